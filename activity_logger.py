@@ -1,7 +1,13 @@
+import logging
+
 from flask import session, request
 from models import ActivityLog, db
+from socket_encoding import emit_event
+from metrics import record_activity_log
 import datetime
 
+logger = logging.getLogger(__name__)
+
 
 def log_activity(action, entity_type, entity_id=None, entity_name=None, description=None):
     """
@@ -43,28 +49,26 @@ def log_activity(action, entity_type, entity_id=None, entity_name=None, descript
         
         db.session.add(activity_log)
         db.session.commit()
+        record_activity_log(action, entity_type)
         
         # Emit real-time log update to logs dashboard
         try:
             from flask import current_app
             if hasattr(current_app, 'socketio') and school_id:
-                print(f"📡 Emitting new_activity_log to room school_{school_id}")
-                current_app.socketio.emit('new_activity_log', {
+                emit_event(current_app.socketio, 'new_activity_log', {
                     'school_id': school_id,
                     'log': activity_log.to_dict()
-                }, room=f'school_{school_id}')
-                print(f"✅ new_activity_log event emitted successfully")
+                }, f'school_{school_id}')
             else:
-                print(f"⚠️ No socketio instance found or no school_id")
-        except Exception as e:
-            print(f"❌ Failed to emit activity log: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        print(f"📝 Activity logged: {username} ({user_role}) {action} {entity_type} - {entity_name}")
-        
-    except Exception as e:
-        print(f"❌ Failed to log activity: {e}")
+                logger.debug("No socketio instance or school_id, new_activity_log not emitted")
+        except Exception:
+            logger.exception("Failed to emit activity log")
+
+        logger.info("Activity logged: %s (%s) %s %s - %s", username, user_role, action, entity_type, entity_name)
+
+    except Exception:
+        logger.exception("Failed to log activity")
+        record_activity_log(action, entity_type, ok=False)
         # Don't let logging errors break the main functionality
         db.session.rollback()
 
@@ -91,11 +95,13 @@ def log_login(username, user_role, school_id=None):
         
         db.session.add(activity_log)
         db.session.commit()
+        record_activity_log('LOGIN', 'auth')
         
-        print(f"🔑 Login logged: {username} ({user_role})")
-        
-    except Exception as e:
-        print(f"❌ Failed to log login: {e}")
+        logger.info("Login logged: %s (%s)", username, user_role)
+
+    except Exception:
+        logger.exception("Failed to log login")
+        record_activity_log('LOGIN', 'auth', ok=False)
         db.session.rollback()
 
 
@@ -121,9 +127,11 @@ def log_logout(username, user_role, school_id=None):
         
         db.session.add(activity_log)
         db.session.commit()
+        record_activity_log('LOGOUT', 'auth')
         
-        print(f"🚪 Logout logged: {username} ({user_role})")
-        
-    except Exception as e:
-        print(f"❌ Failed to log logout: {e}")
+        logger.info("Logout logged: %s (%s)", username, user_role)
+
+    except Exception:
+        logger.exception("Failed to log logout")
+        record_activity_log('LOGOUT', 'auth', ok=False)
         db.session.rollback()
\ No newline at end of file
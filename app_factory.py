@@ -0,0 +1,206 @@
+"""
+Application factory shared by every entry point
+create_app(config) builds the Flask app with the blueprint groups listed in
+BLUEPRINT_GROUPS (instance/config.py, comma separated):
+
+    auth            login and logout pages
+    main_admin      main admin dashboard, Telegram settings, profiles
+    school_admin    school admin dashboard, CRUD pages, activity logs
+    instructor      instructor portal
+    api             mobile app REST API
+    telegram        school admin Telegram pages and webhook (off by default)
+
+Blueprint modules are imported only when their group is mounted, and
+Socket.IO only with realtime=True: flask_socketio brings in the engine.io
+client and requests, the largest part of a cold start. Socket event
+handlers are registered by app_realtime.py, which is the realtime server.
+
+Maintenance scripts and migrations use create_script_app(): config and
+database only, no blueprints, request hooks or Socket.IO. Tests and
+benchmarks use create_local_app(), which also creates the tables. Production
+serving goes through wsgi.py and gunicorn.conf.py.
+"""
+
+import importlib
+import logging
+
+from flask import Flask, render_template
+
+from database import init_database
+from health import init_health
+from structured_logging import init_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUPS = ('auth', 'main_admin', 'school_admin', 'instructor', 'api')
+
+# group -> (module, blueprint attribute, register options, optional)
+BLUEPRINT_GROUPS = {
+    'auth': [
+        ('blueprints.auth.auth', 'auth_bp', {}, False),
+    ],
+    'main_admin': [
+        ('blueprints.main_admin.main_admin_dashboard', 'main_admin_bp', {}, False),
+    ],
+    'school_admin': [
+        ('blueprints.school_admin.school_admin_dashboard', 'school_admin_bp', {}, False),
+        ('blueprints.school_admin.crud_intructor', 'school_admin_bp', {}, False),
+        ('blueprints.school_admin.crud_accounts', 'school_admin_bp', {}, False),
+        ('blueprints.school_admin.crud_section', 'sections_bp', {}, False),
+        ('blueprints.school_admin.crud_student', 'school_admin_bp', {}, False),
+        ('blueprints.school_admin.crud_subject', 'subjects_bp', {}, False),
+        ('blueprints.school_admin.crud_assignment', 'assignment_bp', {}, False),
+        ('blueprints.school_admin.logs', 'logs_bp', {}, False),
+    ],
+    'instructor': [
+        ('blueprints.instructor.instructor_dashboard', 'instructor_bp', {}, False),
+    ],
+    'api': [
+        ('blueprints.api.auth_api', 'auth_api', {}, False),
+        ('blueprints.api.messaging_api', 'messaging_api', {}, False),
+        ('blueprints.api.school_api', 'school_api', {}, False),
+        ('blueprints.api.attendance_api', 'attendance_api', {}, True),
+        ('blueprints.api.meetings_api', 'meetings_api', {}, True),
+        ('blueprints.api.presence_api', 'presence_api', {}, False),
+    ],
+    'telegram': [
+        ('blueprints.school_admin.crud_telegram', 'telegram_bp', {'url_prefix': '/school_admin'}, False),
+    ],
+}
+
+
+def enabled_groups(config):
+    """Blueprint groups to mount, from BLUEPRINT_GROUPS in the config"""
+    groups = config.get('BLUEPRINT_GROUPS', DEFAULT_GROUPS)
+    if isinstance(groups, str):
+        groups = [group.strip() for group in groups.split(',') if group.strip()]
+    unknown = set(groups) - set(BLUEPRINT_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown blueprint groups: {', '.join(sorted(unknown))}")
+    return list(groups)
+
+
+def register_blueprints(app, groups):
+    """Import and register the blueprints of groups; returns their names"""
+    registered = []
+    for group in groups:
+        for module_name, attribute, options, optional in BLUEPRINT_GROUPS[group]:
+            try:
+                module = importlib.import_module(module_name)
+            except Exception as e:
+                if not optional:
+                    raise
+                logger.warning("Skipping %s: %s", module_name, e)
+                continue
+            blueprint = getattr(module, attribute)
+            app.register_blueprint(blueprint, **options)
+            registered.append(blueprint.name)
+    return registered
+
+
+def init_realtime(app):
+    """Socket.IO server and the presence registry"""
+    from flask_socketio import SocketIO
+    from presence import create_presence
+
+    # async_mode follows the server: threading for the dev server and gthread
+    # workers, gevent/eventlet for those gunicorn workers (see gunicorn.conf.py).
+    # http_compression deflates long-polling responses above compression_threshold bytes
+    socketio = SocketIO(app, cors_allowed_origins="*",
+                        async_mode=app.config.get('SOCKETIO_ASYNC_MODE', 'threading'),
+                        message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE') or None,
+                        http_compression=True, compression_threshold=1024)
+    # Attach socketio to app for activity_logger and blueprint access
+    app.socketio = socketio
+    # Presence registry: who is online right now (see presence.py)
+    app.presence = create_presence(app.config)
+    return socketio
+
+
+def create_app(config=None, groups=None, realtime=False, instrument=True):
+    """Build the EduTrack app.
+
+    config    config object (default instance.config.Config)
+    groups    blueprint groups to mount, default BLUEPRINT_GROUPS from the config
+    realtime  also create the Socket.IO server (app.socketio) and start the
+              notification dispatcher (NOTIFICATION_DISPATCHER)
+    instrument  query statistics, profiler and /metrics
+    """
+    if config is None:
+        from instance.config import Config as config
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # JSON logs written off the request thread (see structured_logging.py)
+    init_logging(app)
+
+    # SQLAlchemy setup: URL, pool and read replica from the config (see database.py)
+    init_database(app)
+
+    socketio = init_realtime(app) if realtime else None
+
+    if instrument:
+        from query_stats import init_query_stats
+        from profiler import init_profiler
+        from metrics import init_metrics
+        # Statement counts and timings per request (see query_stats.py)
+        init_query_stats(app)
+        # On-demand request profiles for admins (see profiler.py)
+        init_profiler(app)
+        # Prometheus metrics at /metrics, including Socket.IO emits (see metrics.py)
+        init_metrics(app, socketio)
+
+    groups = enabled_groups(app.config) if groups is None else list(dict.fromkeys(groups))
+    app.blueprint_groups = groups
+    register_blueprints(app, groups)
+
+    if realtime and app.config.get('NOTIFICATION_DISPATCHER', True):
+        from notification_outbox import start_dispatcher
+        # Only a process with Socket.IO can push App rows: consume them from
+        # the start rather than after this process's first wake_dispatcher()
+        start_dispatcher(app)
+
+    if 'instructor' in groups and app.config.get('DIGEST_FLUSHER', True):
+        from attendance_digest import start_digest_flusher
+        # Buffered results must not wait for the next one recorded in this
+        # process, which after a restart can be the next school day
+        start_digest_flusher(app)
+
+    if groups:
+        @app.route('/')
+        def home():
+            return render_template('landing.html')
+
+        # /healthz and /readyz for the load balancer (see health.py)
+        init_health(app)
+
+    return app
+
+
+def create_local_app(config=None, groups=(), database_url=None, realtime=False, instrument=False,
+                     sqlite_mysql_shims=False, **settings):
+    """App on a local database with its tables created (tests, benchmarks).
+
+    settings override config for this app only; sqlite_mysql_shims=True adds
+    the MySQL functions some views use (CONCAT, IF) when the database is SQLite.
+    """
+    import models  # noqa: F401 - register the tables for db.create_all()
+    from database import db, install_sqlite_mysql_shims
+    if config is None:
+        from instance.config import Config as config
+    if database_url:
+        settings['SQLALCHEMY_DATABASE_URI'] = database_url
+    app = create_app(type(config.__name__, (config,), settings), groups=groups,
+                     realtime=realtime, instrument=instrument)
+    with app.app_context():
+        if sqlite_mysql_shims:
+            install_sqlite_mysql_shims(db.engine)
+        db.create_all(bind_key=None)
+    return app
+
+
+def create_script_app(config=None):
+    """App for migrations and maintenance scripts: config and database only"""
+    import models  # noqa: F401 - register the tables for db.create_all()
+    return create_app(config, groups=(), instrument=False)
@@ -0,0 +1,295 @@
+"""
+Attendance Digests
+record_attendance used to write one message per student per class, so a
+student with eight classes produced eight inbox messages and up to eight
+Telegram messages a day. Schools can now switch to a digest mode in
+school_notification_settings:
+
+    quiet       send once no new result arrived for quiet_minutes
+    end_of_day  send at digest_time (local HH:MM), or later for older days
+
+In digest mode the results are buffered in attendance_digest_events, in
+the same transaction as the attendance rows, and flush_due_digests() turns
+each student's buffer into one consolidated inbox message plus, depending
+on presence, one Telegram or in-app push through the notification outbox.
+Statuses listed in realtime_statuses (Absent and Late by default) bypass
+the buffer and still go out immediately.
+
+Every web app that mounts the instructor portal starts a DigestFlusher when
+it is built (create_app, DIGEST_FLUSHER), so results buffered before a worker
+was recycled or restarted are still sent on time. `python attendance_digest.py`
+runs a standalone one, `--once` for cron.
+"""
+
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import db
+from models import (AttendanceDigestEvent, Attendance, Conversation, InstructorSchedule, Message,
+                    ParentAccount, SchoolAdmin, SchoolNotificationSettings, Student, Subject)
+from message_templates import STATUS_EMOJI
+from notification_outbox import enqueue_telegram, enqueue_app, wake_dispatcher
+from presence import choose_channel, CHANNEL_SOCKET, CHANNEL_TELEGRAM
+
+logger = logging.getLogger(__name__)
+
+OFF = 'off'
+QUIET = 'quiet'
+END_OF_DAY = 'end_of_day'
+DIGEST_MODES = (OFF, QUIET, END_OF_DAY)
+
+FLUSH_INTERVAL = 60
+
+
+def get_digest_settings(school_id):
+    """Settings of a school in digest mode, None when results are sent in real time"""
+    settings = SchoolNotificationSettings.query.filter_by(school_id=school_id).first()
+    if settings is None or settings.digest_mode == OFF:
+        return None
+    return settings
+
+
+def buffer_event(record, schedule_id, school_id):
+    """Hold an attendance record for the student's next digest (caller commits)"""
+    if record.id is None:
+        db.session.flush()
+    db.session.add(AttendanceDigestEvent(school_id=school_id, student_id=record.student_id,
+                                         attendance_id=record.id, schedule_id=schedule_id))
+
+
+def is_due(settings, events, now):
+    """Whether a student's buffered events should go out now"""
+    if settings is None or settings.digest_mode == OFF:
+        return True  # digest switched off with results still buffered
+    newest = max(event.created_at for event in events)
+    if settings.digest_mode == QUIET:
+        return now - newest >= timedelta(minutes=settings.quiet_minutes)
+    try:
+        hour, minute = (int(part) for part in settings.digest_time.split(':'))
+    except (AttributeError, ValueError):
+        hour, minute = 17, 0
+    oldest = min(event.created_at for event in events)
+    cutoff = datetime.combine(oldest.date(), datetime.min.time()).replace(hour=hour, minute=minute)
+    return now >= cutoff
+
+
+def format_digest(student, rows, html=False):
+    """One message covering every buffered class result of a student"""
+    bold = (lambda text: f"<b>{text}</b>") if html else (lambda text: text)
+    lines = []
+    current_date = None
+    for row in rows:
+        if row.date != current_date:
+            current_date = row.date
+            lines.append(f"\n📅 {bold(row.date.strftime('%A, %B %d, %Y'))}")
+        time_range = f" ({row.start_time} - {row.end_time})" if row.start_time else ''
+        lines.append(f"{STATUS_EMOJI.get(row.status, '📝')} {row.subject or 'Unknown'}{time_range}: {row.status}")
+    return (
+        f"📚 {bold('Attendance Summary')}\n\n"
+        f"👤 {bold('Student:')} {student.first_name} {student.last_name}\n"
+        + "\n".join(lines)
+    )
+
+
+def _school_sender(school_id, cache):
+    """Digests come from the school, not from one of the instructors"""
+    if school_id not in cache:
+        admin = SchoolAdmin.query.filter_by(school_id=school_id).order_by(SchoolAdmin.id).first()
+        cache[school_id] = admin.id if admin else 0
+    return cache[school_id]
+
+
+def _parent_conversation(student, sender_id):
+    parent = ParentAccount.query.filter_by(student_id=student.id).first()
+    if not parent:
+        parent = ParentAccount(student_id=student.id, school_id=student.school_id)
+        db.session.add(parent)
+        db.session.flush()
+    conversation = Conversation.query.filter(
+        Conversation.school_id == student.school_id,
+        db.or_(
+            db.and_(Conversation.participant1_id == sender_id,
+                    Conversation.participant1_type == 'admin',
+                    Conversation.participant2_id == parent.id,
+                    Conversation.participant2_type == 'parent'),
+            db.and_(Conversation.participant1_id == parent.id,
+                    Conversation.participant1_type == 'parent',
+                    Conversation.participant2_id == sender_id,
+                    Conversation.participant2_type == 'admin')
+        )
+    ).first()
+    if not conversation:
+        conversation = Conversation(school_id=student.school_id,
+                                    participant1_id=sender_id, participant1_type='admin',
+                                    participant2_id=parent.id, participant2_type='parent')
+        db.session.add(conversation)
+        db.session.flush()
+    return parent, conversation
+
+
+def flush_due_digests(now=None, school_id=None):
+    """Send every student digest that is due; returns how many were sent"""
+    now = now or datetime.now()
+    query = AttendanceDigestEvent.query
+    if school_id is not None:
+        query = query.filter(AttendanceDigestEvent.school_id == school_id)
+    events = query.order_by(AttendanceDigestEvent.student_id, AttendanceDigestEvent.id)\
+        .with_for_update(skip_locked=True)\
+        .all()
+    if not events:
+        db.session.commit()
+        return 0
+
+    settings = {row.school_id: row for row in SchoolNotificationSettings.query.filter(
+        SchoolNotificationSettings.school_id.in_({event.school_id for event in events})).all()}
+    by_student = {}
+    for event in events:
+        by_student.setdefault(event.student_id, []).append(event)
+    due = {student_id: student_events for student_id, student_events in by_student.items()
+           if is_due(settings.get(student_events[0].school_id), student_events, now)}
+    if not due:
+        db.session.commit()
+        return 0
+
+    # Everything the digests show, in one query
+    rows = db.session.query(
+        AttendanceDigestEvent.student_id,
+        Attendance.date,
+        Attendance.status,
+        Subject.name.label('subject'),
+        InstructorSchedule.start_time,
+        InstructorSchedule.end_time
+    ).join(Attendance, AttendanceDigestEvent.attendance_id == Attendance.id)\
+     .outerjoin(Subject, Attendance.subject_id == Subject.id)\
+     .outerjoin(InstructorSchedule, AttendanceDigestEvent.schedule_id == InstructorSchedule.id)\
+     .filter(AttendanceDigestEvent.id.in_([event.id for student_events in due.values() for event in student_events]))\
+     .order_by(Attendance.date, InstructorSchedule.start_minute, AttendanceDigestEvent.id)\
+     .all()
+    rows_by_student = {}
+    for row in rows:
+        rows_by_student.setdefault(row.student_id, []).append(row)
+    students = {student.id: student for student in Student.query.filter(Student.id.in_(list(due))).all()}
+
+    senders = {}
+    sent = 0
+    for student_id, student_events in due.items():
+        student = students.get(student_id)
+        student_rows = rows_by_student.get(student_id)
+        if student and student_rows:
+            sender_id = _school_sender(student.school_id, senders)
+            parent, conversation = _parent_conversation(student, sender_id)
+            message = Message(
+                conversation_id=conversation.id,
+                sender_id=sender_id,
+                sender_type='admin',
+                receiver_id=parent.id,
+                receiver_type='parent',
+                content=format_digest(student, student_rows),
+                message_type='notification'
+            )
+            db.session.add(message)
+            conversation.updated_at = datetime.now()
+            channel = choose_channel('parent', parent.id, student.telegram_chat_id)
+            if channel == CHANNEL_TELEGRAM:
+                enqueue_telegram(student.id, student.school_id, format_digest(student, student_rows, html=True))
+            elif channel == CHANNEL_SOCKET:
+                enqueue_app(message, student.id, student.school_id)
+            sent += 1
+        for event in student_events:
+            db.session.delete(event)
+
+    db.session.commit()
+    if sent:
+        wake_dispatcher()
+    return sent
+
+
+class DigestFlusher:
+    """Background thread calling flush_due_digests every interval seconds"""
+
+    def __init__(self, app, interval=FLUSH_INTERVAL):
+        self.app = app
+        self.interval = interval
+        self.stats = {'runs': 0, 'digests': 0, 'errors': 0}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='attendance-digest', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                sent = flush_due_digests()
+                self.stats['runs'] += 1
+                self.stats['digests'] += sent
+                return sent
+            except Exception:
+                db.session.rollback()
+                self.stats['errors'] += 1
+                logger.exception("Attendance digest flush failed")
+                return 0
+
+
+_flusher_lock = threading.Lock()
+
+
+def start_digest_flusher(app):
+    """Start app's flusher unless it already has one"""
+    flusher = getattr(app, 'digest_flusher', None)
+    if flusher is None:
+        with _flusher_lock:
+            flusher = getattr(app, 'digest_flusher', None)
+            if flusher is None:
+                flusher = DigestFlusher(app, app.config.get('DIGEST_FLUSH_INTERVAL', FLUSH_INTERVAL)).start()
+                app.digest_flusher = flusher
+    return flusher
+
+
+def ensure_digest_flusher():
+    """Start the current app's flusher unless it is already running"""
+    from flask import current_app
+    return start_digest_flusher(current_app._get_current_object())
+
+
+def main():
+    from telegram_polling import create_polling_app
+
+    parser = argparse.ArgumentParser(description='Attendance digest flusher')
+    parser.add_argument('--once', action='store_true', help='flush what is due and exit (for cron)')
+    args = parser.parse_args()
+
+    app = create_polling_app()
+    flusher = DigestFlusher(app, app.config.get('DIGEST_FLUSH_INTERVAL', FLUSH_INTERVAL))
+    if args.once:
+        print(f"📨 {flusher.run_once()} attendance digests sent")
+        return
+
+    flusher.start()
+    print(f"📨 Flushing attendance digests every {flusher.interval}s")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 {flusher.stats}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping digest flusher...")
+        flusher.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
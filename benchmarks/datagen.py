@@ -0,0 +1,237 @@
+"""
+Synthetic data generator for the benchmarks
+Fills an empty database with schools shaped like the real ones:
+
+    per school    one admin, sections across grades 7-10, one instructor
+                  (with a login) per section, a subject per period and grade
+    timetable     PERIODS classes a day, Monday to Friday, for every
+                  section; instructor (section + period) % sections teaches
+                  a period, so nobody is booked twice
+    attendance    one row per student and class for every school day of the
+                  term, ending today
+    messaging     a parent account per student, conversations between each
+                  instructor and parents of their students, a few messages each
+    activity log  admin and instructor actions spread over the term
+
+Everything comes from one random.Random(seed), so the same arguments give
+the same rows. Rows are written with executemany in chunks and explicit ids,
+which is why the database has to be empty.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from database import db
+from models import (School, SchoolAdmin, Instructor, SchoolInstructorAccount, Section, Subject, Student,
+                    ParentAccount, InstructorSchedule, Attendance, Conversation, Message, ActivityLog)
+from schedule_index import DAY_NAMES, format_minutes
+
+PASSWORD = 'bench-password'
+GRADES = ('Grade 7', 'Grade 8', 'Grade 9', 'Grade 10')
+SUBJECTS = ('Filipino', 'English', 'Mathematics', 'Science', 'Araling Panlipunan', 'MAPEH', 'TLE', 'Values Education')
+FIRST_NAMES = ('Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Angel', 'John', 'Princess', 'Paolo', 'Bea', 'Carlo', 'Jasmine')
+LAST_NAMES = ('Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Villanueva')
+STATUSES = (('Present', 0.86), ('Late', 0.07), ('Absent', 0.05), ('Excused', 0.02))
+LOG_ACTIONS = (('CREATE', 'student'), ('UPDATE', 'student'), ('CREATE', 'attendance'), ('LOGIN', 'account'),
+               ('UPDATE', 'section'), ('DELETE', 'student'), ('CREATE', 'subject'), ('LOGOUT', 'account'))
+
+PERIODS = 6
+FIRST_PERIOD = 7 * 60 + 30
+PERIOD_LENGTH = 60
+CLASS_LENGTH = 50
+CHUNK = 5000
+
+
+class Dataset:
+    """Ids the benchmark scenarios need, per school"""
+
+    def __init__(self):
+        self.schools = []  # dicts, see generate()
+        self.rows = {}     # table name -> rows written
+
+    def school(self, index=0):
+        return self.schools[index]
+
+
+def _write(model, rows, dataset):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[start:start + CHUNK])
+    dataset.rows[model.__tablename__] = dataset.rows.get(model.__tablename__, 0) + len(rows)
+
+
+def _status(rng):
+    roll = rng.random()
+    for status, share in STATUSES:
+        if roll < share:
+            return status
+        roll -= share
+    return STATUSES[0][0]
+
+
+def school_days(end, count):
+    """The last count weekdays up to and including end, oldest first"""
+    days, day = [], end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def generate(schools=1, sections=8, students_per_section=30, term_days=60, conversations_per_instructor=30,
+             messages_per_conversation=8, logs_per_school=3000, seed=42, end=None):
+    """Fill the current app's database; returns a Dataset"""
+    if db.session.query(School.id).first() is not None:
+        raise RuntimeError('The benchmark data generator needs an empty database')
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    days = school_days(end, term_days)
+    password = generate_password_hash(PASSWORD)  # hashed once, shared by every account
+    dataset = Dataset()
+    ids = {name: 0 for name in ('school', 'admin', 'instructor', 'account', 'section', 'subject', 'student',
+                                'parent', 'schedule', 'attendance', 'conversation', 'message', 'log')}
+
+    def next_id(name):
+        ids[name] += 1
+        return ids[name]
+
+    for school_index in range(schools):
+        rows = {model: [] for model in (School, SchoolAdmin, Instructor, SchoolInstructorAccount, Section, Subject,
+                                        Student, ParentAccount, InstructorSchedule)}
+        school_id = next_id('school')
+        rows[School].append({'id': school_id, 'name': f'Benchmark National High School {school_index + 1}',
+                             'school_code': f'BENCH{school_index + 1:03d}'})
+        admin_id = next_id('admin')
+        rows[SchoolAdmin].append({'id': admin_id, 'username': f'benchadmin{school_index + 1}', 'password': password,
+                                  'school_id': school_id, 'role': 'admin'})
+
+        subject_ids = {}
+        for grade in GRADES:
+            for period in range(PERIODS):
+                subject_ids[grade, period] = next_id('subject')
+                rows[Subject].append({'id': subject_ids[grade, period], 'name': SUBJECTS[period % len(SUBJECTS)],
+                                      'school_id': school_id, 'grade_level': grade})
+
+        section_list, instructor_ids, account_ids = [], [], []
+        for index in range(sections):
+            grade = GRADES[index * len(GRADES) // sections]
+            section_id = next_id('section')
+            section_list.append((section_id, grade))
+            rows[Section].append({'id': section_id, 'name': f'Section {index + 1}', 'school_id': school_id,
+                                  'grade_level': grade})
+            instructor_id, account_id = next_id('instructor'), next_id('account')
+            instructor_ids.append(instructor_id)
+            account_ids.append(account_id)
+            rows[Instructor].append({'id': instructor_id, 'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                                     'gender': rng.choice(('Male', 'Female')), 'address': 'Quezon City',
+                                     'email': f'teacher{instructor_id}@bench.example.com', 'school_id': school_id,
+                                     'created_by': admin_id})
+            rows[SchoolInstructorAccount].append({'id': account_id, 'instructor_id': instructor_id,
+                                                  'school_admin_id': admin_id, 'school_id': school_id,
+                                                  'password': password})
+
+        students = {}  # section id -> [(student id, code, parent id)]
+        for section_id, grade in section_list:
+            for _ in range(students_per_section):
+                student_id, parent_id = next_id('student'), next_id('parent')
+                code = f'B{student_id:07d}'
+                rows[Student].append({'id': student_id, 'first_name': rng.choice(FIRST_NAMES),
+                                      'last_name': rng.choice(LAST_NAMES), 'grade_level': grade,
+                                      'section_id': section_id, 'school_id': school_id, 'code': code,
+                                      'parent_contact': f'09{rng.randrange(10 ** 9):09d}'})
+                rows[ParentAccount].append({'id': parent_id, 'student_id': student_id, 'school_id': school_id})
+                students.setdefault(section_id, []).append((student_id, code, parent_id))
+
+        timetable = {}  # weekday -> [(schedule id, instructor id, section id, subject id)]
+        schedules_by_instructor = {}
+        for weekday in range(5):
+            for index, (section_id, grade) in enumerate(section_list):
+                for period in range(PERIODS):
+                    instructor_id = instructor_ids[(index + period) % sections]
+                    start = FIRST_PERIOD + period * PERIOD_LENGTH
+                    schedule_id = next_id('schedule')
+                    rows[InstructorSchedule].append({
+                        'id': schedule_id, 'instructor_id': instructor_id, 'subject_id': subject_ids[grade, period],
+                        'section_id': section_id, 'day': DAY_NAMES[weekday], 'weekday': weekday,
+                        'start_time': format_minutes(start), 'end_time': format_minutes(start + CLASS_LENGTH),
+                        'start_minute': start, 'end_minute': start + CLASS_LENGTH})
+                    timetable.setdefault(weekday, []).append((schedule_id, instructor_id, section_id,
+                                                              subject_ids[grade, period]))
+                    schedules_by_instructor.setdefault(instructor_id, []).append(schedule_id)
+
+        for model, model_rows in rows.items():
+            _write(model, model_rows, dataset)
+
+        # A term of attendance, written a day at a time
+        for day in days:
+            _write(Attendance, [
+                {'id': next_id('attendance'), 'student_id': student_id, 'date': day, 'status': _status(rng),
+                 'subject_id': subject_id, 'instructor_id': instructor_id}
+                for _, instructor_id, section_id, subject_id in timetable[day.weekday()]
+                for student_id, _, _ in students[section_id]
+            ], dataset)
+
+        # Conversations between instructors and parents of the sections they teach
+        conversations, messages = [], []
+        term_start = datetime.combine(days[0], time(7))
+        term_seconds = int((datetime.combine(end, time(18)) - term_start).total_seconds())
+        for index, (instructor_id, account_id) in enumerate(zip(instructor_ids, account_ids)):
+            taught = [section_list[(index - period) % sections][0] for period in range(PERIODS)]
+            parents = [parent_id for section_id in dict.fromkeys(taught) for _, _, parent_id in students[section_id]]
+            for parent_id in rng.sample(parents, min(conversations_per_instructor, len(parents))):
+                conversation_id = next_id('conversation')
+                stamps = sorted(term_start + timedelta(seconds=rng.randrange(term_seconds))
+                                for _ in range(messages_per_conversation))
+                for number, stamp in enumerate(stamps):
+                    from_teacher = number % 2 == 0
+                    messages.append({
+                        'id': next_id('message'), 'conversation_id': conversation_id,
+                        'sender_id': account_id if from_teacher else parent_id,
+                        'sender_type': 'instructor' if from_teacher else 'parent',
+                        'receiver_id': parent_id if from_teacher else account_id,
+                        'receiver_type': 'parent' if from_teacher else 'instructor',
+                        'content': f'Message {number + 1} about class this week', 'timestamp': stamp,
+                        'is_read': number < len(stamps) - 2, 'message_type': 'text'})
+                conversations.append({
+                    'id': conversation_id, 'school_id': school_id,
+                    'participant1_id': account_id, 'participant1_type': 'instructor',
+                    'participant2_id': parent_id, 'participant2_type': 'parent',
+                    'created_at': stamps[0] if stamps else term_start,
+                    'updated_at': stamps[-1] if stamps else term_start})
+        _write(Conversation, conversations, dataset)
+        _write(Message, messages, dataset)
+
+        logs = []
+        for _ in range(logs_per_school):
+            action, entity = rng.choice(LOG_ACTIONS)
+            by_admin = rng.random() < 0.6
+            logs.append({
+                'id': next_id('log'), 'school_id': school_id,
+                'user_id': admin_id if by_admin else rng.choice(instructor_ids),
+                'username': f'benchadmin{school_index + 1}' if by_admin else 'teacher',
+                'user_role': 'school_admin' if by_admin else 'instructor',
+                'action': action, 'entity_type': entity, 'entity_id': rng.randrange(1, 10000),
+                'entity_name': f'{entity.title()} {rng.randrange(1, 10000)}',
+                'description': f'{action.title()} {entity}', 'ip_address': f'10.0.{rng.randrange(256)}.{rng.randrange(256)}',
+                'user_agent': 'Mozilla/5.0 (benchmark)',
+                'timestamp': term_start + timedelta(seconds=rng.randrange(term_seconds))})
+        _write(ActivityLog, logs, dataset)
+        db.session.commit()
+
+        dataset.schools.append({
+            'school_id': school_id,
+            'admin_id': admin_id,
+            'admin_username': f'benchadmin{school_index + 1}',
+            'instructor_ids': instructor_ids,
+            'account_ids': account_ids,
+            'instructor_emails': [f'teacher{instructor_id}@bench.example.com' for instructor_id in instructor_ids],
+            'schedule_ids': schedules_by_instructor,
+            'students': students,
+            'term': (days[0], days[-1]),
+        })
+
+    return dataset
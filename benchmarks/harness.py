@@ -0,0 +1,199 @@
+"""
+Endpoint benchmark harness
+Drives the Flask test client through the hot endpoints against a database
+filled by benchmarks/datagen.py and records, per scenario:
+
+    latency     p50 / p90 / p95 / p99 / max / mean in milliseconds
+    queries     statements per request (mean and max), from the
+                X-Query-Count header of query_stats.py
+    status      response codes seen
+
+The app comes from app_factory.create_local_app with only the blueprint
+groups the scenarios need and without realtime, so no Socket.IO server,
+Telegram bot, notification dispatcher or digest flusher runs next to the
+measurements. Output is a JSON document; compare() checks one run against a
+saved baseline.
+"""
+
+import contextlib
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+from database import db
+from blueprints.api.auth_api import generate_token
+from notification_outbox import NotificationDispatcher
+from app_factory import create_local_app
+from benchmarks.datagen import PASSWORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTILES = (50, 90, 95, 99)
+GROUPS = ('instructor', 'school_admin', 'api')
+# Quiet logs and no background threads next to the measurements
+SETTINGS = {
+    'SECRET_KEY': 'benchmark',
+    'DATABASE_REPLICA_URL': None,
+    'LOG_LEVEL': 'WARNING',
+    'LOG_FORMAT': 'text',
+    'LOG_FILE': None,
+    'NOTIFICATION_DISPATCHER': False,
+    'DIGEST_FLUSHER': False,
+    'QUERY_TIMING_HEADERS': True,
+    'QUERY_STRICT_LIMIT': 0,
+}
+
+
+def create_bench_app(database_url):
+    """The app with the benchmarked blueprint groups on database_url"""
+    app = create_local_app(groups=GROUPS, database_url=database_url, instrument=True,
+                           sqlite_mysql_shims=True, **SETTINGS)
+    # Notifications stay queued in the outbox; delivery is not part of the request
+    app.notification_dispatcher = NotificationDispatcher(app)
+    return app
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(latencies, queries, statuses):
+    latencies = sorted(latencies)
+    result = {'count': len(latencies)}
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = round(percentile(latencies, p) * 1000, 3)
+    result['max_ms'] = round(latencies[-1] * 1000, 3) if latencies else 0.0
+    result['mean_ms'] = round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0
+    result['queries_mean'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    result['queries_max'] = max(queries) if queries else 0
+    result['status'] = {str(code): statuses.count(code) for code in sorted(set(statuses))}
+    return result
+
+
+def scenarios(app, dataset):
+    """(name, client, request factory) for every benchmarked endpoint.
+
+    A request factory takes the iteration number and returns
+    (method, url, keyword arguments for the test client)
+    """
+    school = dataset.school(0)
+    instructor_id = school['instructor_ids'][0]
+    account_id = school['account_ids'][0]
+    schedule_id = school['schedule_ids'][instructor_id][0]
+    term_end = school['term'][1]
+
+    instructor = app.test_client()
+    with instructor.session_transaction() as sess:
+        sess['instructor_id'] = instructor_id
+        sess['school_id'] = school['school_id']
+    admin = app.test_client()
+    with admin.session_transaction() as sess:
+        sess['user_id'] = school['admin_id']
+        sess['user_type'] = 'school_admin'
+        sess['school_id'] = school['school_id']
+    api = app.test_client()
+
+    with app.app_context():
+        from models import InstructorSchedule
+        section_id = db.session.get(InstructorSchedule, schedule_id).section_id
+    student_id, code, parent_id = school['students'][section_id][0]
+    instructor_headers = {'Authorization': 'Bearer ' + generate_token(
+        account_id, school['instructor_emails'][0], 'instructor', school['school_id'], 'instructor')}
+    parent_headers = {'Authorization': 'Bearer ' + generate_token(
+        parent_id, str(student_id), 'parent', school['school_id'], 'parent')}
+    roster = [student for student, _, _ in school['students'][section_id]]
+
+    def record_attendance(i):
+        # A new date every time, the endpoint refuses a second recording of a day
+        form = {'date': (term_end + timedelta(days=i + 1)).isoformat()}
+        form.update({f'status_{student}': 'Present' if (student + i) % 9 else 'Absent' for student in roster})
+        return 'post', f'/instructor/attendance/{schedule_id}?ajax=1', {'data': form}
+
+    return [
+        ('record_attendance', instructor, record_attendance),
+        ('conversations', api, lambda i: ('get', '/api/messaging/conversations', {'headers': instructor_headers})),
+        ('monthly_report', instructor, lambda i: (
+            'get', f'/instructor/attendance/monthly-report?month={term_end.month}&year={term_end.year}', {})),
+        ('logs_dashboard', admin, lambda i: ('get', '/school_admin/logs/', {})),
+        ('attendance_summary', api, lambda i: ('get', '/api/attendance/summary', {'headers': parent_headers})),
+        ('login_instructor', api, lambda i: ('post', '/api/auth/login', {'json': {
+            'username': school['instructor_emails'][0], 'password': PASSWORD}})),
+        ('login_parent', api, lambda i: ('post', '/api/auth/login', {'json': {
+            'username': str(student_id), 'password': code}})),
+    ]
+
+
+def run(app, dataset, iterations=50, warmup=5, only=None, quiet=True):
+    """Benchmark every scenario; returns {name: summary}"""
+    results = {}
+    sink = open(os.devnull, 'w') if quiet else None
+    try:
+        for name, client, factory in scenarios(app, dataset):
+            if only and name not in only:
+                continue
+            latencies, queries, statuses = [], [], []
+            for i in range(warmup + iterations):
+                method, url, kwargs = factory(i)
+                with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, **kwargs)
+                    elapsed = time.perf_counter() - started
+                if i < warmup:
+                    continue
+                latencies.append(elapsed)
+                queries.append(int(response.headers.get('X-Query-Count', 0)))
+                statuses.append(response.status_code)
+            results[name] = summarize(latencies, queries, statuses)
+    finally:
+        if sink:
+            sink.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, dataset, settings):
+    """The JSON document written by benchmarks/run.py"""
+    return {
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'rows': dataset.rows,
+        'results': results,
+    }
+
+
+def compare(baseline, current, max_regression=0.25, metric='p95_ms'):
+    """Regressions of current against baseline, as readable strings.
+
+    Latency regresses when metric grew by more than max_regression (0.25 =
+    25%). Statement counts do not depend on the machine, so any growth of
+    queries_max counts, as does a scenario that stopped answering 2xx.
+    """
+    problems = []
+    for name, before in baseline.get('results', {}).items():
+        after = current['results'].get(name)
+        if after is None:
+            continue
+        if before[metric] and after[metric] > before[metric] * (1 + max_regression):
+            problems.append(f"{name}: {metric} {before[metric]:.1f} -> {after[metric]:.1f} ms "
+                            f"(+{(after[metric] / before[metric] - 1) * 100:.0f}%)")
+        if after['queries_max'] > before['queries_max']:
+            problems.append(f"{name}: queries per request {before['queries_max']} -> {after['queries_max']}")
+        failed = sum(count for code, count in after['status'].items() if not code.startswith('2'))
+        if failed:
+            problems.append(f"{name}: {failed} responses were not 2xx ({after['status']})")
+    return problems
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Load test: development server against the production server
+Fills a temporary SQLite database with benchmarks/datagen.py, starts each
+server on it in turn and drives it with concurrent keep-alive clients for a
+fixed time. Per server it reports requests per second, latency percentiles
+and failed requests.
+
+    dev             socketio.run(), the Werkzeug server app_realtime.py used
+    gunicorn        gunicorn -c gunicorn.conf.py wsgi:app (realtime, gevent
+                    when installed)
+    gunicorn-rest   the same with WEB_REALTIME=0 and auto-sized workers
+
+The request mix is the mobile API (attendance summary and conversations,
+with JWTs) plus /readyz, so every request reaches the database.
+
+Usage (from the repository root):
+    python -m benchmarks.load --clients 32 --duration 20
+    python -m benchmarks.load --servers dev gunicorn --output load.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks import datagen, harness
+
+ROOT = harness.ROOT
+SERVERS = {
+    'dev': ([sys.executable, '-c', 'from app_realtime import app, socketio; '
+             'socketio.run(app, host="127.0.0.1", port={port}, use_reloader=False, allow_unsafe_werkzeug=True, '
+             'log_output=False)'], {'SOCKETIO_ASYNC_MODE': 'threading'}),
+    'gunicorn': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                 {'WEB_REALTIME': '1', 'WEB_ACCESS_LOG': ''}),
+    'gunicorn-rest': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                      {'WEB_REALTIME': '0', 'WEB_ACCESS_LOG': ''}),
+}
+
+
+def prepare_database(path, sections, students):
+    """Seeded SQLite database; returns (url, request mix)"""
+    url = 'sqlite:///' + path
+    app = harness.create_bench_app(url)
+    with app.app_context():
+        dataset = datagen.generate(schools=1, sections=sections, students_per_section=students, term_days=20,
+                                   conversations_per_instructor=10, logs_per_school=200)
+    school = dataset.school(0)
+    student_id, _, parent_id = next(iter(school['students'].values()))[0]
+    instructor = 'Bearer ' + harness.generate_token(school['account_ids'][0], school['instructor_emails'][0],
+                                                    'instructor', school['school_id'], 'instructor')
+    parent = 'Bearer ' + harness.generate_token(parent_id, str(student_id), 'parent', school['school_id'], 'parent')
+    mix = [
+        ('/api/attendance/summary', {'Authorization': parent}),
+        ('/api/messaging/conversations', {'Authorization': instructor}),
+        ('/api/attendance/history?limit=20', {'Authorization': parent}),
+        ('/readyz', {}),
+    ]
+    return url, mix
+
+
+def start_server(name, database_url, port):
+    command, env = SERVERS[name]
+    env = dict(os.environ, DATABASE_URL=database_url, WEB_BIND=f'127.0.0.1:{port}', **env)
+    process = subprocess.Popen([part.format(port=port) for part in command], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/healthz')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{name} did not answer /healthz on port {port}')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def drive(port, mix, clients, duration):
+    """Keep clients busy for duration seconds; returns (latencies, failures)"""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed, i = [], 0, offset
+        while time.perf_counter() < deadline:
+            path, headers = mix[i % len(mix)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            failures.append(failed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(failures)
+
+
+def run(servers, clients=16, duration=10, warmup=2, sections=4, students=30, port=5190):
+    folder = tempfile.mkdtemp()
+    database_url, mix = prepare_database(os.path.join(folder, 'load.sqlite3'), sections, students)
+    results = {}
+    for offset, name in enumerate(servers):
+        try:
+            process = start_server(name, database_url, port + offset)
+        except (OSError, RuntimeError) as e:
+            results[name] = {'error': str(e)}
+            continue
+        try:
+            drive(port + offset, mix, clients, warmup)
+            latencies, failed = drive(port + offset, mix, clients, duration)
+        finally:
+            stop_server(process)
+        summary = harness.summarize(latencies, [], [200] * len(latencies))
+        summary.pop('queries_mean'), summary.pop('queries_max'), summary.pop('status')
+        summary['rps'] = round(len(latencies) / duration, 1)
+        summary['failed'] = failed
+        results[name] = summary
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EduTrack360 server load test')
+    parser.add_argument('--servers', nargs='*', choices=sorted(SERVERS), default=['dev', 'gunicorn', 'gunicorn-rest'])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per server')
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--sections', type=int, default=4)
+    parser.add_argument('--students', type=int, default=30, help='students per section')
+    parser.add_argument('--port', type=int, default=5190, help='first port to use')
+    parser.add_argument('--output', help='write the JSON results here')
+    args = parser.parse_args()
+
+    print("🧪 EduTrack360 load test")
+    print("=" * 50)
+    print(f"  {args.clients} clients, {args.duration:g} s per server")
+    results = run(args.servers, clients=args.clients, duration=args.duration, warmup=args.warmup,
+                  sections=args.sections, students=args.students, port=args.port)
+
+    print(f"\n  {'server':<15} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'failed':>7}")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"  {name:<15} ❌ {result['error']}")
+            continue
+        print(f"  {name:<15} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f} {result['failed']:>7}")
+    dev = results.get('dev', {}).get('rps')
+    for name, result in results.items():
+        if name != 'dev' and dev and 'rps' in result:
+            print(f"  {name}: {result['rps'] / dev:.2f}x the development server's throughput")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clients': args.clients, 'duration': args.duration, 'results': results}, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
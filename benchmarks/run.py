@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner
+Generates a dataset, runs the endpoint scenarios and writes the results as
+JSON. With --baseline the run is compared against an earlier result file
+and the exit status is 1 when an endpoint got slower by more than
+--max-regression or started issuing more statements.
+
+Uses a temporary SQLite file unless --database-url points at an empty
+database (e.g. a scratch MySQL schema).
+
+Usage (from the repository root):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --max-regression 0.3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import datagen, harness
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EduTrack360 endpoint benchmarks')
+    parser.add_argument('--database-url', help='empty database to fill (default: a temporary SQLite file)')
+    parser.add_argument('--schools', type=int, default=1)
+    parser.add_argument('--sections', type=int, default=8)
+    parser.add_argument('--students', type=int, default=30, help='students per section')
+    parser.add_argument('--term-days', type=int, default=60)
+    parser.add_argument('--conversations', type=int, default=30, help='conversations per instructor')
+    parser.add_argument('--logs', type=int, default=3000, help='activity log rows per school')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='scenario names to run')
+    parser.add_argument('--output', help='write the JSON results here')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='allowed p95 growth against the baseline (0.25 = 25%%)')
+    parser.add_argument('--verbose', action='store_true', help='show what the endpoints print')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    app = harness.create_bench_app(database_url)
+
+    print("🧪 EduTrack360 benchmarks")
+    print("=" * 50)
+    started = time.perf_counter()
+    with app.app_context():
+        dataset = datagen.generate(schools=args.schools, sections=args.sections,
+                                   students_per_section=args.students, term_days=args.term_days,
+                                   conversations_per_instructor=args.conversations,
+                                   logs_per_school=args.logs, seed=args.seed)
+    print(f"  Data generated in {time.perf_counter() - started:.1f} s: "
+          + ', '.join(f'{count} {table}' for table, count in dataset.rows.items()))
+
+    results = harness.run(app, dataset, iterations=args.iterations, warmup=args.warmup,
+                          only=args.only, quiet=not args.verbose)
+    settings = {key: getattr(args, key) for key in ('schools', 'sections', 'students', 'term_days',
+                                                    'conversations', 'logs', 'seed', 'iterations', 'warmup')}
+    settings['database'] = database_url.split(':', 1)[0]
+    document = harness.report(results, dataset, settings)
+
+    print(f"\n  {'scenario':<20} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'queries':>8}  status")
+    for name, result in results.items():
+        print(f"  {name:<20} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['max_ms']:>8.1f} {result['queries_max']:>8}  {result['status']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, default=str)
+        print(f"\n  Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = harness.compare(baseline, document, max_regression=args.max_regression)
+        if problems:
+            print(f"\n❌ Regressions against {args.baseline}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Bandwidth benchmark for Socket.IO room events
+Compares JSON, msgpack and msgpack+deflate payloads for a school room with
+1,000 connected clients. Runs offline, no server or database needed.
+
+Usage (from the repository root):
+    python -m benchmarks.socket_payloads --clients 1000 --events 500
+"""
+
+import argparse
+import datetime
+import time
+
+import socket_encoding
+from socket_encoding import (
+    ENCODING_JSON, ENCODING_MSGPACK, ENCODING_MSGPACK_DEFLATE, encode, decode, encoded_size,
+    shorten, expand
+)
+
+
+def sample_activity_log(i):
+    """Payload shaped like activity_logger's new_activity_log event"""
+    return {
+        'school_id': 3,
+        'log': {
+            'id': 120000 + i,
+            'school_id': 3,
+            'user_id': 17,
+            'username': 'registrar.admin',
+            'user_role': 'school_admin',
+            'action': 'UPDATE',
+            'entity_type': 'student',
+            'entity_id': 4821 + i,
+            'entity_name': 'Maria Clara Santos',
+            'description': 'Updated student: Maria Santos → Maria Clara Santos (Grade 10)',
+            'ip_address': '192.168.10.42',
+            'user_agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                           '(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0'),
+            'timestamp': (datetime.datetime(2025, 1, 6, 8, 0) + datetime.timedelta(seconds=i)).isoformat()
+        }
+    }
+
+
+def sample_message(i):
+    """Payload shaped like the attendance new_message event"""
+    return {
+        'id': 880000 + i,
+        'conversationId': 5120 + i,
+        'senderId': 44,
+        'content': (
+            f"Attendance for Student {i} Dela Cruz on 2025-01-06\n"
+            f"Subject: Araling Panlipunan 10\n"
+            f"Status: Present\n"
+            f"Time: 08:00 - 09:00"
+        ),
+        'timestamp': (datetime.datetime(2025, 1, 6, 8, 0) + datetime.timedelta(seconds=i)).isoformat(),
+        'type': 'notification'
+    }
+
+
+def measure(name, factory, clients, events, encodings):
+    payloads = [factory(i) for i in range(events)]
+    results = {}
+    for encoding in encodings:
+        start = time.perf_counter()
+        sizes = [encoded_size(p, encoding) for p in payloads]
+        elapsed = time.perf_counter() - start
+        per_event = sum(sizes) / len(sizes)
+        results[encoding] = per_event
+        print(f"  {encoding:<16} {per_event:8.1f} B/event  "
+              f"{per_event * clients / 1024:10.1f} KiB per room broadcast  "
+              f"{per_event * clients * events / 1024 / 1024:8.2f} MiB total  "
+              f"encode {elapsed / events * 1e6:6.1f} us/event")
+
+        if encoding != ENCODING_JSON:
+            roundtrip = decode(encode(payloads[0], encoding), encoding)
+            assert roundtrip == expand(shorten(payloads[0])), f"{encoding} round trip mismatch for {name}"
+
+    baseline = results[ENCODING_JSON]
+    for encoding, size in results.items():
+        if encoding != ENCODING_JSON:
+            print(f"  {encoding:<16} saves {(1 - size / baseline) * 100:5.1f}% vs JSON")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=500)
+    args = parser.parse_args()
+
+    if socket_encoding.msgpack is None:
+        print("⚠️ msgpack is not installed, only the JSON baseline can be measured")
+        encodings = [ENCODING_JSON]
+    else:
+        encodings = [ENCODING_JSON, ENCODING_MSGPACK, ENCODING_MSGPACK_DEFLATE]
+
+    print(f"📊 School room with {args.clients} clients, {args.events} events per type\n")
+    print("new_activity_log")
+    measure('new_activity_log', sample_activity_log, args.clients, args.events, encodings)
+    print("\nnew_message")
+    measure('new_message', sample_message, args.clients, args.events, encodings)
+
+
+if __name__ == '__main__':
+    main()
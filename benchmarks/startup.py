@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Times a cold start of each way the app is built, every run in a fresh
+interpreter so no module is already imported:
+
+    realtime        import app_realtime (Socket.IO server, all groups)
+    web             create_app(), no Socket.IO
+    script          create_script_app(), what migrations and workers use
+    group:<name>    create_app(groups=[name]), one blueprint group alone
+
+Reports the median time spent importing and building the app, the whole
+process wall time (interpreter start included), the number of modules
+loaded and whether requests and flask_socketio were among them. With
+--baseline the exit status is 1 when a variant got slower by more than
+--max-regression.
+
+Usage (from the repository root):
+    python -m benchmarks.startup --runs 7 --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from app_factory import BLUEPRINT_GROUPS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; the last line it prints is the measurement
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+{build}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'build_ms': elapsed * 1000, 'modules': len(sys.modules),
+                  'requests': 'requests' in sys.modules, 'socketio': 'flask_socketio' in sys.modules}}))
+'''
+
+VARIANTS = {
+    'realtime': 'import app_realtime',
+    'web': 'from app_factory import create_app; create_app()',
+    'script': 'from app_factory import create_script_app; create_script_app()',
+}
+VARIANTS.update({f'group:{group}': f'from app_factory import create_app; create_app(groups=[{group!r}])'
+                 for group in BLUEPRINT_GROUPS})
+
+
+def measure(build, database_url):
+    """One cold start in a fresh interpreter"""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.pop('SQLALCHEMY_DATABASE_URI', None)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD.format(build=build)], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    process_ms = (time.perf_counter() - started) * 1000
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'failed')
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result['process_ms'] = process_ms
+    return result
+
+
+def run(variants, runs=5, database_url='sqlite://'):
+    """Median cold start of every variant; returns {name: summary}"""
+    results = {}
+    for name in variants:
+        try:
+            samples = [measure(VARIANTS[name], database_url) for _ in range(runs)]
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        results[name] = {
+            'build_ms': round(statistics.median(s['build_ms'] for s in samples), 1),
+            'process_ms': round(statistics.median(s['process_ms'] for s in samples), 1),
+            'modules': samples[-1]['modules'],
+            'requests': samples[-1]['requests'],
+            'socketio': samples[-1]['socketio'],
+        }
+    return results
+
+
+def compare(baseline, current, max_regression=0.25):
+    """Variants whose median build time grew by more than max_regression"""
+    problems = []
+    for name, before in baseline.get('results', {}).items():
+        after = current['results'].get(name)
+        if not after or 'error' in before:
+            continue
+        if 'error' in after:
+            problems.append(f"{name}: {after['error']}")
+        elif after['build_ms'] > before['build_ms'] * (1 + max_regression):
+            problems.append(f"{name}: {before['build_ms']:.0f} -> {after['build_ms']:.0f} ms "
+                            f"(+{(after['build_ms'] / before['build_ms'] - 1) * 100:.0f}%)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EduTrack360 startup benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per variant')
+    parser.add_argument('--only', nargs='*', choices=sorted(VARIANTS), help='variants to run')
+    parser.add_argument('--database-url', default='sqlite://',
+                        help='DATABASE_URL for the children; engines are created but not connected')
+    parser.add_argument('--output', help='write the JSON results here')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='allowed growth of the median build time (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    print("🧪 EduTrack360 startup")
+    print("=" * 50)
+    results = run(args.only or list(VARIANTS), runs=args.runs, database_url=args.database_url)
+    document = {'python': sys.version.split()[0], 'runs': args.runs, 'results': results}
+
+    print(f"  {'variant':<22} {'build':>8} {'process':>8} {'modules':>8}  requests  socketio")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"  {name:<22} ❌ {result['error']}")
+            continue
+        print(f"  {name:<22} {result['build_ms']:>8.0f} {result['process_ms']:>8.0f} {result['modules']:>8}  "
+              f"{'yes' if result['requests'] else 'no':<8}  {'yes' if result['socketio'] else 'no'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(baseline, document, max_regression=args.max_regression)
+        if problems:
+            print(f"\n❌ Regressions against {args.baseline}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
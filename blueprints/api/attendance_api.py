@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from datetime import date
 from models import Attendance, ParentAccount, Student, Subject, Instructor, db
 from blueprints.api.auth_api import token_required
+from database import read_replica
 
 attendance_api = Blueprint('attendance_api', __name__, url_prefix='/api/attendance')
 
@@ -11,6 +12,23 @@ def _get_parent_student_id(user_id: int) -> int | None:
     return parent.student_id if parent else None
 
 
+def _serialize_attendance(records):
+    """Attendance rows with subject and instructor names, looked up in one
+    query each instead of two per row"""
+    subject_ids = {a.subject_id for a in records if a.subject_id}
+    instructor_ids = {a.instructor_id for a in records if a.instructor_id}
+    subjects = dict(db.session.query(Subject.id, Subject.name).filter(Subject.id.in_(subject_ids)).all()) \
+        if subject_ids else {}
+    instructors = dict(db.session.query(Instructor.id, Instructor.name).filter(Instructor.id.in_(instructor_ids)).all()) \
+        if instructor_ids else {}
+    return [{
+        'date': a.date.isoformat() if a.date else None,
+        'status': a.status,
+        'subject': subjects.get(a.subject_id),
+        'instructor': instructors.get(a.instructor_id),
+    } for a in records]
+
+
 @attendance_api.route('/summary', methods=['GET'])
 @token_required
 def summary():
@@ -34,25 +52,17 @@ def summary():
         group_by(Attendance.status).all()
     totals = {status: count for status, count in totals_query}
 
-    def serialize_att(a: Attendance):
-        subj = Subject.query.get(a.subject_id)
-        instr = Instructor.query.get(a.instructor_id)
-        return {
-            'date': a.date.isoformat() if a.date else None,
-            'status': a.status,
-            'subject': subj.name if subj else None,
-            'instructor': instr.name if instr else None,
-        }
 
     return jsonify({
         'success': True,
         'studentId': student_id,
-        'today': [serialize_att(a) for a in todays],
+        'today': _serialize_attendance(todays),
         'totals': totals
     })
 
 
 @attendance_api.route('/history', methods=['GET'])
+@read_replica
 @token_required
 def history():
     """Return recent attendance history for parent (defaults to last 50)."""
@@ -66,14 +76,5 @@ def history():
     limit = request.args.get('limit', 50, type=int)
     rows = Attendance.query.filter_by(student_id=student_id).order_by(Attendance.date.desc(), Attendance.id.desc()).limit(limit).all()
 
-    def serialize_att(a: Attendance):
-        subj = Subject.query.get(a.subject_id)
-        instr = Instructor.query.get(a.instructor_id)
-        return {
-            'date': a.date.isoformat() if a.date else None,
-            'status': a.status,
-            'subject': subj.name if subj else None,
-            'instructor': instr.name if instr else None,
-        }
-
-    return jsonify({'success': True, 'items': [serialize_att(a) for a in rows]})
+
+    return jsonify({'success': True, 'items': _serialize_attendance(rows)})
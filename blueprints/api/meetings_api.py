@@ -0,0 +1,208 @@
+from flask import Blueprint, jsonify, request
+from datetime import date, datetime, timedelta
+from models import Meeting, Instructor, ParentAccount, SchoolInstructorAccount, Student, Subject, db
+from blueprints.api.auth_api import token_required
+from meeting_availability import (DAY_START, DAY_END, DEFAULT_DURATION, MAX_RANGE_DAYS, clashes,
+                                  find_free_slots)
+from schedule_index import parse_minutes, format_minutes
+
+meetings_api = Blueprint('meetings_api', __name__, url_prefix='/api/meetings')
+
+MEETING_STATUSES = ('scheduled', 'cancelled', 'completed')
+
+
+def _caller_instructor_id():
+    """Instructor id behind an instructor token"""
+    account = SchoolInstructorAccount.query.get(request.user_id)
+    return account.instructor_id if account else None
+
+
+def _caller_student_id():
+    """Student id behind a parent token"""
+    parent = ParentAccount.query.get(request.user_id)
+    return parent.student_id if parent else None
+
+
+def _parse_date(value, default=None):
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _participants(instructor_id, student_id):
+    """(instructor id, student, error response) for the caller's role; parents
+    always mean their own student and instructors themselves"""
+    if request.user_type == 'parent':
+        student_id = _caller_student_id()
+    elif request.user_type == 'instructor':
+        instructor_id = _caller_instructor_id()
+    elif request.user_type != 'admin':
+        return None, None, (jsonify({'success': False, 'message': 'Not allowed'}), 403)
+
+    instructor = Instructor.query.filter_by(id=instructor_id, school_id=request.school_id).first() \
+        if instructor_id else None
+    if not instructor:
+        return None, None, (jsonify({'success': False, 'message': 'Instructor not found'}), 404)
+    student = None
+    if student_id:
+        student = Student.query.filter_by(id=student_id, school_id=request.school_id).first()
+        if not student:
+            return None, None, (jsonify({'success': False, 'message': 'Student not found'}), 404)
+    return instructor.id, student, None
+
+
+@meetings_api.route('', methods=['GET'])
+@token_required
+def list_meetings():
+    """Meetings of the caller between from and to (default: the next 30 days)"""
+    start_date = _parse_date(request.args.get('from'), date.today())
+    end_date = _parse_date(request.args.get('to'), start_date + timedelta(days=30) if start_date else None)
+    if not start_date or not end_date:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD'}), 400
+
+    query = Meeting.query.filter(Meeting.school_id == request.school_id)\
+        .filter(Meeting.meeting_date >= start_date, Meeting.meeting_date <= end_date)
+    if request.user_type == 'instructor':
+        query = query.filter(Meeting.instructor_id == _caller_instructor_id())
+    elif request.user_type == 'parent':
+        query = query.filter(Meeting.student_id == _caller_student_id())
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Meeting.status == status)
+
+    meetings = query.order_by(Meeting.meeting_date, Meeting.start_minute).all()
+    return jsonify({'success': True, 'meetings': [meeting.to_dict() for meeting in meetings]})
+
+
+@meetings_api.route('/availability', methods=['GET'])
+@token_required
+def availability():
+    """Free intervals of an instructor, and optionally a student, per school day.
+
+    Query: instructor_id, student_id, from, to (YYYY-MM-DD, at most
+    MAX_RANGE_DAYS apart), duration (minutes), day_start / day_end (HH:MM)
+    """
+    instructor_id, student, error = _participants(request.args.get('instructor_id', type=int),
+                                                  request.args.get('student_id', type=int))
+    if error:
+        return error
+
+    start_date = _parse_date(request.args.get('from'), date.today())
+    end_date = _parse_date(request.args.get('to'), start_date + timedelta(days=13) if start_date else None)
+    if not start_date or not end_date or end_date < start_date:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD, from before to'}), 400
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        return jsonify({'success': False, 'message': f'Search at most {MAX_RANGE_DAYS} days at a time'}), 400
+
+    duration = request.args.get('duration', DEFAULT_DURATION, type=int)
+    day_start = parse_minutes(request.args.get('day_start')) if request.args.get('day_start') else DAY_START
+    day_end = parse_minutes(request.args.get('day_end')) if request.args.get('day_end') else DAY_END
+    if not duration or duration <= 0 or day_start is None or day_end is None or day_start >= day_end:
+        return jsonify({'success': False, 'message': 'Invalid duration or day bounds'}), 400
+
+    days = find_free_slots(request.school_id, instructor_id, start_date, end_date,
+                           section_id=student.section_id if student else None,
+                           student_id=student.id if student else None,
+                           duration=duration, day_start=day_start, day_end=day_end)
+    return jsonify({
+        'success': True,
+        'instructorId': instructor_id,
+        'studentId': student.id if student else None,
+        'duration': duration,
+        'days': [{
+            'date': day.isoformat(),
+            'free': [{'start': format_minutes(start), 'end': format_minutes(end)} for start, end in free]
+        } for day, free in days]
+    })
+
+
+@meetings_api.route('', methods=['POST'])
+@token_required
+def create_meeting():
+    """Schedule a meeting in a free interval"""
+    data = request.get_json() or {}
+    instructor_id, student, error = _participants(data.get('instructorId'), data.get('studentId'))
+    if error:
+        return error
+    if not student:
+        return jsonify({'success': False, 'message': 'Student is required'}), 400
+
+    title = (data.get('title') or '').strip()
+    meeting_date = _parse_date(data.get('date'))
+    start = parse_minutes(data.get('startTime'))
+    end = parse_minutes(data.get('endTime'))
+    if not title or not meeting_date or start is None or end is None:
+        return jsonify({'success': False, 'message': 'title, date, startTime and endTime are required'}), 400
+    if start >= end:
+        return jsonify({'success': False, 'message': 'End time must be after start time'}), 400
+    if meeting_date < date.today():
+        return jsonify({'success': False, 'message': 'Meetings cannot be scheduled in the past'}), 400
+    subject_id = data.get('subjectId')
+    if subject_id and not Subject.query.filter_by(id=subject_id, school_id=request.school_id).first():
+        return jsonify({'success': False, 'message': 'Subject not found'}), 404
+
+    try:
+        # Bookings take turns on the instructor's row and then the student's,
+        # always in that order so two bookings cannot deadlock. The meeting is
+        # inserted before the check, so of two concurrent bookings sharing the
+        # instructor or the student the second always sees the first
+        db.session.query(Instructor.id).filter(Instructor.id == instructor_id).with_for_update().one()
+        db.session.query(Student.id).filter(Student.id == student.id).with_for_update().one()
+        meeting = Meeting(
+            school_id=request.school_id,
+            instructor_id=instructor_id,
+            student_id=student.id,
+            subject_id=subject_id,
+            title=title[:150],
+            description=data.get('description'),
+            meeting_date=meeting_date,
+            start_time=format_minutes(start),
+            end_time=format_minutes(end),
+            location=data.get('location')
+        )
+        db.session.add(meeting)
+        db.session.flush()
+
+        overlaps = clashes(request.school_id, instructor_id, meeting_date, start, end,
+                           section_id=student.section_id, student_id=student.id, exclude_id=meeting.id, lock=True)
+        if overlaps:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': f"The time overlaps a {' and a '.join(overlaps)}",
+                'conflicts': overlaps
+            }), 409
+        db.session.commit()
+        return jsonify({'success': True, 'meeting': meeting.to_dict()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error creating meeting: {str(e)}'}), 500
+
+
+@meetings_api.route('/<int:meeting_id>/status', methods=['POST'])
+@token_required
+def update_status(meeting_id):
+    """Cancel or complete a meeting"""
+    status = (request.get_json() or {}).get('status')
+    if status not in MEETING_STATUSES:
+        return jsonify({'success': False, 'message': f"Status must be one of {', '.join(MEETING_STATUSES)}"}), 400
+
+    meeting = Meeting.query.filter_by(id=meeting_id, school_id=request.school_id).first()
+    allowed = meeting is not None and (
+        request.user_type == 'admin'
+        or (request.user_type == 'instructor' and meeting.instructor_id == _caller_instructor_id())
+        or (request.user_type == 'parent' and meeting.student_id == _caller_student_id() and status == 'cancelled')
+    )
+    if not allowed:
+        return jsonify({'success': False, 'message': 'Meeting not found'}), 404
+
+    try:
+        meeting.status = status
+        db.session.commit()
+        return jsonify({'success': True, 'meeting': meeting.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error updating meeting: {str(e)}'}), 500
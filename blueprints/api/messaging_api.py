@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models import Conversation, Message, SchoolInstructorAccount, Student, SchoolAdmin, Instructor, ParentAccount, db
+from models import Conversation, Message, conversation_dicts, SchoolInstructorAccount, Student, SchoolAdmin, Instructor, ParentAccount, db
 from blueprints.api.auth_api import token_required
+from message_templates import prefetch_messages
 import datetime
 
 messaging_api = Blueprint('messaging_api', __name__, url_prefix='/api/messaging')
@@ -28,8 +29,10 @@ def get_conversations():
         )
     ).order_by(Conversation.updated_at.desc()).all()
     
+    # Participants, last messages, unread counts and names for the whole
+    # list at once, instead of four lookups per conversation
     return jsonify({
-        'conversations': [conv.to_dict(user_id, user_type) for conv in conversations]
+        'conversations': conversation_dicts(conversations, user_id, user_type)
     }), 200
 
 @messaging_api.route('/conversations/<int:conversation_id>/messages', methods=['GET'])
@@ -58,8 +61,13 @@ def get_messages(conversation_id):
         .order_by(Message.timestamp.asc())\
         .limit(limit).offset(offset).all()
     
+    # Names for templated messages in one query instead of one per message,
+    # and each sender looked up once rather than per message
+    names = prefetch_messages(messages)
+    senders = {}
+    
     return jsonify({
-        'messages': [msg.to_dict() for msg in messages]
+        'messages': [msg.to_dict(names, senders) for msg in messages]
     }), 200
 
 @messaging_api.route('/conversations/<int:conversation_id>/messages', methods=['POST'])
@@ -113,17 +121,20 @@ def send_message(conversation_id):
     conversation.updated_at = datetime.datetime.utcnow()
     db.session.commit()
     
-    # Emit Socket.IO event (if socketio is available)
+    # Emit Socket.IO event (if socketio is available). The room is the whole
+    # school, and the receiver may be connected to another worker, so the
+    # emit never depends on this process's presence registry
     try:
         from app_realtime import socketio
-        socketio.emit('new_message', {
+        from socket_encoding import emit_event
+        emit_event(socketio, 'new_message', {
             'id': message.id,
             'conversationId': conversation_id,
             'senderId': user_id,
             'content': content,
             'timestamp': message.timestamp.isoformat(),
             'type': message.message_type
-        }, room=f'school_{school_id}')
+        }, f'school_{school_id}')
     except:
         pass  # Socket.IO not available or not running
     
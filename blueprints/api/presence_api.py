@@ -0,0 +1,55 @@
+from flask import Blueprint, jsonify, request
+from blueprints.api.auth_api import token_required
+from database import db
+from models import ParentAccount, SchoolAdmin, SchoolInstructorAccount, Student
+from presence import get_presence, user_key
+
+presence_api = Blueprint('presence_api', __name__, url_prefix='/api/presence')
+
+# Messaging participant types and the account table their ids refer to
+ACCOUNT_MODELS = {
+    'parent': ParentAccount,
+    'instructor': SchoolInstructorAccount,
+    'admin': SchoolAdmin,
+    'student': Student,
+}
+
+
+def _split_key(key):
+    user_type, _, user_id = key.partition(':')
+    return {'type': user_type, 'id': int(user_id) if user_id.isdigit() else user_id}
+
+
+@presence_api.route('/online', methods=['GET'])
+@token_required
+def online_now():
+    """Users of the caller's school with a live real-time connection"""
+    registry = get_presence()
+    if registry is None:
+        return jsonify({'success': False, 'message': 'Real-time server is not running'}), 503
+
+    users = [_split_key(key) for key in registry.online_users(request.school_id)]
+    return jsonify({'success': True, 'online': users, 'count': len(users)})
+
+
+@presence_api.route('/<user_type>/<int:user_id>', methods=['GET'])
+@token_required
+def user_presence(user_type, user_id):
+    """Whether one user of the caller's school is online and how many connections they have"""
+    model = ACCOUNT_MODELS.get(user_type)
+    account = db.session.get(model, user_id) if model else None
+    if account is None or account.school_id != request.school_id:
+        return jsonify({'success': False, 'message': 'User not found'}), 404
+
+    registry = get_presence()
+    if registry is None:
+        return jsonify({'success': False, 'message': 'Real-time server is not running'}), 503
+
+    sids = registry.sids(user_key(user_type, user_id))
+    return jsonify({
+        'success': True,
+        'type': user_type,
+        'id': user_id,
+        'online': bool(sids),
+        'connections': len(sids)
+    })
@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify
 from models import School, Student, Instructor, Subject, Section
+from entity_versions import conditional
 
 school_api = Blueprint('school_api', __name__, url_prefix='/api/schools')
 
 @school_api.route('/<int:school_id>', methods=['GET'])
+@conditional('school', 'students', 'instructors', 'subjects', 'sections', school='school_id', max_age=60, public=True)
 def get_school(school_id: int):
     school = School.query.get_or_404(school_id)
 
@@ -1,9 +1,18 @@
+import logging
+
 from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, flash
-from database import db
+from database import db, read_replica
 from models import Attendance, Student, Subject, InstructorSchedule, Section, Instructor
 from datetime import datetime, date
 from sqlalchemy import func, case
 from models import Conversation, Message, SchoolInstructorAccount
+from presence import choose_channel, CHANNEL_SOCKET, CHANNEL_TELEGRAM
+from notification_outbox import enqueue_telegram, enqueue_app, wake_dispatcher
+from attendance_digest import get_digest_settings, buffer_event, ensure_digest_flusher
+from dashboard_cache import invalidate_instructor
+from message_templates import ATTENDANCE, attendance_params, dump_params, format_attendance
+
+logger = logging.getLogger(__name__)
 
 attendance_bp = Blueprint('instructor_attendance', __name__)
 
@@ -98,13 +107,13 @@ def record_attendance(sched_id):
                      'application/json' in request.headers.get('Accept', '') or \
                      request.is_json
             
-            print(f"DEBUG: AJAX request detected: {is_ajax}")
-            print(f"DEBUG: Form data: {dict(request.form)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("AJAX request: %s, form data: %s", is_ajax, request.form.to_dict())
             
             attendance_date = request.form.get('date')
             if not attendance_date:
                 error_msg = 'Please select a date'
-                print(f"DEBUG: Date validation failed: {error_msg}")
+                logger.debug("Date validation failed: %s", error_msg)
                 if is_ajax:
                     return jsonify({'success': False, 'error': error_msg}), 400
                 flash(error_msg, 'error')
@@ -114,7 +123,7 @@ def record_attendance(sched_id):
                 attendance_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
             except ValueError:
                 error_msg = 'Invalid date format'
-                print(f"DEBUG: Date parsing failed: {error_msg}")
+                logger.debug("Date parsing failed: %s", error_msg)
                 if is_ajax:
                     return jsonify({'success': False, 'error': error_msg}), 400
                 flash(error_msg, 'error')
@@ -129,7 +138,7 @@ def record_attendance(sched_id):
             
             if existing_attendance:
                 error_msg = f'Attendance for {attendance_date.strftime("%B %d, %Y")} has already been recorded for this class. Please choose a different date or contact your administrator to modify existing records.'
-                print(f"DEBUG: Duplicate attendance: {error_msg}")
+                logger.debug("Duplicate attendance for %s", attendance_date)
                 if is_ajax:
                     return jsonify({
                         'success': False, 
@@ -148,7 +157,7 @@ def record_attendance(sched_id):
                 
                 # Validate status
                 if status not in ['Present', 'Absent', 'Late', 'Excused']:
-                    print(f"DEBUG: Invalid status '{status}' for student {student.name}, defaulting to Present")
+                    logger.debug("Invalid status %r for student %s, defaulting to Present", status, student.id)
                     status = 'Present'
                 
                 attendance_record = Attendance(
@@ -162,18 +171,120 @@ def record_attendance(sched_id):
             
             if not attendance_records:
                 error_msg = 'No students found in this section'
-                print(f"DEBUG: No students: {error_msg}")
+                logger.debug("No students: %s", error_msg)
                 if is_ajax:
                     return jsonify({'success': False, 'error': error_msg}), 400
                 flash(error_msg, 'error')
                 return render_template('instructor/record_attendance.html', schedule=schedule, students=students)
             
-            # Save all attendance records
+            # Save all attendance records; the parent notifications below join
+            # the same transaction so neither is committed without the other
             db.session.add_all(attendance_records)
+            db.session.flush()
+            
+            # Send app notifications to parents via messaging. In digest mode only
+            # the real-time statuses go out now, the rest wait for the digest
+            digest = get_digest_settings(school_id)
+            realtime_statuses = digest.realtime_status_set() if digest else None
+            subject = Subject.query.get(schedule.subject_id)
+            instructor_account = SchoolInstructorAccount.query.filter_by(instructor_id=instructor_id, school_id=school_id).first()
+            app_notifications = 0
+            failed_notifications = 0
+            digested_notifications = 0
+            for record in attendance_records:
+                if digest and record.status not in realtime_statuses:
+                    buffer_event(record, schedule.id, school_id)
+                    digested_notifications += 1
+                    continue
+                try:
+                    # Savepoint: a failure only drops this student's notification
+                    with db.session.begin_nested():
+                        student = Student.query.get(record.student_id)
+                        if not student:
+                            continue
+                        # Ensure parent account exists
+                        from models import ParentAccount
+                        parent = ParentAccount.query.filter_by(student_id=student.id).first()
+                        if not parent:
+                            parent = ParentAccount(student_id=student.id, school_id=school_id)
+                            db.session.add(parent)
+                            db.session.flush()
+                        # Find or create conversation instructor <-> parent
+                        conv = Conversation.query.filter(
+                            Conversation.school_id == school_id,
+                            db.or_(
+                                db.and_(
+                                    Conversation.participant1_id == (instructor_account.id if instructor_account else 0),
+                                    Conversation.participant1_type == 'instructor',
+                                    Conversation.participant2_id == parent.id,
+                                    Conversation.participant2_type == 'parent'
+                                ),
+                                db.and_(
+                                    Conversation.participant1_id == parent.id,
+                                    Conversation.participant1_type == 'parent',
+                                    Conversation.participant2_id == (instructor_account.id if instructor_account else 0),
+                                    Conversation.participant2_type == 'instructor'
+                                )
+                            )
+                        ).first()
+                        if not conv:
+                            conv = Conversation(
+                                school_id=school_id,
+                                participant1_id=(instructor_account.id if instructor_account else 0),
+                                participant1_type='instructor',
+                                participant2_id=parent.id,
+                                participant2_type='parent'
+                            )
+                            db.session.add(conv)
+                            db.session.flush()
+                        # Store the template and its ids; the text is rendered on read
+                        msg = Message(
+                            conversation_id=conv.id,
+                            sender_id=(instructor_account.id if instructor_account else 0),
+                            sender_type='instructor',
+                            receiver_id=parent.id,
+                            receiver_type='parent',
+                            template_id=ATTENDANCE,
+                            params=dump_params(attendance_params(
+                                student.id,
+                                schedule.subject_id,
+                                attendance_date.strftime('%Y-%m-%d'),
+                                record.status,
+                                schedule.start_time,
+                                schedule.end_time
+                            )),
+                            message_type='notification'
+                        )
+                        db.session.add(msg)
+                        conv.updated_at = datetime.now()
+                        # Pick the cheapest channel: live push if the parent is online,
+                        # Telegram if they are offline but linked, otherwise inbox only.
+                        # Both pushes go through the outbox (see notification_outbox.py)
+                        channel = choose_channel('parent', parent.id, student.telegram_chat_id)
+                        if channel == CHANNEL_TELEGRAM:
+                            enqueue_telegram(student.id, school_id, format_attendance(
+                                f"{student.first_name} {student.last_name}",
+                                subject.name if subject else 'Unknown',
+                                attendance_date.strftime('%Y-%m-%d'),
+                                record.status,
+                                schedule.start_time,
+                                schedule.end_time,
+                                html=True
+                            ))
+                        elif channel == CHANNEL_SOCKET:
+                            enqueue_app(msg, student.id, school_id)
+                    app_notifications += 1
+                except Exception:
+                    failed_notifications += 1
+                    logger.exception("Failed to create app notification for student %s", record.student_id)
+
             db.session.commit()
+            invalidate_instructor(instructor_id)
+            wake_dispatcher()
+            if digested_notifications:
+                ensure_digest_flusher()
             
             # Emit real-time attendance update
-            school_id = session.get('school_id')
             try:
                 from flask import current_app
                 if hasattr(current_app, 'socketio'):
@@ -184,102 +295,21 @@ def record_attendance(sched_id):
                     current_app.socketio.emit('attendance_recorded', {
                         'school_id': school_id,
                         'instructor_id': instructor_id,
-                        'subject_name': Subject.query.get(schedule.subject_id).name if Subject.query.get(schedule.subject_id) else 'Unknown Subject',
+                        'subject_name': subject.name if subject else 'Unknown Subject',
                         'date': attendance_date.strftime('%Y-%m-%d'),
                         'present_count': present_count,
                         'total_count': total_count,
                         'student_name': f"{present_count}/{total_count} students"
                     }, room=f'school_{school_id}')
-            except Exception as e:
-                print(f"Socket.IO emit error: {e}")
-            
-            # Send app notifications to parents via messaging
-            subject = Subject.query.get(schedule.subject_id)
-            instructor_account = SchoolInstructorAccount.query.filter_by(instructor_id=instructor_id, school_id=school_id).first()
-            app_notifications = 0
-            failed_notifications = 0
-            for record in attendance_records:
-                try:
-                    student = Student.query.get(record.student_id)
-                    if not student:
-                        continue
-                    # Ensure parent account exists
-                    from models import ParentAccount
-                    parent = ParentAccount.query.filter_by(student_id=student.id).first()
-                    if not parent:
-                        parent = ParentAccount(student_id=student.id, school_id=school_id)
-                        db.session.add(parent)
-                        db.session.commit()
-                    # Find or create conversation instructor <-> parent
-                    conv = Conversation.query.filter(
-                        Conversation.school_id == school_id,
-                        db.or_(
-                            db.and_(
-                                Conversation.participant1_id == (instructor_account.id if instructor_account else 0),
-                                Conversation.participant1_type == 'instructor',
-                                Conversation.participant2_id == parent.id,
-                                Conversation.participant2_type == 'parent'
-                            ),
-                            db.and_(
-                                Conversation.participant1_id == parent.id,
-                                Conversation.participant1_type == 'parent',
-                                Conversation.participant2_id == (instructor_account.id if instructor_account else 0),
-                                Conversation.participant2_type == 'instructor'
-                            )
-                        )
-                    ).first()
-                    if not conv:
-                        conv = Conversation(
-                            school_id=school_id,
-                            participant1_id=(instructor_account.id if instructor_account else 0),
-                            participant1_type='instructor',
-                            participant2_id=parent.id,
-                            participant2_type='parent'
-                        )
-                        db.session.add(conv)
-                        db.session.commit()
-                    # Compose message
-                    content = (
-                        f"Attendance for {student.first_name} {student.last_name} on {attendance_date.strftime('%Y-%m-%d')}\n"
-                        f"Subject: {subject.name if subject else 'Unknown'}\n"
-                        f"Status: {record.status}\n"
-                        f"Time: {schedule.start_time} - {schedule.end_time}"
-                    )
-                    msg = Message(
-                        conversation_id=conv.id,
-                        sender_id=(instructor_account.id if instructor_account else 0),
-                        sender_type='instructor',
-                        receiver_id=parent.id,
-                        receiver_type='parent',
-                        content=content,
-                        message_type='notification'
-                    )
-                    db.session.add(msg)
-                    conv.updated_at = datetime.now()
-                    db.session.commit()
-                    # Emit to school room
-                    try:
-                        from flask import current_app
-                        if hasattr(current_app, 'socketio'):
-                            current_app.socketio.emit('new_message', {
-                                'id': msg.id,
-                                'conversationId': conv.id,
-                                'senderId': msg.sender_id,
-                                'content': msg.content,
-                                'timestamp': msg.timestamp.isoformat(),
-                                'type': msg.message_type
-                            }, room=f'school_{school_id}')
-                    except Exception as e:
-                        print(f"Socket.IO emit error (attendance notify): {e}")
-                    app_notifications += 1
-                except Exception as e:
-                    failed_notifications += 1
-                    print(f"Failed to create app notification for student {record.student_id}: {str(e)}")
+            except Exception:
+                logger.exception("Socket.IO emit error")
 
             # Create detailed success message
             success_message = f'Attendance recorded successfully for {len(attendance_records)} students'
             if app_notifications > 0:
                 success_message += f' and {app_notifications} app notifications sent'
+            if digested_notifications > 0:
+                success_message += f' ({digested_notifications} held for the daily digest)'
             
             # Return JSON response for AJAX requests
             if is_ajax:
@@ -289,6 +319,7 @@ def record_attendance(sched_id):
                     'students_recorded': len(attendance_records),
                     'notifications_sent': app_notifications,
                     'failed_notifications': failed_notifications,
+                    'digested_notifications': digested_notifications,
                     'date': attendance_date.strftime('%Y-%m-%d')
                 })
             
@@ -298,7 +329,7 @@ def record_attendance(sched_id):
         except Exception as e:
             db.session.rollback()
             error_msg = f'Error recording attendance: {str(e)}'
-            print(f"Attendance error: {error_msg}")  # Debug log
+            logger.exception("Error recording attendance")
             if is_ajax:
                 return jsonify({'success': False, 'error': error_msg}), 500
             flash(error_msg, 'error')
@@ -306,6 +337,7 @@ def record_attendance(sched_id):
     return render_template('instructor/record_attendance.html', schedule=schedule, students=students)
 
 @attendance_bp.route('/attendance/history', methods=['GET'])
+@read_replica
 def attendance_history():
     """View attendance history for instructor"""
     if 'instructor_id' not in session:
@@ -385,6 +417,7 @@ def attendance_history():
     return render_template('instructor/attendance_history.html', subjects_data=subjects_data)
 
 @attendance_bp.route('/attendance/monthly-report', methods=['GET'])
+@read_replica
 def monthly_report():
     """View monthly attendance report for instructor"""
     if 'instructor_id' not in session:
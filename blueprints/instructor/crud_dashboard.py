@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, flash
+from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, flash, current_app
 from database import db
+from dashboard_cache import dashboard_cache
 from models import (
     Instructor, InstructorSchedule, Attendance, Student, Subject, Section, 
     Notification, TelegramConfig
@@ -31,23 +32,42 @@ def dashboard():
     )
 
 def get_dashboard_data(instructor_id, school_id):
-    """Get comprehensive dashboard data"""
-    today = date.today()
+    """Get comprehensive dashboard data, from today's cached snapshot"""
+    snapshot = dashboard_cache.get(
+        instructor_id, school_id,
+        lambda: compute_dashboard_snapshot(instructor_id, school_id),
+        ttl=current_app.config.get('DASHBOARD_CACHE_TTL')
+    )
+    
+    # Upcoming classes (next 3) move with the clock, so they are picked from
+    # the cached schedule on every call
     current_time = datetime.now()
+    current_minute = current_time.hour * 60 + current_time.minute
+    data = dict(snapshot)
+    data['upcoming_classes'] = [
+        schedule for schedule in snapshot['todays_schedule']
+        if schedule['start_minute'] is not None and schedule['start_minute'] >= current_minute
+    ][:3]
+    return data
+
+def compute_dashboard_snapshot(instructor_id, school_id):
+    """Run the dashboard queries: (snapshot of plain values, section ids it covers)"""
+    today = date.today()
     
     # Today's schedule
     todays_schedule = db.session.query(
         InstructorSchedule.id,
         InstructorSchedule.start_time,
         InstructorSchedule.end_time,
+        InstructorSchedule.start_minute,
         Subject.name.label('subject'),
         Section.name.label('section'),
         Section.grade_level
     ).join(Subject, InstructorSchedule.subject_id == Subject.id)\
      .join(Section, InstructorSchedule.section_id == Section.id)\
      .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .filter(InstructorSchedule.day == today.strftime('%A'))\
-     .order_by(InstructorSchedule.start_time)\
+     .filter(InstructorSchedule.weekday == today.weekday())\
+     .order_by(InstructorSchedule.start_minute)\
      .all()
     
     # Attendance submitted today
@@ -107,24 +127,9 @@ def get_dashboard_data(instructor_id, school_id):
         .filter(func.date(Notification.timestamp) == today)\
         .count()
     
-    # Upcoming classes (next 3)
-    current_day = current_time.strftime('%A')
-    current_time_str = current_time.strftime('%H:%M')
-    
-    upcoming_classes = db.session.query(
-        InstructorSchedule.id,
-        InstructorSchedule.start_time,
-        InstructorSchedule.end_time,
-        Subject.name.label('subject'),
-        Section.name.label('section')
-    ).join(Subject, InstructorSchedule.subject_id == Subject.id)\
-     .join(Section, InstructorSchedule.section_id == Section.id)\
-     .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .filter(InstructorSchedule.day == current_day)\
-     .filter(InstructorSchedule.start_time >= current_time_str)\
-     .order_by(InstructorSchedule.start_time)\
-     .limit(3)\
-     .all()
+    # Sections the instructor teaches, for roster invalidation
+    section_ids = [section_id for (section_id,) in db.session.query(distinct(InstructorSchedule.section_id))
+                   .filter(InstructorSchedule.instructor_id == instructor_id).all()]
     
     # Total students under instructor
     total_students = db.session.query(func.count(distinct(Student.id)))\
@@ -139,11 +144,11 @@ def get_dashboard_data(instructor_id, school_id):
         .filter(Student.telegram_chat_id.isnot(None))\
         .scalar()
     
-    return {
-        'todays_schedule': todays_schedule,
+    snapshot = {
+        'todays_schedule': [row._asdict() for row in todays_schedule],
         'todays_classes_count': len(todays_schedule),
         'attendance_submitted': todays_attendance,
-        'recent_attendance': recent_attendance,
+        'recent_attendance': [row._asdict() for row in recent_attendance],
         'weekly_stats': {
             'total_records': weekly_stats.total_records or 0,
             'present': weekly_stats.present or 0,
@@ -151,13 +156,13 @@ def get_dashboard_data(instructor_id, school_id):
             'late': weekly_stats.late or 0,
             'attendance_rate': round((weekly_stats.present / weekly_stats.total_records * 100) if weekly_stats.total_records else 0, 1)
         },
-        'poor_attendance': poor_attendance,
+        'poor_attendance': [row._asdict() for row in poor_attendance],
         'todays_messages': todays_messages,
-        'upcoming_classes': upcoming_classes,
         'total_students': total_students,
         'telegram_connected': telegram_connected,
         'telegram_rate': round((telegram_connected / total_students * 100) if total_students else 0, 1)
     }
+    return snapshot, section_ids
 
 @dashboard_bp.route('/api/stats', methods=['GET'])
 def get_stats():
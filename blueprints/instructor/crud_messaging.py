@@ -3,6 +3,8 @@ from database import db
 from models import Student, Notification, Conversation, Message, SchoolInstructorAccount, ParentAccount, Subject
 from datetime import datetime
 from sqlalchemy import func, or_, and_
+from notification_outbox import enqueue_app, wake_dispatcher
+from entity_versions import conditional
 
 messaging_bp = Blueprint('instructor_messaging', __name__)
 
@@ -99,33 +101,13 @@ def send_message():
         )
         db.session.add(msg)
         conversation.updated_at = datetime.now()
-        db.session.commit()
-
-        # Emit socket event to the school's room
-        try:
-            from flask import current_app
-            if hasattr(current_app, 'socketio'):
-                current_app.socketio.emit('new_message', {
-                    'id': msg.id,
-                    'conversationId': conversation.id,
-                    'senderId': msg.sender_id,
-                    'content': msg.content,
-                    'timestamp': msg.timestamp.isoformat(),
-                    'type': msg.message_type
-                }, room=f'school_{school_id}')
-        except Exception as e:
-            # Non-fatal
-            print(f"Socket emit failed: {e}")
 
-        # Record a notification log for history
-        notification = Notification(
-            student_id=student_id,
-            type='SMS',
-            message=message,
-            status='Sent'
-        )
-        db.session.add(notification)
+        # Queue the live push in the same transaction as the message. It goes to
+        # the school room, which the parent may share with this worker or not,
+        # so it is always queued; the Message row is the inbox copy
+        enqueue_app(msg, student_id, school_id, text=message)
         db.session.commit()
+        wake_dispatcher()
 
         return jsonify({
             'success': True,
@@ -142,6 +124,7 @@ def send_message():
 ## Telegram helper removed: messaging now delivered in-app via Socket.IO and Message model
 
 @messaging_bp.route('/message/templates', methods=['GET'])
+@conditional('message_templates', school=None, max_age=3600, public=True)
 def get_message_templates():
     """Get pre-defined message templates"""
     templates = [
@@ -183,12 +166,12 @@ def get_notification_history():
             Notification.id,
             Notification.message,
             Notification.status,
-            Notification.created_at,
+            Notification.timestamp.label('created_at'),
             Student.first_name,
             Student.last_name
         ).join(Student, Notification.student_id == Student.id)\
          .filter(Student.school_id == school_id)\
-         .order_by(Notification.created_at.desc())\
+         .order_by(Notification.timestamp.desc())\
          .limit(50)\
          .all()
         
@@ -231,7 +214,7 @@ def get_notification_stats():
         failed_notifications = db.session.query(Notification)\
             .join(Student, Notification.student_id == Student.id)\
             .filter(Student.school_id == school_id)\
-            .filter(Notification.status == 'Failed')\
+            .filter(Notification.status.in_(['Failed', 'Dead']))\
             .count()
         
         # Get students without Telegram
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, flash
 from database import db
 from models import InstructorSchedule, Subject, Section, Instructor
+from schedule_index import INSTRUCTOR, get_schedule_index, format_minutes, DAY_NAMES
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_
 
@@ -29,7 +30,7 @@ def view_schedule():
      .join(Section, InstructorSchedule.section_id == Section.id)\
      .filter(InstructorSchedule.instructor_id == instructor_id)\
      .filter(Subject.school_id == school_id)\
-     .order_by(InstructorSchedule.day, InstructorSchedule.start_time)\
+     .order_by(InstructorSchedule.weekday, InstructorSchedule.start_minute)\
      .all()
     
     # Organize schedules by day
@@ -49,7 +50,7 @@ def todays_schedule():
         return jsonify({'error': 'Not authorized'}), 401
     
     instructor_id = session['instructor_id']
-    today = datetime.now().strftime('%A')
+    today = datetime.now().weekday()
     
     # Get today's schedules
     schedules = db.session.query(
@@ -61,15 +62,15 @@ def todays_schedule():
     ).join(Subject, InstructorSchedule.subject_id == Subject.id)\
      .join(Section, InstructorSchedule.section_id == Section.id)\
      .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .filter(InstructorSchedule.day == today)\
-     .order_by(InstructorSchedule.start_time)\
+     .filter(InstructorSchedule.weekday == today)\
+     .order_by(InstructorSchedule.start_minute)\
      .all()
     
     schedule_list = []
     for schedule in schedules:
         schedule_list.append({
             'id': schedule.id,
-            'time': schedule.time,
+            'time': schedule.start_time,
             'subject': schedule.subject,
             'section': schedule.section,
             'grade_level': schedule.grade_level
@@ -85,8 +86,8 @@ def upcoming_classes():
     
     instructor_id = session['instructor_id']
     current_time = datetime.now()
-    current_day = current_time.strftime('%A')
-    current_time_str = current_time.strftime('%H:%M')
+    current_day = current_time.weekday()
+    current_minute = current_time.hour * 60 + current_time.minute
     
     # Get today's remaining schedules
     todays_remaining = db.session.query(
@@ -97,9 +98,9 @@ def upcoming_classes():
     ).join(Subject, InstructorSchedule.subject_id == Subject.id)\
      .join(Section, InstructorSchedule.section_id == Section.id)\
      .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .filter(InstructorSchedule.day == current_day)\
-     .filter(InstructorSchedule.start_time >= current_time_str)\
-     .order_by(InstructorSchedule.start_time)\
+     .filter(InstructorSchedule.weekday == current_day)\
+     .filter(InstructorSchedule.start_minute >= current_minute)\
+     .order_by(InstructorSchedule.start_minute)\
      .limit(3)\
      .all()
     
@@ -107,7 +108,7 @@ def upcoming_classes():
     for schedule in todays_remaining:
         upcoming.append({
             'id': schedule.id,
-            'time': schedule.time,
+            'time': schedule.start_time,
             'subject': schedule.subject,
             'section': schedule.section,
             'day': 'Today'
@@ -123,25 +124,22 @@ def check_conflicts():
     
     instructor_id = session['instructor_id']
     
-    # Find overlapping schedules (same day and time)
-    conflicts = db.session.query(
-        InstructorSchedule.day,
-        InstructorSchedule.start_time,
-        func.count(InstructorSchedule.id).label('conflict_count'),
-        func.group_concat(Subject.name).label('subjects')
-    ).join(Subject, InstructorSchedule.subject_id == Subject.id)\
-     .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .group_by(InstructorSchedule.day, InstructorSchedule.start_time)\
-     .having(func.count(InstructorSchedule.id) > 1)\
-     .all()
+    # Find overlapping schedules in one sweep over the instructor's classes
+    conflicts = [conflict for conflict in get_schedule_index(session['school_id']).conflicts(instructor_id)
+                 if conflict.kind == INSTRUCTOR]
+    subject_ids = {slot.subject_id for conflict in conflicts for slot in (conflict.first, conflict.second)}
+    subjects = dict(db.session.query(Subject.id, Subject.name)
+                    .filter(Subject.id.in_(subject_ids)).all()) if subject_ids else {}
     
     conflict_list = []
     for conflict in conflicts:
         conflict_list.append({
-            'day': conflict.day,
-            'time': conflict.time,
-            'count': conflict.conflict_count,
-            'subjects': conflict.subjects.split(',') if conflict.subjects else []
+            'day': DAY_NAMES[conflict.weekday],
+            'time': f"{format_minutes(conflict.second.start)} - {format_minutes(min(conflict.first.end, conflict.second.end))}",
+            'count': 2,
+            'schedule_ids': [conflict.first.id, conflict.second.id],
+            'subjects': [subjects.get(conflict.first.subject_id, 'Unknown'),
+                         subjects.get(conflict.second.subject_id, 'Unknown')]
         })
     
     return jsonify({'conflicts': conflict_list})
@@ -158,8 +156,8 @@ def schedule_summary():
     summary = db.session.query(
         InstructorSchedule.day,
         func.count(InstructorSchedule.id).label('class_count'),
-        func.min(InstructorSchedule.start_time).label('first_class'),
-        func.max(InstructorSchedule.start_time).label('last_class')
+        func.min(InstructorSchedule.start_minute).label('first_class'),
+        func.max(InstructorSchedule.start_minute).label('last_class')
     ).filter(InstructorSchedule.instructor_id == instructor_id)\
      .group_by(InstructorSchedule.day)\
      .all()
@@ -168,8 +166,8 @@ def schedule_summary():
     for day_summary in summary:
         summary_data[day_summary.day] = {
             'class_count': day_summary.class_count,
-            'first_class': day_summary.first_class,
-            'last_class': day_summary.last_class
+            'first_class': format_minutes(day_summary.first_class) if day_summary.first_class is not None else None,
+            'last_class': format_minutes(day_summary.last_class) if day_summary.last_class is not None else None
         }
     
     return jsonify({'summary': summary_data})
@@ -3,7 +3,10 @@ from .crud_dashboard import dashboard_bp
 from .crud_attendance import attendance_bp
 from .crud_schedule import schedule_bp
 from .crud_messaging import messaging_bp
-from .crud_meetings import meetings_bp
+try:
+    from .crud_meetings import meetings_bp
+except ImportError:
+    meetings_bp = None
 
 # Create main instructor blueprint
 instructor_bp = Blueprint('instructor', __name__, url_prefix='/instructor', template_folder='templates')
@@ -13,4 +16,5 @@ instructor_bp.register_blueprint(dashboard_bp)
 instructor_bp.register_blueprint(attendance_bp)
 instructor_bp.register_blueprint(schedule_bp) 
 instructor_bp.register_blueprint(messaging_bp)
-instructor_bp.register_blueprint(meetings_bp)
+if meetings_bp is not None:
+    instructor_bp.register_blueprint(meetings_bp)
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session
-from database import db
-from models import TelegramConfig, Student, School
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, session, current_app, send_file, Response
+from database import db, read_replica
+from models import TelegramConfig, Student, School, SchoolTelegramBot, Notification
 from sqlalchemy import func
-import requests
+from telegram_provider import get_active_config, get_config_for_school, invalidate_telegram_config, provider
+from notification_outbox import DEAD, outbox_stats, requeue_dead, wake_dispatcher
 import json
 
 main_admin_bp = Blueprint('main_admin', __name__, url_prefix='/main_admin')
@@ -58,8 +59,9 @@ def telegram_config_api():
             return jsonify({'error': 'Bot token and username are required'}), 400
         
         try:
-            # Deactivate all existing configs
-            TelegramConfig.query.update({'is_active': False})
+            # Single-bot mode: the saved bot replaces the active one
+            if not current_app.config.get('TELEGRAM_MULTI_BOT'):
+                TelegramConfig.query.update({'is_active': False})
             
             # Check if config already exists
             existing_config = TelegramConfig.query.filter_by(bot_token=bot_token).first()
@@ -78,6 +80,7 @@ def telegram_config_api():
                 db.session.add(new_config)
             
             db.session.commit()
+            invalidate_telegram_config()
             return jsonify({'message': 'Global telegram configuration saved successfully'})
             
         except Exception as e:
@@ -94,12 +97,14 @@ def delete_telegram_config_api(config_id):
         config = TelegramConfig.query.get_or_404(config_id)
         db.session.delete(config)
         db.session.commit()
+        invalidate_telegram_config()
         return jsonify({'message': 'Configuration deleted successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @main_admin_bp.route('/telegram-stats')
+@read_replica
 def telegram_stats():
     """Get system-wide telegram statistics"""
     if not check_main_admin():
@@ -131,6 +136,7 @@ def telegram_stats():
         return jsonify({'error': str(e)}), 500
 
 @main_admin_bp.route('/school-telegram-stats')
+@read_replica
 def school_telegram_stats():
     """Get school-wise telegram statistics"""
     if not check_main_admin():
@@ -152,6 +158,7 @@ def school_telegram_stats():
                 'school_id': school.id,
                 'school_name': school.name,
                 'school_code': school.school_code,
+                'bot_username': getattr(get_config_for_school(school.id), 'bot_username', None),
                 'total_students': total_students,
                 'connected': connected,
                 'not_connected': not_connected
@@ -163,6 +170,7 @@ def school_telegram_stats():
         return jsonify({'error': str(e)}), 500
 
 @main_admin_bp.route('/all-student-connections')
+@read_replica
 def all_student_connections():
     """Get all students with their telegram connection status"""
     if not check_main_admin():
@@ -171,18 +179,15 @@ def all_student_connections():
     try:
         from models import Section
         
-        # Get all students with their school information
-        students = Student.query.all()
+        # Get all students with their school and section in one query
+        rows = db.session.query(Student, School, Section.name)\
+            .outerjoin(School, Student.school_id == School.id)\
+            .outerjoin(Section, Student.section_id == Section.id)\
+            .all()
         student_list = []
         
-        for student in students:
-            school = School.query.get(student.school_id)
-            # Get section name
-            section_name = 'N/A'
-            if student.section_id:
-                section = Section.query.get(student.section_id)
-                if section:
-                    section_name = section.name
+        for student, school, section_name in rows:
+            section_name = section_name or 'N/A'
             
             student_list.append({
                 'id': student.id,
@@ -206,12 +211,13 @@ def all_student_connections():
 @main_admin_bp.route('/auto-setup-status')
 def auto_setup_status():
     """Get auto-setup status for the global bot system"""
+    import requests  # only these views call out, keep it off the startup path
     if not check_main_admin():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
         # Check if we have an active telegram configuration
-        active_config = TelegramConfig.query.filter_by(is_active=True).first()
+        active_config = get_active_config()
         
         if not active_config:
             return jsonify({
@@ -272,14 +278,16 @@ def activate_bot(config_id):
         return jsonify({'error': 'Access denied'}), 403
     
     try:
-        # Deactivate all configs
-        TelegramConfig.query.update({'is_active': False})
+        # Single-bot mode: deactivate all other configs
+        if not current_app.config.get('TELEGRAM_MULTI_BOT'):
+            TelegramConfig.query.update({'is_active': False})
         
         # Activate the selected config
         config = TelegramConfig.query.get_or_404(config_id)
         config.is_active = True
         
         db.session.commit()
+        invalidate_telegram_config()
         
         return jsonify({'message': f'Bot @{config.bot_username} activated successfully'})
         
@@ -287,37 +295,185 @@ def activate_bot(config_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@main_admin_bp.route('/deactivate-bot/<int:config_id>', methods=['POST'])
+def deactivate_bot(config_id):
+    """Deactivate a telegram bot configuration; its schools move to the remaining bots"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        config = TelegramConfig.query.get_or_404(config_id)
+        config.is_active = False
+        
+        db.session.commit()
+        invalidate_telegram_config()
+        
+        return jsonify({'message': f'Bot @{config.bot_username} deactivated successfully'})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@main_admin_bp.route('/school-bot-assignments', methods=['GET', 'POST'])
+def school_bot_assignments():
+    """List which bot serves each school, or pin/unpin a school to a bot"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if request.method == 'GET':
+        try:
+            schools = School.query.order_by(School.name).all()
+            result = []
+            for school in schools:
+                config = get_config_for_school(school.id)
+                result.append({
+                    'school_id': school.id,
+                    'school_name': school.name,
+                    'config_id': config.id if config else None,
+                    'bot_username': config.bot_username if config else None,
+                    'pinned': provider.is_pinned(school.id)
+                })
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    # POST {school_id, config_id}; a null config_id returns the school to hashing
+    data = request.get_json() or {}
+    school_id = data.get('school_id')
+    config_id = data.get('config_id')
+    
+    if not school_id:
+        return jsonify({'error': 'school_id is required'}), 400
+    
+    try:
+        School.query.get_or_404(school_id)
+        assignment = SchoolTelegramBot.query.filter_by(school_id=school_id).first()
+        
+        if config_id is None:
+            if assignment:
+                db.session.delete(assignment)
+        else:
+            config = TelegramConfig.query.get_or_404(config_id)
+            if assignment:
+                assignment.telegram_config_id = config.id
+            else:
+                db.session.add(SchoolTelegramBot(school_id=school_id, telegram_config_id=config.id))
+        
+        db.session.commit()
+        invalidate_telegram_config()
+        
+        config = get_config_for_school(school_id)
+        return jsonify({
+            'message': 'Assignment saved successfully',
+            'school_id': school_id,
+            'bot_username': config.bot_username if config else None
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@main_admin_bp.route('/notification-outbox', methods=['GET'])
+def notification_outbox_status():
+    """Outbox counts per status and the most recent dead letters"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        dead = Notification.query.filter_by(status=DEAD)\
+            .order_by(Notification.id.desc())\
+            .limit(50)\
+            .all()
+        return jsonify({
+            'counts': outbox_stats(),
+            'dead_letters': [{
+                'id': notification.id,
+                'type': notification.type,
+                'student_id': notification.student_id,
+                'school_id': notification.school_id,
+                'attempts': notification.attempts,
+                'last_error': notification.last_error,
+                'created_at': notification.timestamp.isoformat() if notification.timestamp else None
+            } for notification in dead]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main_admin_bp.route('/notification-outbox/requeue', methods=['POST'])
+def requeue_notifications():
+    """Send dead-lettered notifications again, all of them or the given ids"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json() or {}
+    try:
+        count = requeue_dead(data.get('ids'))
+        db.session.commit()
+        wake_dispatcher()
+        return jsonify({'message': f'{count} notifications requeued', 'requeued': count})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@main_admin_bp.route('/profiles')
+def profiles():
+    """Saved request profiles (see profiler.py)"""
+    if not check_main_admin():
+        return redirect(url_for('auth.login'))
+    store = getattr(current_app, 'profile_store', None)
+    return render_template('main_admin/profiles.html', profiles=store.list() if store else [],
+                           enabled=store is not None)
+
+@main_admin_bp.route('/profiles/<profile_id>.<fmt>')
+def download_profile(profile_id, fmt):
+    """Download a profile as pstats, collapsed stacks or metadata"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    store = getattr(current_app, 'profile_store', None)
+    path = store.path(profile_id, fmt) if store else None
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=f'{profile_id}.{fmt}')
+
+@main_admin_bp.route('/profiles/<profile_id>/summary')
+def profile_summary(profile_id):
+    """Slowest functions of a profile as plain text"""
+    if not check_main_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    store = getattr(current_app, 'profile_store', None)
+    summary = store.summary(profile_id) if store else None
+    if summary is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(summary, content_type='text/plain; charset=utf-8')
+
 @main_admin_bp.route('/test-bot/<int:config_id>', methods=['POST'])
 def test_bot(config_id):
     """Test a telegram bot configuration"""
+    from telegram_bot import call_bot_api
+    from telegram_transport import TransportError
     if not check_main_admin():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
         config = TelegramConfig.query.get_or_404(config_id)
         
-        # Test the bot by calling getMe API
-        test_url = f"https://api.telegram.org/bot{config.bot_token}/getMe"
-        response = requests.get(test_url, timeout=10)
+        # Test the bot by calling getMe through the shared transport
+        try:
+            bot_data = call_bot_api(config.bot_token, 'getMe', http_method='GET')
+        except TransportError as e:
+            message = 'Failed to connect to Telegram API' if e.transient else str(e)
+            return jsonify({'success': False, 'message': message})
         
-        if response.status_code == 200:
-            bot_info = response.json()
-            if bot_info.get('ok'):
-                bot_data = bot_info.get('result', {})
-                return jsonify({
-                    'success': True,
-                    'message': f'Bot test successful!',
-                    'bot_info': {
-                        'username': bot_data.get('username', 'Unknown'),
-                        'first_name': bot_data.get('first_name', 'Unknown'),
-                        'can_join_groups': bot_data.get('can_join_groups', False),
-                        'can_read_all_group_messages': bot_data.get('can_read_all_group_messages', False)
-                    }
-                })
-            else:
-                return jsonify({'success': False, 'message': 'Bot API returned error'})
-        else:
-            return jsonify({'success': False, 'message': 'Failed to connect to Telegram API'})
+        return jsonify({
+            'success': True,
+            'message': 'Bot test successful!',
+            'bot_info': {
+                'username': bot_data.get('username', 'Unknown'),
+                'first_name': bot_data.get('first_name', 'Unknown'),
+                'can_join_groups': bot_data.get('can_join_groups', False),
+                'can_read_all_group_messages': bot_data.get('can_read_all_group_messages', False)
+            }
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -325,13 +481,15 @@ def test_bot(config_id):
 @main_admin_bp.route('/send-test-message/<int:student_id>', methods=['POST'])
 def send_test_message(student_id):
     """Send a test message to a specific student"""
+    from telegram_bot import call_bot_api
+    from telegram_transport import TransportError
     if not check_main_admin():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
         # Get student and active bot config
         student = Student.query.get_or_404(student_id)
-        active_config = TelegramConfig.query.filter_by(is_active=True).first()
+        active_config = get_config_for_school(student.school_id)
         
         if not active_config:
             return jsonify({'success': False, 'message': 'No active bot configuration'})
@@ -340,21 +498,19 @@ def send_test_message(student_id):
             return jsonify({'success': False, 'message': 'Student not connected to Telegram'})
         
         # Send test message
-        message = f"🧪 Test Message from {student.school.school_name}\n\nHi! This is a test notification for {student.first_name} {student.last_name}.\n\nYour attendance notifications are working properly! ✅"
+        message = f"🧪 Test Message from {student.school.name}\n\nHi! This is a test notification for {student.first_name} {student.last_name}.\n\nYour attendance notifications are working properly! ✅"
         
-        send_url = f"https://api.telegram.org/bot{active_config.bot_token}/sendMessage"
-        payload = {
-            'chat_id': student.telegram_chat_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
-        
-        response = requests.post(send_url, json=payload, timeout=10)
+        try:
+            call_bot_api(active_config.bot_token, 'sendMessage', {
+                'chat_id': student.telegram_chat_id,
+                'text': message,
+                'parse_mode': 'HTML'
+            })
+        except TransportError as e:
+            message = 'Failed to send test message' if e.transient else f'Failed to send test message: {e}'
+            return jsonify({'success': False, 'message': message})
         
-        if response.status_code == 200:
-            return jsonify({'success': True, 'message': 'Test message sent successfully!'})
-        else:
-            return jsonify({'success': False, 'message': 'Failed to send test message'})
+        return jsonify({'success': True, 'message': 'Test message sent successfully!'})
             
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
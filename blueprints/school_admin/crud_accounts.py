@@ -1,9 +1,14 @@
+import logging
+
 from flask import Blueprint, request, jsonify, render_template, session
 from database import db
 from models import SchoolAdmin, SchoolInstructorAccount, Instructor
 from activity_logger import log_activity
+from entity_versions import bump
 from werkzeug.security import generate_password_hash
 
+logger = logging.getLogger(__name__)
+
 school_admin_bp = Blueprint('school_admin_accounts', __name__, url_prefix='/school_admin/accounts')
 
 
@@ -102,6 +107,7 @@ def create_account():
             db.session.add(account)
 
         db.session.commit()
+        bump(school_id, 'accounts')
 
         # Log the activity
         log_activity(
@@ -132,10 +138,9 @@ def create_account():
                     'school_id': school_id,
                     'account': account_data
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting account_created event: {{'school_id': {school_id}, 'account': {{'id': {account.id}, 'username': '{data['username']}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted account_created to room school_%s", school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         return jsonify({"success": True, "message": "Account saved successfully!"})
 
@@ -182,6 +187,7 @@ def update_account(id):
                 instructor.email = data['username']
 
         db.session.commit()
+        bump(school_id, 'accounts')
 
         # Log the activity
         username = data.get('username') if data.get('username') else (account.username if hasattr(account, 'username') else account.instructor.email)
@@ -213,10 +219,9 @@ def update_account(id):
                     'school_id': school_id,
                     'account': account_data
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting account_updated event: {{'school_id': {school_id}, 'account': {{'id': {account.id}, 'username': '{account_data['username']}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted account_updated to room school_%s", school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         return jsonify({"success": True, "message": "Account updated successfully!"})
 
@@ -267,6 +272,7 @@ def delete_account(id):
         
         db.session.delete(account)
         db.session.commit()
+        bump(school_id, 'accounts')
 
         # Emit real-time update
         try:
@@ -276,10 +282,9 @@ def delete_account(id):
                     'school_id': school_id,
                     'account': account_data
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting account_deleted event: {{'school_id': {school_id}, 'account': {{'id': {account_data['id']}, 'username': '{account_data['username']}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted account_deleted to room school_%s", school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         return jsonify({"success": True, "message": "Account deleted successfully!"})
 
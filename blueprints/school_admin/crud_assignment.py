@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify, render_template, session, flash, redirect, url_for
 from database import db
 from models import Instructor, Subject, Section, InstructorSchedule, SchoolAdmin
+from schedule_index import (DAY_NAMES, INSTRUCTOR, SECTION, get_schedule_index, parse_weekday, parse_minutes,
+                            format_minutes, schedules_changed)
+from student_import import read_rows, ImportFileError
+from timetable_import import import_timetable, REQUIRED_COLUMNS, COLUMN_ALIASES, MAX_ROWS
+from dashboard_cache import invalidate_instructor, invalidate_school
 from sqlalchemy import func
+import csv
 import hashlib
 from datetime import datetime
 
@@ -22,28 +28,6 @@ def create_assignment():
         start_time = data.get('start_time')
         end_time = data.get('end_time')
 
-        # Normalize day and time inputs
-        VALID_DAYS = {'Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'}
-
-        def normalize_time(value: str | None) -> str | None:
-            if not value:
-                return None
-            v = value.strip()
-            # Try 24h first (HH:MM)
-            for fmt in ('%H:%M', '%H:%M:%S'):
-                try:
-                    return datetime.strptime(v, fmt).strftime('%H:%M')
-                except Exception:
-                    pass
-            # Try 12h with AM/PM
-            v_up = v.upper().replace('.', '')
-            for fmt in ('%I:%M %p', '%I:%M%p'):
-                try:
-                    return datetime.strptime(v_up, fmt).strftime('%H:%M')
-                except Exception:
-                    pass
-            return None
-        
         # Validate required fields
         if not all([instructor_id, subject_id, section_id, day, start_time, end_time]):
             return jsonify({
@@ -52,17 +36,18 @@ def create_assignment():
             }), 400
         
         # Validate day
-        if day not in VALID_DAYS:
+        if day not in DAY_NAMES:
             return jsonify({'success': False, 'message': 'Invalid day provided'}), 400
+        weekday = parse_weekday(day)
 
-        # Normalize times
-        n_start = normalize_time(start_time)
-        n_end = normalize_time(end_time)
-        if not n_start or not n_end:
+        # Normalize times to minutes since midnight
+        start_minute = parse_minutes(start_time)
+        end_minute = parse_minutes(end_time)
+        if start_minute is None or end_minute is None:
             return jsonify({'success': False, 'message': 'Invalid time format. Use HH:MM or h:MM AM/PM'}), 400
 
         # Validate time range
-        if n_start >= n_end:
+        if start_minute >= end_minute:
             return jsonify({
                 'success': False,
                 'message': 'End time must be after start time'
@@ -104,66 +89,56 @@ def create_assignment():
                 'message': 'Section not found'
             }), 404
         
+        # Duplicate and overlap checks run against the school's in-memory index
+        index = get_schedule_index(session['school_id'])
+
         # Check for duplicate assignments
-        existing_assignment = InstructorSchedule.query.filter_by(
-            instructor_id=instructor_id,
-            subject_id=subject_id,
-            section_id=section_id,
-            day=day
-        ).first()
-        
-        if existing_assignment:
+        if index.find(instructor.id, weekday, subject_id=subject.id, section_id=section.id):
             return jsonify({
                 'success': False,
                 'message': f'Assignment already exists for {instructor.name} teaching {subject.name} to {section.grade_level}-{section.name} on {day}'
             }), 400
         
         # Check for section time conflicts (same section can't have two classes at the same time)
-        section_conflicts = InstructorSchedule.query.filter(
-            InstructorSchedule.section_id == section_id,
-            InstructorSchedule.day == day,
-            InstructorSchedule.start_time < n_end,
-            InstructorSchedule.end_time > n_start
-        ).first()
+        section_conflicts = index.overlapping(SECTION, section.id, weekday, start_minute, end_minute)
         
         if section_conflicts:
-            conflict_subject = Subject.query.get(section_conflicts.subject_id)
+            conflict = section_conflicts[0]
+            conflict_subject = Subject.query.get(conflict.subject_id)
             conflict_subject_name = conflict_subject.name if conflict_subject else 'another subject'
             return jsonify({
                 'success': False,
-                'message': f'Time conflict! {section.grade_level}-{section.name} already has {conflict_subject_name} scheduled on {day} from {section_conflicts.start_time} to {section_conflicts.end_time}'
+                'message': f'Time conflict! {section.grade_level}-{section.name} already has {conflict_subject_name} scheduled on {day} from {format_minutes(conflict.start)} to {format_minutes(conflict.end)}'
             }), 400
         
         # Check for instructor time conflicts (same instructor can't teach two classes at the same time)
-        instructor_conflicts = InstructorSchedule.query.filter(
-            InstructorSchedule.instructor_id == instructor_id,
-            InstructorSchedule.day == day,
-            InstructorSchedule.start_time < n_end,
-            InstructorSchedule.end_time > n_start
-        ).first()
+        instructor_conflicts = index.overlapping(INSTRUCTOR, instructor.id, weekday, start_minute, end_minute)
         
         if instructor_conflicts:
-            conflict_subject = Subject.query.get(instructor_conflicts.subject_id)
-            conflict_section = Section.query.get(instructor_conflicts.section_id)
+            conflict = instructor_conflicts[0]
+            conflict_subject = Subject.query.get(conflict.subject_id)
+            conflict_section = Section.query.get(conflict.section_id)
             conflict_subject_name = conflict_subject.name if conflict_subject else 'another subject'
             conflict_section_name = f"{conflict_section.grade_level}-{conflict_section.name}" if conflict_section else 'another section'
             return jsonify({
                 'success': False,
-                'message': f'Time conflict! {instructor.name} is already teaching {conflict_subject_name} to {conflict_section_name} on {day} from {instructor_conflicts.start_time} to {instructor_conflicts.end_time}'
+                'message': f'Time conflict! {instructor.name} is already teaching {conflict_subject_name} to {conflict_section_name} on {day} from {format_minutes(conflict.start)} to {format_minutes(conflict.end)}'
             }), 400
         
         # Create new assignment
         new_assignment = InstructorSchedule(
-            instructor_id=instructor_id,
-            subject_id=subject_id,
-            section_id=section_id,
+            instructor_id=instructor.id,
+            subject_id=subject.id,
+            section_id=section.id,
             day=day,
-            start_time=n_start,
-            end_time=n_end
+            start_time=format_minutes(start_minute),
+            end_time=format_minutes(end_minute)
         )
         
         db.session.add(new_assignment)
+        schedules_changed(session['school_id'])
         db.session.commit()
+        invalidate_instructor(instructor.id)
         
         return jsonify({
             'success': True,
@@ -199,7 +174,7 @@ def get_instructor_assignments(instructor_id):
      .join(Instructor, InstructorSchedule.instructor_id == Instructor.id)\
      .filter(Instructor.school_id == school_id)\
      .filter(InstructorSchedule.instructor_id == instructor_id)\
-     .order_by(InstructorSchedule.day, InstructorSchedule.start_time)\
+     .order_by(InstructorSchedule.weekday, InstructorSchedule.start_minute)\
      .all()
     
     assignment_list = []
@@ -236,8 +211,11 @@ def delete_assignment(assignment_id):
                 'message': 'Assignment not found'
             }), 404
         
+        instructor_id = assignment.instructor_id
         db.session.delete(assignment)
+        schedules_changed(session['school_id'])
         db.session.commit()
+        invalidate_instructor(instructor_id)
         
         return jsonify({
             'success': True,
@@ -250,3 +228,106 @@ def delete_assignment(assignment_id):
             'success': False,
             'message': f'Error deleting assignment: {str(e)}'
         }), 500
+
+@assignment_bp.route('/assignments/import', methods=['POST'])
+def import_assignments():
+    """Import a whole timetable from a CSV or XLSX file"""
+    if 'school_id' not in session:
+        return jsonify({'error': 'Session expired'}), 401
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'Choose a CSV or XLSX file to import'}), 400
+    dry_run = request.form.get('dry_run') in ('1', 'true', 'on')
+    partial = request.form.get('partial') in ('1', 'true', 'on')
+    
+    try:
+        rows = read_rows(upload.filename, upload.read(), required=REQUIRED_COLUMNS,
+                         aliases=COLUMN_ALIASES, max_rows=MAX_ROWS)
+    except ImportFileError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'success': False, 'message': f'Could not read the file: {e}'}), 400
+    
+    try:
+        summary = import_timetable(rows, session['school_id'], dry_run=dry_run, partial=partial)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error importing timetable: {str(e)}'
+        }), 500
+    if summary['imported']:
+        invalidate_school(session['school_id'])
+    
+    if summary['blocked']:
+        message = (f"Nothing imported: {summary['failed']} of {summary['total_rows']} rows have errors "
+                   f"or conflicts ({len(summary['conflicts'])} conflicts)")
+    elif dry_run:
+        message = f"{summary['valid']} of {summary['total_rows']} rows can be imported"
+    else:
+        message = f"Imported {summary['imported']} of {summary['total_rows']} classes"
+        if summary['failed']:
+            message += f", {summary['failed']} rows skipped"
+    
+    return jsonify({
+        'success': not summary['blocked'],
+        'message': message,
+        'imported': summary['imported'],
+        'failed': summary['failed'],
+        'dry_run': dry_run,
+        'errors': summary['errors'],
+        'conflicts': summary['conflicts']
+    }), 409 if summary['blocked'] else 200
+
+@assignment_bp.route('/assignments/conflicts', methods=['GET'])
+def assignment_conflicts():
+    """Every overlapping pair of classes in the school"""
+    if 'school_id' not in session:
+        return jsonify({'error': 'Session expired'}), 401
+    
+    try:
+        school_id = session['school_id']
+        conflicts = get_schedule_index(school_id).conflicts()
+        
+        # Names for the report, one query per table
+        slots = [slot for conflict in conflicts for slot in (conflict.first, conflict.second)]
+        subjects = dict(db.session.query(Subject.id, Subject.name)
+                        .filter(Subject.id.in_({slot.subject_id for slot in slots})).all()) if slots else {}
+        instructors = dict(db.session.query(Instructor.id, Instructor.name)
+                           .filter(Instructor.id.in_({slot.instructor_id for slot in slots})).all()) if slots else {}
+        sections = {section.id: f"{section.grade_level}-{section.name}" for section in
+                    Section.query.filter(Section.id.in_({slot.section_id for slot in slots})).all()} if slots else {}
+        
+        def describe(slot):
+            return {
+                'id': slot.id,
+                'subject': subjects.get(slot.subject_id, 'Unknown'),
+                'instructor': instructors.get(slot.instructor_id, 'Unknown'),
+                'section': sections.get(slot.section_id, 'Unknown'),
+                'start_time': format_minutes(slot.start),
+                'end_time': format_minutes(slot.end)
+            }
+        
+        conflict_list = []
+        for conflict in conflicts:
+            conflict_list.append({
+                'type': conflict.kind,
+                'day': DAY_NAMES[conflict.weekday],
+                'resource': (instructors if conflict.kind == INSTRUCTOR else sections).get(conflict.resource_id, 'Unknown'),
+                'overlap_start': format_minutes(conflict.second.start),
+                'overlap_end': format_minutes(min(conflict.first.end, conflict.second.end)),
+                'classes': [describe(conflict.first), describe(conflict.second)]
+            })
+        
+        return jsonify({
+            'success': True,
+            'count': len(conflict_list),
+            'conflicts': conflict_list
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error checking conflicts: {str(e)}'
+        }), 500
@@ -1,12 +1,18 @@
+import logging
+
 from flask import Blueprint, request, jsonify, render_template, session
 from database import db
 from models import Instructor, SchoolAdmin
 from activity_logger import log_activity
+from entity_versions import bump, conditional
+
+logger = logging.getLogger(__name__)
 
 school_admin_bp = Blueprint('crud_instructor', __name__, url_prefix='/school_admin')
 
 # Get all instructors for the school
 @school_admin_bp.route('/instructors', methods=['GET'])
+@conditional('instructors', 'accounts')
 def get_instructors():
     # Get school_id from session
     if 'school_id' not in session:
@@ -15,15 +21,13 @@ def get_instructors():
     school_id = session['school_id']
     instructors = Instructor.query.filter_by(school_id=school_id).all()
     
-    # Add creator name to each instructor
+    # Add creator name to each instructor, with all creators fetched in one query
+    creator_ids = {instructor.created_by for instructor in instructors if instructor.created_by}
+    creators = dict(db.session.query(SchoolAdmin.id, SchoolAdmin.username)
+                    .filter(SchoolAdmin.id.in_(creator_ids)).all()) if creator_ids else {}
     for instructor in instructors:
         if instructor.created_by:
-            # Fetch the creator's actual username from SchoolAdmin table
-            creator = SchoolAdmin.query.filter_by(id=instructor.created_by).first()
-            if creator:
-                instructor.creator_name = creator.username
-            else:
-                instructor.creator_name = "Unknown Admin"
+            instructor.creator_name = creators.get(instructor.created_by, "Unknown Admin")
         else:
             instructor.creator_name = "System"
     
@@ -90,6 +94,7 @@ def create_instructor():
 
         db.session.add(new_instructor)
         db.session.commit()
+        bump(school_id, 'instructors')
 
         # Log the activity
         log_activity(
@@ -119,13 +124,12 @@ def create_instructor():
                         'creator_name': creator_name
                     }
                 }
-                print(f"📢 Emitting instructor_created event: {event_data}")
+                logger.debug("Emitting instructor_created to room school_%s: %s", school_id, event_data)
                 current_app.socketio.emit('instructor_created', event_data, room=f'school_{school_id}')
-                print(f"✅ Successfully emitted to room: school_{school_id}")
             else:
-                print("❌ No socketio found in current_app")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("No socketio found in current_app")
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         return jsonify({
             'success': True, 
@@ -208,6 +212,7 @@ def update_instructor(id):
         instructor.address = data.get('address').strip()
         
         db.session.commit()
+        bump(school_id, 'instructors')
 
         # Log the activity
         log_activity(
@@ -232,13 +237,12 @@ def update_instructor(id):
                         'address': instructor.address
                     }
                 }
-                print(f"📢 Emitting instructor_updated event: {event_data}")
+                logger.debug("Emitting instructor_updated to room school_%s: %s", school_id, event_data)
                 current_app.socketio.emit('instructor_updated', event_data, room=f'school_{school_id}')
-                print(f"✅ Successfully emitted to room: school_{school_id}")
             else:
-                print("❌ No socketio found in current_app")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("No socketio found in current_app")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         # Get creator name for response
         creator = SchoolAdmin.query.filter_by(id=instructor.created_by).first()
@@ -312,6 +316,7 @@ def delete_instructor(id):
         # Now we can safely delete the instructor
         db.session.delete(instructor)
         db.session.commit()
+        bump(school_id, 'instructors', 'accounts')
         
         # Emit real-time update after successful deletion
         try:
@@ -324,13 +329,12 @@ def delete_instructor(id):
                         'name': instructor_name
                     }
                 }
-                print(f"📢 Emitting instructor_deleted event: {event_data}")
+                logger.debug("Emitting instructor_deleted to room school_%s: %s", school_id, event_data)
                 current_app.socketio.emit('instructor_deleted', event_data, room=f'school_{school_id}')
-                print(f"✅ Successfully emitted to room: school_{school_id}")
             else:
-                print("❌ No socketio found in current_app")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("No socketio found in current_app")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         return jsonify({
             'success': True, 
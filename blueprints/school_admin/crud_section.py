@@ -1,9 +1,14 @@
+import logging
+
 from flask import Blueprint, request, jsonify, render_template, session
 from database import db
 from models import Section
 from activity_logger import log_activity
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
+from entity_versions import bump, conditional
+
+logger = logging.getLogger(__name__)
 
 sections_bp = Blueprint('crud_section', __name__, url_prefix='/school_admin')
 # Get all sections for the school
@@ -15,15 +20,13 @@ def get_sections():
 
     try:
         sections = Section.query.filter_by(school_id=school_id).all()
-        print(f"DEBUG: Fetching sections for school {school_id}, found {len(sections)} sections")
-        for section in sections:
-            print(f"  - Section: {section.id}, {section.name}, {section.grade_level}")
+        logger.debug("Fetching sections for school %s, found %d sections", school_id, len(sections))
         return jsonify({
             "success": True,
             "sections": [section.to_dict() for section in sections]
         })
-    except Exception as e:
-        print("Error fetching sections:", e)
+    except Exception:
+        logger.exception("Error fetching sections")
         return jsonify({"success": False, "message": "Error fetching sections."}), 500
 
 
@@ -52,6 +55,7 @@ def create_section():
 
         db.session.add(new_section)
         db.session.commit()
+        bump(school_id, 'sections')
         
         # Log the activity
         log_activity(
@@ -74,19 +78,20 @@ def create_section():
                         'grade_level': new_section.grade_level
                     }
                 }, room=f'school_{school_id}')
-        except Exception as e:
-            print(f"Socket.IO emit error: {e}")
-        
-        print(f"DEBUG: Section created - ID: {new_section.id}, Name: {new_section.name}, School: {new_section.school_id}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
+
+        logger.debug("Section created - ID: %s, Name: %s, School: %s", new_section.id, new_section.name,
+                     new_section.school_id)
 
         return jsonify({
             "success": True, 
             "message": "Section created successfully!", 
             "section": new_section.to_dict()
         })
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print("Error creating section:", e)
+        logger.exception("Error creating section")
         return jsonify({"success": False, "message": "Error creating section. Please try again."}), 500 
 
 # Update an existing section
@@ -117,6 +122,7 @@ def update_section(section_id):
         section.name = data.get('name')
         section.grade_level = data.get('grade_level')
         db.session.commit()
+        bump(school_id, 'sections')
 
         # Log the activity
         log_activity(
@@ -139,35 +145,31 @@ def update_section(section_id):
                         'grade_level': section.grade_level
                     }
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting section_updated event: {{'school_id': {school_id}, 'section': {{'id': {section.id}, 'name': '{section.name}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted section_updated for section %s to room school_%s", section.id, school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         return jsonify({
             "success": True, 
             "message": "Section updated successfully!", 
             "section": section.to_dict()
         })
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print("Error updating section:", e)
+        logger.exception("Error updating section")
         return jsonify({"success": False, "message": "Error updating section. Please try again."}), 500 
 
 #delete a section (using raw SQL to avoid column mapping issues)
 @sections_bp.route('/delete/section/<int:section_id>', methods=['DELETE'])
 def delete_section(section_id):
     try:
-        print(f"Attempting to delete section with ID: {section_id}")
-        
         school_id = session.get('school_id')
-        print(f"School ID from session: {school_id}")
+        logger.debug("Deleting section %s of school %s", section_id, school_id)
         
         if not school_id:
             return jsonify({"success": False, "message": "Session expired. Please login again."}), 401
 
         section = Section.query.filter_by(id=section_id, school_id=school_id).first()
-        print(f"Found section: {section}")
         
         if not section:
             return jsonify({"success": False, "message": "Section not found"}), 404
@@ -181,7 +183,6 @@ def delete_section(section_id):
             {"section_id": section_id}
         ).fetchone()
         students_count = students_result[0] if students_result else 0
-        print(f"Students count: {students_count}")
         if students_count > 0:
             dependencies.append(f"{students_count} student(s)")
         
@@ -191,7 +192,6 @@ def delete_section(section_id):
             {"section_id": section_id}
         ).fetchone()
         schedules_count = schedules_result[0] if schedules_result else 0
-        print(f"Schedules count: {schedules_count}")
         if schedules_count > 0:
             dependencies.append(f"{schedules_count} schedule(s)")
             
@@ -201,7 +201,6 @@ def delete_section(section_id):
             {"section_id": section_id}
         ).fetchone()
         advisers_count = advisers_result[0] if advisers_result else 0
-        print(f"Section advisers count: {advisers_count}")
         if advisers_count > 0:
             dependencies.append(f"{advisers_count} section adviser(s)")
 
@@ -211,8 +210,6 @@ def delete_section(section_id):
                 "message": f"Cannot delete section '{section.name}' because it has {', '.join(dependencies)} assigned to it. Please remove these assignments first."
             }), 400
 
-        print(f"No dependencies found, proceeding to delete section '{section.name}'")
-        
         # Store section info for real-time update before deletion
         section_name = section.name
         section_school_id = section.school_id
@@ -232,7 +229,8 @@ def delete_section(section_id):
             {"section_id": section_id}
         )
         db.session.commit()
-        print("Section deleted successfully")
+        bump(school_id, 'sections')
+        logger.info("Section %s deleted", section_id)
 
         # Emit real-time update
         try:
@@ -245,21 +243,15 @@ def delete_section(section_id):
                         'name': section_name
                     }
                 }, room=f'school_{section_school_id}')
-        except Exception as e:
-            print(f"Socket.IO emit error: {e}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         return jsonify({"success": True, "message": "Section deleted successfully!"})
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        error_msg = str(e)
-        error_type = type(e).__name__
-        print(f"Error deleting section - Type: {error_type}, Message: {error_msg}")
-        
-        import traceback
-        print("Full traceback:")
-        traceback.print_exc()
-        
+        logger.exception("Error deleting section %s", section_id)
+
         # Return user-friendly error message
         return jsonify({
             "success": False, 
@@ -267,6 +259,7 @@ def delete_section(section_id):
         }), 500
 
 @sections_bp.route('/sections/api', methods=['GET'])
+@conditional('sections')
 def get_sections_api():
     """API endpoint to get all sections for dropdown"""
     if 'school_id' not in session:
@@ -276,9 +269,7 @@ def get_sections_api():
     
     try:
         sections = Section.query.filter_by(school_id=school_id).all()
-        print(f"DEBUG: API Fetching sections for school {school_id}, found {len(sections)} sections")
-        for section in sections:
-            print(f"  - API Section: {section.id}, {section.name}, {section.grade_level}")
+        logger.debug("API fetching sections for school %s, found %d sections", school_id, len(sections))
         
         sections_list = []
         for section in sections:
@@ -293,6 +284,6 @@ def get_sections_api():
             "sections": sections_list
         }), 200
         
-    except Exception as e:
-        print("Error fetching sections API:", e)
+    except Exception:
+        logger.exception("Error fetching sections API")
         return jsonify({"success": False, "message": "Error fetching sections."}), 500
\ No newline at end of file
@@ -1,8 +1,16 @@
+import logging
+
 from flask import Blueprint, request, render_template, redirect, url_for, flash, session, jsonify
 from database import db
 from models import Student, Section
 from activity_logger import log_activity
-import random, string
+from registration_index import registration_index, student_saved, student_deleted
+from student_import import read_rows, import_students, ImportFileError
+from dashboard_cache import invalidate_section, invalidate_school
+from entity_versions import bump
+import csv, random, string
+
+logger = logging.getLogger(__name__)
 
 school_admin_bp = Blueprint('crud_student', __name__, url_prefix='/school_admin')
 
@@ -59,6 +67,9 @@ def add_student():
 
         db.session.add(new_student)
         db.session.commit()
+        student_saved(new_student)
+        invalidate_section(new_student.section_id)
+        bump(school_id, 'students')
 
         # Log the activity
         log_activity(
@@ -90,10 +101,9 @@ def add_student():
                         'code': code
                     }
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting student_created event: {{'school_id': {school_id}, 'student': {{'id': {new_student.id}, 'name': '{first_name} {last_name}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted student_created to room school_%s", school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         success_message = f"Student {first_name} {last_name} added successfully with code {code}"
         
@@ -147,6 +157,7 @@ def edit_student(student_id):
 
         # Store old values for logging
         old_name = f"{student.first_name} {student.last_name}"
+        old_section_id = student.section_id
         
         student.first_name = request.form['first_name']
         student.last_name = request.form['last_name']
@@ -155,6 +166,7 @@ def edit_student(student_id):
         student.parent_contact = request.form['parent_contact']
 
         db.session.commit()
+        invalidate_section(old_section_id, student.section_id)
 
         # Log the activity
         log_activity(
@@ -186,10 +198,9 @@ def edit_student(student_id):
                         'code': student.code
                     }
                 }, room=f'school_{school_id}')
-                print(f"📢 Emitting student_updated event: {{'school_id': {school_id}, 'student': {{'id': {student.id}, 'name': '{student.first_name} {student.last_name}'}}}}")
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+                logger.debug("Emitted student_updated to room school_%s", school_id)
+        except Exception:
+            logger.exception("Socket.IO emit error")
 
         # Get section name for response
         section = Section.query.get(student.section_id)
@@ -258,8 +269,8 @@ def delete_student(student_id):
                         'name': student_name
                     }
                 }, room=f'school_{school_id}')
-        except Exception as e:
-            print(f"Socket.IO emit error: {e}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         # Log the activity before deletion
         log_activity(
@@ -270,8 +281,12 @@ def delete_student(student_id):
             description=f"Deleted student: {student_name} (Grade {student.grade_level})"
         )
         
+        section_id = student.section_id
         db.session.delete(student)
         db.session.commit()
+        student_deleted(student_id)
+        invalidate_section(section_id)
+        bump(school_id, 'students')
         
         success_message = f"Student {student_name} deleted successfully"
         
@@ -294,3 +309,75 @@ def delete_student(student_id):
             
         flash(error_message, "danger")
         return redirect(url_for('crud_student.students_page'))
+
+# --- Bulk Import Students (CSV/XLSX) ---
+@school_admin_bp.route('/import_students', methods=['POST'])
+def import_students_file():
+    school_id = session.get('school_id')
+    if not school_id:
+        return jsonify({'success': False, 'message': 'Session expired. Please log in again.'}), 401
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'Choose a CSV or XLSX file to import'}), 400
+    dry_run = request.form.get('dry_run') in ('1', 'true', 'on')
+
+    try:
+        rows = read_rows(upload.filename, upload.read())
+    except ImportFileError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'success': False, 'message': f'Could not read the file: {e}'}), 400
+
+    try:
+        summary = import_students(rows, school_id, dry_run=dry_run)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error importing students: {e}'}), 500
+
+    if summary['imported']:
+        for student in summary['students']:
+            registration_index.add_student(student['id'], student['code'], school_id)
+        invalidate_school(school_id)
+        bump(school_id, 'students')
+
+        # One log entry and one event for the whole file instead of one per student
+        log_activity(
+            action='CREATE',
+            entity_type='student',
+            entity_name=f"{summary['imported']} students",
+            description=f"Imported {summary['imported']} students from {upload.filename}"
+                        f" ({summary['failed']} rows skipped)"
+        )
+        try:
+            from flask import current_app
+            if hasattr(current_app, 'socketio'):
+                current_app.socketio.emit('students_imported', {
+                    'school_id': school_id,
+                    'count': summary['imported']
+                }, room=f'school_{school_id}')
+        except Exception:
+            logger.exception("Socket.IO emit error")
+
+    if dry_run:
+        message = f"{summary['valid']} of {summary['total_rows']} rows are valid"
+    else:
+        message = f"Imported {summary['imported']} of {summary['total_rows']} students"
+    if summary['failed']:
+        message += f", {summary['failed']} rows have errors"
+
+    return jsonify({
+        'success': True,
+        'message': message,
+        'imported': summary['imported'],
+        'failed': summary['failed'],
+        'dry_run': dry_run,
+        'errors': summary['errors'],
+        'students': [{
+            'row': student['row'],
+            'id': student['id'],
+            'first_name': student['first_name'],
+            'last_name': student['last_name'],
+            'code': student['code']
+        } for student in summary['students']]
+    })
@@ -1,9 +1,14 @@
+import logging
+
 from flask import Blueprint, request, jsonify, render_template, session
 from database import db
 from models import Subject, Instructor, Section, SchoolAdmin
 from activity_logger import log_activity
+from entity_versions import bump, conditional
 import re
 
+logger = logging.getLogger(__name__)
+
 subjects_bp = Blueprint('subjects', __name__, url_prefix='/school_admin')
 
 # Get all subjects for the school
@@ -70,6 +75,7 @@ def create_subject():
         
         db.session.add(new_subject)
         db.session.commit()
+        bump(school_id, 'subjects')
         
         # Log the activity
         log_activity(
@@ -84,7 +90,7 @@ def create_subject():
         try:
             from flask import current_app
             if hasattr(current_app, 'socketio'):
-                print(f"📚 Emitting subject_created event to room school_{school_id}")
+                logger.debug("Emitting subject_created to room school_%s", school_id)
                 current_app.socketio.emit('subject_created', {
                     'school_id': school_id,
                     'subject': {
@@ -93,11 +99,10 @@ def create_subject():
                         'grade_level': new_subject.grade_level
                     }
                 }, room=f'school_{school_id}')
-                print(f"✅ Subject_created event emitted successfully")
             else:
-                print("❌ No socketio found in current_app")
-        except Exception as e:
-            print(f"🔥 Socket.IO emit error: {e}")
+                logger.debug("No socketio found in current_app")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         # Return the new subject data
         subject_data = {
@@ -167,6 +172,7 @@ def update_subject(subject_id):
         subject.grade_level = grade_level
         
         db.session.commit()
+        bump(school_id, 'subjects')
         
         # Log the activity
         log_activity(
@@ -189,11 +195,10 @@ def update_subject(subject_id):
                         'grade_level': subject.grade_level
                     }
                 }
-                print(f"📢 Emitting subject_updated event: {subject_data}")
+                logger.debug("Emitting subject_updated to room school_%s: %s", school_id, subject_data)
                 current_app.socketio.emit('subject_updated', subject_data, room=f'school_{school_id}')
-                print(f"✅ Successfully emitted to room: school_{school_id}")
-        except Exception as e:
-            print(f"❌ Socket.IO emit error: {e}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         # Return updated subject data
         subject_data = {
@@ -247,6 +252,7 @@ def delete_subject(subject_id):
         
         db.session.delete(subject)
         db.session.commit()
+        bump(school_id, 'subjects')
         
         # Emit real-time update
         try:
@@ -259,8 +265,8 @@ def delete_subject(subject_id):
                         'name': subject_name
                     }
                 }, room=f'school_{school_id}')
-        except Exception as e:
-            print(f"Socket.IO emit error: {e}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         return jsonify({
             'success': True, 
@@ -275,6 +281,7 @@ def delete_subject(subject_id):
         }), 500
 
 @subjects_bp.route('/subjects/api', methods=['GET'])
+@conditional('subjects')
 def get_subjects_api():
     """API endpoint to get all subjects for dropdown"""
     if 'school_id' not in session:
@@ -1,33 +1,61 @@
-from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for
+import logging
+
+from flask import Blueprint, request, jsonify, session, render_template, redirect, url_for, current_app
 from database import db
 from models import TelegramConfig, Student, Section, School
 from sqlalchemy import func
+from registration_index import student_saved
+from dashboard_cache import invalidate_section
+from telegram_provider import get_config_by_id, get_config_for_school, invalidate_telegram_config, other_bot_for_school
+from telegram_ingest import WebhookIngestor, queue_reply, post_message, current_config_id, INVALID, BUSY
+from telegram_bot import call_bot_api, wrong_bot_message
+from telegram_transport import TransportError
 import datetime
 import json
+import threading
+
+logger = logging.getLogger(__name__)
 
 # Create blueprint
 telegram_bp = Blueprint('telegram', __name__)
 
+_ingestor_lock = threading.Lock()
+
 @telegram_bp.route('/webhook', methods=['POST'])
-def telegram_webhook():
-    """Handle incoming Telegram webhook updates"""
-    try:
-        update = request.get_json()
-        
-        if not update:
-            return jsonify({'status': 'error', 'message': 'No data received'}), 400
-        
-        # Process the update
-        result = process_telegram_update(update)
-        
-        if result.get('status') == 'success':
-            return jsonify({'status': 'ok'}), 200
-        else:
-            return jsonify({'status': 'error', 'message': result.get('message', 'Unknown error')}), 500
-            
-    except Exception as e:
-        print(f"Webhook error: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+@telegram_bp.route('/webhook/<int:config_id>', methods=['POST'])
+def telegram_webhook(config_id=None):
+    """Acknowledge a Telegram webhook update and queue it for processing.
+    Each bot's webhook URL ends in its config id so replies use the same bot."""
+    update = request.get_json(silent=True)
+    status = get_webhook_ingestor().submit(update, config_id)
+
+    if status == INVALID:
+        return jsonify({'status': 'error', 'message': 'Invalid update'}), 400
+    if status == BUSY:
+        # Telegram retries non-2xx responses, so the update is not lost
+        return jsonify({'status': 'error', 'message': 'Busy, retry later'}), 503
+
+    # Duplicates are acknowledged too, otherwise Telegram keeps resending them
+    return jsonify({'status': 'ok'}), 200
+
+def get_webhook_ingestor():
+    """Webhook ingestor of the current app, started on first use"""
+    app = current_app._get_current_object()
+    ingestor = getattr(app, 'telegram_ingestor', None)
+    if ingestor is None:
+        with _ingestor_lock:
+            ingestor = getattr(app, 'telegram_ingestor', None)
+            if ingestor is None:
+                ingestor = WebhookIngestor(
+                    app,
+                    process_telegram_update,
+                    deliver_telegram_message,
+                    workers=app.config.get('TELEGRAM_INGEST_WORKERS', 4),
+                    queue_size=app.config.get('TELEGRAM_INGEST_QUEUE_SIZE', 1000),
+                    dedupe_size=app.config.get('TELEGRAM_DEDUPE_SIZE', 10000)
+                )
+                app.telegram_ingestor = ingestor
+    return ingestor
 
 def process_telegram_update(update):
     """Process incoming Telegram update"""
@@ -43,7 +71,7 @@ def process_telegram_update(update):
         if not chat_id or not text:
             return {'status': 'ignored', 'message': 'Invalid message format'}
         
-        print(f"📱 Received message: '{text}' from chat_id: {chat_id}")
+        logger.debug("Received message %r from chat %s", text, chat_id)
         
         # Handle /start command
         if text.startswith('/start'):
@@ -58,7 +86,7 @@ def process_telegram_update(update):
         return handle_general_message(chat_id, text)
         
     except Exception as e:
-        print(f"Error processing update: {e}")
+        logger.exception("Error processing update")
         return {'status': 'error', 'message': str(e)}
 
 def handle_start_command(chat_id, text):
@@ -106,7 +134,7 @@ def handle_student_registration(chat_id, text):
         school_code = parts[0].upper()
         student_code = parts[1].upper()
         
-        print(f"🔍 Looking for school code: '{school_code}', student code: '{student_code}'")
+        logger.debug("Looking for school code %r, student code %r", school_code, student_code)
         
         # Find school by code
         school = School.query.filter_by(school_code=school_code).first()
@@ -122,8 +150,6 @@ def handle_student_registration(chat_id, text):
             send_telegram_message(chat_id, message)
             return {'status': 'error', 'message': f'School not found: {school_code}'}
         
-        print(f"✅ Found school: {school.name} (Code: {school_code})")
-        
         # Find student by code in that school
         student = Student.query.filter_by(school_id=school.id, code=student_code).first()
         
@@ -132,7 +158,12 @@ def handle_student_registration(chat_id, text):
             send_telegram_message(chat_id, message)
             return {'status': 'error', 'message': f'Student not found: {student_code}'}
         
-        print(f"✅ Found student: {student.first_name} {student.last_name} (Code: {student_code})")
+        # Only the bot serving the school can message this chat later
+        receiving = get_config_by_id(current_config_id())
+        other = other_bot_for_school(school.id, receiving.bot_token) if receiving else None
+        if other:
+            send_telegram_message(chat_id, wrong_bot_message(student, other))
+            return {'status': 'error', 'message': 'Student is served by another bot'}
         
         # Check if already registered
         if student.telegram_chat_id and student.telegram_status:
@@ -144,13 +175,14 @@ def handle_student_registration(chat_id, text):
         student.telegram_chat_id = str(chat_id)
         student.telegram_status = True
         db.session.commit()
+        invalidate_section(student.section_id)
         
         # Send success message
         success_message = f"✅ Registration successful!\n\n👤 Student: {student.first_name} {student.last_name}\n🏫 School: {school.name}\n📚 You'll receive attendance notifications here."
         
         send_telegram_message(chat_id, success_message)
         
-        print(f"✅ Student registered: {student.first_name} {student.last_name} -> {chat_id}")
+        logger.info("Student %s registered for Telegram notifications", student.id)
         
         return {
             'status': 'success', 
@@ -158,7 +190,7 @@ def handle_student_registration(chat_id, text):
         }
         
     except Exception as e:
-        print(f"Error in student registration: {e}")
+        logger.exception("Error in student registration")
         db.session.rollback()
         
         error_message = "❌ Registration failed. Please try again or contact your school administrator."
@@ -188,35 +220,35 @@ def handle_general_message(chat_id, text):
         return {'status': 'error', 'message': str(e)}
 
 def send_telegram_message(chat_id, message):
-    """Send a message to a Telegram chat"""
+    """Send a message to a Telegram chat.
+
+    Replies produced while the webhook ingestor processes a batch are queued
+    and sent together, one sendMessage per chat.
+    """
+    if queue_reply(chat_id, message):
+        return True
+    return deliver_telegram_message(chat_id, message)
+
+def deliver_telegram_message(chat_id, message, parse_mode='HTML', config_id=None):
+    """Send a message right away through the given bot (default: primary active bot)"""
     try:
-        # Get active bot configuration
-        config = TelegramConfig.query.filter_by(is_active=True).first()
+        # Cached active bot configuration
+        config = get_config_by_id(config_id)
         
         if not config:
-            print("❌ No active bot configuration found")
+            logger.warning("No active bot configuration found")
             return False
         
-        import requests
-        
-        url = f"https://api.telegram.org/bot{config.bot_token}/sendMessage"
-        data = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
-        
-        response = requests.post(url, json=data, timeout=10)
-        
-        if response.status_code == 200:
-            print(f"✅ Message sent to {chat_id}")
+        api_base = current_app.config.get('TELEGRAM_API_BASE', 'https://api.telegram.org')
+        if post_message(api_base, config.bot_token, chat_id, message, parse_mode):
+            logger.debug("Message sent to %s", chat_id)
             return True
         else:
-            print(f"❌ Failed to send message: {response.text}")
+            logger.warning("Failed to send message to %s", chat_id)
             return False
             
-    except Exception as e:
-        print(f"❌ Error sending message: {e}")
+    except Exception:
+        logger.exception("Error sending message to %s", chat_id)
         return False
 
 @telegram_bp.route('/auto-setup-status', methods=['GET'])
@@ -296,46 +328,36 @@ def get_telegram_config():
 def create_or_update_telegram_config():
     """Create or update telegram configuration"""
     try:
-        print("DEBUG: Starting telegram config save...")
-        
         if 'user_id' not in session:
-            print("DEBUG: No user_id in session")
             return jsonify({'error': 'Unauthorized'}), 401
         
         school_id = session.get('school_id')
-        print(f"DEBUG: School ID from session: {school_id}")
-        
+
         if not school_id:
-            print("DEBUG: No school_id found")
             return jsonify({'error': 'School not found'}), 400
         
         data = request.get_json()
-        print(f"DEBUG: Received data: {data}")
-        
+
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
         bot_token = data.get('bot_token', '').strip()
         bot_username = data.get('bot_username', '').strip()
         
-        print(f"DEBUG: Bot token length: {len(bot_token)}, Bot username: {bot_username}")
-        
+
         if not bot_token or not bot_username:
             return jsonify({'error': 'Bot token and username are required'}), 400
         
         # Check if configuration already exists (global bot system)
         existing_config = TelegramConfig.query.filter_by(bot_token=bot_token).first()
-        print(f"DEBUG: Existing config found: {existing_config is not None}")
         
         if existing_config:
             # Update existing configuration
-            print("DEBUG: Updating existing configuration...")
             existing_config.bot_username = bot_username
             existing_config.is_active = True
             existing_config.updated_at = datetime.datetime.utcnow()
         else:
             # Create new configuration
-            print("DEBUG: Creating new configuration...")
             new_config = TelegramConfig(
                 school_id=school_id,
                 bot_token=bot_token,
@@ -343,15 +365,14 @@ def create_or_update_telegram_config():
             )
             db.session.add(new_config)
         
-        print("DEBUG: Committing to database...")
         db.session.commit()
-        print("DEBUG: Configuration saved successfully!")
+        invalidate_telegram_config()
+        logger.info("Telegram configuration %s saved for school %s", bot_username, school_id)
         
         return jsonify({'message': 'Configuration saved successfully'}), 200
         
     except Exception as e:
-        print(f"DEBUG: Error occurred: {str(e)}")
-        print(f"DEBUG: Error type: {type(e)}")
+        logger.exception("Error saving telegram configuration")
         db.session.rollback()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
@@ -370,6 +391,7 @@ def delete_telegram_config(config_id):
         
         db.session.delete(config)
         db.session.commit()
+        invalidate_telegram_config()
         
         return jsonify({'message': 'Configuration deleted successfully'}), 200
         
@@ -475,14 +497,20 @@ def send_test_message(student_id):
         if not student.telegram_status or not student.telegram_chat_id:
             return jsonify({'error': 'Student is not connected to Telegram'}), 400
         
-        # Here you would implement the actual Telegram message sending
-        # For now, we'll just return a success message
-        # You would need to integrate with the Telegram Bot API
+        bot_config = get_config_for_school(school_id)
+        if not bot_config:
+            return jsonify({'error': 'No active telegram bot configuration found'}), 400
         
         message = f"Test message for {student.first_name} {student.last_name}"
-        
-        # TODO: Implement actual Telegram message sending
-        # telegram_service.send_message(student.telegram_chat_id, message)
+        try:
+            call_bot_api(bot_config.bot_token, 'sendMessage', {
+                'chat_id': student.telegram_chat_id,
+                'text': message
+            })
+        except TransportError as e:
+            if e.transient:
+                return jsonify({'error': 'Could not reach the Telegram API'}), 502
+            return jsonify({'error': f'Telegram refused the message: {e}'}), 400
         
         return jsonify({
             'message': 'Test message sent successfully',
@@ -506,8 +534,9 @@ def generate_invite(student_id):
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
-        # Get global bot configuration (active bot)
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
+        # Bot assigned to the student's school, so the parent starts the bot
+        # that will later send the notifications
+        bot_config = get_config_for_school(student.school_id)
         if not bot_config:
             return jsonify({'error': 'No active telegram bot configuration found'}), 400
         
@@ -517,6 +546,7 @@ def generate_invite(student_id):
             import string
             student.code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
             db.session.commit()
+            student_saved(student)
         
         # Create invite link
         invite_link = f"https://t.me/{bot_config.bot_username}?start={student.code}"
@@ -591,37 +621,23 @@ def test_bot(config_id):
         if 'school_admin_id' not in session:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        school_id = session.get('school_id')
-        config = TelegramConfig.query.filter_by(id=config_id, school_id=school_id).first()
-        
-        if not config:
+        # A school admin can only test the bot serving their school
+        config = get_config_for_school(session.get('school_id'))
+        if not config or config.id != config_id:
             return jsonify({'error': 'Configuration not found'}), 404
         
-        # TODO: Implement actual bot testing
-        # This would involve making a request to the Telegram Bot API
-        # to verify the bot token is valid and the bot is responding
-        
-        # For now, we'll simulate a test
-        import time
-        
-        # Simulate API call delay
-        time.sleep(1)
-        
-        # In a real implementation, you would install requests and do:
-        # import requests
-        # response = requests.get(f"https://api.telegram.org/bot{config.bot_token}/getMe")
-        # if response.status_code == 200:
-        #     bot_info = response.json()
-        #     return jsonify({
-        #         'status': 'success',
-        #         'message': 'Bot is working correctly',
-        #         'bot_info': bot_info['result']
-        #     }), 200
+        try:
+            bot_info = call_bot_api(config.bot_token, 'getMe', http_method='GET')
+        except TransportError as e:
+            if e.transient:
+                return jsonify({'status': 'error', 'message': 'Could not reach the Telegram API'}), 502
+            return jsonify({'status': 'error', 'message': f'Bot test failed: {e}'}), 400
         
         return jsonify({
             'status': 'success',
-            'message': 'Bot test completed successfully',
-            'bot_username': config.bot_username,
+            'message': 'Bot is working correctly',
+            'bot_username': bot_info.get('username', config.bot_username),
+            'bot_info': bot_info,
             'timestamp': datetime.datetime.utcnow().isoformat()
         }), 200
         
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, jsonify, session, current_app, redirect, url_for
 from models import ActivityLog, db
+from database import read_replica
 from datetime import datetime, timedelta
 from sqlalchemy import desc, and_, or_
 
@@ -22,6 +23,7 @@ def realtime_logs():
     return render_template('school_admin/logs_dashboard_realtime.html')
 
 @logs_bp.route('/')
+@read_replica
 def logs_dashboard():
     """Main logs dashboard"""
     # Check if user is logged in and has proper access
@@ -128,6 +130,7 @@ def get_recent_logs():
 
 
 @logs_bp.route('/api/logs')
+@read_replica
 def api_logs():
     """API endpoint for bulletproof logs"""
     # More flexible authentication check - allow if any form of school admin session exists
@@ -148,6 +151,7 @@ def api_logs():
     })
 
 @logs_bp.route('/api/stats')
+@read_replica
 def api_stats():
     """API endpoint for dashboard statistics"""
     # More flexible authentication check - allow if any form of school admin session exists  
@@ -195,6 +199,7 @@ def api_stats():
 
 
 @logs_bp.route('/api/search')
+@read_replica
 def search_logs():
     """API endpoint for advanced log searching"""
     school_id = session.get('school_id')
@@ -1,8 +1,11 @@
+import logging
+
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from database import db
-from models import Instructor, Student, Subject, Section, Attendance, InstructorSchedule, TelegramConfig, School
+from models import Instructor, Student, Subject, Section, Attendance, InstructorSchedule, TelegramConfig, School, SchoolNotificationSettings
 from sqlalchemy import func
-import requests
+from telegram_provider import get_active_config
+from attendance_digest import DIGEST_MODES
 
 # Import all CRUD modules with correct blueprint names
 from .crud_accounts import school_admin_bp as crud_accounts_bp
@@ -12,6 +15,8 @@ from .crud_student import school_admin_bp as crud_students_bp
 from .crud_subject import subjects_bp as crud_subjects_bp
 from .crud_assignment import assignment_bp as crud_assignment_bp
 
+logger = logging.getLogger(__name__)
+
 school_admin_bp = Blueprint('school_admin', __name__, url_prefix='/school_admin')
 
 # Register all CRUD blueprints
@@ -33,8 +38,6 @@ def dashboard():
         flash("Session expired. Please login again.", "error")
         return redirect(url_for('auth.login'))
     
-    print(f"DEBUG: Dashboard loading for school_id: {school_id}")
-    
     # Fetch real statistics from database
     try:
         # Count instructors
@@ -76,13 +79,10 @@ def dashboard():
             Instructor.school_id == school_id
         ).count()
         
-        print(f"DEBUG: School {school_id} metrics:")
-        print(f"  - Instructors: {instructors_count}")
-        print(f"  - Students: {students_count}")
-        print(f"  - Subjects: {subjects_count}")
-        print(f"  - Sections: {sections_count}")
-        print(f"  - Attendance rate: {attendance_rate:.1f}% ({present_today}/{total_today})")
-        print(f"  - Active classes ({today_weekday}): {active_classes}")
+        logger.debug("School %s metrics: %d instructors, %d students, %d subjects, %d sections, "
+                     "attendance %.1f%% (%d/%d), %d active classes (%s)", school_id, instructors_count,
+                     students_count, subjects_count, sections_count, attendance_rate, present_today,
+                     total_today, active_classes, today_weekday)
         
         # Recent activity data (mock data for now - can be enhanced later)
         recent_activities = [
@@ -115,9 +115,9 @@ def dashboard():
             }
         ]
         
-    except Exception as e:
+    except Exception:
         # Fallback to default values if database query fails
-        print(f"Database query error: {e}")
+        logger.exception("Database query error")
         instructors_count = 12
         students_count = 320
         subjects_count = 18
@@ -251,16 +251,65 @@ def student_connections():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@school_admin_bp.route('/notification-settings', methods=['GET', 'POST'])
+def notification_settings():
+    """Real-time or digest delivery of attendance notifications for this school"""
+    school_id = session.get('school_id')
+    if not school_id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    settings = SchoolNotificationSettings.query.filter_by(school_id=school_id).first()
+    if request.method == 'GET':
+        if not settings:
+            settings = SchoolNotificationSettings(school_id=school_id, digest_mode='off', quiet_minutes=30,
+                                                  digest_time='17:00', realtime_statuses='Absent,Late')
+        return jsonify(settings.to_dict())
+    
+    data = request.get_json() or {}
+    digest_mode = data.get('digest_mode', settings.digest_mode if settings else 'off')
+    if digest_mode not in DIGEST_MODES:
+        return jsonify({'error': f'digest_mode must be one of {", ".join(DIGEST_MODES)}'}), 400
+    
+    try:
+        quiet_minutes = int(data.get('quiet_minutes', settings.quiet_minutes if settings else 30))
+        digest_time = data.get('digest_time', settings.digest_time if settings else '17:00')
+        hour, minute = (int(part) for part in digest_time.split(':'))
+        if quiet_minutes < 1 or not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({'error': 'quiet_minutes must be a positive number and digest_time HH:MM'}), 400
+    
+    realtime_statuses = data.get('realtime_statuses')
+    if realtime_statuses is None:
+        realtime_statuses = sorted(settings.realtime_status_set()) if settings else ['Absent', 'Late']
+    if not set(realtime_statuses) <= {'Present', 'Absent', 'Late', 'Excused'}:
+        return jsonify({'error': 'Unknown attendance status in realtime_statuses'}), 400
+    
+    try:
+        if not settings:
+            settings = SchoolNotificationSettings(school_id=school_id)
+            db.session.add(settings)
+        settings.digest_mode = digest_mode
+        settings.quiet_minutes = quiet_minutes
+        settings.digest_time = f'{hour:02d}:{minute:02d}'
+        settings.realtime_statuses = ','.join(realtime_statuses)
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Notification settings saved', 'settings': settings.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @school_admin_bp.route('/auto-setup-status')
 def auto_setup_status():
     """Get auto-setup status for school admin view"""
+    import requests  # only these views call out, keep it off the startup path
     school_id = session.get('school_id')
     if not school_id:
         return jsonify({'error': 'Access denied'}), 403
     
     try:
         # Check if we have an active telegram configuration
-        active_config = TelegramConfig.query.filter_by(is_active=True).first()
+        active_config = get_active_config()
         
         if not active_config:
             return jsonify({
@@ -0,0 +1,52 @@
+"""
+Database migration script to add the tables behind attendance digests:
+school_notification_settings (per-school digest mode) and
+attendance_digest_events (results waiting for the next digest)
+Run this script to create the new tables without affecting existing data
+"""
+
+from database import db
+from app_factory import create_script_app
+from models import SchoolNotificationSettings, AttendanceDigestEvent
+
+app = create_script_app()
+
+def create_attendance_digest_tables():
+    """Create the digest tables if they don't exist"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+
+            for model in (SchoolNotificationSettings, AttendanceDigestEvent):
+                table = model.__tablename__
+                if table not in existing_tables:
+                    print(f"Creating {table} table...")
+                    model.__table__.create(db.engine)
+                    print(f"✓ {table} table created successfully")
+                else:
+                    print(f"✓ {table} table already exists")
+
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Attendance Digest Migration ===\n")
+    print("This will create the tables for per-school attendance digests.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_attendance_digest_tables()
+        if success:
+            print("\n🎉 Migration complete! Schools can now switch to digest notifications.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
@@ -0,0 +1,48 @@
+"""
+Database migration script to add the entity_versions table behind the
+ETags of reference-data endpoints (see entity_versions.py)
+Run this script to create the new table without affecting existing data
+"""
+
+from database import db
+from app_factory import create_script_app
+from models import EntityVersion
+
+app = create_script_app()
+
+def create_entity_versions():
+    """Create the entity_versions table if it doesn't exist"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            table = EntityVersion.__tablename__
+            if table not in inspector.get_table_names():
+                print(f"Creating {table} table...")
+                EntityVersion.__table__.create(db.engine)
+                print(f"✓ {table} table created successfully")
+            else:
+                print(f"✓ {table} table already exists")
+
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Entity Versions Migration ===\n")
+    print("This will create the table that keeps reference-data versions for every worker.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_entity_versions()
+        if success:
+            print("\n🎉 Migration complete! ETags now stay current across workers.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
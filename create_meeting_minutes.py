@@ -0,0 +1,79 @@
+"""
+Database migration script for meeting availability (see
+meeting_availability.py): creates the meetings table if it is missing,
+otherwise adds meetings.start_minute and end_minute, fills them in from
+start_time/end_time and indexes (instructor_id, meeting_date)
+"""
+
+from sqlalchemy import text
+
+from database import db
+from app_factory import create_script_app
+from models import Meeting
+from schedule_index import parse_minutes
+
+app = create_script_app()
+
+def create_meeting_minutes():
+    """Create or alter the meetings table in place"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            if 'meetings' not in inspector.get_table_names():
+                print("Creating meetings table...")
+                Meeting.__table__.create(db.engine)
+                print("\n✅ Database migration completed successfully!")
+                return True
+
+            existing_columns = {column['name'] for column in inspector.get_columns('meetings')}
+            existing_indexes = {index['name'] for index in inspector.get_indexes('meetings')}
+
+            for name in ('start_minute', 'end_minute'):
+                if name not in existing_columns:
+                    print(f"Adding column {name}...")
+                    db.session.execute(text(f"ALTER TABLE meetings ADD COLUMN {name} SMALLINT NULL"))
+                else:
+                    print(f"✓ Column {name} already exists")
+
+            print("Backfilling minutes from the stored times...")
+            rows = db.session.execute(text("SELECT id, start_time, end_time FROM meetings")).all()
+            updates = [{'id': row.id, 'start_minute': parse_minutes(row.start_time),
+                        'end_minute': parse_minutes(row.end_time)} for row in rows]
+            if updates:
+                db.session.execute(text(
+                    "UPDATE meetings SET start_minute = :start_minute, end_minute = :end_minute WHERE id = :id"),
+                    updates)
+            print(f"✓ {len(updates)} meetings backfilled")
+
+            if 'ix_meetings_instructor_date' not in existing_indexes:
+                print("Creating index ix_meetings_instructor_date...")
+                db.session.execute(text(
+                    "CREATE INDEX ix_meetings_instructor_date ON meetings (instructor_id, meeting_date)"))
+            else:
+                print("✓ Index ix_meetings_instructor_date already exists")
+
+            db.session.commit()
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Meeting Availability Migration ===\n")
+    print("This will add minute columns and an index to the meetings table.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_meeting_minutes()
+        if success:
+            print("\n🎉 Migration complete! The meetings API can now search free time.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
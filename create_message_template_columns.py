@@ -0,0 +1,61 @@
+"""
+Database migration script to store templated messages (see
+message_templates.py): adds messages.template_id and messages.params and
+allows messages.content to be NULL
+Existing messages keep their rendered content and are not affected
+"""
+
+from sqlalchemy import text
+
+from database import db
+from app_factory import create_script_app
+
+app = create_script_app()
+
+def create_message_template_columns():
+    """Alter the messages table in place"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing_columns = {column['name'] for column in inspector.get_columns('messages')}
+
+            print("Allowing NULL content for templated messages...")
+            db.session.execute(text("ALTER TABLE messages MODIFY content TEXT NULL"))
+
+            if 'template_id' not in existing_columns:
+                print("Adding column template_id...")
+                db.session.execute(text("ALTER TABLE messages ADD COLUMN template_id VARCHAR(50) NULL"))
+            else:
+                print("✓ Column template_id already exists")
+
+            if 'params' not in existing_columns:
+                print("Adding column params...")
+                db.session.execute(text("ALTER TABLE messages ADD COLUMN params TEXT NULL"))
+            else:
+                print("✓ Column params already exists")
+
+            db.session.commit()
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Message Template Migration ===\n")
+    print("This will add template columns to the messages table.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_message_template_columns()
+        if success:
+            print("\n🎉 Migration complete! Attendance notifications are now stored as templates.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
@@ -4,9 +4,11 @@ Run this script to create the new tables without affecting existing data
 """
 
 from database import db
-from app_realtime import app
+from app_factory import create_script_app
 from models import Conversation, Message, ParentAccount
 
+app = create_script_app()
+
 def create_messaging_tables():
     """Create the messaging tables if they don't exist"""
     with app.app_context():
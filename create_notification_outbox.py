@@ -0,0 +1,90 @@
+"""
+Database migration script to turn the notifications table into a delivery
+outbox (see notification_outbox.py)
+Adds the Telegram/App types, the Processing/Dead statuses and the delivery
+state columns without affecting existing notifications
+"""
+
+from sqlalchemy import text
+
+from database import db
+from app_factory import create_script_app
+
+app = create_script_app()
+
+NEW_COLUMNS = {
+    'school_id': 'INT NULL',
+    'message_id': 'INT NULL',
+    'attempts': 'INT NOT NULL DEFAULT 0',
+    'next_attempt_at': 'DATETIME NULL',
+    'claimed_at': 'DATETIME NULL',
+    'sent_at': 'DATETIME NULL',
+    'last_error': 'VARCHAR(500) NULL',
+}
+
+def create_notification_outbox():
+    """Alter the notifications table in place"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing_columns = {column['name'] for column in inspector.get_columns('notifications')}
+
+            print("Extending notification types and statuses...")
+            db.session.execute(text(
+                "ALTER TABLE notifications "
+                "MODIFY type ENUM('SMS','Email','Telegram','App') NOT NULL, "
+                "MODIFY status ENUM('Sent','Failed','Pending','Processing','Dead') DEFAULT 'Pending'"
+            ))
+
+            for name, definition in NEW_COLUMNS.items():
+                if name in existing_columns:
+                    print(f"✓ Column {name} already exists")
+                    continue
+                print(f"Adding column {name}...")
+                db.session.execute(text(f"ALTER TABLE notifications ADD COLUMN {name} {definition}"))
+
+            if 'school_id' not in existing_columns:
+                db.session.execute(text(
+                    "ALTER TABLE notifications ADD CONSTRAINT fk_notifications_school "
+                    "FOREIGN KEY (school_id) REFERENCES schools(id)"
+                ))
+            if 'message_id' not in existing_columns:
+                db.session.execute(text(
+                    "ALTER TABLE notifications ADD CONSTRAINT fk_notifications_message "
+                    "FOREIGN KEY (message_id) REFERENCES messages(id) ON DELETE SET NULL"
+                ))
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes('notifications')}
+            if 'ix_notifications_outbox' not in existing_indexes:
+                print("Adding outbox index...")
+                db.session.execute(text(
+                    "CREATE INDEX ix_notifications_outbox ON notifications (status, next_attempt_at)"
+                ))
+            else:
+                print("✓ Outbox index already exists")
+
+            db.session.commit()
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Notification Outbox Migration ===\n")
+    print("This will add delivery tracking columns to the notifications table.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_notification_outbox()
+        if success:
+            print("\n🎉 Migration complete! Notifications are now delivered through the outbox.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
@@ -0,0 +1,105 @@
+"""
+Database migration script for the normalized schedule columns (see
+schedule_index.py): adds instructor_sched.weekday, start_minute and
+end_minute, fills them in from the day/start_time/end_time strings and
+indexes them per instructor and per section, and adds
+schools.schedule_version, which schedule writes bump
+The string columns are kept and not modified
+"""
+
+from sqlalchemy import text
+
+from database import db
+from app_factory import create_script_app
+from schedule_index import parse_weekday, parse_minutes
+
+app = create_script_app()
+
+NEW_COLUMNS = {
+    'weekday': 'SMALLINT NULL',
+    'start_minute': 'SMALLINT NULL',
+    'end_minute': 'SMALLINT NULL',
+}
+
+SCHOOL_COLUMNS = {
+    'schedule_version': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+NEW_INDEXES = {
+    'ix_instructor_sched_instructor_day': '(instructor_id, weekday, start_minute)',
+    'ix_instructor_sched_section_day': '(section_id, weekday, start_minute)',
+}
+
+def create_schedule_minutes():
+    """Alter instructor_sched in place and backfill the new columns"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing_columns = {column['name'] for column in inspector.get_columns('instructor_sched')}
+            existing_indexes = {index['name'] for index in inspector.get_indexes('instructor_sched')}
+
+            for name, definition in NEW_COLUMNS.items():
+                if name not in existing_columns:
+                    print(f"Adding column {name}...")
+                    db.session.execute(text(f"ALTER TABLE instructor_sched ADD COLUMN {name} {definition}"))
+                else:
+                    print(f"✓ Column {name} already exists")
+
+            school_columns = {column['name'] for column in inspector.get_columns('schools')}
+            for name, definition in SCHOOL_COLUMNS.items():
+                if name not in school_columns:
+                    print(f"Adding column schools.{name}...")
+                    db.session.execute(text(f"ALTER TABLE schools ADD COLUMN {name} {definition}"))
+                else:
+                    print(f"✓ Column schools.{name} already exists")
+
+            print("Backfilling weekday and minutes from the stored strings...")
+            rows = db.session.execute(text("SELECT id, day, start_time, end_time FROM instructor_sched")).all()
+            updates, unparsed = [], []
+            for row in rows:
+                values = {'id': row.id, 'weekday': parse_weekday(row.day),
+                          'start_minute': parse_minutes(row.start_time), 'end_minute': parse_minutes(row.end_time)}
+                if None in values.values():
+                    unparsed.append(row)
+                updates.append(values)
+            if updates:
+                db.session.execute(text(
+                    "UPDATE instructor_sched SET weekday = :weekday, start_minute = :start_minute, "
+                    "end_minute = :end_minute WHERE id = :id"), updates)
+            print(f"✓ {len(updates) - len(unparsed)} of {len(updates)} schedules backfilled")
+            for row in unparsed:
+                print(f"⚠️ Schedule {row.id} could not be parsed: {row.day} {row.start_time}-{row.end_time}")
+
+            for name, columns in NEW_INDEXES.items():
+                if name not in existing_indexes:
+                    print(f"Creating index {name}...")
+                    db.session.execute(text(f"CREATE INDEX {name} ON instructor_sched {columns}"))
+                else:
+                    print(f"✓ Index {name} already exists")
+
+            db.session.commit()
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Schedule Minutes Migration ===\n")
+    print("This will add weekday/minute columns and indexes to instructor_sched")
+    print("and a schedule version to schools.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_schedule_minutes()
+        if success:
+            print("\n🎉 Migration complete! Schedule overlaps are now checked on integer minutes.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
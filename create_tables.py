@@ -1,4 +1,7 @@
-from app import app, db
+from app_factory import create_script_app
+from database import db
+
+app = create_script_app()
 
 with app.app_context():
     # Create all tables
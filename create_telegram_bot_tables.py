@@ -0,0 +1,49 @@
+"""
+Database migration script to add the school_telegram_bots table used to
+assign schools to one of several active Telegram bots
+Run this script to create the new table without affecting existing data
+"""
+
+from database import db
+from app_factory import create_script_app
+from models import SchoolTelegramBot
+
+app = create_script_app()
+
+def create_telegram_bot_tables():
+    """Create the bot assignment table if it doesn't exist"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing_tables = inspector.get_table_names()
+
+            if 'school_telegram_bots' not in existing_tables:
+                print("Creating school_telegram_bots table...")
+                SchoolTelegramBot.__table__.create(db.engine)
+                print("✓ School telegram bots table created successfully")
+            else:
+                print("✓ School telegram bots table already exists")
+
+            print("\n✅ Database migration completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("=== EduTrack360 Multi-Bot Database Migration ===\n")
+    print("This will create the table that assigns schools to Telegram bots.")
+    print("Existing data will NOT be affected.\n")
+
+    response = input("Do you want to proceed? (yes/no): ")
+
+    if response.lower() in ['yes', 'y']:
+        success = create_telegram_bot_tables()
+        if success:
+            print("\n🎉 Migration complete! Schools can now be assigned to individual bots.")
+        else:
+            print("\n⚠️ Migration failed. Please check the error messages above.")
+    else:
+        print("\nMigration cancelled.")
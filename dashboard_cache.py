@@ -0,0 +1,133 @@
+"""
+Instructor Dashboard Cache
+get_dashboard_data runs about ten queries and is hit on every page load and
+every /api/stats poll. The results are now kept as one snapshot per
+instructor and day:
+
+    (instructor_id, date) -> plain dicts of every dashboard figure
+
+Snapshots are dropped when the data behind them changes in this process:
+    record_attendance           invalidate_instructor
+    assignment create / delete  invalidate_instructor
+    timetable import            invalidate_school
+    student add / edit / delete invalidate_section (the sections a snapshot
+                                covers are stored with it)
+    student import              invalidate_school
+
+and expire after TTL seconds regardless, which bounds how stale a snapshot
+can get from writes made by other workers or the Telegram bot process.
+
+Recomputes are single-flight: when several polls miss at once, one runs
+the queries and the others wait for its result. A snapshot whose data was
+invalidated while it was being computed is returned to the waiting callers
+but not stored.
+"""
+
+import threading
+import time
+from datetime import date
+
+TTL = 60  # seconds
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DashboardCache:
+
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}       # (instructor_id, day) -> (snapshot, stored_at, school_id, section_ids)
+        self._flights = {}       # (instructor_id, day) -> _Flight
+        self._generation = 0     # bumped by every invalidation
+        self.stats = {'hits': 0, 'misses': 0, 'waits': 0, 'invalidations': 0}
+
+    def get(self, instructor_id, school_id, compute, ttl=None):
+        """Today's snapshot of an instructor, computing it at most once at a time.
+
+        compute() returns (snapshot, section_ids)
+        """
+        key = (instructor_id, date.today())
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] < ttl:
+                self.stats['hits'] += 1
+                return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generation
+                self.stats['misses'] += 1
+            else:
+                self.stats['waits'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            snapshot, section_ids = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.result = snapshot
+            with self._lock:
+                if self._generation == generation:
+                    self._entries[key] = (snapshot, time.time(), school_id, frozenset(section_ids))
+            return snapshot
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _drop(self, matches):
+        with self._lock:
+            self._generation += 1
+            self.stats['invalidations'] += 1
+            for key in [key for key, entry in self._entries.items() if matches(key, entry)]:
+                del self._entries[key]
+
+    def invalidate_instructor(self, instructor_id):
+        self._drop(lambda key, entry: key[0] == instructor_id)
+
+    def invalidate_section(self, section_id):
+        section_id = int(section_id) if section_id is not None else None
+        self._drop(lambda key, entry: section_id in entry[3])
+
+    def invalidate_school(self, school_id):
+        self._drop(lambda key, entry: entry[2] == school_id)
+
+    def clear(self):
+        self._drop(lambda key, entry: True)
+
+
+dashboard_cache = DashboardCache()
+
+
+def invalidate_instructor(instructor_id):
+    """Hook for attendance and schedule changes of one instructor"""
+    dashboard_cache.invalidate_instructor(instructor_id)
+
+
+def invalidate_section(*section_ids):
+    """Hook for roster changes; pass the old and new section on a move"""
+    for section_id in set(section_ids):
+        if section_id is not None:
+            dashboard_cache.invalidate_section(section_id)
+
+
+def invalidate_school(school_id):
+    """Hook for bulk changes"""
+    dashboard_cache.invalidate_school(school_id)
@@ -0,0 +1,131 @@
+"""
+Entity Version Stamps
+Serves reference data (school info, section and subject dropdowns, the
+instructor list, message templates) with an ETag built from per-school
+version numbers in the entity_versions table, so every worker sees every
+bump. CRUD writes bump() the entities they changed and @conditional answers
+304 before the view runs, after one small query.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+TTL = 60  # seconds; ETags also roll over this often, for writers that do not bump()
+
+
+def increment(execute, school_id, entity):
+    """Add one to a version row through execute (a session's or a connection's)"""
+    from models import EntityVersion
+
+    table = EntityVersion.__table__
+    result = execute(table.update()
+                     .where(table.c.school_id == school_id, table.c.entity == entity)
+                     .values(version=table.c.version + 1))
+    if result.rowcount == 0:
+        execute(table.insert().values(school_id=school_id, entity=entity, version=1))
+
+
+class VersionStamps:
+
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.stats = {'not_modified': 0, 'full': 0, 'bumps': 0}
+
+    def current(self, school_id, entities):
+        """ETag covering the given entities of a school"""
+        from models import EntityVersion
+
+        versions = dict(db.session.query(EntityVersion.entity, EntityVersion.version)
+                        .filter(EntityVersion.school_id == (school_id or 0), EntityVersion.entity.in_(entities))
+                        .all())
+        tokens = [str(school_id), str(int(time.time() // self.ttl))]
+        tokens += [f'{entity}.{versions.get(entity, 0)}' for entity in entities]
+        return hashlib.blake2b('|'.join(tokens).encode(), digest_size=8).hexdigest()
+
+    def bump(self, school_id, *entities):
+        for _ in range(2):
+            try:
+                for entity in entities:
+                    increment(db.session.execute, school_id or 0, entity)
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Another worker created the same version row first; it exists now
+                db.session.rollback()
+            except SQLAlchemyError:
+                db.session.rollback()
+                logger.exception("Could not bump %s of school %s", ', '.join(entities), school_id)
+                return
+        with self._lock:
+            self.stats['bumps'] += 1
+
+    def count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+entity_versions = VersionStamps()
+
+
+def bump(school_id, *entities):
+    """Hook for CRUD writes, after the commit"""
+    entity_versions.bump(school_id, *entities)
+
+
+def _cache_headers(response, etag, max_age, public):
+    response.set_etag(etag, weak=True)
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def conditional(*entities, school='session', max_age=0, public=False):
+    """Serve a GET view with an ETag, answering 304 early.
+
+    school: 'session' for the logged-in school, the name of a URL argument,
+    or None for data shared by every school. max_age=0 sends no-cache, so
+    clients revalidate every time.
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if school == 'session':
+                school_id = session.get('school_id')
+                if school_id is None:
+                    return view(*args, **kwargs)  # the view answers the expired session
+                user = session.get('user_id') or session.get('instructor_id')
+            else:
+                school_id = kwargs.get(school) if school else None
+                user = None
+            etag = entity_versions.current(school_id, entities)
+            if user is not None:
+                etag = f'{etag}-{user}'  # pages differ per user
+
+            if request.if_none_match.contains_weak(etag):
+                entity_versions.count('not_modified')
+                return _cache_headers(current_app.response_class(status=304), etag, max_age, public)
+
+            entity_versions.count('full')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _cache_headers(response, etag, max_age, public)
+            return response
+        return wrapper
+    return decorate
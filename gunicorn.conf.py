@@ -0,0 +1,142 @@
+"""
+gunicorn settings for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`kill -HUP <master pid>` reloads code and settings without dropping
+requests: new workers start, old ones finish what they are serving (up to
+WEB_GRACEFUL_TIMEOUT) and exit. Socket.IO clients reconnect by themselves.
+
+Environment:
+    WEB_BIND                address, default 0.0.0.0:5000
+    WEB_REALTIME            1 serves Socket.IO (default), 0 the REST app only
+    WEB_WORKER_CLASS        gevent or eventlet (default, whichever is
+                            installed), else gthread
+    WEB_WORKERS             worker processes, auto-sized when unset
+    WEB_MAX_WORKERS         cap for the auto-sized count (8)
+    WEB_THREADS             threads per gthread worker
+    WEB_CONNECTIONS         clients per gevent/eventlet worker (1000)
+    WEB_TIMEOUT             seconds before a stuck worker is restarted (60)
+    WEB_GRACEFUL_TIMEOUT    seconds a worker gets to finish on reload (30)
+    WEB_MAX_REQUESTS        recycle REST workers after this many requests
+    WEB_ACCESS_LOG          access log file, '-' for stdout (default), empty for none
+    METRICS_MULTIPROC_DIR   where workers publish /metrics values, a fresh
+                            temporary directory when unset and workers > 1
+    PRESENCE_BACKEND        sqlite when unset and workers > 1 (see presence.py)
+
+Sizing: Socket.IO keeps rooms and long-polling sessions in the process, so
+a realtime server runs one worker unless SOCKETIO_MESSAGE_QUEUE is set and
+the balancer in front uses sticky sessions; its concurrency comes from
+greenlets or threads. The REST app runs 2 x CPUs + 1 workers. Each worker
+has its own database pool, so workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+must stay under the server's max_connections.
+
+Everything else kept in memory is per worker too:
+    /metrics          each worker writes its values to METRICS_MULTIPROC_DIR
+                      and the one answering a scrape adds them all up, so one
+                      scrape target still covers every worker (metrics.py)
+    dashboard cache   invalidation only reaches the worker that handled the
+                      write; the others serve their snapshot until
+                      DASHBOARD_CACHE_TTL expires (dashboard_cache.py), so an
+                      instructor may see a dashboard up to that old
+    presence          the memory backend only knows its own worker's
+                      sockets, so with several workers PRESENCE_BACKEND
+                      defaults to sqlite, one file shared on the host
+                      (PRESENCE_SQLITE_PATH)
+    Telegram config   cached per worker for TELEGRAM_CONFIG_TTL
+"""
+
+import importlib.util
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+
+# Socket.IO async mode each worker class needs
+ASYNC_MODES = {'gevent': 'gevent', 'eventlet': 'eventlet', 'gthread': 'threading', 'sync': 'threading'}
+
+
+def default_worker_class():
+    # find_spec, not import: gevent must not be imported before the worker patches
+    for name in ('gevent', 'eventlet'):
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return 'gthread'
+
+
+def auto_workers(realtime, cpus):
+    if realtime and not os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+        return 1
+    return min(cpus * 2 + 1, int(os.environ.get('WEB_MAX_WORKERS', '8')))
+
+
+realtime = os.environ.get('WEB_REALTIME', '1') == '1'
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+worker_class = os.environ.get('WEB_WORKER_CLASS') or default_worker_class()
+workers = int(os.environ.get('WEB_WORKERS') or auto_workers(realtime, multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', '50' if realtime else '8'))
+worker_connections = int(os.environ.get('WEB_CONNECTIONS', '1000'))
+timeout = int(os.environ.get('WEB_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# Recycling a realtime worker drops every socket on it, so only REST workers are recycled
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', '0' if realtime else '5000'))
+max_requests_jitter = max_requests // 10
+
+# Each worker builds its own app: database pools and background threads must
+# not be shared across the fork
+preload_app = False
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL', 'info')
+proc_name = 'edutrack360'
+
+# Read by instance/config.py when the worker imports the app
+os.environ['SOCKETIO_ASYNC_MODE'] = ASYNC_MODES.get(worker_class, 'threading')
+if workers > 1:
+    # Keyed by the master pid, so a reload (HUP) keeps the same directory
+    os.environ.setdefault('METRICS_MULTIPROC_DIR',
+                          os.path.join(tempfile.gettempdir(), f'edutrack360-metrics-{os.getpid()}'))
+    # A user connected to another worker must not count as offline
+    os.environ.setdefault('PRESENCE_BACKEND', 'sqlite')
+
+
+def on_starting(server):
+    mode = 'realtime' if realtime else 'REST only'
+    server.log.info(f"EduTrack360 ({mode}): {workers} {worker_class} worker(s) on {bind}")
+    if realtime and workers > 1 and not os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+        server.log.warning("Several realtime workers without SOCKETIO_MESSAGE_QUEUE: "
+                           "room events only reach clients of the emitting worker")
+    directory = os.environ.get('METRICS_MULTIPROC_DIR')
+    if directory:
+        # Values of a previous run would be added to this one's
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    """Runs in the master, also for workers killed on timeout"""
+    directory = os.environ.get('METRICS_MULTIPROC_DIR')
+    if directory:
+        from metrics import mark_process_dead
+        mark_process_dead(directory, worker.pid)
+
+
+def worker_exit(server, worker):
+    """Stop the worker's background threads and close its database connections"""
+    module = sys.modules.get('wsgi')
+    app = getattr(module, 'app', None)
+    if app is None:
+        return
+    # metrics_flusher last: its final write includes what the others recorded
+    for name in ('notification_dispatcher', 'digest_flusher', 'metrics_flusher'):
+        thread = getattr(app, name, None)
+        if thread is not None:
+            thread.stop(timeout=5)
+    from database import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
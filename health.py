@@ -0,0 +1,91 @@
+"""
+Liveness and readiness endpoints for load balancers
+/healthz answers without touching the database; /readyz checks that every
+engine has a free pooled connection and answers SELECT 1 within
+HEALTH_DB_TIMEOUT seconds, and returns 503 otherwise. Only one probe per
+engine runs at a time; driver errors are logged, not returned.
+"""
+
+import logging
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import text
+
+from database import db, REPLICA
+
+logger = logging.getLogger(__name__)
+
+_probes = {}  # engine -> the probe thread last started for it
+_probes_lock = threading.Lock()
+
+
+def pool_status(pool):
+    """Connection counts of a pool; capacity is None when it is unbounded"""
+    status = {'type': type(pool).__name__}
+    if not hasattr(pool, 'checkedout'):
+        return status
+    status.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(),
+                  overflow=pool.overflow())
+    max_overflow = getattr(pool, '_max_overflow', -1)
+    status['capacity'] = None if max_overflow < 0 else status['size'] + max_overflow
+    return status
+
+
+def check_engine(engine, timeout):
+    """(ok, details) for one engine"""
+    details = {'pool': pool_status(engine.pool)}
+    capacity = details['pool'].get('capacity')
+    if capacity is not None and details['pool']['checked_out'] >= capacity:
+        details['error'] = 'connection pool exhausted'
+        return False, details
+
+    result = {}
+
+    def probe():
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            result['ok'] = True
+        except Exception as e:
+            logger.warning("Readiness probe of %s failed: %s", engine.url.render_as_string(), e)
+            result['error'] = 'connection failed'
+
+    # A thread, so an unreachable server cannot hold the request past the
+    # timeout. A probe still stuck from an earlier request holds a pooled
+    # connection, so no second one is started until it returns
+    with _probes_lock:
+        previous = _probes.get(engine)
+        if previous is not None and previous.is_alive():
+            details['error'] = 'probe pending'
+            return False, details
+        worker = _probes[engine] = threading.Thread(target=probe, name='readiness-probe', daemon=True)
+    started = time.perf_counter()
+    worker.start()
+    worker.join(timeout)
+    details['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if worker.is_alive():
+        details['error'] = f'no answer within {timeout} s'
+    elif 'error' in result:
+        details['error'] = result['error']
+    return 'error' not in details, details
+
+
+def init_health(app):
+    """Serve /healthz and /readyz for app"""
+    app.config.setdefault('HEALTH_DB_TIMEOUT', 2)
+    started = time.time()
+
+    @app.route('/healthz')
+    def healthz():
+        return jsonify({'status': 'ok', 'uptime': round(time.time() - started, 1)})
+
+    @app.route('/readyz')
+    def readyz():
+        checks, ready = {}, True
+        for name in [None, REPLICA] if REPLICA in db.engines else [None]:
+            ok, details = check_engine(db.engines[name], float(app.config['HEALTH_DB_TIMEOUT']))
+            checks[name or 'primary'] = details
+            ready = ready and ok
+        return jsonify({'status': 'ready' if ready else 'unavailable', 'checks': checks}), 200 if ready else 503
@@ -0,0 +1,114 @@
+"""
+Meeting Availability
+Finds free time for a meeting between an instructor and a student's parent
+over a date range. The busy time of a date is the union of:
+
+    - the instructor's weekly classes on that weekday (ScheduleIndex)
+    - the classes of the student's section on that weekday, when given
+    - scheduled meetings of the instructor or the student on that date,
+      one range query on the (instructor_id, meeting_date) index
+
+Intervals are [start, end) minutes since midnight. The weekly part is
+merged once per weekday, so each date only merges in its own meetings
+before the free gaps within the school day are taken.
+"""
+
+from datetime import timedelta
+
+from database import db
+from models import Meeting
+from schedule_index import INSTRUCTOR, SECTION, get_schedule_index
+
+DAY_START = 7 * 60
+DAY_END = 18 * 60
+DEFAULT_DURATION = 30
+MAX_RANGE_DAYS = 62
+SCHOOL_DAYS = (0, 1, 2, 3, 4)
+
+
+def merge(intervals):
+    """Sorted union of (start, end) intervals; touching intervals are joined"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def free_between(busy, day_start, day_end, duration):
+    """Gaps of at least `duration` minutes in [day_start, day_end) around merged busy intervals"""
+    free = []
+    cursor = day_start
+    for start, end in busy:
+        if cursor >= day_end:
+            break
+        if min(start, day_end) - cursor >= duration:
+            free.append((cursor, min(start, day_end)))
+        cursor = max(cursor, end)
+    if day_end - cursor >= duration:
+        free.append((cursor, day_end))
+    return free
+
+
+def weekly_busy(school_id, instructor_id, section_id=None):
+    """Merged class intervals per weekday for the instructor and the section"""
+    index = get_schedule_index(school_id)
+    busy = {}
+    for weekday in range(7):
+        slots = index.day_slots(INSTRUCTOR, instructor_id, weekday)
+        if section_id is not None:
+            slots += index.day_slots(SECTION, section_id, weekday)
+        busy[weekday] = merge((slot.start, slot.end) for slot in slots)
+    return busy
+
+
+def meetings_between(instructor_id, student_id, start_date, end_date, exclude_id=None, lock=False):
+    """Scheduled meetings of the instructor or the student, by date; lock reads
+    them FOR UPDATE, so a booking transaction sees the latest committed rows"""
+    who = Meeting.instructor_id == instructor_id
+    if student_id is not None:
+        who = db.or_(who, Meeting.student_id == student_id)
+    query = db.session.query(Meeting.id, Meeting.meeting_date, Meeting.start_minute, Meeting.end_minute)\
+        .filter(Meeting.meeting_date >= start_date, Meeting.meeting_date <= end_date)\
+        .filter(Meeting.status == 'scheduled')\
+        .filter(who)
+    if lock:
+        query = query.with_for_update()
+    by_date = {}
+    for meeting_id, meeting_date, start, end in query.all():
+        if meeting_id != exclude_id and start is not None and end is not None:
+            by_date.setdefault(meeting_date, []).append((start, end))
+    return by_date
+
+
+def find_free_slots(school_id, instructor_id, start_date, end_date, section_id=None, student_id=None,
+                    duration=DEFAULT_DURATION, day_start=DAY_START, day_end=DAY_END, weekdays=SCHOOL_DAYS):
+    """[(date, [(start, end), ...])] free intervals of every school day in the range"""
+    weekly = weekly_busy(school_id, instructor_id, section_id)
+    meetings = meetings_between(instructor_id, student_id, start_date, end_date)
+    days = []
+    current = start_date
+    while current <= end_date:
+        if current.weekday() in weekdays:
+            busy = weekly[current.weekday()]
+            if current in meetings:
+                busy = merge(busy + meetings[current])
+            days.append((current, free_between(busy, day_start, day_end, duration)))
+        current += timedelta(days=1)
+    return days
+
+
+def clashes(school_id, instructor_id, meeting_date, start, end, section_id=None, student_id=None, exclude_id=None,
+            lock=False):
+    """What a proposed meeting would overlap: a list of 'class' / 'meeting'"""
+    found = []
+    weekly = weekly_busy(school_id, instructor_id, section_id)[meeting_date.weekday()]
+    if any(busy_start < end and busy_end > start for busy_start, busy_end in weekly):
+        found.append('class')
+    meetings = meetings_between(instructor_id, student_id, meeting_date, meeting_date, exclude_id, lock)
+    if any(busy_start < end and busy_end > start for busy_start, busy_end in meetings.get(meeting_date, [])):
+        found.append('meeting')
+    return found
@@ -0,0 +1,168 @@
+"""
+Message Templates
+Attendance notifications store a template id and a few compact parameters
+instead of the rendered text, which is built when the message is read.
+Message.to_dict still returns the rendered text as content for older
+clients; newer ones also get template and params and may render themselves.
+
+There is one row per student per class, so the parameters are a positional
+list of ids and integers:
+    [student id, subject id, date as YYYYMMDD, status code (P, A, L, E),
+     start, end]
+with start and end in minutes since midnight ('HH:MM' strings are kept as
+given when they are in any other format). Names are not stored: they are
+looked up at render time, in bulk through NameLookup when a list of
+messages is rendered.
+"""
+
+import json
+import re
+
+ATTENDANCE = 'attendance'
+
+STATUS_CODES = {'Present': 'P', 'Absent': 'A', 'Late': 'L', 'Excused': 'E'}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+STATUS_EMOJI = {
+    'Present': '✅',
+    'Absent': '❌',
+    'Late': '🕐',
+    'Excused': '📝'
+}
+
+
+# Positions in the attendance parameters
+STUDENT, SUBJECT, DATE, STATUS, START, END = range(6)
+
+
+def _pack_time(value):
+    if isinstance(value, str) and re.fullmatch(r'\d\d:\d\d', value):
+        return int(value[:2]) * 60 + int(value[3:])
+    return value
+
+
+def _unpack_time(value):
+    return f"{value // 60:02d}:{value % 60:02d}" if isinstance(value, int) else value
+
+
+def attendance_params(student_id, subject_id, date, status, start_time, end_time):
+    """date is 'YYYY-MM-DD', start_time and end_time as the schedule shows them"""
+    return [
+        student_id,
+        subject_id,
+        int(date.replace('-', '')),
+        STATUS_CODES.get(status, status),
+        _pack_time(start_time),
+        _pack_time(end_time)
+    ]
+
+
+def dump_params(params):
+    return json.dumps(params, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_params(raw):
+    try:
+        params = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    return params if isinstance(params, list) else []
+
+
+def _param(params, position):
+    return params[position] if len(params) > position else None
+
+
+def format_attendance(student_name, subject_name, date, status, start_time, end_time, html=False):
+    """Wording of a per-class attendance notification, inbox text or Telegram HTML"""
+    if not html:
+        return (
+            f"Attendance for {student_name} on {date}\n"
+            f"Subject: {subject_name}\n"
+            f"Status: {status}\n"
+            f"Time: {start_time} - {end_time}"
+        )
+    return f"""
+📚 <b>Attendance Notification</b>
+
+👤 <b>Name:</b> {student_name}
+📖 <b>Subject:</b> {subject_name}
+📅 <b>Date:</b> {date}
+🕐 <b>Time:</b> {start_time} - {end_time}
+{STATUS_EMOJI.get(status, '📝')} <b>Status:</b> {status}
+
+---
+This is an automated message from your school attendance system.
+    """.strip()
+
+
+class NameLookup:
+    """Student and subject names for rendering, fetched in bulk and cached"""
+
+    def __init__(self):
+        self.students = {}
+        self.subjects = {}
+
+    def prefetch(self, student_ids=(), subject_ids=()):
+        from database import db
+        from models import Student, Subject
+
+        student_ids = set(student_ids) - set(self.students) - {None}
+        subject_ids = set(subject_ids) - set(self.subjects) - {None}
+        if student_ids:
+            rows = db.session.query(Student.id, Student.first_name, Student.last_name)\
+                .filter(Student.id.in_(student_ids)).all()
+            self.students.update({row.id: f"{row.first_name} {row.last_name}" for row in rows})
+            self.students.update({student_id: None for student_id in student_ids - {row.id for row in rows}})
+        if subject_ids:
+            rows = db.session.query(Subject.id, Subject.name).filter(Subject.id.in_(subject_ids)).all()
+            self.subjects.update({row.id: row.name for row in rows})
+            self.subjects.update({subject_id: None for subject_id in subject_ids - {row.id for row in rows}})
+        return self
+
+    def student(self, student_id):
+        if student_id not in self.students:
+            self.prefetch(student_ids=[student_id])
+        return self.students.get(student_id) or 'Unknown student'
+
+    def subject(self, subject_id):
+        if subject_id not in self.subjects:
+            self.prefetch(subject_ids=[subject_id])
+        return self.subjects.get(subject_id) or 'Unknown'
+
+
+def _render_attendance(params, names, html):
+    date = _param(params, DATE)
+    if isinstance(date, int):
+        date = f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}"
+    status = _param(params, STATUS)
+    return format_attendance(
+        names.student(_param(params, STUDENT)),
+        names.subject(_param(params, SUBJECT)),
+        date or '',
+        STATUS_NAMES.get(status, status),
+        _unpack_time(_param(params, START)) or '',
+        _unpack_time(_param(params, END)) or '',
+        html=html
+    )
+
+
+TEMPLATES = {
+    ATTENDANCE: _render_attendance,
+}
+
+
+def render(template_id, params, names=None, html=False):
+    """Text of a templated message; empty for unknown templates"""
+    renderer = TEMPLATES.get(template_id)
+    if renderer is None:
+        return ''
+    return renderer(params, names or NameLookup(), html)
+
+
+def prefetch_messages(messages, names=None):
+    """NameLookup (names, or a new one) loaded with every name the messages refer to"""
+    params_list = [load_params(message.params) for message in messages
+                   if message.template_id == ATTENDANCE and message.content is None]
+    return (names or NameLookup()).prefetch([_param(params, STUDENT) for params in params_list],
+                                            [_param(params, SUBJECT) for params in params_list])
@@ -0,0 +1,529 @@
+"""
+Prometheus Metrics
+In-process counters, gauges and histograms, rendered in the Prometheus text
+format at GET /metrics. Each metric has its own lock and keeps one value per
+label combination, so recording is a dict update and never does I/O.
+
+    HTTP        edutrack_http_requests_total, edutrack_http_request_duration_seconds
+                (by blueprint and endpoint), edutrack_http_requests_in_flight
+    database    edutrack_db_pool_checkouts_total, edutrack_db_pool_checkout_wait_seconds,
+                edutrack_db_pool_connections (at scrape time),
+                edutrack_db_statements_total / _seconds_total (from query_stats.py)
+    Socket.IO   edutrack_socketio_clients (by encoding), edutrack_socketio_emits_total
+    Telegram    edutrack_telegram_request_duration_seconds, edutrack_telegram_errors_total,
+                edutrack_telegram_deferred, edutrack_telegram_ingest_queue
+    outbox      edutrack_notification_outbox (by type and status, at scrape time)
+    activity    edutrack_activity_log_writes_total
+    logging     edutrack_log_records_dropped_total, edutrack_log_queue (from structured_logging.py)
+
+The endpoint answers the addresses in METRICS_ALLOWED_IPS (loopback by
+default) unless the request came through a proxy: ngrok and other tunnels
+connect from 127.0.0.1 too, so anything carrying X-Forwarded-For or
+Forwarded is refused. Scrapers elsewhere send METRICS_TOKEN as a bearer token.
+
+Several workers: values live in the process that recorded them, so behind
+gunicorn each scrape would only see the worker that answered it. With
+METRICS_MULTIPROC_DIR set (gunicorn.conf.py sets it whenever it starts more
+than one worker) every worker writes its values to <dir>/<pid>.json every
+METRICS_FLUSH_INTERVAL seconds and when scraped, and /metrics adds up the
+files of all workers:
+    counters, histograms  summed; a worker that exited keeps its file, so
+                          totals never go backwards
+    gauges                summed over live workers (mark_process_dead drops
+                          them when a worker exits)
+    shared gauges         read from the database by the scraping worker alone
+                          (edutrack_notification_outbox)
+"""
+
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, current_app, g, has_app_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=(), shared=False):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.shared = shared  # the same value in every worker, never summed
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def snapshot(self):
+        """[[labels, value], ...], as written to the multiprocess directory"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def combine(first, second):
+        return first + second
+
+    def render(self, values=None):
+        if values is None:
+            with self._lock:
+                values = list(self._values.items())
+        lines = self._header()
+        lines.extend(f'{self.name}{_labels(self.label_names, key)} {_number(value)}' for key, value in values)
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        """Mirror a total that is counted elsewhere"""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+
+    @staticmethod
+    def combine(first, second):
+        return [[a + b for a, b in zip(first[0], second[0])], first[1] + second[1], first[2] + second[2]]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self, values=None):
+        if values is None:
+            with self._lock:
+                values = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {count}')
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that read gauges when scraped"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._shared_collectors = []
+        self._lock = threading.Lock()
+        self.directory = None  # METRICS_MULTIPROC_DIR, set by init_metrics
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=(), shared=False):
+        return self.register(Gauge(name, help_text, labels, shared))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def collector(self, function):
+        """function() is called on every scrape, before rendering"""
+        with self._lock:
+            self._collectors.append(function)
+        return function
+
+    def shared_collector(self, function):
+        """Like collector, for shared gauges: only the scraping worker runs it"""
+        with self._lock:
+            self._shared_collectors.append(function)
+        return function
+
+    def collect(self, shared=True):
+        with self._lock:
+            collectors = self._collectors + (self._shared_collectors if shared else [])
+        for collect in collectors:
+            try:
+                collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", collect.__name__)
+
+    def write(self, directory):
+        """Save this process's values to <directory>/<pid>.json"""
+        with self._lock:
+            metrics = list(self._metrics)
+        snapshot = {metric.name: {'kind': metric.kind, 'values': metric.snapshot()}
+                    for metric in metrics if not metric.shared}
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def merged(self, directory):
+        """{metric name: {labels: value}} added up over every worker's file"""
+        with self._lock:
+            metrics = {metric.name: metric for metric in self._metrics}
+        totals = {}
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # removed while listing
+            for name, entry in snapshot.items():
+                metric = metrics.get(name)
+                if metric is None or metric.shared:
+                    continue
+                values = totals.setdefault(name, {})
+                for labels, value in entry['values']:
+                    key = tuple(labels)
+                    values[key] = metric.combine(values[key], value) if key in values else value
+        return totals
+
+    def render(self):
+        self.collect()
+        with self._lock:
+            metrics = list(self._metrics)
+        directory = self.directory
+        totals = None
+        if directory:
+            self.write(directory)
+            totals = self.merged(directory)
+        lines = []
+        for metric in metrics:
+            if totals is None or metric.shared:
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render(list(totals.get(metric.name, {}).items())))
+        return '\n'.join(lines) + '\n'
+
+
+def mark_process_dead(directory, pid):
+    """Drop the gauges of a worker that exited; its counters and histograms
+    stay in the directory so the totals never go backwards"""
+    path = os.path.join(directory, f'{pid}.json')
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+    snapshot = {name: entry for name, entry in snapshot.items() if entry['kind'] != 'gauge'}
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+class MetricsFlusher:
+    """Background thread writing this worker's values to the multiprocess
+    directory every interval seconds, and once more when stopped"""
+
+    def __init__(self, app, directory, interval=5):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.run_once()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                registry.collect(shared=False)
+                registry.write(self.directory)
+            except Exception:
+                logger.exception("Writing metrics to %s failed", self.directory)
+
+
+registry = Registry()
+
+http_requests = registry.counter('edutrack_http_requests_total', 'HTTP requests handled',
+                                 ('blueprint', 'endpoint', 'method', 'status'))
+http_latency = registry.histogram('edutrack_http_request_duration_seconds', 'HTTP request latency',
+                                  ('blueprint', 'endpoint'))
+http_in_flight = registry.gauge('edutrack_http_requests_in_flight', 'HTTP requests being handled')
+db_checkouts = registry.counter('edutrack_db_pool_checkouts_total', 'Connections checked out of the pool')
+db_checkout_wait = registry.histogram('edutrack_db_pool_checkout_wait_seconds',
+                                      'Time spent waiting for a pooled connection', buckets=WAIT_BUCKETS)
+db_connections = registry.gauge('edutrack_db_pool_connections', 'Pool connections by state', ('state',))
+db_statements = registry.counter('edutrack_db_statements_total', 'SQL statements run by requests', ('endpoint',))
+db_statement_seconds = registry.counter('edutrack_db_statement_seconds_total', 'Time requests spent in SQL',
+                                      ('endpoint',))
+socketio_clients = registry.gauge('edutrack_socketio_clients', 'Connected Socket.IO clients', ('encoding',))
+socketio_emits = registry.counter('edutrack_socketio_emits_total', 'Socket.IO events emitted', ('event',))
+telegram_latency = registry.histogram('edutrack_telegram_request_duration_seconds', 'Bot API call latency',
+                                      ('method',))
+telegram_errors = registry.counter('edutrack_telegram_errors_total', 'Failed Bot API calls', ('method', 'kind'))
+telegram_deferred = registry.gauge('edutrack_telegram_deferred', 'Bot API calls waiting for a retry')
+telegram_ingest_queue = registry.gauge('edutrack_telegram_ingest_queue', 'Webhook updates waiting for a worker')
+notification_outbox = registry.gauge('edutrack_notification_outbox', 'Notifications by type and status',
+                                     ('type', 'status'), shared=True)
+activity_log_writes = registry.counter('edutrack_activity_log_writes_total', 'Activity log rows written',
+                                       ('action', 'entity_type', 'result'))
+log_dropped = registry.counter('edutrack_log_records_dropped_total', 'Log records dropped on a full queue')
+log_queue = registry.gauge('edutrack_log_queue', 'Log records waiting to be written')
+
+
+# --- recording hooks ---
+
+def record_telegram_call(method, latency):
+    telegram_latency.observe(latency, method)
+
+
+def record_telegram_error(method, kind):
+    telegram_errors.inc(method, kind)
+
+
+def record_activity_log(action, entity_type, ok=True):
+    activity_log_writes.inc((action or '').upper(), (entity_type or '').lower(), 'ok' if ok else 'error')
+
+
+def record_log_dropped():
+    log_dropped.inc()
+
+
+def instrument_socketio(socketio):
+    """Count every emit of a SocketIO instance, including flask_socketio.emit()
+    inside handlers, which goes through the same method"""
+    emit = socketio.emit
+
+    def counted_emit(event, *args, **kwargs):
+        socketio_emits.inc(event)
+        return emit(event, *args, **kwargs)
+
+    socketio.emit = counted_emit
+    return socketio
+
+
+def instrument_engine(engine):
+    """Count pool checkouts and time how long each one waits"""
+    if getattr(engine, '_metrics', False):
+        return
+
+    def time_pool(pool):
+        event.listen(pool, 'checkout', lambda *args: db_checkouts.inc())
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                db_checkout_wait.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+
+    time_pool(engine.pool)
+    # dispose() replaces the pool
+    event.listen(engine, 'engine_disposed', lambda disposed: time_pool(disposed.pool))
+    engine._metrics = True
+
+
+# --- scrape-time collectors ---
+
+@registry.collector
+def collect_pool():
+    if not has_app_context():
+        return
+    from database import db
+    pool = db.engine.pool
+    for state, reader in (('checked_out', 'checkedout'), ('idle', 'checkedin'), ('overflow', 'overflow'),
+                          ('size', 'size')):
+        if hasattr(pool, reader):
+            db_connections.set(getattr(pool, reader)(), state)
+
+
+@registry.collector
+def collect_statements():
+    from query_stats import query_stats
+    for endpoint, entry in query_stats.snapshot().items():
+        db_statements.set(entry['queries'], endpoint)
+        db_statement_seconds.set(round(entry['db_seconds'], 6), endpoint)
+
+
+@registry.collector
+def collect_socket_clients():
+    from socket_encoding import client_counts
+    for encoding, count in client_counts().items():
+        socketio_clients.set(count, encoding)
+
+
+@registry.collector
+def collect_queues():
+    import telegram_transport
+    transport = telegram_transport._transport
+    telegram_deferred.set(len(transport.deferred) if transport else 0)
+    if has_app_context():
+        ingestor = getattr(current_app, 'telegram_ingestor', None)
+        telegram_ingest_queue.set(ingestor.queue.qsize() if ingestor else 0)
+
+
+@registry.collector
+def collect_log_queue():
+    from structured_logging import queue_depth
+    log_queue.set(queue_depth())
+
+
+@registry.shared_collector
+def collect_outbox():
+    if not has_app_context():
+        return
+    from notification_outbox import outbox_stats
+    for type_, statuses in outbox_stats().items():
+        for status, count in statuses.items():
+            notification_outbox.set(count, type_, status)
+
+
+# --- Flask wiring ---
+
+PROXY_HEADERS = ('X-Forwarded-For', 'Forwarded', 'X-Real-IP')
+
+
+def _may_scrape(allowed, token):
+    if token:
+        header = request.headers.get('Authorization', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+    # A tunnel or reverse proxy on this host makes every client look local
+    if any(name in request.headers for name in PROXY_HEADERS):
+        return False
+    return request.remote_addr in allowed
+
+
+def init_metrics(app, socketio=None):
+    """Record request metrics for app and serve them at /metrics"""
+    allowed = app.config.get('METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if isinstance(allowed, str):
+        allowed = tuple(ip.strip() for ip in allowed.split(',') if ip.strip())
+    if socketio is not None:
+        instrument_socketio(socketio)
+    directory = app.config.get('METRICS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        registry.directory = directory
+        app.metrics_flusher = MetricsFlusher(app, directory, app.config.get('METRICS_FLUSH_INTERVAL', 5)).start()
+
+    @app.before_request
+    def start_request_timer():
+        if not getattr(app, '_metrics_engine_ready', False):
+            from database import db
+            instrument_engine(db.engine)
+            app._metrics_engine_ready = True
+        g._metrics_started = time.perf_counter()
+        http_in_flight.inc()
+
+    def finish(status):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        http_in_flight.dec()
+        blueprint = request.blueprint or ''
+        endpoint = request.endpoint or 'unmatched'
+        http_requests.inc(blueprint, endpoint, request.method, str(status))
+        http_latency.observe(time.perf_counter() - started, blueprint, endpoint)
+
+    @app.after_request
+    def record_request(response):
+        finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_failed_request(error=None):
+        # Only still pending when the request ended in an exception
+        finish(500)
+
+    @app.route('/metrics')
+    def metrics():
+        if not _may_scrape(allowed, app.config.get('METRICS_TOKEN')):
+            abort(404)
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    return registry
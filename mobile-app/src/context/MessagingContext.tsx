@@ -1,8 +1,10 @@
 import React, { createContext, useContext, useEffect, useMemo, useRef, useState } from 'react';
 import io, { Socket } from 'socket.io-client';
+import AsyncStorage from '@react-native-async-storage/async-storage';
 import api from '@services/api.service';
 import { Conversation, Message } from '../types';
 import { useAuth } from './AuthContext';
+import { SOCKET_ENCODING_QUERY, decodeEvent } from '@services/socketEncoding';
 
 interface MessagingContextShape {
   conversations: Conversation[];
@@ -37,12 +39,25 @@ export const MessagingProvider: React.FC<{children: React.ReactNode}> = ({ child
   useEffect(() => {
     if (!user) return;
   const url = api.getWebSocketUrl();
-  const s = io(url, { path: '/socket.io', transports: ['websocket', 'polling'], forceNew: true });
+  const s = io(url, {
+    path: '/socket.io',
+    transports: ['websocket', 'polling'],
+    forceNew: true,
+    // Compact msgpack frames for new_message, deflated when large (see socketEncoding.ts)
+    query: SOCKET_ENCODING_QUERY,
+    // Token identifies this connection in the server's presence registry
+    auth: (cb) => { AsyncStorage.getItem('auth_token').then(token => cb({ token })); },
+  });
     s.on('connect', () => {
       const schoolId = (user as any).schoolId ?? (user as any).school_id;
       if (schoolId) s.emit('join_school', { schoolId });
     });
-    s.on('new_message', (payload: any) => {
+    // Keep this device marked online (server TTL is 90s)
+    const heartbeat = setInterval(() => {
+      if (s.connected) s.emit('presence_heartbeat');
+    }, 30000);
+    s.on('new_message', (raw: any) => {
+      const payload = decodeEvent(raw);
       const convId = payload.conversationId || payload.conversation_id;
       const mapped: Message = {
         id: payload.id,
@@ -68,6 +83,7 @@ export const MessagingProvider: React.FC<{children: React.ReactNode}> = ({ child
     });
     socketRef.current = s;
     return () => {
+      clearInterval(heartbeat);
       s.disconnect();
       socketRef.current = null;
     };
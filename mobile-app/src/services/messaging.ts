@@ -2,6 +2,7 @@ import { io, Socket } from 'socket.io-client';
 import { API_URL } from './api';
 import { Message } from '@types';
 import { api } from './api';
+import { SOCKET_ENCODING_QUERY, decodeEvent } from './socketEncoding';
 
 let socket: Socket | null = null;
 
@@ -10,13 +11,13 @@ export function initSocket(schoolId: number) {
   socket = io(API_URL.replace('http', 'ws'), {
     transports: ['websocket'],
     path: '/socket.io',
-    query: { school_id: String(schoolId) }
+    query: { school_id: String(schoolId), ...SOCKET_ENCODING_QUERY }
   });
   return socket;
 }
 
 export function onNewMessage(handler: (m: Message) => void) {
-  socket?.on('new_message', handler);
+  socket?.on('new_message', (raw: any) => handler(decodeEvent(raw)));
 }
 
 export function disconnectSocket() {
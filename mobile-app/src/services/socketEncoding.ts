@@ -0,0 +1,249 @@
+// Compact Socket.IO events (see socket_encoding.py on the server).
+// The app connects with ?encoding=msgpack&compress=deflate; new_message and
+// new_activity_log then arrive as msgpack binary frames with short field
+// keys, behind a flag byte (0 = plain, 1 = zlib deflated when large).
+
+export const SOCKET_ENCODING_QUERY = { encoding: 'msgpack', compress: 'deflate' };
+
+const FLAG_DEFLATE = 1;
+
+// Reverse of SHORT_KEYS, KEY_MAP_VERSION 1
+const LONG_KEYS: Record<string, string> = {
+  s: 'school_id',
+  l: 'log',
+  i: 'id',
+  u: 'user_id',
+  un: 'username',
+  ur: 'user_role',
+  a: 'action',
+  et: 'entity_type',
+  ei: 'entity_id',
+  en: 'entity_name',
+  d: 'description',
+  ip: 'ip_address',
+  t: 'timestamp',
+  c: 'conversationId',
+  si: 'senderId',
+  m: 'content',
+  ty: 'type',
+};
+
+const utf8 = new TextDecoder();
+
+// Decoder for the subset of msgpack that msgpack.packb produces for these events
+function unpack(bytes: Uint8Array): any {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (length: number) => {
+    const value = utf8.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+    return value;
+  };
+  const bin = (length: number) => {
+    const value = bytes.slice(pos, pos + length);
+    pos += length;
+    return value;
+  };
+  const array = (length: number) => {
+    const value = [];
+    for (let n = 0; n < length; n++) value.push(read());
+    return value;
+  };
+  const map = (length: number) => {
+    const value: Record<string, any> = {};
+    for (let n = 0; n < length; n++) {
+      const key = read();
+      value[key] = read();
+    }
+    return value;
+  };
+  const next = (size: number, get: (offset: number) => number) => {
+    const value = get(pos);
+    pos += size;
+    return value;
+  };
+
+  function read(): any {
+    const type = bytes[pos++];
+    if (type <= 0x7f) return type;
+    if (type >= 0xe0) return type - 0x100;
+    if (type >= 0x80 && type <= 0x8f) return map(type & 0x0f);
+    if (type >= 0x90 && type <= 0x9f) return array(type & 0x0f);
+    if (type >= 0xa0 && type <= 0xbf) return str(type & 0x1f);
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(next(1, o => view.getUint8(o)));
+      case 0xc5: return bin(next(2, o => view.getUint16(o)));
+      case 0xc6: return bin(next(4, o => view.getUint32(o)));
+      case 0xca: return next(4, o => view.getFloat32(o));
+      case 0xcb: return next(8, o => view.getFloat64(o));
+      case 0xcc: return next(1, o => view.getUint8(o));
+      case 0xcd: return next(2, o => view.getUint16(o));
+      case 0xce: return next(4, o => view.getUint32(o));
+      case 0xcf: return next(8, o => Number(view.getBigUint64(o)));
+      case 0xd0: return next(1, o => view.getInt8(o));
+      case 0xd1: return next(2, o => view.getInt16(o));
+      case 0xd2: return next(4, o => view.getInt32(o));
+      case 0xd3: return next(8, o => Number(view.getBigInt64(o)));
+      case 0xd9: return str(next(1, o => view.getUint8(o)));
+      case 0xda: return str(next(2, o => view.getUint16(o)));
+      case 0xdb: return str(next(4, o => view.getUint32(o)));
+      case 0xdc: return array(next(2, o => view.getUint16(o)));
+      case 0xdd: return array(next(4, o => view.getUint32(o)));
+      case 0xde: return map(next(2, o => view.getUint16(o)));
+      case 0xdf: return map(next(4, o => view.getUint32(o)));
+      default: throw new Error(`Unsupported msgpack type 0x${type.toString(16)}`);
+    }
+  }
+
+  return read();
+}
+
+// Length and distance tables of RFC 1951, section 3.2.5
+const LENGTH_BASE = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115,
+  131, 163, 195, 227, 258];
+const LENGTH_EXTRA = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0];
+const DISTANCE_BASE = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537,
+  2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577];
+const DISTANCE_EXTRA = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12,
+  13, 13];
+const CODE_LENGTH_ORDER = [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15];
+
+interface Huffman {
+  counts: number[];   // codes per bit length
+  symbols: number[];  // symbols ordered by code
+}
+
+function huffman(lengths: number[]): Huffman {
+  const counts = new Array(16).fill(0);
+  for (const length of lengths) counts[length]++;
+  counts[0] = 0;
+  const offsets = [0, 0];
+  for (let length = 1; length < 15; length++) offsets[length + 1] = offsets[length] + counts[length];
+  const symbols: number[] = [];
+  lengths.forEach((length, symbol) => {
+    if (length) symbols[offsets[length]++] = symbol;
+  });
+  return { counts, symbols };
+}
+
+const FIXED_LITERALS = huffman(Array.from({ length: 288 }, (_, n) => (n < 144 ? 8 : n < 256 ? 9 : n < 280 ? 7 : 8)));
+const FIXED_DISTANCES = huffman(new Array(30).fill(5));
+
+// Inflater for the zlib streams of Python's zlib.compress (Hermes has no
+// DecompressionStream); the Adler-32 trailer is not checked
+function inflate(data: Uint8Array): Uint8Array {
+  if ((data[0] & 0x0f) !== 8) throw new Error('Not a zlib deflate stream');
+  let pos = 2;
+  let bitBuffer = 0;
+  let bitCount = 0;
+  const out: number[] = [];
+
+  const bits = (count: number) => {
+    while (bitCount < count) {
+      if (pos >= data.length) throw new Error('Truncated deflate stream');
+      bitBuffer |= data[pos++] << bitCount;
+      bitCount += 8;
+    }
+    const value = bitBuffer & ((1 << count) - 1);
+    bitBuffer >>>= count;
+    bitCount -= count;
+    return value;
+  };
+  const decode = (table: Huffman) => {
+    let code = 0;
+    let first = 0;
+    let index = 0;
+    for (let length = 1; length < 16; length++) {
+      code |= bits(1);
+      const count = table.counts[length];
+      if (code - first < count) return table.symbols[index + code - first];
+      index += count;
+      first = (first + count) << 1;
+      code <<= 1;
+    }
+    throw new Error('Invalid Huffman code');
+  };
+  const dynamicTables = (): [Huffman, Huffman] => {
+    const literalCount = bits(5) + 257;
+    const distanceCount = bits(5) + 1;
+    const codeCount = bits(4) + 4;
+    const codeLengths = new Array(19).fill(0);
+    for (let n = 0; n < codeCount; n++) codeLengths[CODE_LENGTH_ORDER[n]] = bits(3);
+    const codeTable = huffman(codeLengths);
+    const lengths: number[] = [];
+    while (lengths.length < literalCount + distanceCount) {
+      const symbol = decode(codeTable);
+      if (symbol < 16) {
+        lengths.push(symbol);
+        continue;
+      }
+      const value = symbol === 16 ? lengths[lengths.length - 1] : 0;
+      const repeat = symbol === 16 ? 3 + bits(2) : symbol === 17 ? 3 + bits(3) : 11 + bits(7);
+      for (let n = 0; n < repeat; n++) lengths.push(value);
+    }
+    return [huffman(lengths.slice(0, literalCount)), huffman(lengths.slice(literalCount))];
+  };
+  const block = (literals: Huffman, distances: Huffman) => {
+    for (;;) {
+      const symbol = decode(literals);
+      if (symbol < 256) {
+        out.push(symbol);
+      } else if (symbol === 256) {
+        return;
+      } else {
+        const length = LENGTH_BASE[symbol - 257] + bits(LENGTH_EXTRA[symbol - 257]);
+        const code = decode(distances);
+        const start = out.length - DISTANCE_BASE[code] - bits(DISTANCE_EXTRA[code]);
+        for (let n = 0; n < length; n++) out.push(out[start + n]);
+      }
+    }
+  };
+
+  let last = 0;
+  while (!last) {
+    last = bits(1);
+    const type = bits(2);
+    if (type === 0) {
+      // Stored block: starts at the next byte boundary
+      bitBuffer = 0;
+      bitCount = 0;
+      const length = data[pos] | (data[pos + 1] << 8);
+      pos += 4;
+      for (let n = 0; n < length; n++) out.push(data[pos++]);
+    } else if (type === 1) {
+      block(FIXED_LITERALS, FIXED_DISTANCES);
+    } else if (type === 2) {
+      block(...dynamicTables());
+    } else {
+      throw new Error('Invalid deflate block type');
+    }
+  }
+  return Uint8Array.from(out);
+}
+
+// Strip the flag byte of a msgpack+deflate frame, inflating when set
+function unframe(frame: Uint8Array): Uint8Array {
+  const body = frame.subarray(1);
+  return frame[0] === FLAG_DEFLATE ? inflate(body) : body;
+}
+
+function expand(value: any): any {
+  if (Array.isArray(value)) return value.map(expand);
+  if (value && typeof value === 'object' && !(value instanceof Uint8Array)) {
+    const result: Record<string, any> = {};
+    for (const [key, item] of Object.entries(value)) result[LONG_KEYS[key] ?? key] = expand(item);
+    return result;
+  }
+  return value;
+}
+
+// Payload of a compact event; JSON payloads (older servers) pass through unchanged
+export function decodeEvent(payload: any): any {
+  if (payload instanceof ArrayBuffer) return expand(unpack(unframe(new Uint8Array(payload))));
+  if (payload instanceof Uint8Array) return expand(unpack(unframe(payload)));
+  return payload;
+}
@@ -1,4 +1,5 @@
 from database import db
+from sqlalchemy import event
 import datetime
 
 
@@ -9,6 +10,8 @@ class School(db.Model):
     school_code = db.Column(db.String(20), unique=True, nullable=False)  # Added school code
     address = db.Column(db.String(255))
     contact = db.Column(db.String(50))
+    # Bumped by every schedule write (see schedule_index.py)
+    schedule_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     instructors = db.relationship('Instructor', backref='school', lazy=True)
     school_admins = db.relationship('SchoolAdmin', backref='school', lazy=True)
@@ -17,6 +20,23 @@ class School(db.Model):
     students = db.relationship('Student', backref='school', lazy=True)
     school_instructor_accounts = db.relationship('SchoolInstructorAccount', backref='school', lazy=True)
 
+class EntityVersion(db.Model):
+    """Version of one kind of a school's reference data (see entity_versions.py)"""
+    __tablename__ = 'entity_versions'
+    school_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0: shared by every school
+    entity = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+@event.listens_for(School, 'after_update')
+def _school_updated(mapper, connection, target):
+    # Bulk updates such as the schedule version bump do not come through here
+    state = db.inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('name', 'school_code', 'address', 'contact')):
+        from entity_versions import increment
+        increment(connection.execute, target.id, 'school')
+
+
 class MainAdmin(db.Model):
     __tablename__ = 'main_admin'
     id = db.Column(db.Integer, primary_key=True)
@@ -118,11 +138,24 @@ class Notification(db.Model):
     __tablename__ = 'notifications'
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'))
-    type = db.Column(db.Enum('SMS','Email'), nullable=False)
+    type = db.Column(db.Enum('SMS','Email','Telegram','App'), nullable=False)
     message = db.Column(db.Text)
-    status = db.Column(db.Enum('Sent','Failed','Pending'), default='Pending')
+    status = db.Column(db.Enum('Sent','Failed','Pending','Processing','Dead'), default='Pending')
     timestamp = db.Column(db.DateTime, server_default=db.func.current_timestamp())
 
+    # Outbox delivery state (see notification_outbox.py)
+    school_id = db.Column(db.Integer, db.ForeignKey('schools.id'))
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='SET NULL'))  # App pushes
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime)
+    claimed_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(500))
+
+    __table_args__ = (
+        db.Index('ix_notifications_outbox', 'status', 'next_attempt_at'),
+    )
+
 class Meeting(db.Model):
     __tablename__ = 'meetings'
     id = db.Column(db.Integer, primary_key=True)
@@ -139,6 +172,39 @@ class Meeting(db.Model):
     status = db.Column(db.Enum('scheduled', 'cancelled', 'completed'), default='scheduled', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
+    # Minutes since midnight of start_time/end_time, filled in on save (see meeting_availability.py)
+    start_minute = db.Column(db.SmallInteger)
+    end_minute = db.Column(db.SmallInteger)
+
+    __table_args__ = (
+        db.Index('ix_meetings_instructor_date', 'instructor_id', 'meeting_date'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "instructorId": self.instructor_id,
+            "studentId": self.student_id,
+            "subjectId": self.subject_id,
+            "title": self.title,
+            "description": self.description,
+            "date": self.meeting_date.isoformat() if self.meeting_date else None,
+            "startTime": self.start_time,
+            "endTime": self.end_time,
+            "location": self.location,
+            "status": self.status,
+            "createdAt": self.created_at.isoformat() if self.created_at else None
+        }
+
+
+@event.listens_for(Meeting, 'before_insert')
+@event.listens_for(Meeting, 'before_update')
+def _normalize_meeting(mapper, connection, target):
+    from schedule_index import parse_minutes
+    target.start_minute = parse_minutes(target.start_time)
+    target.end_minute = parse_minutes(target.end_time)
+
+
 class InstructorSchedule(db.Model):
     __tablename__ = 'instructor_sched'
     id = db.Column(db.Integer, primary_key=True)
@@ -149,6 +215,25 @@ class InstructorSchedule(db.Model):
     end_time = db.Column(db.String(20), nullable=False)
     day = db.Column(db.String(20), nullable=False)
 
+    # Normalized copies of day/start_time/end_time (see schedule_index.py),
+    # filled in from the strings on every insert and update
+    weekday = db.Column(db.SmallInteger)       # 0 = Monday ... 6 = Sunday
+    start_minute = db.Column(db.SmallInteger)  # minutes since midnight
+    end_minute = db.Column(db.SmallInteger)
+
+    __table_args__ = (
+        db.Index('ix_instructor_sched_instructor_day', 'instructor_id', 'weekday', 'start_minute'),
+        db.Index('ix_instructor_sched_section_day', 'section_id', 'weekday', 'start_minute'),
+    )
+
+
+@event.listens_for(InstructorSchedule, 'before_insert')
+@event.listens_for(InstructorSchedule, 'before_update')
+def _normalize_schedule(mapper, connection, target):
+    from schedule_index import normalize_schedule
+    normalize_schedule(target)
+
+
 class SchoolInstructorAccount(db.Model):
     __tablename__ = 'school_instructor_account'
     id = db.Column(db.Integer, primary_key=True)
@@ -186,6 +271,64 @@ class TelegramConfig(db.Model):
         }
 
 
+class SchoolTelegramBot(db.Model):
+    """Pins a school to one of several active bots. Schools without a row are
+    spread over the active bots by consistent hashing (telegram_provider.py)."""
+    __tablename__ = 'school_telegram_bots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    school_id = db.Column(db.Integer, db.ForeignKey('schools.id'), unique=True, nullable=False)
+    telegram_config_id = db.Column(db.Integer, db.ForeignKey('telegram_config.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    school = db.relationship('School')
+    telegram_config = db.relationship('TelegramConfig')
+
+
+class SchoolNotificationSettings(db.Model):
+    """Per-school attendance notification mode. Without a row, or with
+    digest_mode 'off', every class result is sent as it is recorded."""
+    __tablename__ = 'school_notification_settings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    school_id = db.Column(db.Integer, db.ForeignKey('schools.id'), unique=True, nullable=False)
+    digest_mode = db.Column(db.Enum('off', 'quiet', 'end_of_day'), nullable=False, default='off')
+    quiet_minutes = db.Column(db.Integer, nullable=False, default=30)  # 'quiet': send after this long without new results
+    digest_time = db.Column(db.String(5), nullable=False, default='17:00')  # 'end_of_day': local HH:MM
+    realtime_statuses = db.Column(db.String(50), nullable=False, default='Absent,Late')  # still sent immediately
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    school = db.relationship('School')
+
+    def realtime_status_set(self):
+        return {status.strip() for status in (self.realtime_statuses or '').split(',') if status.strip()}
+
+    def to_dict(self):
+        return {
+            "school_id": self.school_id,
+            "digest_mode": self.digest_mode,
+            "quiet_minutes": self.quiet_minutes,
+            "digest_time": self.digest_time,
+            "realtime_statuses": sorted(self.realtime_status_set())
+        }
+
+
+class AttendanceDigestEvent(db.Model):
+    """An attendance result waiting to go out in the student's next digest"""
+    __tablename__ = 'attendance_digest_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    school_id = db.Column(db.Integer, db.ForeignKey('schools.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendance.id', ondelete='CASCADE'), nullable=False)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('instructor_sched.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.datetime.now, nullable=False)  # local time, for digest_time
+
+    __table_args__ = (
+        db.Index('ix_attendance_digest_student', 'school_id', 'student_id'),
+    )
+
+
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -237,81 +380,19 @@ class Conversation(db.Model):
     messages = db.relationship('Message', backref='conversation', lazy='dynamic', cascade='all, delete-orphan')
     school = db.relationship('School', backref='conversations')
     
+    def other_participant(self, current_user_id, current_user_type):
+        """(type, id) of the participant who is not the current user"""
+        if self.participant1_id == current_user_id and self.participant1_type == current_user_type:
+            return self.participant2_type, self.participant2_id
+        return self.participant1_type, self.participant1_id
+
     def get_participant_info(self, participant_id, participant_type):
         """Get participant name and details"""
-        if participant_type == 'instructor':
-            account = SchoolInstructorAccount.query.get(participant_id)
-            if account and account.instructor:
-                return {
-                    'id': account.id,
-                    'name': account.instructor.name,
-                    'role': 'instructor',
-                    'email': account.instructor.email
-                }
-        elif participant_type == 'parent':
-            from models import ParentAccount, Student as StudentModel
-            parent = ParentAccount.query.get(participant_id)
-            if parent:
-                s = StudentModel.query.get(parent.student_id)
-                display = f"Parent of {s.first_name} {s.last_name}" if s else 'Parent'
-                return {
-                    'id': parent.id,
-                    'name': display,
-                    'role': 'parent',
-                    'email': None
-                }
-        elif participant_type == 'student':
-            student = Student.query.get(participant_id)
-            if student:
-                return {
-                    'id': student.id,
-                    'name': student.name,
-                    'role': 'student',
-                    'email': student.email if hasattr(student, 'email') else None
-                }
-        elif participant_type == 'admin':
-            admin = SchoolAdmin.query.get(participant_id)
-            if admin:
-                return {
-                    'id': admin.id,
-                    'name': admin.username,
-                    'role': 'school_admin',
-                    'email': None
-                }
-        return None
+        return participant_infos([(participant_type, participant_id)]).get((participant_type, participant_id))
     
-    def to_dict(self, current_user_id, current_user_type):
+    def to_dict(self, current_user_id, current_user_type, names=None):
         """Convert to dictionary for API response"""
-        # Determine the other participant
-        if self.participant1_id == current_user_id and self.participant1_type == current_user_type:
-            other_id = self.participant2_id
-            other_type = self.participant2_type
-        else:
-            other_id = self.participant1_id
-            other_type = self.participant1_type
-        
-        other_participant = self.get_participant_info(other_id, other_type)
-        
-        # Get last message
-        last_msg = self.messages.order_by(Message.timestamp.desc()).first()
-        
-        # Count unread messages for current user
-        unread_count = self.messages.filter(
-            Message.receiver_id == current_user_id,
-            Message.receiver_type == current_user_type,
-            Message.is_read == False
-        ).count()
-        
-        return {
-            'id': self.id,
-            'participantId': other_participant['id'] if other_participant else 0,
-            'participantName': other_participant['name'] if other_participant else 'Unknown',
-            'participantRole': other_participant['role'] if other_participant else 'unknown',
-            'lastMessage': last_msg.content if last_msg else None,
-            'lastMessageTime': last_msg.timestamp.isoformat() if last_msg else None,
-            'unreadCount': unread_count,
-            'avatar': None
-        }
+        return conversation_dicts([self], current_user_id, current_user_type, names)[0]
 
 
 class Message(db.Model):
@@ -323,13 +404,31 @@ class Message(db.Model):
     sender_type = db.Column(db.String(20), nullable=False)  # 'instructor', 'student', 'admin'
     receiver_id = db.Column(db.Integer, nullable=False)
     receiver_type = db.Column(db.String(20), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.Column(db.Text)  # NULL for templated messages
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
     message_type = db.Column(db.String(50), default='text')  # 'text', 'announcement', 'notification'
+    template_id = db.Column(db.String(50))  # see message_templates.py
+    params = db.Column(db.Text)  # compact JSON parameters of the template
     
-    def get_sender_info(self):
-        """Get sender details"""
+    def rendered_content(self, names=None):
+        """Stored text, or the template rendered with its parameters"""
+        if self.content is not None or not self.template_id:
+            return self.content or ''
+        from message_templates import render, load_params
+        return render(self.template_id, load_params(self.params), names)
+    
+    def get_sender_info(self, senders=None):
+        """Get sender details; senders is an optional dict shared across
+        messages so each sender is looked up once"""
+        if senders is not None:
+            key = (self.sender_type, self.sender_id)
+            if key not in senders:
+                senders[key] = self._lookup_sender()
+            return senders[key]
+        return self._lookup_sender()
+
+    def _lookup_sender(self):
         if self.sender_type == 'instructor':
             account = SchoolInstructorAccount.query.get(self.sender_id)
             if account and account.instructor:
@@ -363,22 +462,105 @@ class Message(db.Model):
                 }
         return {'name': 'Unknown', 'role': 'unknown'}
     
-    def to_dict(self):
+    def to_dict(self, names=None, senders=None):
         """Convert to dictionary for API response"""
-        sender_info = self.get_sender_info()
+        sender_info = self.get_sender_info(senders)
         
-        return {
+        data = {
             'id': self.id,
             'conversationId': self.conversation_id,
             'senderId': self.sender_id,
             'senderName': sender_info['name'],
             'senderRole': sender_info['role'],
             'receiverId': self.receiver_id,
-            'content': self.content,
+            'content': self.rendered_content(names),
             'timestamp': self.timestamp.isoformat(),
             'isRead': self.is_read,
             'type': self.message_type
         }
+        if self.template_id:
+            from message_templates import load_params
+            data['template'] = self.template_id
+            data['params'] = load_params(self.params)
+        return data
+
+
+def participant_infos(keys):
+    """{(type, id): name and details} of conversation participants, one query per type"""
+    ids = {}
+    for participant_type, participant_id in keys:
+        ids.setdefault(participant_type, set()).add(participant_id)
+    infos = {}
+    if ids.get('instructor'):
+        rows = db.session.query(SchoolInstructorAccount.id, Instructor.name, Instructor.email)\
+            .join(Instructor, SchoolInstructorAccount.instructor_id == Instructor.id)\
+            .filter(SchoolInstructorAccount.id.in_(ids['instructor'])).all()
+        infos.update({('instructor', row.id): {'id': row.id, 'name': row.name, 'role': 'instructor',
+                                               'email': row.email} for row in rows})
+    if ids.get('parent'):
+        rows = db.session.query(ParentAccount.id, Student.first_name, Student.last_name)\
+            .outerjoin(Student, ParentAccount.student_id == Student.id)\
+            .filter(ParentAccount.id.in_(ids['parent'])).all()
+        infos.update({('parent', row.id): {
+            'id': row.id,
+            'name': f"Parent of {row.first_name} {row.last_name}" if row.first_name is not None else 'Parent',
+            'role': 'parent',
+            'email': None
+        } for row in rows})
+    if ids.get('student'):
+        rows = db.session.query(Student.id, Student.first_name, Student.last_name)\
+            .filter(Student.id.in_(ids['student'])).all()
+        infos.update({('student', row.id): {'id': row.id, 'name': f"{row.first_name} {row.last_name}",
+                                            'role': 'student', 'email': None} for row in rows})
+    if ids.get('admin'):
+        rows = db.session.query(SchoolAdmin.id, SchoolAdmin.username)\
+            .filter(SchoolAdmin.id.in_(ids['admin'])).all()
+        infos.update({('admin', row.id): {'id': row.id, 'name': row.username, 'role': 'school_admin',
+                                          'email': None} for row in rows})
+    return infos
+
+
+def conversation_dicts(conversations, current_user_id, current_user_type, names=None):
+    """to_dict of several conversations in a fixed number of queries: the other
+    participants (per type), the last messages, the unread counts and the names
+    the last messages render with (names is an optional shared NameLookup)"""
+    from message_templates import prefetch_messages
+
+    if not conversations:
+        return []
+    conversation_ids = [conversation.id for conversation in conversations]
+    others = {conversation.id: conversation.other_participant(current_user_id, current_user_type)
+              for conversation in conversations}
+    participants = participant_infos(others.values())
+
+    newest = db.select(db.func.max(Message.id))\
+        .where(Message.conversation_id.in_(conversation_ids))\
+        .group_by(Message.conversation_id)
+    last_messages = {message.conversation_id: message
+                     for message in Message.query.filter(Message.id.in_(newest)).all()}
+    unread_counts = dict(db.session.query(Message.conversation_id, db.func.count(Message.id))
+                         .filter(Message.conversation_id.in_(conversation_ids),
+                                 Message.receiver_id == current_user_id,
+                                 Message.receiver_type == current_user_type,
+                                 Message.is_read == False)
+                         .group_by(Message.conversation_id).all())
+    names = prefetch_messages(last_messages.values(), names)
+
+    result = []
+    for conversation in conversations:
+        other_participant = participants.get(others[conversation.id])
+        last_msg = last_messages.get(conversation.id)
+        result.append({
+            'id': conversation.id,
+            'participantId': other_participant['id'] if other_participant else 0,
+            'participantName': other_participant['name'] if other_participant else 'Unknown',
+            'participantRole': other_participant['role'] if other_participant else 'unknown',
+            'lastMessage': last_msg.rendered_content(names) if last_msg else None,
+            'lastMessageTime': last_msg.timestamp.isoformat() if last_msg else None,
+            'unreadCount': unread_counts.get(conversation.id, 0),
+            'avatar': None
+        })
+    return result
 
 
 
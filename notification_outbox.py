@@ -0,0 +1,374 @@
+"""
+Notification Outbox
+Attendance notices, instructor messages and school broadcasts used to be sent
+straight from the request, and a Telegram send that failed was simply lost.
+Now the request only inserts Pending rows into notifications, in the same
+transaction as the attendance records or messages they announce, and a
+dispatcher delivers them afterwards:
+
+    1. claim a batch of due rows with SELECT ... FOR UPDATE SKIP LOCKED and
+       mark them Processing, so dispatchers in several workers never pick
+       the same row
+    2. send Telegram rows through the bot serving the school, and push App
+       rows to the school's Socket.IO room as new_message
+    3. write every outcome back with one bulk UPDATE
+
+Transient failures go back to Pending with exponential backoff. Rows that
+fail permanently, or run out of attempts, are dead-lettered (status Dead,
+last_error kept) and can be requeued from the main admin dashboard.
+Processing rows whose lease ran out because a dispatcher died mid-batch are
+claimed again, so delivery is at least once.
+
+The realtime app starts its dispatcher as soon as it is built
+(create_app(realtime=True)), so App pushes enqueued by REST workers, and rows
+a restarted worker left Pending or Processing, always have a consumer. Other
+web workers start a Telegram-only one on their first wake_dispatcher() call.
+`python notification_outbox.py` runs a standalone one for Telegram rows.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from database import db
+from models import Notification, Student, Message
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM = 'Telegram'
+APP = 'App'
+
+PENDING = 'Pending'
+PROCESSING = 'Processing'
+SENT = 'Sent'
+DEAD = 'Dead'
+
+BATCH_SIZE = 100
+POLL_INTERVAL = 5
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 30
+LEASE = 300
+ERROR_LIMIT = 500  # size of notifications.last_error
+
+# Plain snapshot of a claimed row, used after the claiming transaction ended
+OutboxItem = namedtuple('OutboxItem', ['id', 'type', 'student_id', 'school_id',
+                                       'message', 'message_id', 'attempts'])
+
+
+def enqueue_telegram(student_id, school_id, text):
+    """Add a Pending Telegram notification to the current transaction"""
+    notification = Notification(student_id=student_id, school_id=school_id,
+                                type=TELEGRAM, message=text, status=PENDING)
+    db.session.add(notification)
+    return notification
+
+
+def enqueue_app(message, student_id, school_id, text=None):
+    """Add a Pending in-app push of a Message row to the current transaction"""
+    if message.id is None:
+        db.session.flush()
+    notification = Notification(student_id=student_id, school_id=school_id, type=APP,
+                                message=text, message_id=message.id, status=PENDING)
+    db.session.add(notification)
+    return notification
+
+
+def claim_batch(types=(TELEGRAM, APP), limit=BATCH_SIZE, lease=LEASE):
+    """Lock up to limit due rows, mark them Processing and commit"""
+    now = datetime.utcnow()
+    due = db.or_(
+        db.and_(Notification.status == PENDING,
+                db.or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now)),
+        db.and_(Notification.status == PROCESSING,
+                Notification.claimed_at < now - timedelta(seconds=lease))
+    )
+    rows = Notification.query.filter(Notification.type.in_(types), due)\
+        .order_by(Notification.id)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)\
+        .all()
+
+    items = []
+    for row in rows:
+        row.status = PROCESSING
+        row.claimed_at = now
+        items.append(OutboxItem(row.id, row.type, row.student_id, row.school_id,
+                                row.message, row.message_id, row.attempts or 0))
+    db.session.commit()
+    return items
+
+
+def requeue_dead(ids=None):
+    """Move dead letters back to Pending with fresh attempts; caller commits"""
+    query = Notification.query.filter(Notification.status == DEAD)
+    if ids:
+        query = query.filter(Notification.id.in_(ids))
+    return query.update({
+        'status': PENDING,
+        'attempts': 0,
+        'next_attempt_at': None,
+        'claimed_at': None,
+        'last_error': None
+    }, synchronize_session=False)
+
+
+def outbox_stats():
+    """Number of Telegram and App notifications per type and status"""
+    rows = db.session.query(Notification.type, Notification.status, db.func.count(Notification.id))\
+        .filter(Notification.type.in_((TELEGRAM, APP)))\
+        .group_by(Notification.type, Notification.status)\
+        .all()
+    stats = {}
+    for type_, status, count in rows:
+        stats.setdefault(type_, {})[status] = count
+    return stats
+
+
+def error_text(error):
+    """What is kept in last_error and shown on the dashboard. Our own messages
+    and TransportError (which never carries the bot token) are kept as they
+    are; any other exception is reduced to its type."""
+    from telegram_transport import TransportError
+    if isinstance(error, (str, TransportError)):
+        return str(error)[:ERROR_LIMIT]
+    return type(error).__name__
+
+
+class NotificationDispatcher:
+    """Background thread draining the outbox in claimed batches"""
+
+    def __init__(self, app, types=(TELEGRAM, APP), batch_size=BATCH_SIZE, interval=POLL_INTERVAL,
+                 max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY, lease=LEASE):
+        self.app = app
+        self.types = types
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'dead': 0, 'errors': 0}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Deliver newly committed notifications now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Keep going while batches come back full, there is more waiting
+            while not self._stopped.is_set() and self.run_once() >= self.batch_size:
+                pass
+            self._wakeup.wait(timeout=self.interval)
+            self._wakeup.clear()
+
+    def run_once(self):
+        """Claim, deliver and record one batch; returns how many rows were claimed"""
+        with self.app.app_context():
+            try:
+                items = claim_batch(self.types, self.batch_size, self.lease)
+                if not items:
+                    return 0
+                self.stats['claimed'] += len(items)
+                updates = self.deliver(items)
+                db.session.bulk_update_mappings(Notification, updates)
+                db.session.commit()
+                for update in updates:
+                    if update['status'] == SENT:
+                        self.stats['sent'] += 1
+                    elif update['status'] == DEAD:
+                        self.stats['dead'] += 1
+                    else:
+                        self.stats['retried'] += 1
+                return len(items)
+            except Exception:
+                db.session.rollback()
+                self.stats['errors'] += 1
+                logger.exception("Notification dispatch failed")
+                return 0
+
+    # --- outcomes, as mappings for the bulk UPDATE ---
+
+    def _sent(self, item):
+        return {'id': item.id, 'status': SENT, 'attempts': item.attempts + 1,
+                'sent_at': datetime.utcnow(), 'claimed_at': None, 'last_error': None}
+
+    def _dead(self, item, error):
+        error = error_text(error)
+        logger.warning("Notification %s dead-lettered: %s", item.id, error)
+        return {'id': item.id, 'status': DEAD, 'attempts': item.attempts + 1,
+                'claimed_at': None, 'last_error': error}
+
+    def _retry(self, item, error, retry_after=None, count_attempt=True):
+        attempts = item.attempts + 1 if count_attempt else item.attempts
+        if attempts >= self.max_attempts:
+            return self._dead(item, f'Gave up after {attempts} attempts: {error_text(error)}')
+        delay = retry_after or self.retry_delay * (2 ** max(attempts - 1, 0))
+        return {'id': item.id, 'status': PENDING, 'attempts': attempts,
+                'next_attempt_at': datetime.utcnow() + timedelta(seconds=delay),
+                'claimed_at': None, 'last_error': error_text(error)}
+
+    # --- delivery ---
+
+    def deliver(self, items):
+        updates = []
+        telegram = [item for item in items if item.type == TELEGRAM]
+        app_pushes = [item for item in items if item.type == APP]
+        if telegram:
+            updates.extend(self._deliver_telegram(telegram))
+        if app_pushes:
+            updates.extend(self._deliver_app(app_pushes))
+        return updates
+
+    def _deliver_telegram(self, items):
+        from telegram_provider import get_config_for_school
+        from telegram_transport import get_transport, TransportError, CircuitOpenError
+
+        api_base = self.app.config.get('TELEGRAM_API_BASE', 'https://api.telegram.org')
+        transport = get_transport()
+        chat_ids = dict(db.session.query(Student.id, Student.telegram_chat_id)
+                        .filter(Student.id.in_({item.student_id for item in items}))
+                        .all())
+
+        updates = []
+        for item in items:
+            chat_id = chat_ids.get(item.student_id)
+            if not chat_id:
+                updates.append(self._dead(item, 'Student is not linked to Telegram'))
+                continue
+            config = get_config_for_school(item.school_id)
+            if config is None:
+                updates.append(self._retry(item, 'No active bot configuration found'))
+                continue
+            try:
+                result = transport.call(f"{api_base}/bot{config.bot_token}", 'sendMessage',
+                                        {'chat_id': chat_id, 'text': item.message, 'parse_mode': 'HTML'})
+            except CircuitOpenError as e:
+                # Not the message's fault: wait for the breaker without spending an attempt
+                updates.append(self._retry(item, e, count_attempt=False))
+                continue
+            except TransportError as e:
+                if e.transient:
+                    updates.append(self._retry(item, e, retry_after=e.retry_after))
+                else:
+                    updates.append(self._dead(item, e))
+                continue
+            if result.get('ok'):
+                updates.append(self._sent(item))
+            else:
+                updates.append(self._dead(item, result.get('description', 'sendMessage failed')))
+        return updates
+
+    def _deliver_app(self, items):
+        from socket_encoding import emit_event
+        from message_templates import prefetch_messages
+
+        socketio = getattr(self.app, 'socketio', None)
+        messages = {message.id: message for message in
+                    Message.query.filter(Message.id.in_({item.message_id for item in items})).all()}
+        names = prefetch_messages(messages.values())
+
+        updates = []
+        for item in items:
+            message = messages.get(item.message_id)
+            if message is None:
+                updates.append(self._dead(item, 'Message no longer exists'))
+                continue
+            if socketio is None:
+                # The message is already in the parent's inbox; there is just no live push
+                updates.append(self._sent(item))
+                continue
+            try:
+                emit_event(socketio, 'new_message', {
+                    'id': message.id,
+                    'conversationId': message.conversation_id,
+                    'senderId': message.sender_id,
+                    'content': message.rendered_content(names),
+                    'timestamp': message.timestamp.isoformat(),
+                    'type': message.message_type
+                }, f'school_{item.school_id}')
+                updates.append(self._sent(item))
+            except Exception as e:
+                updates.append(self._retry(item, e))
+        return updates
+
+
+_dispatcher_lock = threading.Lock()
+
+
+def start_dispatcher(app):
+    """Dispatcher of app, created and started unless it already has one"""
+    dispatcher = getattr(app, 'notification_dispatcher', None)
+    if dispatcher is None:
+        with _dispatcher_lock:
+            dispatcher = getattr(app, 'notification_dispatcher', None)
+            if dispatcher is None:
+                dispatcher = NotificationDispatcher(
+                    app,
+                    # Without Socket.IO, App pushes are left to a worker that has it
+                    types=(TELEGRAM, APP) if hasattr(app, 'socketio') else (TELEGRAM,),
+                    batch_size=app.config.get('NOTIFICATION_BATCH_SIZE', BATCH_SIZE),
+                    interval=app.config.get('NOTIFICATION_POLL_INTERVAL', POLL_INTERVAL),
+                    max_attempts=app.config.get('NOTIFICATION_MAX_ATTEMPTS', MAX_ATTEMPTS),
+                    retry_delay=app.config.get('NOTIFICATION_RETRY_DELAY', RETRY_DELAY),
+                    lease=app.config.get('NOTIFICATION_LEASE', LEASE)
+                ).start()
+                app.notification_dispatcher = dispatcher
+    return dispatcher
+
+
+def get_dispatcher():
+    """Dispatcher of the current app, created and started on first use"""
+    from flask import current_app
+    return start_dispatcher(current_app._get_current_object())
+
+
+def wake_dispatcher():
+    """Call after committing notifications so they go out straight away"""
+    try:
+        get_dispatcher().wake()
+    except Exception as e:
+        # The rows stay Pending and are picked up by the next poll
+        logger.warning("Could not wake notification dispatcher: %s", e)
+
+
+def main():
+    from telegram_polling import create_polling_app
+
+    app = create_polling_app()
+    dispatcher = NotificationDispatcher(
+        app,
+        types=(TELEGRAM,),  # App pushes need the Socket.IO server of a web worker
+        batch_size=app.config.get('NOTIFICATION_BATCH_SIZE', BATCH_SIZE),
+        interval=app.config.get('NOTIFICATION_POLL_INTERVAL', POLL_INTERVAL),
+        max_attempts=app.config.get('NOTIFICATION_MAX_ATTEMPTS', MAX_ATTEMPTS),
+        retry_delay=app.config.get('NOTIFICATION_RETRY_DELAY', RETRY_DELAY),
+        lease=app.config.get('NOTIFICATION_LEASE', LEASE)
+    ).start()
+    print("📬 Dispatching Telegram notifications from the outbox")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 {dispatcher.stats}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping dispatcher...")
+        dispatcher.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Presence and Connection Registry
+Tracks which users currently have a live Socket.IO connection so notification
+paths can pick the cheapest delivery channel: Telegram or the inbox for users
+who are offline. Room emits never depend on it, since the memory backend only
+knows the sockets of its own process and a room reaches every worker.
+
+Users are identified by the same (type, id) pairs the messaging models use:
+    parent:<ParentAccount.id>, instructor:<SchoolInstructorAccount.id>,
+    admin:<SchoolAdmin.id>
+
+Each user maps to a set of sids. A sid stays online while it keeps sending
+heartbeats; anything older than the TTL is treated as offline and purged.
+
+Two backends are available:
+    memory  - single process, dictionaries only (default)
+    sqlite  - a local SQLite file in WAL mode, shared by all workers on the host
+              (gunicorn.conf.py picks it whenever it starts several workers)
+
+Where no registry is available a user counts as offline.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = 90  # seconds without a heartbeat before a sid counts as gone
+PURGE_INTERVAL = 30
+
+CHANNEL_SOCKET = 'socket'      # recipient online, in-app push costs nothing
+CHANNEL_TELEGRAM = 'telegram'  # recipient offline but has a linked Telegram chat
+CHANNEL_INBOX = 'inbox'        # stored message only, picked up on next app open
+
+# Session user types used by the web login mapped to messaging participant types
+SESSION_USER_TYPES = {
+    'school_admin': 'admin',
+    'school_instructor': 'instructor',
+    'main_admin': 'main_admin',
+}
+
+
+def user_key(user_type, user_id):
+    """Registry key for a messaging participant"""
+    return f'{user_type}:{user_id}'
+
+
+class MemoryPresence:
+    """In-process presence registry"""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sids = {}    # sid -> [user_key, school_id, last_seen]
+        self._users = {}   # user_key -> set of sids
+        self._last_purge = time.time()
+
+    def connect(self, sid, key, school_id=None):
+        now = time.time()
+        with self._lock:
+            self._drop(sid)
+            self._sids[sid] = [key, school_id, now]
+            self._users.setdefault(key, set()).add(sid)
+        self._maybe_purge(now)
+
+    def heartbeat(self, sid):
+        now = time.time()
+        with self._lock:
+            entry = self._sids.get(sid)
+            if entry is None:
+                return False
+            entry[2] = now
+        self._maybe_purge(now)
+        return True
+
+    def disconnect(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def sids(self, key):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            return {sid for sid in self._users.get(key, ()) if self._sids[sid][2] >= cutoff}
+
+    def is_online(self, key):
+        return bool(self.sids(key))
+
+    def online_users(self, school_id):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            return sorted({
+                key for key, sid_school, last_seen in self._sids.values()
+                if sid_school == school_id and last_seen >= cutoff
+            })
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, entry in self._sids.items() if entry[2] < cutoff]
+            for sid in expired:
+                self._drop(sid)
+        return len(expired)
+
+    def _drop(self, sid):
+        entry = self._sids.pop(sid, None)
+        if entry is None:
+            return
+        sids = self._users.get(entry[0])
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._users[entry[0]]
+
+    def _maybe_purge(self, now):
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            self.purge_expired()
+
+
+class SQLitePresence:
+    """Presence registry stored in a local SQLite file so every worker sees it"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = time.time()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS presence ('
+            ' sid TEXT PRIMARY KEY,'
+            ' user_key TEXT NOT NULL,'
+            ' school_id INTEGER,'
+            ' last_seen REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_presence_user ON presence (user_key, last_seen)')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_presence_school ON presence (school_id, last_seen)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def connect(self, sid, key, school_id=None):
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR REPLACE INTO presence (sid, user_key, school_id, last_seen) VALUES (?, ?, ?, ?)',
+            (sid, key, school_id, now)
+        )
+        self._maybe_purge(now)
+
+    def heartbeat(self, sid):
+        now = time.time()
+        cursor = self._conn().execute('UPDATE presence SET last_seen = ? WHERE sid = ?', (now, sid))
+        self._maybe_purge(now)
+        return cursor.rowcount > 0
+
+    def disconnect(self, sid):
+        self._conn().execute('DELETE FROM presence WHERE sid = ?', (sid,))
+
+    def sids(self, key):
+        rows = self._conn().execute(
+            'SELECT sid FROM presence WHERE user_key = ? AND last_seen >= ?',
+            (key, time.time() - self.ttl)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def is_online(self, key):
+        row = self._conn().execute(
+            'SELECT 1 FROM presence WHERE user_key = ? AND last_seen >= ? LIMIT 1',
+            (key, time.time() - self.ttl)
+        ).fetchone()
+        return row is not None
+
+    def online_users(self, school_id):
+        rows = self._conn().execute(
+            'SELECT DISTINCT user_key FROM presence WHERE school_id = ? AND last_seen >= ? ORDER BY user_key',
+            (school_id, time.time() - self.ttl)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        cursor = self._conn().execute('DELETE FROM presence WHERE last_seen < ?', (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def _maybe_purge(self, now):
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            self.purge_expired()
+
+
+def create_presence(config):
+    """Build the presence registry configured for the app"""
+    ttl = int(config.get('PRESENCE_TTL', DEFAULT_TTL))
+    backend = config.get('PRESENCE_BACKEND', 'memory')
+    if backend == 'sqlite':
+        return SQLitePresence(config.get('PRESENCE_SQLITE_PATH', 'instance/presence.sqlite3'), ttl=ttl)
+    return MemoryPresence(ttl=ttl)
+
+
+def get_presence():
+    """Presence registry of the current app. Processes without Socket.IO (REST
+    workers, scripts, the outbox) read the shared SQLite registry when it is
+    configured; None when nothing tells who is online."""
+    from flask import current_app
+    app = current_app._get_current_object()
+    registry = getattr(app, 'presence', None)
+    if registry is None and app.config.get('PRESENCE_BACKEND') == 'sqlite':
+        registry = app.presence = create_presence(app.config)
+    return registry
+
+
+def is_online(user_type, user_id):
+    """Whether a user has a live connection. Unknown (no registry) counts as
+    offline, so notifications fall back to Telegram or the inbox."""
+    registry = get_presence()
+    if registry is None:
+        return False
+    return registry.is_online(user_key(user_type, user_id))
+
+
+def choose_channel(user_type, user_id, telegram_chat_id=None):
+    """Cheapest channel that still reaches the user right now"""
+    if is_online(user_type, user_id):
+        return CHANNEL_SOCKET
+    if telegram_chat_id:
+        return CHANNEL_TELEGRAM
+    return CHANNEL_INBOX
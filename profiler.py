@@ -0,0 +1,199 @@
+"""
+On-demand Request Profiler
+Profiles one live request under cProfile plus a stack sampler when an admin
+(or a caller with PROFILER_TOKEN) sends X-Profile: 1 or ?_profile=1, or for
+1 in PROFILE_SAMPLE_RATE requests. Each profile is saved to PROFILE_DIR as
+<id>.pstats, <id>.collapsed (flame graphs) and <id>.json; only the newest
+PROFILE_KEEP are kept. One request is profiled at a time.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from io import StringIO
+
+from flask import g, request, session
+
+logger = logging.getLogger(__name__)
+
+ADMIN_USER_TYPES = ('main_admin', 'school_admin')
+FORMATS = ('pstats', 'collapsed', 'json')
+PROFILE_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[0-9a-f]{6}$')
+
+_profiling = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval, counting collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+class ProfileStore:
+    """Bounded directory of saved profiles, oldest dropped first"""
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def path(self, profile_id, fmt):
+        if not PROFILE_ID.match(profile_id or '') or fmt not in FORMATS:
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.{fmt}')
+        return path if os.path.exists(path) else None
+
+    def save(self, profile, sampler, meta):
+        # Microseconds so ids sort in save order, pruning depends on it
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, f'{profile_id}.pstats'))
+            with open(os.path.join(self.directory, f'{profile_id}.collapsed'), 'w') as f:
+                f.write(sampler.collapsed())
+            with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+                json.dump(dict(meta, id=profile_id, samples=sampler.samples), f)
+            self._prune()
+        return profile_id
+
+    def _prune(self):
+        ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for profile_id in ids[:-self.keep] if len(ids) > self.keep else []:
+            for fmt in FORMATS:
+                try:
+                    os.remove(os.path.join(self.directory, f'{profile_id}.{fmt}'))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """Metadata of the saved profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def summary(self, profile_id, limit=40):
+        """Text report of the slowest functions by cumulative time"""
+        path = self.path(profile_id, 'pstats')
+        if path is None:
+            return None
+        out = StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+def _requested_by_admin(app):
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    if not flag:
+        return False
+    token = app.config.get('PROFILER_TOKEN')
+    if token and flag == token:
+        return True
+    return flag == '1' and session.get('user_type') in ADMIN_USER_TYPES
+
+
+def init_profiler(app):
+    """Profile requests of app on demand; returns the ProfileStore"""
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config.setdefault('PROFILE_KEEP', 50)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0)
+    app.config.setdefault('PROFILE_INTERVAL_MS', 5)
+    app.config.setdefault('PROFILER_TOKEN', None)
+    store = app.profile_store = ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_KEEP'])
+
+    @app.before_request
+    def start_profile():
+        if _requested_by_admin(app):
+            trigger = 'admin'
+        elif app.config['PROFILE_SAMPLE_RATE'] and random.randrange(app.config['PROFILE_SAMPLE_RATE']) == 0:
+            trigger = 'sample'
+        else:
+            return
+        if not _profiling.acquire(blocking=False):
+            return  # another request is being profiled
+        sampler = StackSampler(threading.get_ident(), app.config['PROFILE_INTERVAL_MS'] / 1000)
+        profile = cProfile.Profile()
+        g._profile = (profile, sampler, trigger, time.perf_counter())
+        sampler.start()
+        profile.enable()
+
+    def finish(status):
+        running = g.pop('_profile', None)
+        if running is None:
+            return None
+        profile, sampler, trigger, started = running
+        profile.disable()
+        sampler.stop()
+        _profiling.release()
+        meta = {
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+            'trigger': trigger,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            return store.save(profile, sampler, meta)
+        except OSError as e:
+            logger.warning("Could not save profile: %s", e)
+            return None
+
+    @app.after_request
+    def stop_profile(response):
+        profile_id = finish(response.status_code)
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_failed_profile(error=None):
+        # Still running only when the request ended in an exception
+        finish(500)
+
+    return store
@@ -0,0 +1,160 @@
+"""
+Per-request SQL Statistics
+Counts and times the statements of each request (X-Query-Count and
+Server-Timing headers, query_stats.snapshot() per endpoint) and groups them
+by shape, SQL with literals collapsed, to spot N+1 loops. With
+QUERY_STRICT_LIMIT = K > 0 a shape repeated more than K times in one
+request raises RepeatedQueryError.
+"""
+
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|:\w+|\$\d+))+\s*\)')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """SQL text with literals and IN lists collapsed"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?…)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class RepeatedQueryError(RuntimeError):
+    """One statement shape ran more often than QUERY_STRICT_LIMIT allows"""
+
+    def __init__(self, shape, count, endpoint=None):
+        self.shape = shape
+        self.count = count
+        self.endpoint = endpoint
+        super().__init__(f"{endpoint or 'request'} ran the same statement {count} times: {shape[:200]}")
+
+
+class RequestQueries:
+    """Statements of the request being handled"""
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.count = 0
+        self.db_time = 0.0
+        self.started = time.perf_counter()
+        self.shapes = {}
+        self.violation = None
+
+    def record(self, statement):
+        self.count += 1
+        shape = statement_shape(statement)
+        repeats = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if self.limit and repeats > self.limit and self.violation is None:
+            self.violation = RepeatedQueryError(shape, repeats, request.endpoint)
+            raise self.violation
+
+    def most_repeated(self):
+        if not self.shapes:
+            return None, 0
+        return max(self.shapes.items(), key=lambda item: item[1])
+
+
+class QueryStats:
+    """Totals per endpoint since the process started"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, endpoint, queries):
+        elapsed = time.perf_counter() - queries.started
+        shape, repeats = queries.most_repeated()
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'queries_max': 0, 'db_seconds': 0.0,
+                    'request_seconds': 0.0, 'most_repeated': 0, 'most_repeated_shape': None}
+            entry['requests'] += 1
+            entry['queries'] += queries.count
+            entry['queries_max'] = max(entry['queries_max'], queries.count)
+            entry['db_seconds'] += queries.db_time
+            entry['request_seconds'] += elapsed
+            if repeats > entry['most_repeated']:
+                entry['most_repeated'] = repeats
+                entry['most_repeated_shape'] = shape
+
+    def snapshot(self):
+        """{endpoint: totals}, with per-request means added"""
+        with self._lock:
+            result = {endpoint: dict(entry) for endpoint, entry in self._endpoints.items()}
+        for entry in result.values():
+            entry['queries_mean'] = round(entry['queries'] / entry['requests'], 2)
+            entry['db_ms_mean'] = round(entry['db_seconds'] / entry['requests'] * 1000, 3)
+            entry['request_ms_mean'] = round(entry['request_seconds'] / entry['requests'] * 1000, 3)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
+
+
+def _current():
+    return g.get('_request_queries') if has_request_context() else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current()
+    if queries is not None:
+        queries.record(statement)
+        conn.info.setdefault('query_stats_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current()
+    started = conn.info.get('query_stats_started')
+    if queries is not None and started:
+        queries.db_time += time.perf_counter() - started.pop()
+
+
+def init_query_stats(app):
+    """Track the statements of every request of app"""
+    app.config.setdefault('QUERY_STRICT_LIMIT', 0)
+    app.config.setdefault('QUERY_TIMING_HEADERS', True)
+
+    @app.before_request
+    def start_counting():
+        g._request_queries = RequestQueries(app.config['QUERY_STRICT_LIMIT'])
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get('_request_queries')
+        if queries is None:
+            return response
+        if queries.violation is not None:
+            raise queries.violation
+        if app.config['QUERY_TIMING_HEADERS']:
+            total = (time.perf_counter() - queries.started) * 1000
+            response.headers['X-Query-Count'] = str(queries.count)
+            response.headers['Server-Timing'] = (f'db;dur={queries.db_time * 1000:.1f};desc="{queries.count} queries", '
+                                                 f'app;dur={total:.1f}')
+        return response
+
+    @app.teardown_request
+    def record_queries(error=None):
+        # Also runs for requests that ended in an exception
+        queries = g.pop('_request_queries', None)
+        if queries is not None:
+            query_stats.add(request.endpoint or 'unmatched', queries)
+
+    return query_stats
@@ -0,0 +1,133 @@
+"""
+Telegram Registration Index
+In-memory lookups used to resolve "SCHOOL STUDENTCODE" registration messages
+without scanning the students and schools tables:
+    student code            -> {student_id: school_id}
+    normalized school term  -> set of school ids
+
+School terms are the school code, the full name with spaces removed and every
+word of the name, all upper-cased. The index is loaded lazily in one pass,
+kept current by the student CRUD hooks below, and rebuilt after
+REFRESH_INTERVAL so changes made by other workers, and schools added by the
+setup scripts, are picked up too.
+"""
+
+import threading
+import time
+
+REFRESH_INTERVAL = 300  # seconds before the whole index is reloaded
+MISS_REBUILD_INTERVAL = 30  # minimum gap between rebuilds triggered by a miss
+
+
+def normalize(term):
+    return (term or '').strip().upper()
+
+
+def school_terms(school_code, name):
+    """Every normalized term a registration message may use for a school"""
+    terms = {normalize(school_code), normalize(name).replace(' ', '')}
+    terms.update(normalize(name).split())
+    terms.discard('')
+    return terms
+
+
+class RegistrationIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {}         # student code -> {student_id: school_id}
+        self._student_codes = {}  # student_id -> code, for removals
+        self._schools = {}       # term -> set of school ids
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.time() - self._loaded_at > REFRESH_INTERVAL:
+            self.rebuild()
+
+    def rebuild(self):
+        """Reload both maps from the database (two narrow queries)"""
+        from database import db
+        from models import Student, School
+
+        students = db.session.query(Student.id, Student.code, Student.school_id).all()
+        schools = db.session.query(School.id, School.school_code, School.name).all()
+
+        codes, student_codes, school_map = {}, {}, {}
+        for student_id, code, school_id in students:
+            code = normalize(code)
+            if code:
+                codes.setdefault(code, {})[student_id] = school_id
+                student_codes[student_id] = code
+        for school_id, school_code, name in schools:
+            for term in school_terms(school_code, name):
+                school_map.setdefault(term, set()).add(school_id)
+
+        with self._lock:
+            self._codes = codes
+            self._student_codes = student_codes
+            self._schools = school_map
+            self._loaded_at = time.time()
+
+    def add_student(self, student_id, code, school_id):
+        code = normalize(code)
+        with self._lock:
+            self._remove_student(student_id)
+            if code:
+                self._codes.setdefault(code, {})[student_id] = school_id
+                self._student_codes[student_id] = code
+
+    def remove_student(self, student_id):
+        with self._lock:
+            self._remove_student(student_id)
+
+    def _remove_student(self, student_id):
+        code = self._student_codes.pop(student_id, None)
+        if code is None:
+            return
+        matches = self._codes.get(code)
+        if matches is not None:
+            matches.pop(student_id, None)
+            if not matches:
+                del self._codes[code]
+
+    def candidates(self, words, school_id=None):
+        """(student_id, code) pairs where one word is the student's code and a
+        different word names the student's school, in message order"""
+        self._ensure_loaded()
+        words = [normalize(word) for word in words]
+        with self._lock:
+            found = []
+            for i, code in enumerate(words):
+                students = self._codes.get(code)
+                if not students:
+                    continue
+                for student_id, student_school in students.items():
+                    if school_id is not None and student_school != school_id:
+                        continue
+                    if any(j != i and student_school in self._schools.get(term, ())
+                           for j, term in enumerate(words)):
+                        found.append((student_id, code))
+            return found
+
+    def resolve(self, words, school_id=None):
+        """Candidates for a message, rebuilding once if nothing matched and the
+        index may be missing rows added by another worker"""
+        found = self.candidates(words, school_id)
+        if not found and self._loaded_at is not None and time.time() - self._loaded_at > MISS_REBUILD_INTERVAL:
+            self.rebuild()
+            found = self.candidates(words, school_id)
+        return found
+
+
+registration_index = RegistrationIndex()
+
+
+def student_saved(student):
+    """Hook for student create/update"""
+    registration_index.add_student(student.id, student.code, student.school_id)
+
+
+def student_deleted(student_id):
+    """Hook for student delete"""
+    registration_index.remove_student(student_id)
+
@@ -0,0 +1,249 @@
+"""
+Schedule Index
+instructor_sched stores day names and HH:MM strings, and overlap checks used
+to compare those strings ('9:00' sorts after '10:00', '1:30 PM' after
+anything). Every row now also carries weekday (0 = Monday) and start_minute /
+end_minute as minutes since midnight, filled in from the strings when a row
+is saved, and overlap checks compare integers.
+
+ScheduleIndex keeps one school's classes in memory, bucketed by instructor
+or section and weekday and sorted by start minute, so checking a new class
+for overlaps is a binary search instead of two queries. Writers call
+schedules_changed() before they commit, which bumps schools.schedule_version;
+before each use the index compares that version with the one it loaded and
+reloads when any worker changed the school's classes.
+
+conflict_report() finds every overlapping pair of a school's classes in one
+sweep-line pass over the classes sorted by start.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime
+from enum import IntEnum
+
+
+class Weekday(IntEnum):
+    MONDAY = 0
+    TUESDAY = 1
+    WEDNESDAY = 2
+    THURSDAY = 3
+    FRIDAY = 4
+    SATURDAY = 5
+    SUNDAY = 6
+
+    @property
+    def label(self):
+        return self.name.capitalize()
+
+
+DAY_NAMES = tuple(day.label for day in Weekday)
+INSTRUCTOR = 'instructor'
+SECTION = 'section'
+
+Slot = namedtuple('Slot', 'id instructor_id section_id subject_id weekday start end')
+Conflict = namedtuple('Conflict', 'kind resource_id weekday first second')
+
+
+def parse_weekday(value):
+    """Weekday number of a day name ('Monday', 'Mon') or number, None if unknown"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value if 0 <= value <= 6 else None
+    key = str(value).strip().lower()
+    for day in Weekday:
+        if len(key) >= 3 and day.label.lower().startswith(key):
+            return int(day)
+    return None
+
+
+def parse_minutes(value):
+    """Minutes since midnight of 'HH:MM', 'HH:MM:SS' or 'h:MM AM', None if invalid"""
+    if not value:
+        return None
+    text = str(value).strip()
+    for candidate, formats in ((text, ('%H:%M', '%H:%M:%S')),
+                               (text.upper().replace('.', ''), ('%I:%M %p', '%I:%M%p'))):
+        for fmt in formats:
+            try:
+                parsed = datetime.strptime(candidate, fmt)
+                return parsed.hour * 60 + parsed.minute
+            except ValueError:
+                pass
+    return None
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_schedule(schedule):
+    """Fill weekday/start_minute/end_minute of an InstructorSchedule from its strings"""
+    schedule.weekday = parse_weekday(schedule.day)
+    schedule.start_minute = parse_minutes(schedule.start_time)
+    schedule.end_minute = parse_minutes(schedule.end_time)
+
+
+class _Bucket:
+    """Classes of one instructor or section on one weekday, sorted by start"""
+
+    def __init__(self):
+        self.starts = []
+        self.slots = []
+        self.longest = 0
+
+    def add(self, slot):
+        i = bisect_right(self.starts, slot.start)
+        self.starts.insert(i, slot.start)
+        self.slots.insert(i, slot)
+        self.longest = max(self.longest, slot.end - slot.start)
+
+    def overlapping(self, start, end):
+        """Slots with slot.start < end and slot.end > start"""
+        found = []
+        i = bisect_left(self.starts, end)
+        # No slot is longer than self.longest, so the walk back stops as soon
+        # as a start is too early to reach past `start`
+        while i > 0:
+            i -= 1
+            if self.starts[i] + self.longest <= start:
+                break
+            if self.slots[i].end > start:
+                found.append(self.slots[i])
+        found.reverse()
+        return found
+
+
+class ScheduleIndex:
+    """In-memory interval index of one school's classes"""
+
+    def __init__(self, school_id):
+        self.school_id = school_id
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._buckets = {}
+        self._version = None
+
+    def _query(self, *columns):
+        from database import db
+        from models import Instructor, InstructorSchedule
+
+        return db.session.query(*columns)\
+            .join(Instructor, InstructorSchedule.instructor_id == Instructor.id)\
+            .filter(Instructor.school_id == self.school_id)\
+            .filter(InstructorSchedule.weekday.isnot(None))\
+            .filter(InstructorSchedule.start_minute.isnot(None))\
+            .filter(InstructorSchedule.end_minute.isnot(None))
+
+    def _stored_version(self):
+        from database import db
+        from models import School
+
+        return db.session.query(School.schedule_version).filter(School.id == self.school_id).scalar() or 0
+
+    def load(self, version=None):
+        from models import InstructorSchedule as S
+
+        # Read the version first: a write landing in between only causes another reload
+        version = self._stored_version() if version is None else version
+        rows = self._query(S.id, S.instructor_id, S.section_id, S.subject_id,
+                           S.weekday, S.start_minute, S.end_minute).all()
+        with self._lock:
+            self._slots = {}
+            self._buckets = {}
+            for row in rows:
+                self._add(Slot(*row))
+            self._version = version
+
+    def ensure_current(self):
+        """Reload when the school's schedule version moved (one primary key lookup)"""
+        stored = self._stored_version()
+        with self._lock:
+            if stored == self._version:
+                return self
+        self.load(stored)
+        return self
+
+    def _keys(self, slot):
+        return ((INSTRUCTOR, slot.instructor_id, slot.weekday), (SECTION, slot.section_id, slot.weekday))
+
+    def _add(self, slot):
+        self._slots[slot.id] = slot
+        for key in self._keys(slot):
+            self._buckets.setdefault(key, _Bucket()).add(slot)
+
+    def overlapping(self, kind, resource_id, weekday, start, end, exclude_id=None):
+        """Classes of an instructor or section overlapping [start, end) on a weekday"""
+        with self._lock:
+            bucket = self._buckets.get((kind, resource_id, weekday))
+            if bucket is None:
+                return []
+            return [slot for slot in bucket.overlapping(start, end) if slot.id != exclude_id]
+
+    def day_slots(self, kind, resource_id, weekday):
+        """Classes of an instructor or section on a weekday, by start"""
+        with self._lock:
+            bucket = self._buckets.get((kind, resource_id, weekday))
+            return list(bucket.slots) if bucket else []
+
+    def find(self, instructor_id, weekday, **fields):
+        """Classes of an instructor on a weekday matching the given Slot fields"""
+        with self._lock:
+            bucket = self._buckets.get((INSTRUCTOR, instructor_id, weekday))
+            return [slot for slot in (bucket.slots if bucket else [])
+                    if all(getattr(slot, name) == value for name, value in fields.items())]
+
+    def slots(self, instructor_id=None):
+        with self._lock:
+            return [slot for slot in self._slots.values()
+                    if instructor_id is None or slot.instructor_id == instructor_id]
+
+    def conflicts(self, instructor_id=None):
+        return conflict_report(self.slots(instructor_id))
+
+
+def conflict_report(slots):
+    """Every pair of classes sharing an instructor or a section whose times
+    overlap, in one sweep over the classes ordered by weekday and start.
+
+    Each instructor and section has a heap of the classes still running at
+    the sweep position, keyed by end minute; a class conflicts with every
+    class left in its heaps once the finished ones are popped.
+    """
+    active = {}
+    conflicts = []
+    for slot in sorted(slots, key=lambda slot: (slot.weekday, slot.start, slot.end, slot.id)):
+        for kind, resource_id in ((INSTRUCTOR, slot.instructor_id), (SECTION, slot.section_id)):
+            running = active.setdefault((kind, resource_id, slot.weekday), [])
+            while running and running[0][0] <= slot.start:
+                heapq.heappop(running)
+            for _, _, other in running:
+                conflicts.append(Conflict(kind, resource_id, slot.weekday, other, slot))
+            heapq.heappush(running, (slot.end, slot.id, slot))
+    return conflicts
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_schedule_index(school_id):
+    """The school's index, reloaded first if its schedule version moved"""
+    with _indexes_lock:
+        index = _indexes.get(school_id)
+        if index is None:
+            index = _indexes[school_id] = ScheduleIndex(school_id)
+    return index.ensure_current()
+
+
+def schedules_changed(school_id):
+    """Hook for schedule writes, before commit: bumps the school's schedule
+    version in the same transaction so every worker reloads its index"""
+    from database import db
+    from models import School
+
+    db.session.query(School).filter(School.id == school_id)\
+        .update({School.schedule_version: School.schedule_version + 1}, synchronize_session=False)
@@ -19,7 +19,7 @@ def setup_webhooks_with_url(app, ngrok_url):
     
     webhook_url = f"{ngrok_url}/school_admin/webhook"
     
-    print(f"🔗 Setting up webhooks with URL: {webhook_url}")
+    print(f"🔗 Setting up webhooks with URL: {webhook_url}/<bot id>")
     
     try:
         with app.app_context():
@@ -34,7 +34,8 @@ def setup_webhooks_with_url(app, ngrok_url):
             success_count = 0
             
             for config in configs:
-                if setup_single_webhook(config.bot_token, webhook_url):
+                # Per-bot URL so replies go out through the bot that received the update
+                if setup_single_webhook(config.bot_token, f"{webhook_url}/{config.id}"):
                     print(f"✅ Webhook set for @{config.bot_username}")
                     success_count += 1
                 else:
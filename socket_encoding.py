@@ -0,0 +1,204 @@
+"""
+Compact Socket.IO Event Encoding
+Optional msgpack payloads with short field keys and per-message deflate for
+high-volume room events. JSON stays the default for every client that does
+not ask for something else when it connects.
+
+Clients negotiate the encoding through the connection query string:
+    /socket.io/?encoding=msgpack            -> msgpack with short keys
+    /socket.io/?encoding=msgpack&compress=deflate
+                                            -> msgpack, deflated when large
+
+Compact payloads are sent as binary frames. With deflate negotiated, the
+first byte of every frame is a flag (0 = plain msgpack, 1 = zlib deflated).
+"""
+
+import json
+import threading
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is always available
+    msgpack = None
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+ENCODING_MSGPACK_DEFLATE = 'msgpack+deflate'
+
+ENCODINGS = (ENCODING_JSON, ENCODING_MSGPACK, ENCODING_MSGPACK_DEFLATE)
+
+# Events large enough or frequent enough to be worth encoding per client
+COMPACT_EVENTS = {'new_activity_log', 'new_message'}
+
+# Payloads smaller than this are not worth deflating
+DEFLATE_THRESHOLD = 256
+
+FLAG_PLAIN = b'\x00'
+FLAG_DEFLATE = b'\x01'
+
+# Short field keys shared by all compact events. Clients keep the reverse
+# mapping (see KEY_MAP_VERSION) to rebuild the original field names.
+KEY_MAP_VERSION = 1
+SHORT_KEYS = {
+    # envelope
+    'school_id': 's',
+    'log': 'l',
+    # ActivityLog.to_dict
+    'id': 'i',
+    'user_id': 'u',
+    'username': 'un',
+    'user_role': 'ur',
+    'action': 'a',
+    'entity_type': 'et',
+    'entity_id': 'ei',
+    'entity_name': 'en',
+    'description': 'd',
+    'ip_address': 'ip',
+    'timestamp': 't',
+    # new_message
+    'conversationId': 'c',
+    'senderId': 'si',
+    'content': 'm',
+    'type': 'ty',
+}
+LONG_KEYS = {short: long for long, short in SHORT_KEYS.items()}
+
+# Fields that only matter to the audit trail and are dropped from compact frames
+DROPPED_FIELDS = {'user_agent'}
+
+_client_encodings = {}
+_encoding_counts = {encoding: 0 for encoding in ENCODINGS}
+_lock = threading.Lock()
+
+
+def negotiate(args):
+    """Pick the encoding for a connecting client from its query arguments"""
+    requested = (args.get('encoding') or '').lower()
+    if requested != ENCODING_MSGPACK or msgpack is None:
+        return ENCODING_JSON
+    if (args.get('compress') or '').lower() == 'deflate':
+        return ENCODING_MSGPACK_DEFLATE
+    return ENCODING_MSGPACK
+
+
+def register_client(sid, encoding):
+    """Remember the negotiated encoding of a connected client"""
+    with _lock:
+        previous = _client_encodings.get(sid)
+        if previous is not None:
+            _encoding_counts[previous] -= 1
+        _client_encodings[sid] = encoding
+        _encoding_counts[encoding] += 1
+
+
+def forget_client(sid):
+    """Drop a disconnected client"""
+    with _lock:
+        encoding = _client_encodings.pop(sid, None)
+        if encoding is not None:
+            _encoding_counts[encoding] -= 1
+
+
+def client_counts():
+    """Connected clients per encoding in this process (for /metrics)"""
+    with _lock:
+        return dict(_encoding_counts)
+
+
+def client_encoding(sid):
+    """Encoding negotiated by a client, JSON when unknown"""
+    with _lock:
+        return _client_encodings.get(sid, ENCODING_JSON)
+
+
+def encoded_room(room, encoding):
+    """Name of the per-encoding sub-room of a room"""
+    return f'{room}:{encoding}'
+
+
+def shorten(value):
+    """Recursively replace field names with their short keys"""
+    if isinstance(value, dict):
+        return {
+            SHORT_KEYS.get(key, key): shorten(item)
+            for key, item in value.items()
+            if key not in DROPPED_FIELDS
+        }
+    if isinstance(value, list):
+        return [shorten(item) for item in value]
+    return value
+
+
+def expand(value):
+    """Inverse of shorten, used by Python clients and the benchmark"""
+    if isinstance(value, dict):
+        return {LONG_KEYS.get(key, key): expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+def encode(payload, encoding):
+    """Encode a payload for one encoding"""
+    if encoding == ENCODING_JSON or msgpack is None:
+        return payload
+
+    packed = msgpack.packb(shorten(payload), use_bin_type=True)
+    if encoding == ENCODING_MSGPACK:
+        return packed
+
+    if len(packed) >= DEFLATE_THRESHOLD:
+        deflated = zlib.compress(packed, 6)
+        if len(deflated) < len(packed):
+            return FLAG_DEFLATE + deflated
+    return FLAG_PLAIN + packed
+
+
+def decode(frame, encoding):
+    """Decode a frame produced by encode"""
+    if encoding == ENCODING_JSON:
+        return frame
+    if encoding == ENCODING_MSGPACK_DEFLATE:
+        flag, body = frame[:1], frame[1:]
+        frame = zlib.decompress(body) if flag == FLAG_DEFLATE else body
+    return expand(msgpack.unpackb(frame, raw=False))
+
+
+def encoded_size(payload, encoding):
+    """Size in bytes of a payload on the wire (JSON counted as UTF-8 text)"""
+    if encoding == ENCODING_JSON or msgpack is None:
+        return len(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    return len(encode(payload, encoding))
+
+
+def _may_have_members(socketio, room):
+    """False only when this process alone serves the room and it is empty.
+
+    With SOCKETIO_MESSAGE_QUEUE the emit is published to every server, whose
+    members this process cannot see, so it always goes out.
+    """
+    from socketio import PubSubManager  # only loaded by realtime apps
+    manager = socketio.server.manager
+    if isinstance(manager, PubSubManager):
+        return True
+    return next(iter(manager.get_participants('/', room)), None) is not None
+
+
+def emit_event(socketio, event, payload, room):
+    """Emit an event to a room, encoding it once per negotiated encoding.
+
+    Only events in COMPACT_EVENTS are split by encoding; everything else is
+    sent as JSON to the room itself exactly as before.
+    """
+    if event not in COMPACT_EVENTS:
+        socketio.emit(event, payload, room=room)
+        return
+
+    socketio.emit(event, payload, room=encoded_room(room, ENCODING_JSON))
+    if msgpack is None:
+        return
+    for encoding in (ENCODING_MSGPACK, ENCODING_MSGPACK_DEFLATE):
+        sub_room = encoded_room(room, encoding)
+        if _may_have_members(socketio, sub_room):
+            socketio.emit(event, encode(payload, encoding), room=sub_room)
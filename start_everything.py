@@ -83,21 +83,17 @@ class BotStarter:
         
         # Set environment variables
         env = os.environ.copy()
-        env['FLASK_APP'] = 'app_clean.py'
-        env['FLASK_DEBUG'] = '0'  # Disable debug mode for subprocess
-        env['FLASK_ENV'] = 'production'
+        # The app_clean.py app: no Socket.IO, Telegram pages mounted
+        env['WEB_REALTIME'] = '0'
+        env['BLUEPRINT_GROUPS'] = 'auth,main_admin,school_admin,instructor,api,telegram'
         
-        # Start Flask in background using virtual environment Python
+        # Start Flask in background using virtual environment Python; gunicorn
+        # when installed, else the development server (see wsgi.py)
         venv_python = os.path.join(os.getcwd(), 'env', 'bin', 'python')
         python_cmd = venv_python if os.path.exists(venv_python) else sys.executable
         
         self.flask_process = subprocess.Popen(
-            [python_cmd, '-c', '''
-import sys
-sys.path.append(".")
-from app_clean import app
-app.run(debug=False, host="0.0.0.0", port=5000, use_reloader=False)
-'''],
+            [python_cmd, 'wsgi.py'],
             env=env,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
@@ -109,7 +105,7 @@ app.run(debug=False, host="0.0.0.0", port=5000, use_reloader=False)
         # Test if Flask is running - retry for up to 15 seconds
         for i in range(15):
             try:
-                response = requests.get('http://localhost:5000/', timeout=3)
+                response = requests.get('http://localhost:5000/healthz', timeout=3)
                 if response.status_code == 200:
                     print("✅ Flask is running!")
                     return True
@@ -20,19 +20,14 @@ def main():
     venv_python = os.path.join(os.getcwd(), 'env', 'bin', 'python')
     python_cmd = venv_python if os.path.exists(venv_python) else sys.executable
     
-    flask_process = subprocess.Popen([
-        python_cmd, '-c', '''
-import sys
-sys.path.append(".")
-from app_realtime import app, socketio
-socketio.run(app, debug=False, host="0.0.0.0", port=5000, use_reloader=False)
-'''], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # gunicorn with gunicorn.conf.py when installed, else the development server (see wsgi.py)
+    flask_process = subprocess.Popen([python_cmd, 'wsgi.py'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     
     # Wait for Flask
     print("⏳ Waiting for Flask to start...")
     for i in range(10):
         try:
-            response = requests.get('http://localhost:5000/', timeout=2)
+            response = requests.get('http://localhost:5000/healthz', timeout=2)
             if response.status_code == 200:
                 print("✅ Flask is running!")
                 break
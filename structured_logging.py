@@ -0,0 +1,202 @@
+"""
+Structured logging
+Modules log through logging.getLogger(__name__). init_logging(app) puts a
+QueueHandler on the root logger, so a request thread only appends the record
+to a bounded queue; a QueueListener thread formats and writes it. When the
+queue is full the record is dropped and counted
+(edutrack_log_records_dropped_total) instead of blocking the request.
+
+Configuration (instance/config.py):
+
+    LOG_LEVEL       root level, INFO by default
+    LOG_LEVELS      per-module levels, e.g.
+                    "blueprints.school_admin=DEBUG,telegram_bot=WARNING"
+    LOG_FORMAT      json (one object per line) or text
+    LOG_SAMPLE      fraction of records kept per level, e.g.
+                    "DEBUG=0.01,INFO=0.5"; WARNING and above are always kept
+    LOG_QUEUE_SIZE  records waiting to be written before new ones are dropped
+    LOG_FILE        write here instead of stdout
+
+Records below their logger's level are discarded before the message is
+formatted, so log with %-style arguments rather than f-strings:
+logger.debug("Form data: %s", form) costs one level check while DEBUG is
+off. Records logged inside a request carry its method, path, endpoint and
+the user and school of the session or token; extra={...} adds fields.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from flask import has_request_context, request, session
+
+from metrics import record_log_dropped
+
+# Attributes every LogRecord has; anything else was passed through extra=
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+STOP_TIMEOUT = 5  # seconds shutdown waits for room in a full queue
+
+_handler = None
+_listener = None
+
+
+def _pairs(spec):
+    for item in (spec or '').split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            yield name.strip(), value.strip()
+
+
+def level_number(name):
+    number = logging.getLevelName(str(name).strip().upper())
+    if not isinstance(number, int):
+        raise ValueError(f"Unknown log level {name!r}")
+    return number
+
+
+def parse_levels(spec):
+    """"module=LEVEL,..." as {module: level number}"""
+    return {name: level_number(level) for name, level in _pairs(spec)}
+
+
+def parse_sample(spec):
+    """"LEVEL=fraction,..." as {level number: fraction kept}"""
+    return {level_number(level): float(fraction) for level, fraction in _pairs(spec)}
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request to records, in the thread that logs them"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+            record.user_id = getattr(request, 'user_id', None) or session.get('user_id') \
+                or session.get('instructor_id')
+            record.school_id = getattr(request, 'school_id', None) or session.get('school_id')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records of sampled levels, never of warnings"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        return rate is None or record.levelno >= logging.WARNING or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full"""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+        self._exceptions = logging.Formatter()
+
+    def prepare(self, record):
+        # Merge the arguments and render the traceback here: the objects they
+        # refer to may change before the listener gets to the record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exceptions.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            record_log_dropped()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for the queue to make room"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=STOP_TIMEOUT)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def queue_depth():
+    """Records waiting to be written, 0 before init_logging"""
+    return _handler.queue.qsize() if _handler else 0
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the listener thread"""
+    global _handler, _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass  # output stuck: the listener is a daemon thread and ends with the process
+        logging.getLogger().removeHandler(_handler)
+        _handler.close()
+        for output in _listener.handlers:
+            output.close()
+    _handler = _listener = None
+
+
+def init_logging(app):
+    """Route every log record of this process through the queue"""
+    global _handler, _listener
+    config = app.config
+    shutdown_logging()  # another app in the same process replaces the pipeline
+
+    if config.get('LOG_FILE'):
+        output = logging.FileHandler(config['LOG_FILE'], encoding='utf-8')
+    else:
+        output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if config.get('LOG_FORMAT', 'json') == 'json'
+                        else logging.Formatter(TEXT_FORMAT))
+
+    _handler = DroppingQueueHandler(queue.Queue(int(config.get('LOG_QUEUE_SIZE', 10000))))
+    rates = parse_sample(config.get('LOG_SAMPLE'))
+    if rates:
+        _handler.addFilter(SamplingFilter(rates))
+    _handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level_number(config.get('LOG_LEVEL', 'INFO')))
+    root.addHandler(_handler)
+    for name, level in parse_levels(config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = DrainingQueueListener(_handler.queue, output)
+    _listener.start()
+    return _handler
+
+
+atexit.register(shutdown_logging)
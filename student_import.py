@@ -0,0 +1,196 @@
+"""
+Bulk Student Import
+Onboarding a school used to mean one add_student request per student, and
+generate_unique_code ran a SELECT for every random candidate. An import now
+handles a whole CSV or XLSX file:
+
+    1. parse and validate every row, collecting per-row errors
+    2. resolve section names against the school's sections, loaded once
+    3. generate codes in memory against one preloaded set of existing codes
+    4. insert the valid rows with executemany, CHUNK_SIZE rows per statement
+
+Invalid rows are reported and skipped; they never abort the rest of the
+file. XLSX files need the optional openpyxl package.
+"""
+
+import csv
+import io
+import random
+import string
+
+from sqlalchemy import insert
+
+from database import db
+from models import Student, Section
+
+try:
+    import openpyxl
+except ImportError:  # XLSX support is optional, CSV always works
+    openpyxl = None
+
+CHUNK_SIZE = 500
+MAX_ROWS = 5000
+CODE_LENGTH = 8
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'grade_level', 'section')
+COLUMN_ALIASES = {
+    'firstname': 'first_name',
+    'first': 'first_name',
+    'lastname': 'last_name',
+    'last': 'last_name',
+    'surname': 'last_name',
+    'grade': 'grade_level',
+    'section_name': 'section',
+    'contact': 'parent_contact',
+    'parent_contact_number': 'parent_contact',
+    'guardian_contact': 'parent_contact',
+}
+MAX_LENGTHS = {'first_name': 50, 'last_name': 50, 'grade_level': 50, 'parent_contact': 100}
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported"""
+
+
+def normalize_header(name, aliases=COLUMN_ALIASES):
+    key = str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return aliases.get(key, key)
+
+
+def read_rows(filename, data, required=REQUIRED_COLUMNS, aliases=COLUMN_ALIASES, max_rows=MAX_ROWS):
+    """(row number, {column: value}) pairs of a CSV or XLSX upload; the
+    column names and limits default to the student import's"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'xlsx':
+        if openpyxl is None:
+            raise ImportFileError('XLSX import needs the openpyxl package; upload a CSV file instead')
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    elif extension == 'csv':
+        rows = csv.reader(io.StringIO(data.decode('utf-8-sig')))
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file')
+
+    header = next(rows, None)
+    if not header:
+        raise ImportFileError('The file is empty')
+    columns = [normalize_header(name, aliases) for name in header]
+    missing = [column for column in required if column not in columns]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+
+    result = []
+    for number, values in enumerate(rows, start=2):
+        values = ['' if value is None else str(value).strip() for value in values]
+        if not any(values):
+            continue  # blank line
+        result.append((number, dict(zip(columns, values))))
+        if len(result) > max_rows:
+            raise ImportFileError(f'At most {max_rows} rows can be imported at once')
+    return result
+
+
+class SectionResolver:
+    """Section ids by name for one school, from a single query"""
+
+    def __init__(self, school_id):
+        self.by_name = {}
+        for section in Section.query.filter_by(school_id=school_id).all():
+            self.by_name.setdefault(section.name.strip().lower(), []).append(section)
+        self.ids = {section.id for sections in self.by_name.values() for section in sections}
+
+    def resolve(self, value, grade_level):
+        """(section id, error)"""
+        if value.isdigit() and int(value) in self.ids:
+            return int(value), None
+        candidates = self.by_name.get(value.lower(), [])
+        if len(candidates) > 1:
+            # The same section name in several grades: the grade decides
+            candidates = [section for section in candidates
+                          if section.grade_level.strip().lower() == grade_level.lower()]
+        if len(candidates) == 1:
+            return candidates[0].id, None
+        if not candidates:
+            return None, f"Unknown section '{value}'"
+        return None, f"Section '{value}' is ambiguous, check the grade level"
+
+
+class CodeGenerator:
+    """Unique student codes checked against one preloaded set"""
+
+    def __init__(self):
+        self.taken = {code for (code,) in db.session.query(Student.code).filter(Student.code.isnot(None))}
+
+    def generate(self):
+        while True:
+            code = ''.join(random.choices(CODE_ALPHABET, k=CODE_LENGTH))
+            if code not in self.taken:
+                self.taken.add(code)
+                return code
+
+
+def validate_rows(rows, school_id):
+    """Split rows into insertable student dicts and per-row errors"""
+    sections = SectionResolver(school_id)
+    valid, errors = [], []
+    for number, row in rows:
+        problems = [f'{column} is required' for column in REQUIRED_COLUMNS if not row.get(column)]
+        problems += [f'{column} is longer than {limit} characters'
+                     for column, limit in MAX_LENGTHS.items() if len(row.get(column) or '') > limit]
+        section_id = None
+        if row.get('section'):
+            section_id, error = sections.resolve(row['section'], row.get('grade_level') or '')
+            if error:
+                problems.append(error)
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+            continue
+        valid.append((number, {
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'grade_level': row['grade_level'],
+            'section_id': section_id,
+            'parent_contact': row.get('parent_contact') or None,
+            'school_id': school_id,
+            'telegram_status': False,
+        }))
+    return valid, errors
+
+
+def import_students(rows, school_id, dry_run=False, chunk_size=CHUNK_SIZE):
+    """Validate and insert parsed rows; returns a summary with per-row errors.
+
+    Each chunk is committed on its own, so a database error only fails the
+    rows of that chunk.
+    """
+    valid, errors = validate_rows(rows, school_id)
+    summary = {'total_rows': len(rows), 'imported': 0, 'failed': len(errors),
+               'errors': errors, 'students': [], 'dry_run': dry_run}
+    if dry_run or not valid:
+        summary['valid'] = len(valid)
+        return summary
+
+    codes = CodeGenerator()
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        for _, student in chunk:
+            student['code'] = codes.generate()
+        try:
+            db.session.execute(insert(Student), [student for _, student in chunk])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            summary['failed'] += len(chunk)
+            errors.extend({'row': number, 'errors': [f'Database error: {e}']} for number, _ in chunk)
+            continue
+        # executemany does not return ids on MySQL; read them back by code
+        chunk_codes = [student['code'] for _, student in chunk]
+        ids = dict(db.session.query(Student.code, Student.id)
+                   .filter(Student.school_id == school_id, Student.code.in_(chunk_codes)).all())
+        for number, student in chunk:
+            summary['students'].append(dict(student, id=ids.get(student['code']), row=number))
+        summary['imported'] += len(chunk)
+
+    errors.sort(key=lambda error: error['row'])
+    return summary
@@ -3,59 +3,72 @@ Telegram Bot Handler for Student Registration
 This module handles Telegram bot interactions for linking students to their chat IDs
 """
 
-import requests
+import logging
+
 from database import db
-from models import Student, School, TelegramConfig
-from sqlalchemy import func
+from models import Student, School
+from registration_index import registration_index
+from telegram_provider import get_bot, get_bot_for_config, other_bot_for_school
+from telegram_transport import get_transport, TransportError
+from notification_outbox import enqueue_telegram, wake_dispatcher
+from message_templates import format_attendance
+from dashboard_cache import invalidate_section
 import os
 import json
 
+logger = logging.getLogger(__name__)
+
+def telegram_api_base():
+    """Bot API root, overridable through TELEGRAM_API_BASE (local stubs, proxies)"""
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return current_app.config.get('TELEGRAM_API_BASE', 'https://api.telegram.org')
+    return 'https://api.telegram.org'
+
 class TelegramBot:
     def __init__(self, bot_token, school_id):
         self.bot_token = bot_token
         self.school_id = school_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.base_url = f"{telegram_api_base()}/bot{bot_token}"
     
     def send_message(self, chat_id, text, parse_mode='HTML'):
-        """Send a message to a Telegram chat"""
-        try:
-            url = f"{self.base_url}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': text,
-                'parse_mode': parse_mode
-            }
-            response = requests.post(url, json=data)
-            return response.status_code == 200
-        except Exception as e:
-            print(f"Error sending message: {str(e)}")
-            return False
+        """Send a message to a Telegram chat. Transient failures are deferred
+        for retry by the transport and reported as not sent (False)."""
+        data = {
+            'chat_id': chat_id,
+            'text': text,
+            'parse_mode': parse_mode
+        }
+        result = get_transport().send(self.base_url, 'sendMessage', data)
+        return bool(result and result.get('ok'))
     
     def set_webhook(self, webhook_url):
         """Set webhook URL for the bot"""
         try:
-            url = f"{self.base_url}/setWebhook"
-            data = {'url': webhook_url}
-            response = requests.post(url, json=data)
-            return response.json()
-        except Exception as e:
-            print(f"Error setting webhook: {str(e)}")
+            return get_transport().call(self.base_url, 'setWebhook', {'url': webhook_url})
+        except TransportError as e:
+            logger.warning("Error setting webhook: %s", e)
             return None
     
     def get_bot_info(self):
         """Get bot information"""
         try:
-            url = f"{self.base_url}/getMe"
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Error getting bot info: {str(e)}")
+            return get_transport().call(self.base_url, 'getMe', http_method='GET')
+        except TransportError as e:
+            logger.warning("Error getting bot info: %s", e)
             return None
 
-def process_telegram_update(update_data, school_id):
-    """Process incoming Telegram update and handle student registration"""
+def call_bot_api(bot_token, method, payload=None, http_method='POST'):
+    """One Bot API call for the admin pages (bot tests, test messages). Never
+    deferred, so the caller can report the outcome; raises TransportError."""
+    data = get_transport().call(f"{telegram_api_base()}/bot{bot_token}", method, payload, http_method=http_method)
+    if not data.get('ok'):
+        raise TransportError(f"{method} failed: {data.get('description', 'unknown error')}")
+    return data.get('result')
+
+def process_telegram_update(update_data, school_id, bot=None):
+    """Process incoming Telegram update and handle student registration.
+    A school_id of None accepts students of any school (global bot)."""
     try:
         if 'message' not in update_data:
             return {'status': 'ok', 'message': 'No message in update'}
@@ -63,15 +76,14 @@ def process_telegram_update(update_data, school_id):
         message = update_data['message']
         chat_id = str(message['chat']['id'])
         text = message.get('text', '').strip()
-        first_name = message['from'].get('first_name', '')
-        username = message['from'].get('username', '')
+        first_name = message.get('from', {}).get('first_name', '')
+        username = message.get('from', {}).get('username', '')
         
-        # Get global bot configuration (active bot)
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
-            return {'status': 'error', 'message': 'No active bot configuration found'}
-        
-        bot = TelegramBot(bot_config.bot_token, school_id)
+        if bot is None:
+            # Cached client for the active bot
+            bot = get_bot(school_id)
+            if not bot:
+                return {'status': 'error', 'message': 'No active bot configuration found'}
         
         # Check if this is a /start command with parameters
         if text.startswith('/start '):
@@ -86,9 +98,30 @@ def process_telegram_update(update_data, school_id):
             return send_help_message(chat_id, school_id, bot)
             
     except Exception as e:
-        print(f"Error processing update: {str(e)}")
+        logger.exception("Error processing update")
         return {'status': 'error', 'message': str(e)}
 
+def process_telegram_updates(updates, school_id, config_id=None):
+    """Process a batch of updates received by one bot, resolving the bot once"""
+    bot = get_bot_for_config(config_id, school_id) if config_id else get_bot(school_id)
+    if not bot:
+        return [{'status': 'error', 'message': 'No active bot configuration found'} for _ in updates]
+    return [process_telegram_update(update, school_id, bot) for update in updates]
+
+def wrong_bot_message(student, config):
+    """Reply sent when a student is registered through a bot that does not serve their school"""
+    school_name = student.school.name if student.school else "Your school"
+    return (f"⚠️ {school_name} sends its notifications through @{config.bot_username}.\n\n"
+            f"Please open @{config.bot_username} and send your registration there.")
+
+def refuse_other_bot(student, chat_id, bot):
+    """Tell the parent to use the bot serving the student's school, if this is not it"""
+    config = other_bot_for_school(student.school_id, bot.bot_token)
+    if config is None:
+        return False
+    bot.send_message(chat_id, wrong_bot_message(student, config))
+    return True
+
 def handle_start_command(text, chat_id, school_id, bot):
     """Handle /start command with student code"""
     try:
@@ -102,10 +135,10 @@ def handle_start_command(text, chat_id, school_id, bot):
         student_code = parts[1].strip().upper()
         
         # Find student with matching code and school
-        student = Student.query.filter_by(
-            code=student_code,
-            school_id=school_id
-        ).first()
+        query = Student.query.filter_by(code=student_code)
+        if school_id is not None:
+            query = query.filter_by(school_id=school_id)
+        student = query.first()
         
         if not student:
             bot.send_message(chat_id,
@@ -113,6 +146,9 @@ def handle_start_command(text, chat_id, school_id, bot):
                 "If you continue to have issues, please contact your school administrator.")
             return {'status': 'error', 'message': 'Student not found'}
         
+        if refuse_other_bot(student, chat_id, bot):
+            return {'status': 'error', 'message': 'Student is served by another bot'}
+        
         # Check if student is already linked to another chat
         if student.telegram_chat_id and student.telegram_chat_id != chat_id:
             bot.send_message(chat_id,
@@ -125,6 +161,7 @@ def handle_start_command(text, chat_id, school_id, bot):
         student.telegram_chat_id = chat_id
         student.telegram_status = True
         db.session.commit()
+        invalidate_section(student.section_id)
         
         # Emit real-time Telegram connection update
         try:
@@ -135,8 +172,8 @@ def handle_start_command(text, chat_id, school_id, bot):
                     'student_id': student.id,
                     'student_name': f"{student.first_name} {student.last_name}"
                 }, room=f'school_{student.school_id}')
-        except Exception as e:
-            print(f"Socket.IO emit error: {e}")
+        except Exception:
+            logger.exception("Socket.IO emit error")
         
         # Send confirmation message
         school_name = student.school.name if student.school else "your school"
@@ -152,7 +189,7 @@ def handle_start_command(text, chat_id, school_id, bot):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error in start command: {str(e)}")
+        logger.exception("Error in start command")
         bot.send_message(chat_id, "❌ An error occurred while linking your account. Please try again later.")
         return {'status': 'error', 'message': str(e)}
 
@@ -168,55 +205,52 @@ def handle_manual_registration(text, chat_id, school_id, bot):
                 "Example: 'GREENFIELD ABC123' or 'ABC123 GREENFIELD'")
             return {'status': 'error', 'message': 'Insufficient parameters'}
         
-        # Try different combinations of school name and student code
-        for i in range(len(parts)):
-            for j in range(len(parts)):
-                if i != j:
-                    potential_code = parts[i]
-                    potential_school = parts[j]
-                    
-                    # Find student by code and check if school name matches
-                    student = Student.query.join(School).filter(
-                        Student.code == potential_code,
-                        Student.school_id == school_id,
-                        func.upper(School.name).contains(potential_school)
-                    ).first()
-                    
-                    if student:
-                        # Check if already linked to another chat
-                        if student.telegram_chat_id and student.telegram_chat_id != chat_id:
-                            bot.send_message(chat_id,
-                                f"⚠️ This student code is already linked to another account.\n"
-                                f"Student: {student.first_name} {student.last_name}")
-                            return {'status': 'error', 'message': 'Already linked'}
-                        
-                        # Update student's telegram info
-                        student.telegram_chat_id = chat_id
-                        student.telegram_status = True
-                        db.session.commit()
-                        
-                        # Emit real-time Telegram connection update
-                        try:
-                            from flask import current_app
-                            if hasattr(current_app, 'socketio'):
-                                current_app.socketio.emit('telegram_connected', {
-                                    'school_id': student.school_id,
-                                    'student_id': student.id,
-                                    'student_name': f"{student.first_name} {student.last_name}"
-                                }, room=f'school_{student.school_id}')
-                        except Exception as e:
-                            print(f"Socket.IO emit error: {e}")
-                        
-                        # Send confirmation message
-                        bot.send_message(chat_id,
-                            f"✅ <b>Successfully linked!</b>\n\n"
-                            f"👤 <b>Student:</b> {student.first_name} {student.last_name}\n"
-                            f"🏫 <b>School:</b> {student.school.name}\n"
-                            f"📚 <b>Grade:</b> {student.grade_level}\n\n"
-                            f"You will now receive attendance notifications.")
-                        
-                        return {'status': 'success', 'linked': True, 'student_id': student.id}
-        
+        # Resolve the code and school words through the in-memory index, then
+        # confirm each candidate with a single primary key query
+        for student_id, code in registration_index.resolve(parts, school_id):
+            student = Student.query.filter_by(id=student_id, code=code).first()
+            if student and school_id is not None and student.school_id != school_id:
+                student = None
+            
+            if student:
+                if refuse_other_bot(student, chat_id, bot):
+                    return {'status': 'error', 'message': 'Student is served by another bot'}
+                
+                # Check if already linked to another chat
+                if student.telegram_chat_id and student.telegram_chat_id != chat_id:
+                    bot.send_message(chat_id,
+                        f"⚠️ This student code is already linked to another account.\n"
+                        f"Student: {student.first_name} {student.last_name}")
+                    return {'status': 'error', 'message': 'Already linked'}
+                
+                # Update student's telegram info
+                student.telegram_chat_id = chat_id
+                student.telegram_status = True
+                db.session.commit()
+                invalidate_section(student.section_id)
+                
+                # Emit real-time Telegram connection update
+                try:
+                    from flask import current_app
+                    if hasattr(current_app, 'socketio'):
+                        current_app.socketio.emit('telegram_connected', {
+                            'school_id': student.school_id,
+                            'student_id': student.id,
+                            'student_name': f"{student.first_name} {student.last_name}"
+                        }, room=f'school_{student.school_id}')
+                except Exception:
+                    logger.exception("Socket.IO emit error")
+                
+                # Send confirmation message
+                bot.send_message(chat_id,
+                    f"✅ <b>Successfully linked!</b>\n\n"
+                    f"👤 <b>Student:</b> {student.first_name} {student.last_name}\n"
+                    f"🏫 <b>School:</b> {student.school.name}\n"
+                    f"📚 <b>Grade:</b> {student.grade_level}\n\n"
+                    f"You will now receive attendance notifications.")
+                
+                return {'status': 'success', 'linked': True, 'student_id': student.id}
+
         # If no match found
         bot.send_message(chat_id,
             "❌ No matching student found. Please check:\n"
@@ -230,7 +264,7 @@ def handle_manual_registration(text, chat_id, school_id, bot):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error in manual registration: {str(e)}")
+        logger.exception("Error in manual registration")
         bot.send_message(chat_id, "❌ An error occurred. Please try again later.")
         return {'status': 'error', 'message': str(e)}
 
@@ -238,7 +272,7 @@ def send_help_message(chat_id, school_id, bot):
     """Send help message to user"""
     try:
         # Get school information
-        school = School.query.get(school_id)
+        school = School.query.get(school_id) if school_id is not None else None
         school_name = school.name if school else "the school"
         
         help_text = (
@@ -260,7 +294,7 @@ def send_help_message(chat_id, school_id, bot):
         return {'status': 'ok', 'message': 'Help sent'}
         
     except Exception as e:
-        print(f"Error sending help: {str(e)}")
+        logger.exception("Error sending help")
         return {'status': 'error', 'message': str(e)}
 
 def send_attendance_notification(student_id, message, notification_type='info'):
@@ -270,13 +304,11 @@ def send_attendance_notification(student_id, message, notification_type='info'):
         if not student or not student.telegram_status or not student.telegram_chat_id:
             return False
         
-        # Get global bot configuration (active bot)
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
+        # Cached client for the active bot
+        bot = get_bot(student.school_id)
+        if not bot:
             return False
         
-        bot = TelegramBot(bot_config.bot_token, student.school_id)
-        
         # Format message based on type
         if notification_type == 'absent':
             emoji = '🔴'
@@ -301,8 +333,8 @@ def send_attendance_notification(student_id, message, notification_type='info'):
         
         return bot.send_message(student.telegram_chat_id, formatted_message)
         
-    except Exception as e:
-        print(f"Error sending attendance notification: {str(e)}")
+    except Exception:
+        logger.exception("Error sending attendance notification")
         return False
 
 def broadcast_message_to_school(school_id, message, grade_level=None, section_id=None):
@@ -327,55 +359,38 @@ def broadcast_message_to_school(school_id, message, grade_level=None, section_id
         if not students:
             return {'status': 'error', 'message': 'No connected students found'}
         
-        # Get global bot configuration (active bot)
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
-            return {'status': 'error', 'message': 'No active bot configuration found'}
-        
-        bot = TelegramBot(bot_config.bot_token, school_id)
-        
-        # Send to all students
-        sent_count = 0
-        failed_count = 0
-        
+        # Queue one outbox row per student in a single transaction; the
+        # notification dispatcher sends them and retries failures
         for student in students:
-            try:
-                formatted_message = (
-                    f"📢 <b>SCHOOL ANNOUNCEMENT</b>\n\n"
-                    f"👤 <b>Dear {student.first_name},</b>\n\n"
-                    f"{message}\n\n"
-                    f"<i>From: {student.school.name}</i>"
-                )
-                
-                if bot.send_message(student.telegram_chat_id, formatted_message):
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                print(f"Failed to send to student {student.id}: {str(e)}")
-                failed_count += 1
+            formatted_message = (
+                f"📢 <b>SCHOOL ANNOUNCEMENT</b>\n\n"
+                f"👤 <b>Dear {student.first_name},</b>\n\n"
+                f"{message}\n\n"
+                f"<i>From: {student.school.name}</i>"
+            )
+            enqueue_telegram(student.id, school_id, formatted_message)
+        
+        db.session.commit()
+        wake_dispatcher()
         
         return {
             'status': 'success',
-            'sent_count': sent_count,
-            'failed_count': failed_count,
+            'queued_count': len(students),
             'total_students': len(students)
         }
         
     except Exception as e:
-        print(f"Error broadcasting message: {str(e)}")
+        db.session.rollback()
+        logger.exception("Error broadcasting message")
         return {'status': 'error', 'message': str(e)}
 
 # Example usage functions
 def setup_webhook_for_school(school_id, webhook_url):
     """Setup webhook for a school's bot"""
     try:
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
+        bot = get_bot(school_id)
+        if not bot:
             return {'status': 'error', 'message': 'No active bot configuration found'}
-        
-        bot = TelegramBot(bot_config.bot_token, school_id)
         result = bot.set_webhook(webhook_url)
         
         if result and result.get('ok'):
@@ -389,11 +404,9 @@ def setup_webhook_for_school(school_id, webhook_url):
 def test_bot_connection(school_id):
     """Test if bot is properly configured and responsive"""
     try:
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
+        bot = get_bot(school_id)
+        if not bot:
             return {'status': 'error', 'message': 'No active bot configuration found'}
-        
-        bot = TelegramBot(bot_config.bot_token, school_id)
         bot_info = bot.get_bot_info()
         
         if bot_info and bot_info.get('ok'):
@@ -408,57 +421,38 @@ def test_bot_connection(school_id):
     except Exception as e:
         return {'status': 'error', 'message': str(e)}
 
+def format_attendance_notification(student_name, subject_name, date, status, start_time, end_time):
+    """HTML text of a per-class attendance notification"""
+    return format_attendance(student_name, subject_name, date, status, start_time, end_time, html=True)
+
 def send_attendance_notification(student_id, subject_name, date, status, start_time, end_time, school_id):
     """Send attendance notification to student via Telegram"""
     try:
         # Get student information including telegram_chat_id
         student = Student.query.get(student_id)
         if not student or not student.telegram_chat_id:
-            print(f"Student {student_id} not found or no telegram_chat_id")
+            logger.warning("Student %s not found or has no telegram_chat_id", student_id)
             return False
         
-        # Get global bot configuration (active bot)
-        bot_config = TelegramConfig.query.filter_by(is_active=True).first()
-        if not bot_config:
-            print(f"No active bot configuration found")
+        # Cached client for the active bot
+        bot = get_bot(school_id)
+        if not bot:
+            logger.warning("No active bot configuration for school %s", school_id)
             return False
         
-        bot = TelegramBot(bot_config.bot_token, school_id)
-        
-        # Create attendance notification message
-        status_emoji = {
-            'Present': '✅',
-            'Absent': '❌',
-            'Late': '🕐',
-            'Excused': '📝'
-        }
-        
-        emoji = status_emoji.get(status, '📝')
         student_name = f"{student.first_name} {student.last_name}"
-        
-        message = f"""
-📚 <b>Attendance Notification</b>
-
-👤 <b>Name:</b> {student_name}
-📖 <b>Subject:</b> {subject_name}
-📅 <b>Date:</b> {date}
-🕐 <b>Time:</b> {start_time} - {end_time}
-{emoji} <b>Status:</b> {status}
-
----
-This is an automated message from your school attendance system.
-        """.strip()
+        message = format_attendance_notification(student_name, subject_name, date, status, start_time, end_time)
         
         # Send the message
         success = bot.send_message(student.telegram_chat_id, message, parse_mode='HTML')
         
         if success:
-            print(f"Attendance notification sent to {student_name} (ID: {student_id})")
+            logger.debug("Attendance notification sent to student %s", student_id)
         else:
-            print(f"Failed to send notification to {student_name} (ID: {student_id})")
+            logger.warning("Failed to send notification to student %s", student_id)
             
         return success
         
-    except Exception as e:
-        print(f"Error sending attendance notification: {str(e)}")
-        return False
\ No newline at end of file
+    except Exception:
+        logger.exception("Error sending attendance notification")
+        return False
@@ -0,0 +1,201 @@
+"""
+Asynchronous Telegram Webhook Ingestion
+The webhook only validates an update, records its update_id and queues it, so
+Telegram gets its 200 straight away and never retries because of a slow
+database or a slow sendMessage. Worker threads then process queued updates in
+small batches and send the replies grouped per chat.
+
+With several bots, each bot's webhook carries its config id. update_ids are
+only unique per bot, so dedupe and reply batching are keyed by bot as well,
+and replies go out through the bot that received the update.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from telegram_transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+BUSY = 'busy'
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+_reply_context = threading.local()
+
+
+class UpdateDeduper:
+    """Remembers the most recent (bot, update_id) keys, oldest forgotten first"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Record a key; False if it was already seen"""
+        with self._lock:
+            if key in self._ids:
+                self._ids.move_to_end(key)
+                return False
+            self._ids[key] = True
+            if len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._ids.pop(key, None)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def validate_update(update):
+    """Basic shape check of a Telegram update"""
+    return isinstance(update, dict) and isinstance(update.get('update_id'), int)
+
+
+def queue_reply(chat_id, text, parse_mode='HTML'):
+    """Buffer a reply when running inside an ingest batch.
+
+    Returns False outside a batch so callers fall back to sending directly.
+    """
+    replies = getattr(_reply_context, 'replies', None)
+    if replies is None:
+        return False
+    key = (_reply_context.config_id, str(chat_id), parse_mode)
+    replies.setdefault(key, []).append(text)
+    return True
+
+
+def merge_replies(texts, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Join the replies for one chat into as few messages as the size limit allows"""
+    messages = []
+    current = ''
+    for text in texts:
+        candidate = f"{current}\n\n{text}" if current else text
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            messages.append(current)
+        current = text
+    if current:
+        messages.append(current)
+    return messages
+
+
+def current_config_id():
+    """Bot that received the update being processed, None outside a batch"""
+    return getattr(_reply_context, 'config_id', None)
+
+
+def post_message(api_base, bot_token, chat_id, text, parse_mode='HTML'):
+    """Call sendMessage once through the shared transport; True when delivered.
+    Transient failures are deferred by the transport and retried later."""
+    result = get_transport().send(
+        f"{api_base}/bot{bot_token}",
+        'sendMessage',
+        {'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode}
+    )
+    return bool(result and result.get('ok'))
+
+
+class WebhookIngestor:
+    """Bounded queue of updates drained by a pool of worker threads"""
+
+    def __init__(self, app, handler, sender, workers=4, queue_size=1000,
+                 dedupe_size=10000, batch_size=20):
+        self.app = app
+        self.handler = handler
+        self.sender = sender
+        self.batch_size = batch_size
+        self.deduper = UpdateDeduper(dedupe_size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {'accepted': 0, 'duplicates': 0, 'invalid': 0, 'busy': 0,
+                      'processed': 0, 'failed': 0, 'replies_sent': 0}
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f'telegram-ingest-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, update, config_id=None):
+        """Validate, dedupe and enqueue an update without doing any I/O"""
+        if not validate_update(update):
+            self._count('invalid')
+            return INVALID
+        key = (config_id, update['update_id'])
+        if not self.deduper.add(key):
+            self._count('duplicates')
+            return DUPLICATE
+        try:
+            self.queue.put_nowait((config_id, update))
+        except queue.Full:
+            # Forget the id so Telegram's retry is accepted once there is room
+            self.deduper.discard(key)
+            self._count('busy')
+            return BUSY
+        self._count('accepted')
+        return ACCEPTED
+
+    def join(self, timeout=None):
+        """Wait until every queued update has been processed (used by scripts and tests)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _process(self, batch):
+        with self.app.app_context():
+            _reply_context.replies = {}
+            try:
+                for config_id, update in batch:
+                    _reply_context.config_id = config_id
+                    try:
+                        result = self.handler(update)
+                        if isinstance(result, dict) and result.get('status') == 'error':
+                            self._count('failed')
+                            logger.warning("Update %s failed: %s", update['update_id'], result.get('message'))
+                        else:
+                            self._count('processed')
+                    except Exception:
+                        self._count('failed')
+                        logger.exception("Error processing update %s", update.get('update_id'))
+                replies = _reply_context.replies
+            finally:
+                _reply_context.replies = None
+                _reply_context.config_id = None
+
+            for (config_id, chat_id, parse_mode), texts in replies.items():
+                for text in merge_replies(texts):
+                    if self.sender(chat_id, text, parse_mode, config_id):
+                        self._count('replies_sent')
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Long-polling Telegram Ingestion
+Alternative to the ngrok webhook: pulls updates with getUpdates and feeds them
+to telegram_bot.process_telegram_updates in batches. One runner is started per
+active bot.
+
+Calling getUpdates with an offset tells Telegram to discard every earlier
+update, so the runner only asks for the next offset once the current batch
+has been handled:
+
+    getUpdates(offset) -> handler(batch) -> save offset -> getUpdates(next)
+
+If the handler raises (the database is unreachable, say) the offset stays
+where it was and the same batch is fetched again after retry_delay, so
+delivery is at least once. Errors in a single update are caught and logged
+by telegram_bot itself and never hold the batch up. Offsets are written to a
+small JSON file (atomic replace); on restart polling resumes from the last
+handled batch.
+
+Bot API calls go through the shared transport (telegram_transport.py), so
+its timeouts and circuit breaker apply to polling too.
+
+Usage: python telegram_polling.py [--school-id ID] [--limit 100] [--timeout 30]
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+from telegram_transport import get_transport, TransportError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OFFSET_PATH = 'instance/telegram_offsets.json'
+
+
+class OffsetStore:
+    """Next getUpdates offset per bot, persisted to a JSON file"""
+
+    def __init__(self, path=DEFAULT_OFFSET_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._offsets = json.load(f)
+
+    def get(self, bot_key):
+        with self._lock:
+            return self._offsets.get(bot_key)
+
+    def save(self, bot_key, offset):
+        with self._lock:
+            self._offsets[bot_key] = offset
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._offsets, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+class PollingRunner:
+    """Fetches update batches with getUpdates and handles them one at a time"""
+
+    def __init__(self, app, bot_token, school_id=None, handler=None, offsets=None,
+                 api_base='https://api.telegram.org', limit=100, poll_timeout=30,
+                 retry_delay=5, config_id=None):
+        if handler is None:
+            from telegram_bot import process_telegram_updates
+            handler = process_telegram_updates
+        self.app = app
+        self.bot_token = bot_token
+        self.bot_key = bot_token.split(':', 1)[0]  # numeric bot id, never the secret
+        self.school_id = school_id
+        self.config_id = config_id
+        self.handler = handler
+        self.offsets = offsets or OffsetStore()
+        self.api_base = api_base
+        self.base_url = f"{api_base}/bot{bot_token}"
+        self.limit = max(1, min(limit, 100))  # Bot API maximum
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        with app.app_context():
+            self.transport = get_transport()
+        self.stats = {'polls': 0, 'updates': 0, 'batches': 0, 'errors': 0, 'refetched': 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Run the polling loop on a daemon thread"""
+        self.delete_webhook()
+        self._thread = threading.Thread(target=self._run, name='telegram-poll', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def delete_webhook(self):
+        """getUpdates is refused while a webhook is set"""
+        try:
+            self.transport.call(self.base_url, 'deleteWebhook', {'drop_pending_updates': False})
+        except TransportError as e:
+            logger.warning("Could not delete webhook: %s", e)
+
+    def fetch(self, offset):
+        """One getUpdates call; returns the list of updates"""
+        params = {'timeout': self.poll_timeout, 'limit': self.limit, 'allowed_updates': ['message']}
+        if offset is not None:
+            params['offset'] = offset
+        data = self.transport.call(self.base_url, 'getUpdates', params,
+                                   timeout=(self.transport.timeout[0], self.poll_timeout + 10))
+        if not data.get('ok'):
+            raise TransportError(f"getUpdates failed: {data.get('description', 'unknown error')}")
+        return data['result']
+
+    def _run(self):
+        offset = self.offsets.get(self.bot_key)
+        while not self._stop.is_set():
+            try:
+                updates = self.fetch(offset)
+                self.stats['polls'] += 1
+            except TransportError as e:
+                self.stats['errors'] += 1
+                logger.warning("getUpdates failed: %s", e)
+                self._stop.wait(self.retry_delay)
+                continue
+            if not updates:
+                continue
+            if self._process(updates):
+                offset = updates[-1]['update_id'] + 1
+                self.offsets.save(self.bot_key, offset)
+            else:
+                # Keep the offset: Telegram sends the same batch again
+                self.stats['refetched'] += 1
+                self._stop.wait(self.retry_delay)
+
+    def _process(self, updates):
+        """Run the handler on a batch; False if it raised"""
+        try:
+            with self.app.app_context():
+                self.handler(updates, self.school_id, self.config_id)
+        except Exception:
+            self.stats['errors'] += 1
+            logger.exception("Handling updates %s failed, fetching them again in %ss",
+                             [update.get('update_id') for update in updates], self.retry_delay)
+            return False
+        self.stats['updates'] += len(updates)
+        self.stats['batches'] += 1
+        return True
+
+
+def create_runners(app, school_id=None):
+    """One runner per active bot using the app's configuration"""
+    from telegram_provider import get_active_configs
+
+    with app.app_context():
+        configs = get_active_configs()
+    if not configs:
+        raise RuntimeError('No active bot configuration found')
+
+    offsets = OffsetStore(app.config.get('TELEGRAM_OFFSET_PATH', DEFAULT_OFFSET_PATH))
+    return [
+        PollingRunner(
+            app,
+            config.bot_token,
+            school_id=school_id,
+            config_id=config.id,
+            offsets=offsets,
+            api_base=app.config.get('TELEGRAM_API_BASE', 'https://api.telegram.org'),
+            limit=app.config.get('TELEGRAM_POLL_LIMIT', 100),
+            poll_timeout=app.config.get('TELEGRAM_POLL_TIMEOUT', 30)
+        )
+        for config in configs
+    ]
+
+
+def create_polling_app():
+    """Minimal app with just the database, no blueprints or Socket.IO"""
+    from app_factory import create_script_app
+    return create_script_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telegram long-polling runner')
+    parser.add_argument('--school-id', type=int, default=None,
+                        help='only register students of this school (default: any school)')
+    parser.add_argument('--limit', type=int, default=None, help='updates per getUpdates call (max 100)')
+    parser.add_argument('--timeout', type=int, default=None, help='long-poll timeout in seconds')
+    args = parser.parse_args()
+
+    app = create_polling_app()
+    if args.limit:
+        app.config['TELEGRAM_POLL_LIMIT'] = args.limit
+    if args.timeout:
+        app.config['TELEGRAM_POLL_TIMEOUT'] = args.timeout
+
+    runners = [runner.start() for runner in create_runners(app, args.school_id)]
+    print(f"📡 Polling Telegram updates for {len(runners)} bot(s) "
+          f"(offset file: {runners[0].offsets.path})")
+    try:
+        while True:
+            time.sleep(60)
+            for runner in runners:
+                print(f"📊 bot {runner.bot_key}: {runner.stats}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping poller...")
+        for runner in runners:
+            runner.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Active Telegram Bot Provider
+Caches the active TelegramConfig rows, the school-to-bot assignments and the
+TelegramBot clients built from them so send paths stop querying
+telegram_config before every message.
+
+Several bots can be active at once to spread notifications over their rate
+limits. A school is served by:
+    1. the bot pinned to it in school_telegram_bots, if that bot is active
+    2. otherwise a bot picked by consistent hashing of the school id, so
+       adding or removing a bot only moves about 1/n of the schools
+
+With a single active bot every school maps to it, exactly as before. Since
+a bot can only message chats that talked to it, registration refuses to link
+a student through any other bot than the one serving the student's school.
+
+The cache is per process. Endpoints that change bot configurations or
+assignments call invalidate_telegram_config(); other workers pick the change
+up once the TTL (TELEGRAM_CONFIG_TTL, default 30 seconds) runs out.
+"""
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30
+RING_REPLICAS = 64  # virtual nodes per bot on the hash ring
+
+# Plain snapshot of a TelegramConfig row, safe to share between threads and
+# sessions unlike the ORM instance
+BotConfig = namedtuple('BotConfig', ['id', 'bot_token', 'bot_username'])
+
+
+def _ring_hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+def build_ring(config_ids, replicas=RING_REPLICAS):
+    """Sorted (hash, config_id) points of a consistent hash ring"""
+    return sorted(
+        (_ring_hash(f'bot:{config_id}:{replica}'), config_id)
+        for config_id in config_ids
+        for replica in range(replicas)
+    )
+
+
+def ring_lookup(ring, school_id):
+    """Config id owning a school on the ring"""
+    if not ring:
+        return None
+    index = bisect.bisect(ring, (_ring_hash(f'school:{school_id}'),))
+    return ring[index % len(ring)][1]
+
+
+class TelegramProvider:
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._configs = {}      # config id -> BotConfig, active bots only
+        self._primary = None    # lowest id active bot, used when no school is known
+        self._assignments = {}  # school_id -> config id
+        self._ring = []
+        self._loaded_at = None
+        self._bots = {}         # (bot_token, school_id) -> TelegramBot
+
+    def _expired(self):
+        if self._loaded_at is None:
+            return True
+        ttl = self.ttl
+        try:
+            from flask import current_app, has_app_context
+            if has_app_context():
+                ttl = current_app.config.get('TELEGRAM_CONFIG_TTL', ttl)
+        except ImportError:
+            pass
+        return time.time() - self._loaded_at > ttl
+
+    def _load(self):
+        if not self._expired():
+            return
+        from database import db
+        from models import TelegramConfig, SchoolTelegramBot
+
+        rows = TelegramConfig.query.filter_by(is_active=True).order_by(TelegramConfig.id).all()
+        configs = {row.id: BotConfig(row.id, row.bot_token, row.bot_username) for row in rows}
+        try:
+            assignments = dict(db.session.query(SchoolTelegramBot.school_id,
+                                                SchoolTelegramBot.telegram_config_id).all())
+        except Exception as e:
+            # Table missing until create_telegram_bot_tables.py has run
+            db.session.rollback()
+            logger.warning("Bot assignments unavailable, hashing all schools: %s", e)
+            assignments = {}
+
+        with self._lock:
+            if configs != self._configs:
+                self._bots = {}
+                self._ring = build_ring(list(configs))
+            self._configs = configs
+            self._primary = next(iter(configs.values()), None)
+            self._assignments = assignments
+            self._loaded_at = time.time()
+
+    def active_config(self):
+        """Snapshot of the primary active bot, None when no bot is active"""
+        self._load()
+        return self._primary
+
+    def active_configs(self):
+        """Snapshots of every active bot, by id"""
+        self._load()
+        return list(self._configs.values())
+
+    def config_by_id(self, config_id):
+        """Active bot with this id, falling back to the primary bot"""
+        self._load()
+        return self._configs.get(config_id) or self._primary
+
+    def config_for_school(self, school_id):
+        """Bot that serves a school"""
+        self._load()
+        if school_id is None:
+            return self._primary
+        with self._lock:
+            config_id = self._assignments.get(school_id)
+            if config_id not in self._configs:
+                config_id = ring_lookup(self._ring, school_id)
+            return self._configs.get(config_id, self._primary)
+
+    def is_pinned(self, school_id):
+        self._load()
+        return self._assignments.get(school_id) in self._configs
+
+    def bot(self, school_id=None):
+        """TelegramBot client for the bot serving a school"""
+        return self._client(self.config_for_school(school_id), school_id)
+
+    def bot_for_config(self, config_id, school_id=None):
+        """TelegramBot client for a specific active bot"""
+        return self._client(self.config_by_id(config_id), school_id)
+
+    def _client(self, config, school_id):
+        if config is None:
+            return None
+        key = (config.bot_token, school_id)
+        with self._lock:
+            bot = self._bots.get(key)
+            if bot is None:
+                from telegram_bot import TelegramBot
+                bot = TelegramBot(config.bot_token, school_id)
+                self._bots[key] = bot
+            return bot
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+provider = TelegramProvider()
+
+
+def get_active_config():
+    return provider.active_config()
+
+
+def get_active_configs():
+    return provider.active_configs()
+
+
+def get_config_by_id(config_id):
+    return provider.config_by_id(config_id)
+
+
+def get_config_for_school(school_id):
+    return provider.config_for_school(school_id)
+
+
+def other_bot_for_school(school_id, bot_token):
+    """Config of the bot serving a school when that is not the bot with
+    bot_token, else None. A chat can only be messaged by the bot it talked to,
+    so students must be linked through the bot that serves their school."""
+    config = provider.config_for_school(school_id)
+    if config is not None and config.bot_token != bot_token:
+        return config
+    return None
+
+
+def get_bot(school_id=None):
+    return provider.bot(school_id)
+
+
+def get_bot_for_config(config_id, school_id=None):
+    return provider.bot_for_config(config_id, school_id)
+
+
+def invalidate_telegram_config():
+    """Call after any change to telegram_config or school_telegram_bots rows"""
+    provider.invalidate()
@@ -0,0 +1,331 @@
+"""
+Resilient Telegram Transport
+Every Bot API call goes through one pooled requests.Session with connect and
+read timeouts, so an outage at api.telegram.org can no longer hang request
+threads (and with them the threading-mode Socket.IO server).
+
+A circuit breaker per API host counts consecutive transient failures
+(timeouts, connection errors and HTTP 5xx). After BREAKER_THRESHOLD of
+them calls fail fast for BREAKER_RESET seconds, then a single probe decides
+whether to close the circuit again. 4xx answers such as "chat not found" are
+the caller's problem and never open the circuit. Neither does 429, which
+only rate-limits one bot; it is deferred for the retry_after Telegram gives.
+
+sendMessage calls that fail transiently or hit an open circuit are kept in a
+bounded deferred queue and retried by a background thread with backoff.
+
+Per-endpoint counters (calls, errors, timeouts, rejected, deferred and
+latency) are available from get_transport().metrics().
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import record_telegram_call, record_telegram_error
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30
+DEFERRED_MAX = 1000
+DEFERRED_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 2
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFERRABLE_METHODS = {'sendMessage'}
+
+
+class TransportError(Exception):
+    """A Bot API call failed; transient errors are worth retrying"""
+
+    def __init__(self, message, transient=False, retry_after=None):
+        super().__init__(message)
+        self.transient = transient
+        self.retry_after = retry_after
+
+
+def _describe(method, outcome, error, host):
+    # str() of a requests exception contains the URL, and with it the bot token
+    return f'{method} {outcome}: {type(error).__name__} from {host}'
+
+
+class CircuitOpenError(TransportError):
+    def __init__(self, host):
+        super().__init__(f'Circuit open for {host}', transient=True)
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True  # exactly one probe at a time
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+
+class EndpointMetrics:
+
+    FIELDS = ('calls', 'errors', 'timeouts', 'rejected', 'deferred')
+
+    def __init__(self):
+        self.counts = {field: 0 for field in self.FIELDS}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def snapshot(self):
+        calls = self.counts['calls']
+        return dict(
+            self.counts,
+            latency_avg_ms=round(self.latency_total / calls * 1000, 2) if calls else 0.0,
+            latency_max_ms=round(self.latency_max * 1000, 2)
+        )
+
+
+class TelegramTransport:
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET,
+                 deferred_max=DEFERRED_MAX, max_attempts=DEFERRED_MAX_ATTEMPTS,
+                 retry_base_delay=RETRY_BASE_DELAY):
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.session = requests.Session()
+        self.deferred = deque(maxlen=deferred_max)
+        self._breakers = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._retry_thread = None
+        self._wakeup = threading.Event()
+
+    # --- breakers and metrics ---
+
+    def breaker(self, base_url):
+        host = urlsplit(base_url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[host] = breaker
+            return breaker
+
+    def _metric(self, method):
+        metric = self._metrics.get(method)
+        if metric is None:
+            metric = self._metrics.setdefault(method, EndpointMetrics())
+        return metric
+
+    def _count(self, method, field, latency=None):
+        if latency is not None:
+            record_telegram_call(method, latency)
+        elif field in ('errors', 'timeouts', 'rejected'):
+            record_telegram_error(method, field)
+        with self._lock:
+            metric = self._metric(method)
+            metric.counts[field] += 1
+            if latency is not None:
+                metric.latency_total += latency
+                metric.latency_max = max(metric.latency_max, latency)
+
+    def metrics(self):
+        """Per-endpoint counters plus breaker states and deferred queue size"""
+        with self._lock:
+            return {
+                'endpoints': {method: metric.snapshot() for method, metric in self._metrics.items()},
+                'breakers': {host: breaker.state for host, breaker in self._breakers.items()},
+                'deferred_queue': len(self.deferred)
+            }
+
+    # --- calls ---
+
+    def call(self, base_url, method, payload=None, http_method='POST', timeout=None):
+        """Call a Bot API method and return the decoded JSON response.
+
+        Raises CircuitOpenError while the API host is considered down and
+        TransportError for failed calls.
+        """
+        host = urlsplit(base_url).netloc
+        breaker = self.breaker(base_url)
+        if not breaker.allow():
+            self._count(method, 'rejected')
+            raise CircuitOpenError(host)
+
+        url = f"{base_url}/{method}"
+        start = time.perf_counter()
+        try:
+            if http_method == 'GET':
+                response = self.session.get(url, params=payload, timeout=timeout or self.timeout)
+            else:
+                response = self.session.post(url, json=payload, timeout=timeout or self.timeout)
+        except requests.Timeout as e:
+            self._count(method, 'calls', time.perf_counter() - start)
+            self._count(method, 'timeouts')
+            breaker.record_failure()
+            raise TransportError(_describe(method, 'timed out', e, host), transient=True)
+        except requests.RequestException as e:
+            self._count(method, 'calls', time.perf_counter() - start)
+            self._count(method, 'errors')
+            breaker.record_failure()
+            raise TransportError(_describe(method, 'failed', e, host), transient=True)
+
+        self._count(method, 'calls', time.perf_counter() - start)
+        if response.status_code == 429 or response.status_code >= 500:
+            self._count(method, 'errors')
+            if response.status_code == 429:
+                breaker.record_success()  # the host answered, only this bot is throttled
+            else:
+                breaker.record_failure()
+            retry_after = None
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after')
+            except ValueError:
+                pass
+            raise TransportError(f'{method} returned HTTP {response.status_code}',
+                                 transient=True, retry_after=retry_after)
+
+        breaker.record_success()
+        try:
+            data = response.json()
+        except ValueError:
+            data = {'ok': False, 'description': response.text}
+        if response.status_code != 200:
+            self._count(method, 'errors')
+            raise TransportError(f"{method} returned HTTP {response.status_code}: "
+                                 f"{data.get('description', '')}")
+        return data
+
+    def send(self, base_url, method, payload, defer=True):
+        """Call a method, deferring it for retry on transient failure.
+        Returns the response data, or None when the call failed or was deferred."""
+        try:
+            return self.call(base_url, method, payload)
+        except TransportError as e:
+            if defer and e.transient and method in DEFERRABLE_METHODS:
+                self.defer(base_url, method, payload, retry_after=e.retry_after)
+                logger.info("%s deferred for retry: %s", method, e)
+            else:
+                logger.warning("%s", e)
+            return None
+
+    # --- deferred sends ---
+
+    def defer(self, base_url, method, payload, attempts=0, retry_after=None):
+        with self._lock:
+            self._metric(method).counts['deferred'] += 1
+        self._enqueue(base_url, method, payload, attempts, retry_after or self.retry_base_delay * (2 ** attempts))
+        self._ensure_retry_thread()
+        self._wakeup.set()
+
+    def _enqueue(self, base_url, method, payload, attempts, delay):
+        with self._lock:
+            if len(self.deferred) == self.deferred.maxlen:
+                logger.warning("Deferred queue full, dropping oldest %s", self.deferred[0][1])
+            self.deferred.append((base_url, method, payload, attempts, time.time() + delay))
+
+    def _ensure_retry_thread(self):
+        with self._lock:
+            if self._retry_thread is None or not self._retry_thread.is_alive():
+                self._retry_thread = threading.Thread(target=self._retry_loop,
+                                                      name='telegram-deferred', daemon=True)
+                self._retry_thread.start()
+
+    def retry_deferred(self):
+        """Retry every deferred call that is due; returns how many were delivered"""
+        now = time.time()
+        with self._lock:
+            due = [item for item in self.deferred if item[4] <= now]
+            waiting = [item for item in self.deferred if item[4] > now]
+            self.deferred.clear()
+            self.deferred.extend(waiting)
+
+        delivered = 0
+        for base_url, method, payload, attempts, _ in due:
+            try:
+                self.call(base_url, method, payload)
+                delivered += 1
+            except CircuitOpenError:
+                # Not an attempt: wait for the breaker's probe to close the circuit
+                self._enqueue(base_url, method, payload, attempts, self.retry_base_delay)
+            except TransportError as e:
+                if e.transient and attempts + 1 < self.max_attempts:
+                    delay = e.retry_after or self.retry_base_delay * (2 ** (attempts + 1))
+                    self._enqueue(base_url, method, payload, attempts + 1, delay)
+                else:
+                    logger.error("Giving up on deferred %s after %d attempts: %s", method, attempts + 1, e)
+        return delivered
+
+    def _retry_loop(self):
+        while True:
+            self._wakeup.wait(timeout=1)
+            self._wakeup.clear()
+            if self.deferred:
+                self.retry_deferred()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Process-wide transport, configured from the current app when there is one"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                config = {}
+                try:
+                    from flask import current_app, has_app_context
+                    if has_app_context():
+                        config = current_app.config
+                except ImportError:
+                    pass
+                _transport = TelegramTransport(
+                    connect_timeout=config.get('TELEGRAM_CONNECT_TIMEOUT', CONNECT_TIMEOUT),
+                    read_timeout=config.get('TELEGRAM_READ_TIMEOUT', READ_TIMEOUT),
+                    breaker_threshold=config.get('TELEGRAM_BREAKER_THRESHOLD', BREAKER_THRESHOLD),
+                    breaker_reset=config.get('TELEGRAM_BREAKER_RESET', BREAKER_RESET),
+                    deferred_max=config.get('TELEGRAM_DEFERRED_MAX', DEFERRED_MAX)
+                )
+    return _transport
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the application factory
+Checks that:
+    - BLUEPRINT_GROUPS decides which blueprints are mounted
+    - unknown groups are refused
+    - the script app has no routes, request hooks or Socket.IO
+    - realtime=True adds Socket.IO and presence, starts the notification
+      dispatcher for App and Telegram rows, and only then is flask_socketio
+      (and with it requests) imported
+    - apps with the instructor portal start the attendance digest flusher
+
+Runs against SQLite, no MySQL needed.
+Usage: python test_app_factory.py
+"""
+
+import argparse
+import os
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from app_factory import create_app, create_script_app, DEFAULT_GROUPS
+from database import db
+from benchmarks.startup import measure, VARIANTS
+from instance.config import Config
+from notification_outbox import APP, TELEGRAM
+
+
+class ApiOnly(Config):
+    BLUEPRINT_GROUPS = 'auth, api'
+
+
+def main():
+    argparse.ArgumentParser(description='Application factory test').parse_args()
+
+    # Default groups: everything but the Telegram pages
+    web = create_app()
+    assert web.blueprint_groups == list(DEFAULT_GROUPS)
+    assert {'auth', 'main_admin', 'school_admin', 'instructor', 'auth_api', 'logs'} <= set(web.blueprints)
+    assert 'telegram' not in web.blueprints and not hasattr(web, 'socketio')
+    with web.app_context():
+        db.create_all()
+    assert web.test_client().get('/metrics').status_code == 200
+
+    # Groups from the config, duplicates ignored
+    api = create_app(ApiOnly)
+    assert set(api.blueprints) >= {'auth', 'auth_api', 'messaging_api'}
+    assert not {'main_admin', 'school_admin', 'instructor', 'logs'} & set(api.blueprints)
+    assert create_app(groups=['auth', 'auth']).blueprint_groups == ['auth']
+
+    try:
+        create_app(type('Typo', (Config,), {'BLUEPRINT_GROUPS': 'auth,instructors'}))
+        raise AssertionError('unknown group accepted')
+    except ValueError as e:
+        assert 'instructors' in str(e)
+
+    # Script app: database only
+    script = create_script_app()
+    assert not script.blueprints and not script.before_request_funcs
+    assert [rule.endpoint for rule in script.url_map.iter_rules()] == ['static']
+    with script.app_context():
+        db.create_all()
+        assert 'students' in db.inspect(db.engine).get_table_names()
+
+    # Realtime app, on a file so its dispatcher finds the tables
+    shared = type('Shared', (Config,), {'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'app.db')})
+    with create_script_app(shared).app_context():
+        db.create_all()
+    realtime = create_app(shared, groups=['auth'], realtime=True)
+    assert realtime.socketio is not None and realtime.presence is not None
+    dispatcher = realtime.notification_dispatcher
+    assert dispatcher._thread.is_alive() and set(dispatcher.types) == {APP, TELEGRAM}
+    dispatcher.stop(timeout=5)
+    assert not hasattr(create_app(shared, groups=['auth']), 'notification_dispatcher')
+    assert not hasattr(realtime, 'digest_flusher')
+    portal = create_app(shared, groups=['instructor'])
+    assert portal.digest_flusher._thread.is_alive()
+    portal.digest_flusher.stop(timeout=5)
+
+    # Cold starts: Socket.IO and requests stay out unless realtime
+    cold = {name: measure(VARIANTS[name], 'sqlite://') for name in ('realtime', 'web', 'script')}
+    assert cold['realtime']['socketio'] and cold['realtime']['requests']
+    assert not cold['web']['socketio'] and not cold['web']['requests']
+    assert not cold['script']['socketio'] and cold['script']['modules'] < cold['web']['modules']
+
+    print("🧪 Application factory")
+    print("=" * 50)
+    print(f"  Default app:     {len(web.blueprints)} blueprints, groups {', '.join(web.blueprint_groups)}")
+    print(f"  auth,api app:    {len(api.blueprints)} blueprints")
+    for name, result in cold.items():
+        print(f"  {name + ' start:':<16} {result['build_ms']:.0f} ms, {result['modules']} modules")
+    print("\n✅ App factory passed: groups mounted from the config, realtime and requests loaded only on demand")
+
+
+if __name__ == '__main__':
+    main()
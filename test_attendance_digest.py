@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script for attendance digests
+Records a full school day (8 classes) for one section through the real
+record_attendance endpoint, once with digests off and once in end_of_day
+mode, and checks that:
+    - with digests off every class writes one message per student
+    - in digest mode only Absent/Late go out right away
+    - nothing else is sent before digest_time
+    - after digest_time each student gets exactly one summary covering
+      every buffered class, and the buffer is emptied
+
+Runs against a temporary SQLite file, no MySQL or Telegram needed.
+Usage: python test_attendance_digest.py [--students 30] [--classes 8]
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from database import db
+from models import (School, Section, Student, Instructor, Subject, InstructorSchedule, Message,
+                    Notification, SchoolNotificationSettings, AttendanceDigestEvent)
+from attendance_digest import DigestFlusher, flush_due_digests
+from notification_outbox import NotificationDispatcher
+from test_helpers import create_test_app, login
+
+
+def create_app(students, classes, db_path):
+    # record_attendance uses MySQL's CONCAT
+    app = create_test_app(['instructor'], db_path=db_path, sqlite_mysql_shims=True)
+    # Neither background thread is under test: batches are run by hand
+    app.notification_dispatcher = NotificationDispatcher(app)
+    app.digest_flusher = DigestFlusher(app)
+
+    with app.app_context():
+        school = School(name='Digest National High School', school_code='DIGESTNHS')
+        db.session.add(school)
+        db.session.flush()
+        section = Section(name='Luna', school_id=school.id, grade_level='Grade 10')
+        instructor = Instructor(name='Teacher', gender='Female', address='Manila', email='t@example.com',
+                                school_id=school.id)
+        db.session.add_all([section, instructor])
+        db.session.flush()
+        schedule_ids = []
+        for i in range(classes):
+            subject = Subject(name=f'Subject {i}', school_id=school.id, grade_level='Grade 10')
+            db.session.add(subject)
+            db.session.flush()
+            schedule = InstructorSchedule(instructor_id=instructor.id, subject_id=subject.id, section_id=section.id,
+                                          start_time=f'{7 + i}:00', end_time=f'{8 + i}:00', day='Monday')
+            db.session.add(schedule)
+            db.session.flush()
+            schedule_ids.append(schedule.id)
+        student_ids = []
+        for i in range(students):
+            student = Student(first_name=f'Student{i:03d}', last_name='Digest', grade_level='Grade 10',
+                              section_id=section.id, school_id=school.id, code=f'DG{i:05d}')
+            db.session.add(student)
+            db.session.flush()
+            student_ids.append(student.id)
+        db.session.commit()
+        return app, school.id, instructor.id, schedule_ids, student_ids
+
+
+def record_day(client, day, schedule_ids, statuses):
+    for index, schedule_id in enumerate(schedule_ids):
+        form = {'date': day}
+        form.update({f'status_{student_id}': status(index)
+                     for student_id, status in statuses.items()})
+        response = client.post(f'/instructor/attendance/{schedule_id}?ajax=1', data=form)
+        assert response.status_code == 200, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Attendance digest test')
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--classes', type=int, default=8)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'digest.sqlite3')
+    app, school_id, instructor_id, schedule_ids, student_ids = create_app(args.students, args.classes, db_path)
+    client = app.test_client()
+    login(client, instructor_id=instructor_id, school_id=school_id)
+
+    print("🧪 Attendance digests")
+    print("=" * 50)
+
+    # 1. Digests off: one message per student per class
+    present = {student_id: (lambda index: 'Present') for student_id in student_ids}
+    record_day(client, '2026-10-19', schedule_ids, present)
+    with app.app_context():
+        realtime_messages = Message.query.count()
+    assert realtime_messages == args.students * args.classes
+    print(f"  real-time day:       {realtime_messages} messages")
+
+    # 2. Digest mode: the first student is absent from the third class
+    with app.app_context():
+        db.session.add(SchoolNotificationSettings(school_id=school_id, digest_mode='end_of_day',
+                                                  digest_time='23:59', realtime_statuses='Absent,Late'))
+        db.session.commit()
+    statuses = dict(present)
+    statuses[student_ids[0]] = lambda index: 'Absent' if index == 2 else 'Present'
+    record_day(client, '2026-10-20', schedule_ids, statuses)
+    with app.app_context():
+        immediate = Message.query.count() - realtime_messages
+        buffered = AttendanceDigestEvent.query.count()
+    assert immediate == 1, immediate
+    assert buffered == args.students * args.classes - 1, buffered
+    print(f"  digest day, at once: {immediate} message (the absence), {buffered} results buffered")
+
+    # 3. Not due before digest_time
+    with app.app_context():
+        assert flush_due_digests(now=datetime.now().replace(hour=12, minute=0)) == 0
+        assert AttendanceDigestEvent.query.count() == buffered
+
+    # 4. Due afterwards: one summary per student
+    with app.app_context():
+        sent = flush_due_digests(now=datetime.now() + timedelta(days=1))
+        digests = Message.query.filter(Message.sender_type == 'admin').all()
+        pushes = Notification.query.count()
+        assert sent == args.students and len(digests) == args.students
+        assert AttendanceDigestEvent.query.count() == 0
+        first = next(m for m in digests if 'Student000' in m.content)
+        assert first.content.count('Present') == args.classes - 1 and 'Absent' not in first.content
+        other = next(m for m in digests if 'Student001' in m.content)
+        assert other.content.count('Present') == args.classes
+        # Classes in the order they are held: 9:00 before 10:00
+        positions = [other.content.index(f'Subject {i} ') for i in range(args.classes)]
+        assert positions == sorted(positions), other.content
+        total_messages = Message.query.count()
+    print(f"  digest day, later:   {sent} summaries")
+    print(f"  push notifications:  {pushes} queued in the outbox")
+    print(f"\n📊 Messages per day: {realtime_messages} real-time vs "
+          f"{total_messages - realtime_messages} with digests "
+          f"({realtime_messages / (total_messages - realtime_messages):.1f}x fewer)")
+    print(f"\nSample digest:\n{other.content}")
+
+    print("\n✅ Digest passed: one summary per student, absences still real time")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for ETags on reference-data endpoints
+Reloads school info, the section and subject dropdowns, the instructor page
+and message templates the way clients do and checks that:
+    - responses carry an ETag and the endpoint's Cache-Control
+    - If-None-Match revalidations get a 304 after one version query
+    - creating a section changes the ETag of sections/api and of the school
+      info (its counts), but not of subjects/api
+    - versions live in the database: a worker that did not see the write
+      computes the same new ETag, and editing a school bumps its info
+    - the instructor page has one ETag per user
+    - ETags roll over after TTL seconds
+
+Runs against a temporary SQLite file, no MySQL needed.
+Usage: python test_entity_versions.py [--reloads 200]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from database import db
+from entity_versions import VersionStamps, entity_versions
+from models import School, Section, Subject, Instructor, SchoolAdmin
+from test_helpers import create_test_app, login
+
+
+def build_app(db_path):
+    app = create_test_app(['api', 'school_admin', 'instructor'], db_path=db_path)
+    with app.app_context():
+        school = School(name='Versions National High School', school_code='VERSNHS')
+        db.session.add(school)
+        db.session.flush()
+        admins = [SchoolAdmin(username=f'admin{n}', password='x', school_id=school.id, role='school_admin')
+                  for n in range(2)]
+        db.session.add_all(admins)
+        db.session.flush()
+        db.session.add_all([Section(name='Rizal', school_id=school.id, grade_level='Grade 7'),
+                            Subject(name='Science', school_id=school.id, grade_level='Grade 7'),
+                            Instructor(name='Teacher', gender='Female', address='Cebu City', email='v@example.com',
+                                       school_id=school.id, created_by=admins[0].id)])
+        db.session.commit()
+        return app, school.id, [admin.id for admin in admins]
+
+
+def login_admin(client, school_id, user_id):
+    login(client, school_id=school_id, user_id=user_id, username=f'admin{user_id}', user_type='school_admin')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Conditional GET test')
+    parser.add_argument('--reloads', type=int, default=200)
+    args = parser.parse_args()
+
+    app, school_id, admin_ids = build_app(os.path.join(tempfile.mkdtemp(), 'versions.sqlite3'))
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(a[2]))
+
+    def get(client, path, **headers):
+        queries.clear()
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        return response, len(queries), time.perf_counter() - started
+
+    client = app.test_client()
+    login_admin(client, school_id, admin_ids[0])
+    school_path = f'/api/schools/{school_id}'
+
+    # School info: public, cached a minute, revalidated with one version query
+    first, full_queries, _ = get(client, school_path)
+    assert first.status_code == 200 and full_queries >= 5, full_queries
+    assert first.headers['ETag'].startswith('W/') and 'Last-Modified' not in first.headers
+    assert first.cache_control.public and first.cache_control.max_age == 60
+    revalidated, count, _ = get(client, school_path, **{'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and count == 1 and not revalidated.data
+    assert revalidated.headers['ETag'] == first.headers['ETag']
+    stale, _, _ = get(client, school_path, **{'If-None-Match': 'W/"other"'})
+    assert stale.status_code == 200
+
+    # Dropdowns: private, revalidated on every use
+    sections, _, _ = get(client, '/school_admin/sections/api')
+    subjects, _, _ = get(client, '/school_admin/subjects/api')
+    assert sections.status_code == 200 and sections.cache_control.private and sections.cache_control.no_cache
+    full_ms, not_modified_ms = [], []
+    for _ in range(args.reloads):
+        response, _, elapsed = get(client, '/school_admin/sections/api')
+        full_ms.append(elapsed * 1000)
+        response, count, elapsed = get(client, '/school_admin/sections/api',
+                                       **{'If-None-Match': sections.headers['ETag']})
+        assert response.status_code == 304 and count == 1
+        not_modified_ms.append(elapsed * 1000)
+
+    # Another worker's stamps: same ETags before and after a write it did not see
+    other_worker = VersionStamps()
+    with app.app_context():
+        before = other_worker.current(school_id, ('sections',))
+    created = client.post('/school_admin/create/section', json={'name': 'Bonifacio', 'grade_level': 'Grade 8'})
+    assert created.status_code == 200, created.data
+    response, _, _ = get(client, '/school_admin/sections/api', **{'If-None-Match': sections.headers['ETag']})
+    assert response.status_code == 200 and len(response.get_json()['sections']) == 2
+    response, _, _ = get(client, school_path, **{'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200 and response.get_json()['stats']['sections'] == 2
+    response, count, _ = get(client, '/school_admin/subjects/api', **{'If-None-Match': subjects.headers['ETag']})
+    assert response.status_code == 304 and count == 1
+    with app.app_context():
+        after = other_worker.current(school_id, ('sections',))
+        assert after != before and after == entity_versions.current(school_id, ('sections',))
+
+    # Editing the school (no page does, setup scripts may) changes its info
+    current, _, _ = get(client, school_path)
+    with app.app_context():
+        db.session.get(School, school_id).address = 'Mandaue City'
+        db.session.commit()
+    response, _, _ = get(client, school_path, **{'If-None-Match': current.headers['ETag']})
+    assert response.status_code == 200 and response.get_json()['address'] == 'Mandaue City'
+
+    # Instructor page: one ETag per user, a second admin never gets the first one's page
+    page, _, _ = get(client, '/school_admin/instructors')
+    assert page.status_code == 200 and page.cache_control.private
+    response, count, _ = get(client, '/school_admin/instructors', **{'If-None-Match': page.headers['ETag']})
+    assert response.status_code == 304 and count == 1
+    other = app.test_client()
+    login_admin(other, school_id, admin_ids[1])
+    response, _, _ = get(other, '/school_admin/instructors', **{'If-None-Match': page.headers['ETag']})
+    assert response.status_code == 200
+
+    # Message templates: shared by every school, cached an hour
+    templates, _, _ = get(app.test_client(), '/instructor/message/templates')
+    assert templates.status_code == 200 and templates.cache_control.max_age == 3600
+    response, _, _ = get(app.test_client(), '/instructor/message/templates',
+                         **{'If-None-Match': templates.headers['ETag']})
+    assert response.status_code == 304
+
+    # Expired sessions still reach the view
+    assert app.test_client().get('/school_admin/sections/api').status_code == 401
+
+    # Stamps: a bump changes the ETag, and ETags roll over after TTL seconds
+    with app.app_context():
+        stamps = VersionStamps()
+        etag = stamps.current(school_id, ('subjects',))
+        stamps.bump(school_id, 'subjects')
+        assert stamps.current(school_id, ('subjects',)) != etag
+        assert stamps.current(school_id, ('subjects',)) == stamps.current(school_id, ('subjects',))
+        expiring = VersionStamps(ttl=0.05)
+        etag = expiring.current(school_id, ('subjects',))
+        time.sleep(0.06)
+        assert expiring.current(school_id, ('subjects',)) != etag
+
+    full_ms.sort()
+    not_modified_ms.sort()
+    print("🧪 Conditional GET")
+    print("=" * 50)
+    print(f"  School info:      {full_queries} queries for a full response, 1 for a 304")
+    print(f"  sections/api:     {full_ms[len(full_ms) // 2]:.2f} ms full, "
+          f"{not_modified_ms[len(not_modified_ms) // 2]:.2f} ms 304 (median of {args.reloads})")
+    print(f"  Stamps:           {entity_versions.stats['not_modified']} not modified, "
+          f"{entity_versions.stats['full']} full, {entity_versions.stats['bumps']} bumps")
+    print("\n✅ Conditional GET passed: ETags bumped by writes in every worker, 304 in one query, per-endpoint caching")
+
+
+if __name__ == '__main__':
+    main()
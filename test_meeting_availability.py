@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test script for the meetings API and its free-slot finder
+Builds an instructor with a full weekly timetable, a student whose section
+has its own classes and a month of existing meetings, then checks that:
+    - find_free_slots matches a minute-by-minute brute force for every day
+    - GET /api/meetings/availability answers a month in a few statements
+    - POST /api/meetings refuses times that overlap a class or a meeting
+    - a new meeting disappears from the following availability search
+    - concurrent bookings of the same time create exactly one meeting, also
+      when they share only the student
+
+Runs against a temporary SQLite file, no MySQL needed.
+Usage: python test_meeting_availability.py [--days 31] [--bookers 8]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+import blueprints.api.meetings_api as meetings_api
+from database import db
+from models import (School, Instructor, SchoolAdmin, SchoolInstructorAccount, Section, Student, Subject,
+                    ParentAccount, InstructorSchedule, Meeting)
+from meeting_availability import DAY_START, DAY_END, find_free_slots
+from schedule_index import DAY_NAMES, format_minutes, parse_minutes
+from test_helpers import create_test_app, bearer
+
+
+def brute_force(busy_by_date, day, duration):
+    """Free intervals of a day from a minute bitmap"""
+    taken = [False] * (24 * 60)
+    for start, end in busy_by_date.get(day, []):
+        for minute in range(start, end):
+            taken[minute] = True
+    free, run_start = [], None
+    for minute in range(DAY_START, DAY_END + 1):
+        if minute < DAY_END and not taken[minute]:
+            run_start = minute if run_start is None else run_start
+        elif run_start is not None:
+            if minute - run_start >= duration:
+                free.append((run_start, minute))
+            run_start = None
+    return free
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Meeting availability test')
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--bookers', type=int, default=8)
+    args = parser.parse_args()
+    rng = random.Random(40)
+    first_day = date.today() + timedelta(days=1)
+    last_day = first_day + timedelta(days=args.days - 1)
+
+    # A file, so the concurrent bookings below run on separate connections
+    app = create_test_app(['api'], db_path=os.path.join(tempfile.mkdtemp(), 'meetings.sqlite3'))
+    client = app.test_client()
+    with app.app_context():
+        school = School(name='Meeting National High School', school_code='MEETNHS')
+        db.session.add(school)
+        db.session.flush()
+        admin = SchoolAdmin(username='meetadmin', password='x', school_id=school.id, role='admin')
+        instructors = [Instructor(name=f'Teacher {i}', gender='Female', address='Iloilo City',
+                                  email=f'meet{i}@example.com', school_id=school.id) for i in range(2)]
+        sections = [Section(name=f'Section {i}', school_id=school.id, grade_level='Grade 10') for i in range(2)]
+        subject = Subject(name='Science', school_id=school.id, grade_level='Grade 10')
+        db.session.add_all([admin, subject] + instructors + sections)
+        db.session.flush()
+        teacher, other_teacher = instructors
+        student = Student(first_name='Ana', last_name='Reyes', grade_level='Grade 10',
+                          section_id=sections[1].id, school_id=school.id, code='MEET0001')
+        db.session.add(student)
+        db.session.flush()
+        account = SchoolInstructorAccount(instructor_id=teacher.id, school_admin_id=admin.id, school_id=school.id)
+        parent = ParentAccount(student_id=student.id, school_id=school.id)
+        db.session.add_all([account, parent])
+
+        # Weekly classes: the teacher teaches Section 0, Section 1 has another teacher
+        weekly = {}
+        for weekday in range(5):
+            for period in range(0, 8, 2):
+                start = 7 * 60 + 30 + period * 60 + rng.choice((0, 15))
+                db.session.add(InstructorSchedule(instructor_id=teacher.id, subject_id=subject.id,
+                                                  section_id=sections[0].id, day=DAY_NAMES[weekday],
+                                                  start_time=format_minutes(start), end_time=format_minutes(start + 50)))
+                weekly.setdefault(weekday, []).append((start, start + 50))
+                other = start + 60
+                db.session.add(InstructorSchedule(instructor_id=other_teacher.id, subject_id=subject.id,
+                                                  section_id=sections[1].id, day=DAY_NAMES[weekday],
+                                                  start_time=format_minutes(other), end_time=format_minutes(other + 45)))
+                weekly[weekday].append((other, other + 45))
+
+        # A month of meetings: the teacher's, the student's with someone else, and cancelled ones
+        busy_by_date = {}
+        day = first_day
+        while day <= last_day:
+            if day.weekday() < 5:
+                busy_by_date[day] = list(weekly[day.weekday()])
+                for _ in range(2):
+                    start = rng.randrange(DAY_START, DAY_END - 30, 5)
+                    status = rng.choice(('scheduled', 'scheduled', 'cancelled'))
+                    with_teacher = rng.random() < 0.7
+                    db.session.add(Meeting(school_id=school.id,
+                                           instructor_id=teacher.id if with_teacher else other_teacher.id,
+                                           student_id=student.id if not with_teacher or rng.random() < 0.3 else 999,
+                                           title='Conference', meeting_date=day, status=status,
+                                           start_time=format_minutes(start), end_time=format_minutes(start + 30)))
+                    if status == 'scheduled':
+                        busy_by_date[day].append((start, start + 30))
+            day += timedelta(days=1)
+        db.session.commit()
+
+        # The interval merge against the brute force, for several durations
+        for duration in (15, 30, 45):
+            for day, free in find_free_slots(school.id, teacher.id, first_day, last_day,
+                                             section_id=student.section_id, student_id=student.id,
+                                             duration=duration):
+                assert free == brute_force(busy_by_date, day, duration), (day, free)
+
+        parent_headers = bearer(parent.id, str(student.id), 'parent', school.id, 'parent')
+        teacher_headers = bearer(account.id, teacher.email, 'instructor', school.id, 'instructor')
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+        url = (f'/api/meetings/availability?instructor_id={teacher.id}'
+               f'&from={first_day.isoformat()}&to={last_day.isoformat()}&duration=30')
+        client.get(url, headers=parent_headers)  # warm the schedule index
+        statements.clear()
+        started = time.perf_counter()
+        response = client.get(url, headers=parent_headers)
+        elapsed = time.perf_counter() - started
+        search_statements = len(statements)
+        result = response.get_json()
+        assert response.status_code == 200 and result['studentId'] == student.id, result
+        weekdays = sum(1 for offset in range(args.days) if (first_day + timedelta(days=offset)).weekday() < 5)
+        assert len(result['days']) == weekdays
+
+        # Booking over a class is refused, booking a free interval works
+        monday = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+        class_start, class_end = weekly[monday.weekday()][0]
+        response = client.post('/api/meetings', headers=teacher_headers, json={
+            'studentId': student.id, 'title': 'Progress talk', 'date': monday.isoformat(),
+            'startTime': format_minutes(class_start), 'endTime': format_minutes(class_end)})
+        assert response.status_code == 409 and 'class' in response.get_json()['conflicts']
+
+        day_free = next(day for day in result['days'] if day['date'] == monday.isoformat())['free']
+        slot = day_free[0]
+        response = client.post('/api/meetings', headers=teacher_headers, json={
+            'studentId': student.id, 'title': 'Progress talk', 'date': monday.isoformat(),
+            'startTime': slot['start'], 'endTime': format_minutes(parse_minutes(slot['start']) + 30)})
+        assert response.status_code == 201, response.get_json()
+        meeting = response.get_json()['meeting']
+        assert meeting['instructorId'] == teacher.id
+
+        after = client.get(url, headers=parent_headers).get_json()
+        day_after = next(day for day in after['days'] if day['date'] == monday.isoformat())['free']
+        assert day_after[0]['start'] != slot['start'] or day_after[0]['end'] != slot['end']
+
+        response = client.post(f"/api/meetings/{meeting['id']}/status", headers=parent_headers,
+                               json={'status': 'cancelled'})
+        assert response.status_code == 200 and response.get_json()['meeting']['status'] == 'cancelled'
+
+        # Several clients book the now free slot at the same moment: one wins
+        booking = {'studentId': student.id, 'title': 'Progress talk', 'date': monday.isoformat(),
+                   'startTime': slot['start'], 'endTime': format_minutes(parse_minutes(slot['start']) + 30)}
+        start_gate = threading.Barrier(args.bookers)
+        outcomes = []
+
+        # Hold each booking a moment after its overlap check, so every request
+        # checks before any commits unless the check is serialized
+        check = meetings_api.clashes
+
+        def slow_check(*args, **kwargs):
+            found = check(*args, **kwargs)
+            time.sleep(0.05)
+            return found
+        meetings_api.clashes = slow_check
+
+        def book():
+            booker = app.test_client()
+            start_gate.wait()
+            outcomes.append(booker.post('/api/meetings', headers=teacher_headers, json=booking).status_code)
+
+        threads = [threading.Thread(target=book) for _ in range(args.bookers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(outcomes) == [201] + [409] * (args.bookers - 1), outcomes
+        booked = Meeting.query.filter_by(instructor_id=teacher.id, meeting_date=monday, status='scheduled',
+                                         start_time=slot['start']).count()
+        assert booked == 1, booked
+
+        # The parent books the same time with two different instructors: the
+        # student's row serializes them, so one wins and the other gets a 409
+        saturday = monday + timedelta(days=5)
+        outcomes.clear()
+        start_gate = threading.Barrier(2)
+
+        def book_with(instructor_id):
+            booker = app.test_client()
+            start_gate.wait()
+            outcomes.append(booker.post('/api/meetings', headers=parent_headers, json={
+                'instructorId': instructor_id, 'title': 'Parent conference', 'date': saturday.isoformat(),
+                'startTime': '10:00', 'endTime': '10:30'}).status_code)
+
+        threads = [threading.Thread(target=book_with, args=(instructor_id,))
+                   for instructor_id in (teacher.id, other_teacher.id)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        meetings_api.clashes = check
+        assert sorted(outcomes) == [201, 409], outcomes
+        assert Meeting.query.filter_by(student_id=student.id, meeting_date=saturday).count() == 1
+
+    print("🧪 Meeting availability")
+    print("=" * 50)
+    print(f"  Days searched:          {args.days} ({weekdays} school days)")
+    print(f"  Statements per search:  {search_statements}")
+    print(f"  Search time:            {elapsed * 1000:.1f} ms")
+    print(f"  Concurrent bookings:    {args.bookers}, one created")
+    print("\n✅ Meeting availability passed: free slots match the brute force, no double booking")
+
+
+if __name__ == '__main__':
+    main()
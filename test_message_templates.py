@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for templated notification messages
+Stores attendance notifications as a template id plus compact parameters
+next to the old fully rendered rows and checks that:
+    - Message.to_dict renders exactly the text the old rows stored
+    - newer clients also get template and params
+    - rendering a page of messages looks names up in bulk, not per message
+    - the templated rows are smaller
+
+Runs against an in-memory SQLite database, no MySQL needed.
+Usage: python test_message_templates.py [--messages 1000]
+"""
+
+import argparse
+
+from sqlalchemy import event
+
+from database import db
+from models import School, Section, Student, Subject, Conversation, Message
+from message_templates import (ATTENDANCE, STATUS, attendance_params, dump_params, format_attendance,
+                               prefetch_messages)
+from test_helpers import create_test_app
+
+FIRST_NAMES = ['Maria Clara', 'Jose Miguel', 'Andrea Nicole', 'Juan Carlos', 'Kristine Joy']
+LAST_NAMES = ['Dela Cruz', 'Santos', 'Villanueva', 'Bautista', 'Mendoza']
+SUBJECTS = ['Mathematics', 'English', 'Filipino', 'Science', 'Araling Panlipunan',
+            'Edukasyon sa Pagpapakatao', 'MAPEH', 'Technology and Livelihood Education']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Message template test')
+    parser.add_argument('--messages', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_test_app()
+    with app.app_context():
+        school = School(name='Template National High School', school_code='TEMPLATENHS')
+        db.session.add(school)
+        db.session.flush()
+        section = Section(name='Bonifacio', school_id=school.id, grade_level='Grade 7')
+        db.session.add(section)
+        db.session.flush()
+        students = [Student(first_name=f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {i}',
+                            last_name=LAST_NAMES[i % len(LAST_NAMES)], grade_level='Grade 7',
+                            section_id=section.id, school_id=school.id, code=f'TP{i:05d}') for i in range(50)]
+        subjects = [Subject(name=name, school_id=school.id, grade_level='Grade 7') for name in SUBJECTS]
+        db.session.add_all(students + subjects)
+        db.session.flush()
+        conversation = Conversation(school_id=school.id, participant1_id=1, participant1_type='instructor',
+                                    participant2_id=1, participant2_type='parent')
+        db.session.add(conversation)
+        db.session.flush()
+
+        rendered_bytes = 0
+        templated_bytes = 0
+        expected = {}
+        for i in range(args.messages):
+            student = students[i % len(students)]
+            subject = subjects[i % len(subjects)]
+            status = ('Present', 'Absent', 'Late', 'Excused')[i % 4]
+            # Older schedules may hold times in another format; they are kept as given
+            start, end = ('07:30', '08:45') if i % 10 else ('7:30 AM', '8:45 AM')
+            old_text = format_attendance(f"{student.first_name} {student.last_name}", subject.name,
+                                         '2026-10-19', status, start, end)
+            params = dump_params(attendance_params(student.id, subject.id, '2026-10-19', status, start, end))
+            rendered_bytes += len(old_text.encode('utf-8'))
+            templated_bytes += len(ATTENDANCE) + len(params.encode('utf-8'))
+            message = Message(conversation_id=conversation.id, sender_id=1, sender_type='instructor',
+                              receiver_id=1, receiver_type='parent', template_id=ATTENDANCE, params=params,
+                              message_type='notification')
+            db.session.add(message)
+            db.session.flush()
+            expected[message.id] = old_text
+        db.session.commit()
+
+        # Old clients: rendered content, identical to what used to be stored
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+        messages = Message.query.order_by(Message.id).limit(50).all()
+        names = prefetch_messages(messages)
+        payload = [message.to_dict(names) for message in messages]
+        name_queries = [s for s in statements if 'FROM students' in s or 'FROM subjects' in s]
+        for item in payload:
+            assert item['content'] == expected[item['id']]
+            assert item['template'] == ATTENDANCE and item['params'][STATUS] in 'PALE'
+        assert len(name_queries) == 2, name_queries
+
+        # Rows without a template are returned as stored
+        plain = Message(conversation_id=conversation.id, sender_id=1, sender_type='instructor',
+                        receiver_id=1, receiver_type='parent', content='See you at the meeting')
+        db.session.add(plain)
+        db.session.commit()
+        assert plain.to_dict()['content'] == 'See you at the meeting' and 'template' not in plain.to_dict()
+
+    print("🧪 Templated notification messages")
+    print("=" * 50)
+    print(f"  Messages:             {args.messages}")
+    print(f"  Rendered text:        {rendered_bytes / args.messages:6.1f} bytes per message")
+    print(f"  Template + params:    {templated_bytes / args.messages:6.1f} bytes per message")
+    print(f"  Name queries, 50 msgs: {len(name_queries)}")
+    print(f"\nSample params: {payload[0]['params']}")
+
+    assert rendered_bytes >= 2.5 * templated_bytes
+    print(f"\n✅ Templates passed: same content, {rendered_bytes / templated_bytes:.1f}x smaller rows")
+
+
+if __name__ == '__main__':
+    main()
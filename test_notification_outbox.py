@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the notification outbox
+Queues a school broadcast through telegram_bot.broadcast_message_to_school,
+then drives notification_outbox.NotificationDispatcher against a local stub
+Bot API and checks that:
+    - the broadcast only writes Pending rows, nothing is sent from the request
+    - connection errors are recorded without the bot token
+    - sends failing during an outage stay Pending and go out once it is over
+    - a permanent error dead-letters the row and requeueing delivers it
+    - a row left Processing by a dead dispatcher is claimed again after its lease
+    - every student receives the announcement exactly once
+
+Runs against a temporary SQLite file, no MySQL or Telegram needed.
+Usage: python test_notification_outbox.py [--students 200]
+"""
+
+import argparse
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database import db
+from models import School, Section, Student, TelegramConfig, Notification
+from notification_outbox import NotificationDispatcher, requeue_dead, outbox_stats, PENDING, PROCESSING, SENT, DEAD
+from test_helpers import create_test_app
+
+BAD_CHAT = '9999'
+
+
+class StubBotAPI(BaseHTTPRequestHandler):
+    """sendMessage that fails while down and rejects BAD_CHAT while it is blocked"""
+
+    down = False
+    bad_chat_blocked = True
+    delivered = Counter()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if StubBotAPI.down:
+            status, payload = 502, {'ok': False, 'description': 'Bad Gateway'}
+        elif str(body.get('chat_id')) == BAD_CHAT and StubBotAPI.bad_chat_blocked:
+            status, payload = 403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'}
+        else:
+            with self.lock:
+                self.delivered[str(body['chat_id'])] += 1
+            status, payload = 200, {'ok': True, 'result': {'message_id': 1}}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_app(count, api_base, db_path):
+    app = create_test_app(db_path=db_path, TELEGRAM_API_BASE=api_base, TELEGRAM_BREAKER_RESET=0.2)
+    with app.app_context():
+        school = School(name='Outbox National High School', school_code='OUTBOXNHS')
+        db.session.add(school)
+        db.session.flush()
+        section = Section(name='Rizal', school_id=school.id, grade_level='Grade 9')
+        db.session.add(section)
+        db.session.flush()
+        for i in range(count):
+            chat_id = BAD_CHAT if i == 0 else str(5000000 + i)
+            db.session.add(Student(first_name=f'Student{i}', last_name='Outbox', grade_level='Grade 9',
+                                   section_id=section.id, school_id=school.id, code=f'OB{i:05d}',
+                                   telegram_status=True, telegram_chat_id=chat_id))
+        db.session.add(TelegramConfig(bot_token='777:OUTBOX', bot_username='outbox_bot', is_active=True))
+        db.session.commit()
+        school_id = school.id
+    return app, school_id
+
+
+def count(status):
+    return Notification.query.filter_by(status=status).count()
+
+
+def drain(dispatcher, rounds=50):
+    """Run batches until nothing is due, waiting out short retry delays"""
+    for _ in range(rounds):
+        if not dispatcher.run_once():
+            time.sleep(0.1)
+        with dispatcher.app.app_context():
+            if not Notification.query.filter(Notification.status.in_([PENDING, PROCESSING])).count():
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notification outbox test')
+    parser.add_argument('--students', type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f'http://127.0.0.1:{server.server_port}'
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'outbox.sqlite3')
+    app, school_id = create_app(args.students, api_base, db_path)
+    dispatcher = NotificationDispatcher(app, batch_size=50, max_attempts=4, retry_delay=0.05)
+    app.notification_dispatcher = dispatcher  # not started: batches are run by hand below
+
+    print("🧪 Notification outbox against a local stub")
+    print("=" * 50)
+
+    # 1. The broadcast only queues
+    from telegram_bot import broadcast_message_to_school
+    with app.app_context():
+        result = broadcast_message_to_school(school_id, 'Classes are suspended tomorrow.')
+        assert result['queued_count'] == args.students, result
+        assert count(PENDING) == args.students
+    assert not StubBotAPI.delivered
+    print(f"  queued by broadcast:     {args.students} Pending rows, nothing sent")
+
+    # 2. Connection errors are kept in last_error without the token in the URL
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    app.config['TELEGRAM_API_BASE'] = f'http://127.0.0.1:{closed.getsockname()[1]}'
+    closed.close()
+    dispatcher.run_once()
+    app.config['TELEGRAM_API_BASE'] = api_base
+    with app.app_context():
+        errors = [row.last_error for row in Notification.query.filter(Notification.last_error.isnot(None))]
+        assert errors and any('ConnectionError' in error for error in errors), errors
+        assert not any('777:OUTBOX' in error for error in errors), errors
+        assert count(PENDING) == args.students
+    time.sleep(0.1)  # let the short retry delays pass
+    print(f"  refused connection:      {len(errors)} errors recorded, no token")
+
+    # 3. Outage: nothing is lost, nothing is sent
+    StubBotAPI.down = True
+    dispatcher.run_once()
+    with app.app_context():
+        assert count(PENDING) == args.students and count(SENT) == 0
+    print(f"  during outage:           {dispatcher.stats}")
+
+    # 4. Recovery: everything but the blocked chat goes out
+    StubBotAPI.down = False
+    time.sleep(0.3)  # let the circuit's reset timeout pass
+    drain(dispatcher)
+    with app.app_context():
+        assert count(SENT) == args.students - 1, outbox_stats()
+        dead = Notification.query.filter_by(status=DEAD).all()
+        assert len(dead) == 1 and 'blocked' in dead[0].last_error, [d.last_error for d in dead]
+    print(f"  after recovery:          {args.students - 1} sent, 1 dead-lettered")
+
+    # 5. Requeue the dead letter once the parent unblocks the bot
+    StubBotAPI.bad_chat_blocked = False
+    with app.app_context():
+        assert requeue_dead() == 1
+        db.session.commit()
+    drain(dispatcher)
+    with app.app_context():
+        assert count(SENT) == args.students and count(DEAD) == 0
+    print("  requeued dead letter:    delivered")
+
+    # 6. A row abandoned mid-batch is claimed again once its lease expires
+    with app.app_context():
+        row = Notification.query.first()
+        row.status = PROCESSING
+        row.claimed_at = datetime.utcnow() - timedelta(seconds=dispatcher.lease + 1)
+        chat_id = Student.query.get(row.student_id).telegram_chat_id
+        db.session.commit()
+    drain(dispatcher)
+    with app.app_context():
+        assert count(SENT) == args.students
+    assert StubBotAPI.delivered[chat_id] == 2
+    StubBotAPI.delivered[chat_id] = 1
+    print("  expired lease:           row claimed and sent again")
+
+    server.shutdown()
+
+    assert len(StubBotAPI.delivered) == args.students
+    assert set(StubBotAPI.delivered.values()) == {1}, 'a notification was sent twice'
+    print(f"\n📊 Dispatcher stats: {dispatcher.stats}")
+    print("\n✅ Outbox passed: queued in the transaction, retried, dead-lettered, delivered once")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the presence registry
+Runs the memory and SQLite registries side by side and checks that:
+    - a user stays online while any of their sockets is connected
+    - heartbeats keep a socket alive, sockets past the TTL count as gone
+      and are purged
+    - the SQLite registry is shared by every worker on the host
+    - choose_channel picks socket, Telegram or inbox, and treats a process
+      with no registry as offline
+    - /api/presence reports online users per school, and 503 without realtime
+    - a single user's presence is only visible to their own school
+
+Runs against SQLite, no MySQL or Socket.IO server needed.
+Usage: python test_presence.py [--lookups 20000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from database import db
+from models import School, Student, ParentAccount
+from presence import (MemoryPresence, SQLitePresence, choose_channel, is_online, user_key,
+                      CHANNEL_SOCKET, CHANNEL_TELEGRAM, CHANNEL_INBOX)
+from test_helpers import create_test_app, bearer
+
+TTL = 30
+
+
+def age(registry, sid, seconds):
+    """Move the last heartbeat of sid into the past"""
+    if isinstance(registry, MemoryPresence):
+        registry._sids[sid][2] -= seconds
+    else:
+        registry._conn().execute('UPDATE presence SET last_seen = last_seen - ? WHERE sid = ?', (seconds, sid))
+
+
+def check_registry(registry):
+    parent, teacher = user_key('parent', 1), user_key('instructor', 2)
+
+    # Several sockets per user: online until the last one goes
+    registry.connect('phone', parent, 1)
+    registry.connect('tablet', parent, 1)
+    registry.connect('laptop', teacher, 2)
+    assert registry.sids(parent) == {'phone', 'tablet'}
+    assert registry.online_users(1) == [parent] and registry.online_users(2) == [teacher]
+    registry.disconnect('phone')
+    assert registry.is_online(parent) and registry.sids(parent) == {'tablet'}
+    registry.disconnect('tablet')
+    assert not registry.is_online(parent) and registry.online_users(1) == []
+    registry.disconnect('tablet')  # a second disconnect is harmless
+
+    # A reconnect under another user moves the sid
+    registry.connect('laptop', parent, 1)
+    assert not registry.is_online(teacher) and registry.sids(parent) == {'laptop'}
+
+    # Heartbeats keep a socket alive, stale ones expire and are purged
+    registry.connect('stale', teacher, 2)
+    age(registry, 'laptop', TTL - 5)
+    age(registry, 'stale', TTL + 5)
+    assert registry.heartbeat('laptop') and registry.is_online(parent)
+    assert not registry.is_online(teacher) and registry.online_users(2) == []
+    assert registry.purge_expired() == 1
+    assert not registry.heartbeat('stale')
+    registry.disconnect('laptop')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Presence registry test')
+    parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'presence.sqlite3')
+
+    memory = MemoryPresence(ttl=TTL)
+    check_registry(memory)
+    check_registry(SQLitePresence(path, ttl=TTL))
+
+    # Two workers on one host see each other's sockets
+    worker_a, worker_b = SQLitePresence(path, ttl=TTL), SQLitePresence(path, ttl=TTL)
+    worker_a.connect('sid-a', user_key('parent', 7), 1)
+    assert worker_b.is_online(user_key('parent', 7)) and worker_b.online_users(1) == ['parent:7']
+    worker_b.disconnect('sid-a')
+    assert not worker_a.is_online(user_key('parent', 7))
+
+    # Channels: no registry counts as offline
+    rest = create_test_app(['api'])
+    with rest.app_context():
+        assert not is_online('parent', 1)
+        assert choose_channel('parent', 1, '5551234') == CHANNEL_TELEGRAM
+        assert choose_channel('parent', 1) == CHANNEL_INBOX
+
+    # A REST worker without Socket.IO reads the shared SQLite registry
+    shared = create_test_app(['api'], PRESENCE_BACKEND='sqlite', PRESENCE_SQLITE_PATH=path)
+    worker_a.connect('sid-shared', user_key('parent', 3), 1)
+    with shared.app_context():
+        assert choose_channel('parent', 3, '5551234') == CHANNEL_SOCKET
+        assert choose_channel('parent', 4, '5551234') == CHANNEL_TELEGRAM
+
+    # The realtime app's own registry
+    realtime = create_test_app(['api'], realtime=True)
+    registry = realtime.presence
+    registry.connect('sid-1', user_key('parent', 5), 1)
+    registry.connect('sid-2', user_key('parent', 5), 1)
+    registry.connect('sid-3', user_key('instructor', 6), 1)
+    registry.connect('sid-4', user_key('parent', 8), 2)
+    with realtime.app_context():
+        assert choose_channel('parent', 5, '5551234') == CHANNEL_SOCKET
+        assert choose_channel('parent', 8) == CHANNEL_SOCKET
+        assert choose_channel('parent', 9) == CHANNEL_INBOX
+
+    # /api/presence
+    with realtime.app_context():
+        db.session.add_all([School(id=1, name='North High', school_code='NORTH'),
+                            School(id=2, name='South High', school_code='SOUTH')])
+        for parent_id, school_id in ((5, 1), (8, 2), (9, 1)):
+            db.session.add(Student(id=parent_id, first_name='Kid', last_name=str(parent_id), grade_level='Grade 7',
+                                   section_id=1, school_id=school_id))
+            db.session.add(ParentAccount(id=parent_id, student_id=parent_id, school_id=school_id))
+        db.session.commit()
+    headers = bearer(6, 'teacher@example.com', 'instructor', 1, 'instructor')
+    client = realtime.test_client()
+    online = client.get('/api/presence/online', headers=headers).get_json()
+    assert online['count'] == 2 and {'type': 'parent', 'id': 5} in online['online']
+    assert {'type': 'parent', 'id': 8} not in online['online']  # another school
+    user = client.get('/api/presence/parent/5', headers=headers).get_json()
+    assert user['online'] and user['connections'] == 2
+    assert not client.get('/api/presence/parent/9', headers=headers).get_json()['online']
+    # Another school's user, an unknown account or type: not found, online or not
+    assert client.get('/api/presence/parent/8', headers=headers).status_code == 404
+    assert client.get('/api/presence/parent/404', headers=headers).status_code == 404
+    assert client.get('/api/presence/main_admin/1', headers=headers).status_code == 404
+    assert client.get('/api/presence/online').status_code == 401
+    assert rest.test_client().get('/api/presence/online', headers=headers).status_code == 503
+    assert rest.test_client().get('/api/presence/parent/5', headers=headers).status_code == 404
+
+    # Lookup cost on the notification path
+    timings = {}
+    for name, registry in (('memory', memory), ('sqlite', worker_a)):
+        for n in range(100):
+            registry.connect(f'bulk-{n}', user_key('parent', 1000 + n), 1)
+        started = time.perf_counter()
+        for n in range(args.lookups):
+            registry.is_online(user_key('parent', 1000 + n % 200))
+        timings[name] = (time.perf_counter() - started) / args.lookups * 1e6
+
+    print("🧪 Presence registry")
+    print("=" * 50)
+    print("  Sockets per user:   online until the last one disconnects")
+    print(f"  Expiry:             sockets silent for {TTL} s dropped and purged")
+    print("  Channels:           socket / Telegram / inbox, no registry counts as offline")
+    print("  API:                per school, other schools' users are not found")
+    print(f"  is_online lookup:   memory {timings['memory']:.1f} us, sqlite {timings['sqlite']:.1f} us")
+    print("\n✅ Presence passed: multi-socket users, expiry, shared registry, channel choice, API")
+
+
+if __name__ == '__main__':
+    main()
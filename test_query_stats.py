@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for per-request SQL statistics and the N+1 detector
+Runs with QUERY_STRICT_LIMIT set and checks that:
+    - responses carry X-Query-Count and Server-Timing headers
+    - the endpoints that used to query per row (message and conversation
+      lists, attendance summary and history, instructor list, student
+      connections) now run a fixed number of statements however many rows
+      they return
+    - a route that queries per row fails in strict mode, even when it
+      swallows the error itself
+    - the registry keeps per-endpoint totals
+
+Runs against an in-memory SQLite database, no MySQL needed.
+Usage: python test_query_stats.py [--rows 40] [--limit 3]
+"""
+
+import argparse
+from datetime import date
+
+from flask import jsonify
+
+from database import db
+from models import (School, SchoolAdmin, Instructor, SchoolInstructorAccount, Section, Subject, Student,
+                    ParentAccount, Attendance, Conversation, Message)
+from message_templates import ATTENDANCE, attendance_params, dump_params
+from query_stats import RepeatedQueryError, query_stats, statement_shape
+from test_helpers import create_test_app, login, bearer
+
+
+def create_app(limit):
+    app = create_test_app(['api', 'school_admin', 'main_admin'], instrument=True,
+                          QUERY_STRICT_LIMIT=limit, TESTING=True)
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        return jsonify([Student.query.get(student_id).first_name for student_id in range(1, 20)])
+
+    @app.route('/n-plus-one-swallowed')
+    def n_plus_one_swallowed():
+        try:
+            return jsonify([Student.query.get(student_id).first_name for student_id in range(1, 20)])
+        except Exception as e:
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    return app
+
+
+def seed(rows):
+    school = School(name='Query National High School', school_code='QUERYNHS')
+    db.session.add(school)
+    db.session.flush()
+    admins = [SchoolAdmin(username=f'queryadmin{i}', password='x', school_id=school.id, role='admin') for i in range(3)]
+    sections = [Section(name=f'Section {i}', school_id=school.id, grade_level='Grade 8') for i in range(4)]
+    db.session.add_all(admins + sections)
+    db.session.flush()
+    instructors = [Instructor(name=f'Teacher {i}', gender='Female', address='Cebu City', email=f'q{i}@example.com',
+                              school_id=school.id, created_by=admins[i % 3].id) for i in range(rows)]
+    subjects = [Subject(name=f'Subject {i}', school_id=school.id, grade_level='Grade 8') for i in range(rows)]
+    students = [Student(first_name=f'Student{i}', last_name='Query', grade_level='Grade 8',
+                        section_id=sections[i % 4].id, school_id=school.id, code=f'Q{i:05d}') for i in range(rows)]
+    db.session.add_all(instructors + subjects + students)
+    db.session.flush()
+    account = SchoolInstructorAccount(instructor_id=instructors[0].id, school_admin_id=admins[0].id,
+                                      school_id=school.id)
+    parent = ParentAccount(student_id=students[0].id, school_id=school.id)
+    db.session.add_all([account, parent])
+    db.session.flush()
+    db.session.add_all([Attendance(student_id=students[0].id, date=date.today(), status='Present',
+                                   subject_id=subjects[i].id, instructor_id=instructors[i].id) for i in range(rows)])
+    conversation = Conversation(school_id=school.id, participant1_id=account.id, participant1_type='instructor',
+                                participant2_id=parent.id, participant2_type='parent')
+    db.session.add(conversation)
+    db.session.flush()
+    db.session.add_all([Message(conversation_id=conversation.id,
+                                sender_id=account.id if i % 2 else parent.id,
+                                sender_type='instructor' if i % 2 else 'parent',
+                                receiver_id=parent.id if i % 2 else account.id,
+                                receiver_type='parent' if i % 2 else 'instructor',
+                                content=f'Message {i}') for i in range(rows)])
+
+    # One conversation per other parent: a read text, then an unread attendance notice
+    parents = [ParentAccount(student_id=student.id, school_id=school.id) for student in students[1:]]
+    db.session.add_all(parents)
+    db.session.flush()
+    conversations = [Conversation(school_id=school.id, participant1_id=account.id, participant1_type='instructor',
+                                  participant2_id=other.id, participant2_type='parent') for other in parents]
+    db.session.add_all(conversations)
+    db.session.flush()
+    for i, (other, other_conversation) in enumerate(zip(parents, conversations)):
+        db.session.add(Message(conversation_id=other_conversation.id, sender_id=other.id, sender_type='parent',
+                               receiver_id=account.id, receiver_type='instructor', content='Thank you',
+                               is_read=True))
+        db.session.add(Message(conversation_id=other_conversation.id, sender_id=other.id, sender_type='parent',
+                               receiver_id=account.id, receiver_type='instructor', template_id=ATTENDANCE,
+                               params=dump_params(attendance_params(other.student_id, subjects[i].id,
+                                                                    date.today().isoformat(), 'Late',
+                                                                    '08:00', '09:00'))))
+    db.session.commit()
+    return school.id, account, parent, conversation.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query statistics test')
+    parser.add_argument('--rows', type=int, default=40)
+    parser.add_argument('--limit', type=int, default=3)
+    args = parser.parse_args()
+
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x' LIMIT 5") == \
+        statement_shape("SELECT * FROM t WHERE id IN (?, ?) AND name = 'y' LIMIT 10")
+
+    app = create_app(args.limit)
+    client = app.test_client()
+    with app.app_context():
+        school_id, account, parent, conversation_id = seed(args.rows)
+        instructor_headers = bearer(account.id, 'q0@example.com', 'instructor', school_id, 'instructor')
+        parent_headers = bearer(parent.id, str(parent.student_id), 'parent', school_id, 'parent')
+    login(client, school_id=school_id)
+
+    # Every formerly per-row endpoint, in strict mode
+    counts = {}
+    for name, url, headers, key in (
+            ('message list', f'/api/messaging/conversations/{conversation_id}/messages?limit=100',
+             instructor_headers, 'messages'),
+            ('conversation list', '/api/messaging/conversations', instructor_headers, 'conversations'),
+            ('attendance summary', '/api/attendance/summary', parent_headers, 'today'),
+            ('attendance history', '/api/attendance/history?limit=100', parent_headers, 'items'),
+            ('instructor list', '/school_admin/instructors', None, None),
+            ('student connections', '/main_admin/all-student-connections', None, 'students')):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, (name, response.data[:300])
+        if key:
+            assert len(response.get_json()[key]) == args.rows, name
+        assert response.headers['X-Query-Count'].isdigit()
+        assert response.headers['Server-Timing'].startswith('db;dur=')
+        counts[name] = int(response.headers['X-Query-Count'])
+        assert counts[name] <= 6, (name, counts[name])
+        if name == 'conversation list':
+            listed = {item['participantName']: item for item in response.get_json()[key]}
+            notice = listed['Parent of Student1 Query']
+            assert notice['unreadCount'] == 1 and notice['lastMessage'].startswith('Attendance for Student1 Query')
+            assert 'Subject: Subject 0' in notice['lastMessage'] and 'Status: Late' in notice['lastMessage']
+            assert listed['Parent of Student0 Query']['lastMessage'] == f'Message {args.rows - 1}'
+            assert listed['Parent of Student0 Query']['unreadCount'] == args.rows // 2
+
+    # A per-row loop fails, swallowed or not
+    for url in ('/n-plus-one', '/n-plus-one-swallowed'):
+        try:
+            client.get(url)
+        except RepeatedQueryError as e:
+            assert e.count == args.limit + 1 and 'students' in e.shape
+        else:
+            raise AssertionError(f'{url} was not stopped')
+
+    snapshot = query_stats.snapshot()
+    assert snapshot['attendance_api.summary']['requests'] == 1
+    assert snapshot['n_plus_one']['most_repeated'] == args.limit + 1
+
+    print("🧪 Per-request SQL statistics")
+    print("=" * 50)
+    print(f"  Rows per endpoint:   {args.rows}")
+    print(f"  Strict limit:        {args.limit} repeats of one statement")
+    for name, count in counts.items():
+        print(f"  {name:<20} {count} statements")
+    print("\n✅ Query statistics passed: headers, registry and N+1 detection work")
+
+
+if __name__ == '__main__':
+    main()
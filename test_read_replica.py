@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the database configuration layer and read-replica routing
+Uses two SQLite files holding different data as "primary" and "replica",
+so every response shows where it was read from. Checks that:
+    - pool settings from the config reach the MySQL engines
+    - @read_replica views (logs stats, attendance history) read the replica
+    - other views, and all views without a replica configured, read the primary
+    - writes inside a replica view go to the primary, and reads after a
+      write follow them there
+
+Needs no database server (the MySQL engine is created, never connected).
+Usage: python test_read_replica.py
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import date
+
+from flask import jsonify
+from sqlalchemy.orm import Session
+
+from app_factory import create_script_app
+from database import db, read_replica, replica_reads, REPLICA
+from models import School, Section, Student, Subject, Instructor, ParentAccount, Attendance, ActivityLog
+from test_helpers import TestConfig, create_test_app, login, bearer
+
+
+def create_app(primary, replica=None):
+    app = create_test_app(['school_admin', 'api'], db_path=primary,
+                          DATABASE_REPLICA_URL=f'sqlite:///{replica}' if replica else None)
+
+    @app.route('/log-count')
+    def log_count():
+        return jsonify({'count': ActivityLog.query.count()})
+
+    @app.route('/write-then-read', methods=['POST'])
+    @read_replica
+    def write_then_read():
+        before = ActivityLog.query.count()
+        db.session.add(ActivityLog(school_id=1, username='writer', user_role='school_admin',
+                                   action='CREATE', entity_type='student'))
+        db.session.commit()
+        return jsonify({'before': before, 'after': ActivityLog.query.count()})
+
+    return app
+
+
+def seed(logs, attendance_status):
+    """The same school in both databases, with a different number of logs and
+    a different attendance status, so responses show their source"""
+    school = School(name='Replica National High School', school_code='REPLNHS')
+    db.session.add(school)
+    db.session.flush()
+    section = Section(name='Rizal', school_id=school.id, grade_level='Grade 9')
+    subject = Subject(name='Science', school_id=school.id, grade_level='Grade 9')
+    instructor = Instructor(name='Teacher', gender='Male', address='Davao City', email='r@example.com',
+                            school_id=school.id)
+    db.session.add_all([section, subject, instructor])
+    db.session.flush()
+    student = Student(first_name='Rosa', last_name='Cruz', grade_level='Grade 9', section_id=section.id,
+                      school_id=school.id, code='REPL0001')
+    db.session.add(student)
+    db.session.flush()
+    db.session.add(ParentAccount(student_id=student.id, school_id=school.id))
+    db.session.add(Attendance(student_id=student.id, date=date.today(), status=attendance_status,
+                              subject_id=subject.id, instructor_id=instructor.id))
+    db.session.add_all([ActivityLog(school_id=school.id, username='admin', user_role='school_admin',
+                                    action='UPDATE', entity_type='student') for _ in range(logs)])
+    db.session.commit()
+
+
+def main():
+    argparse.ArgumentParser(description='Read replica routing test').parse_args()
+    folder = tempfile.mkdtemp()
+    primary, replica = os.path.join(folder, 'primary.sqlite3'), os.path.join(folder, 'replica.sqlite3')
+
+    # Pool settings reach a MySQL engine
+    mysql_app = create_script_app(type('MySQLConfig', (TestConfig,), {
+        'DATABASE_URL': 'mysql+pymysql://user:pw@db.invalid/attendance_db', 'DB_POOL_SIZE': 7,
+        'DB_MAX_OVERFLOW': 3, 'DB_POOL_RECYCLE': 600, 'DB_POOL_TIMEOUT': 4,
+        'DATABASE_REPLICA_URL': 'mysql+pymysql://user:pw@replica.invalid/attendance_db'}))
+    with mysql_app.app_context():
+        for key in (None, REPLICA):
+            pool = db.engines[key].pool
+            assert pool.size() == 7 and pool._max_overflow == 3 and pool._recycle == 600
+            assert pool._timeout == 4 and pool._pre_ping
+
+    app = create_app(primary, replica)
+    with app.app_context():
+        seed(logs=3, attendance_status='Present')
+        db.session.remove()
+        db.metadata.create_all(db.engines[REPLICA])
+        with Session(db.engines[REPLICA]) as replica_session:
+            replica_session.add(School(id=1, name='Replica National High School', school_code='REPLNHS'))
+            replica_session.add(Section(id=1, name='Rizal', school_id=1, grade_level='Grade 9'))
+            replica_session.add(Subject(id=1, name='Science', school_id=1, grade_level='Grade 9'))
+            replica_session.add(Instructor(id=1, name='Teacher', gender='Male', address='Davao City',
+                                           email='r@example.com', school_id=1))
+            replica_session.add(Student(id=1, first_name='Rosa', last_name='Cruz', grade_level='Grade 9',
+                                        section_id=1, school_id=1, code='REPL0001'))
+            replica_session.add(ParentAccount(id=1, student_id=1, school_id=1))
+            replica_session.add(Attendance(student_id=1, date=date.today(), status='Late', subject_id=1,
+                                           instructor_id=1))
+            replica_session.add_all([ActivityLog(school_id=1, username='admin', user_role='school_admin',
+                                                 action='UPDATE', entity_type='student') for _ in range(10)])
+            replica_session.commit()
+
+    client = app.test_client()
+    login(client, user_id=1, user_type='school_admin', school_id=1)
+    parent_headers = bearer(1, '1', 'parent', 1, 'parent')
+
+    # Reporting views read the replica
+    assert client.get('/school_admin/logs/api/stats').get_json()['total'] == 10
+    history = client.get('/api/attendance/history', headers=parent_headers).get_json()
+    assert history['items'][0]['status'] == 'Late', history
+
+    # Everything else reads the primary
+    assert client.get('/log-count').get_json()['count'] == 3
+    summary = client.get('/api/attendance/summary', headers=parent_headers).get_json()
+    assert summary['today'][0]['status'] == 'Present', summary
+
+    # Writes go to the primary, and reads after them follow
+    result = client.post('/write-then-read').get_json()
+    assert result == {'before': 10, 'after': 4}, result
+    assert client.get('/log-count').get_json()['count'] == 4
+    assert client.get('/school_admin/logs/api/stats').get_json()['total'] == 10
+
+    # Without a replica the decorator changes nothing
+    plain = create_app(primary)
+    plain_client = plain.test_client()
+    login(plain_client, school_id=1)
+    assert plain_client.get('/school_admin/logs/api/stats').get_json()['total'] == 4
+    with plain.app_context(), replica_reads():
+        assert ActivityLog.query.count() == 4
+
+    print("🧪 Database configuration and read replica")
+    print("=" * 50)
+    print("  MySQL pool:          size 7, overflow 3, recycle 600 s, timeout 4 s, pre-ping")
+    print("  Reporting views:     replica (10 logs, attendance Late)")
+    print("  Other views:         primary (3 logs, attendance Present)")
+    print("  Write in a report:   primary, later reads follow it")
+    print("\n✅ Read replica passed: pool settings applied, reads routed, writes kept on the primary")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test script for the Telegram registration index
+Resolves "SCHOOL STUDENTCODE" messages against three schools that share
+words and a student code used at two of them, and checks that:
+    - a code matches only when another word names the student's school,
+      in either order, and a bot's school_id narrows the match
+    - ambiguous codes and school words return every matching student
+    - students added, deleted and imported through the CRUD pages are
+      found (or gone) at once, without a query
+    - students and schools written by another worker or a setup script
+      are picked up by the miss rebuild and the periodic refresh
+    - handle_manual_registration links the resolved student
+    - with several bots, only the bot serving the student's school links it
+
+Runs against an in-memory SQLite database, no MySQL or Telegram needed.
+Usage: python test_registration_index.py [--students 2000] [--lookups 5000]
+"""
+
+import argparse
+import io
+import time
+
+from sqlalchemy import event
+
+import registration_index as index_module
+from database import db
+from models import School, Section, Student, TelegramConfig, SchoolTelegramBot
+from registration_index import registration_index, school_terms
+from telegram_bot import handle_manual_registration, handle_start_command
+from telegram_provider import invalidate_telegram_config
+from test_helpers import create_test_app, login
+
+
+class FakeBot:
+    def __init__(self, bot_token=None):
+        self.bot_token = bot_token
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def resolve(text, school_id=None):
+    return sorted(student_id for student_id, _ in registration_index.resolve(text.split(), school_id))
+
+
+def age_index(seconds):
+    """Pretend the index was loaded seconds ago"""
+    registration_index._loaded_at -= seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registration index test')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--lookups', type=int, default=5000)
+    args = parser.parse_args()
+
+    assert school_terms('RNHS', 'Rizal National High School') == {
+        'RNHS', 'RIZALNATIONALHIGHSCHOOL', 'RIZAL', 'NATIONAL', 'HIGH', 'SCHOOL'}
+
+    app = create_test_app(['school_admin'])
+    with app.app_context():
+        schools = [School(name='Rizal National High School', school_code='RNHS'),
+                   School(name='San Jose High School', school_code='SJHS'),
+                   School(name='Rizal Science Academy', school_code='RSA')]
+        db.session.add_all(schools)
+        db.session.flush()
+        rnhs, sjhs, rsa = (school.id for school in schools)
+        sections = [Section(name='Mabini', school_id=school.id, grade_level='Grade 7') for school in schools]
+        db.session.add_all(sections)
+        db.session.flush()
+        students = [Student(first_name='Ana', last_name='Rizal', grade_level='Grade 7', section_id=sections[0].id,
+                            school_id=rnhs, code='ABC123'),
+                    Student(first_name='Ben', last_name='San Jose', grade_level='Grade 7',
+                            section_id=sections[1].id, school_id=sjhs, code='abc123'),
+                    Student(first_name='Cai', last_name='Science', grade_level='Grade 7',
+                            section_id=sections[2].id, school_id=rsa, code='XYZ789')]
+        students += [Student(first_name=f'Student{i}', last_name='Filler', grade_level='Grade 7',
+                             section_id=sections[i % 3].id, school_id=schools[i % 3].id, code=f'F{i:06d}')
+                     for i in range(args.students)]
+        db.session.add_all(students)
+        db.session.commit()
+        ana, ben, cai = (student.id for student in students[:3])
+        section_ids = [section.id for section in sections]
+        registration_index.rebuild()
+
+        # One code, one school word, either order; codes are case-insensitive
+        assert resolve('RNHS ABC123') == [ana]
+        assert resolve('abc123 rnhs') == [ana]
+        assert resolve('ABC123 SAN') == [ben]
+        assert resolve('XYZ789 RIZALSCIENCEACADEMY') == [cai]
+        # The word that is the code does not also count as the school
+        assert resolve('ABC123') == [] and resolve('XYZ789 RNHS') == []
+
+        # Ambiguous: HIGH names two schools, RIZAL names two others
+        assert resolve('ABC123 HIGH') == [ana, ben]
+        assert resolve('ABC123 RIZAL') == [ana]
+        assert resolve('XYZ789 RIZAL') == [cai]
+        # A bot serving one school only sees its students
+        assert resolve('ABC123 HIGH', sjhs) == [ben]
+        assert resolve('XYZ789 RIZAL', rnhs) == []
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+        started = time.perf_counter()
+        for i in range(args.lookups):
+            registration_index.resolve(['RNHS', f'F{i * 3 % args.students:06d}'])
+        lookup_us = (time.perf_counter() - started) / args.lookups * 1e6
+        assert statements == []
+
+    # CRUD pages keep the index current without a rebuild
+    client = app.test_client()
+    login(client, school_id=rnhs, username='admin', user_type='school_admin')
+    xhr = {'X-Requested-With': 'XMLHttpRequest'}
+    response = client.post('/school_admin/add_student', headers=xhr, data={
+        'first_name': 'Dina', 'last_name': 'New', 'grade_level': 'Grade 7',
+        'section_id': str(section_ids[0]), 'parent_contact': ''})
+    assert response.status_code in (200, 201), response.data[:300]
+    csv = 'First Name,Last Name,Grade Level,Section,Parent Contact\nEli,Imported,Grade 7,Mabini,\n'
+    response = client.post('/school_admin/import_students', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(csv.encode()), 'students.csv')})
+    assert response.get_json()['imported'] == 1, response.get_json()
+    response = client.post(f'/school_admin/delete_student/{ana}', headers=xhr)
+    assert response.status_code == 200, response.data[:300]
+
+    with app.app_context():
+        dina = Student.query.filter_by(first_name='Dina').one()
+        eli = Student.query.filter_by(first_name='Eli').one()
+        statements.clear()
+        assert resolve(f'RNHS {dina.code}') == [dina.id]
+        assert resolve(f'{eli.code} NATIONAL') == [eli.id]
+        assert resolve('ABC123 HIGH') == [ben]
+        assert statements == []
+
+        # Written by another worker: found by the rebuild a miss triggers
+        other = Student(first_name='Fe', last_name='Elsewhere', grade_level='Grade 7',
+                        section_id=section_ids[1], school_id=sjhs, code='OTHER01')
+        db.session.add(other)
+        db.session.commit()
+        assert resolve('OTHER01 SJHS') == []  # loaded moments ago, no rebuild yet
+        age_index(index_module.MISS_REBUILD_INTERVAL + 1)
+        assert resolve('OTHER01 SJHS') == [other.id]
+
+        # A school added by a setup script: picked up by the periodic refresh
+        school = School(name='Mabini Integrated School', school_code='MIS')
+        db.session.add(school)
+        db.session.flush()
+        late = Student(first_name='Gil', last_name='Late', grade_level='Grade 7', section_id=section_ids[0],
+                       school_id=school.id, code='LATE001')
+        db.session.add(late)
+        db.session.commit()
+        age_index(index_module.REFRESH_INTERVAL + 1)
+        assert registration_index.candidates(['LATE001', 'MABINI']) == [(late.id, 'LATE001')]
+
+        # The bot links the resolved student
+        bot = FakeBot()
+        result = handle_manual_registration('XYZ789 RIZAL', '4242', None, bot)
+        assert result['status'] == 'success' and result['student_id'] == cai
+        assert db.session.get(Student, cai).telegram_chat_id == '4242'
+        result = handle_manual_registration('ABC123 RNHS', '4343', None, bot)
+        assert result['status'] == 'error' and 'No matching student' in bot.sent[-1][1]
+
+        # With two bots, a school pinned to one cannot be registered through the other
+        configs = [TelegramConfig(bot_token='1:FIRST', bot_username='first_bot', is_active=True),
+                   TelegramConfig(bot_token='2:SECOND', bot_username='second_bot', is_active=True)]
+        db.session.add_all(configs)
+        db.session.flush()
+        db.session.add(SchoolTelegramBot(school_id=rsa, telegram_config_id=configs[1].id))
+        db.session.commit()
+        invalidate_telegram_config()
+        first, second = FakeBot('1:FIRST'), FakeBot('2:SECOND')
+        assert handle_manual_registration('XYZ789 RSA', '4444', None, first)['status'] == 'error'
+        assert handle_start_command('/start XYZ789', '4444', None, first)['status'] == 'error'
+        assert all('@second_bot' in text for _, text in first.sent), first.sent
+        assert db.session.get(Student, cai).telegram_chat_id == '4242'
+        result = handle_manual_registration('XYZ789 RSA', '4242', None, second)
+        assert result['status'] == 'success' and result['student_id'] == cai
+        invalidate_telegram_config()
+
+    print("🧪 Telegram registration index")
+    print("=" * 50)
+    print(f"  Students indexed:   {args.students + 3} in 3 schools sharing words and a code")
+    print(f"  Lookup:             {lookup_us:.1f} us, no queries")
+    print("  CRUD hooks:         add, import and delete visible at once")
+    print("  Other writers:      picked up by the miss rebuild and the periodic refresh")
+    print("  Several bots:       linked only through the bot serving the school")
+    print("\n✅ Registration index passed: ambiguous codes and schools, hooks, rebuilds, bot linking")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test script for the normalized schedule engine
+Generates a school timetable, including rows with legacy unpadded and
+AM/PM times, and checks that:
+    - weekday/start_minute/end_minute are filled in on save
+    - ScheduleIndex overlap lookups match a brute-force scan
+    - conflict_report finds exactly the overlapping pairs a pairwise scan finds
+    - the index reloads after any worker's write bumps the schedule version,
+      including swaps and shifts that leave counts and sums unchanged, and
+      costs one primary key lookup while current
+    - create_assignment rejects overlaps the old string comparison missed
+    - /school_admin/assignments/conflicts reports the whole school
+
+Runs against an in-memory SQLite database, no MySQL needed.
+Usage: python test_schedule_index.py [--classes 3000]
+"""
+
+import argparse
+import random
+import time
+from itertools import combinations
+
+from sqlalchemy import event
+
+from database import db
+from models import School, Instructor, Section, Subject, InstructorSchedule
+from schedule_index import (DAY_NAMES, INSTRUCTOR, SECTION, conflict_report, get_schedule_index,
+                            format_minutes, parse_minutes, schedules_changed)
+from test_helpers import create_test_app, login
+
+
+def legacy_time(minutes, style):
+    """The ways times ended up stored before they were normalized"""
+    if style == 0:
+        return format_minutes(minutes)
+    if style == 1:
+        return f"{minutes // 60}:{minutes % 60:02d}"
+    hour = minutes // 60
+    return f"{(hour - 1) % 12 + 1}:{minutes % 60:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def brute_force_pairs(slots):
+    pairs = set()
+    for a, b in combinations(slots, 2):
+        if a.weekday == b.weekday and a.start < b.end and b.start < a.end:
+            if a.instructor_id == b.instructor_id:
+                pairs.add((INSTRUCTOR, frozenset((a.id, b.id))))
+            if a.section_id == b.section_id:
+                pairs.add((SECTION, frozenset((a.id, b.id))))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Schedule index test')
+    parser.add_argument('--classes', type=int, default=3000)
+    args = parser.parse_args()
+    rng = random.Random(38)
+
+    app = create_test_app(['school_admin'])
+    with app.app_context():
+        school = School(name='Schedule National High School', school_code='SCHEDNHS')
+        db.session.add(school)
+        db.session.flush()
+        instructors = [Instructor(name=f'Teacher {i}', gender='Female', address='Cebu City',
+                                  email=f'teacher{i}@example.com', school_id=school.id) for i in range(120)]
+        sections = [Section(name=f'Section {i}', school_id=school.id, grade_level='Grade 8') for i in range(90)]
+        subjects = [Subject(name=f'Subject {i}', school_id=school.id, grade_level='Grade 8') for i in range(12)]
+        db.session.add_all(instructors + sections + subjects)
+        db.session.flush()
+
+        for i in range(args.classes):
+            start = rng.randrange(7 * 60, 17 * 60, 15)
+            end = start + rng.choice((45, 60, 90))
+            db.session.add(InstructorSchedule(
+                instructor_id=rng.choice(instructors).id, section_id=rng.choice(sections).id,
+                subject_id=rng.choice(subjects).id, day=DAY_NAMES[rng.randrange(5)],
+                start_time=legacy_time(start, i % 3), end_time=legacy_time(end, i % 3)))
+        db.session.commit()
+
+        rows = InstructorSchedule.query.all()
+        assert all(row.start_minute == parse_minutes(row.start_time) is not None for row in rows)
+        assert all(row.weekday == DAY_NAMES.index(row.day) for row in rows)
+        legacy = next(row for row in rows if ' ' in row.start_time)
+        print(f"  '{legacy.start_time}' -> {legacy.start_minute} minutes")
+
+        # Overlap lookups against a brute-force scan
+        index = get_schedule_index(school.id)
+        slots = index.slots()
+        assert len(slots) == args.classes
+        for _ in range(500):
+            resource = rng.choice(instructors).id
+            weekday = rng.randrange(5)
+            start = rng.randrange(7 * 60, 17 * 60, 5)
+            end = start + rng.choice((30, 60, 120))
+            expected = sorted(slot.id for slot in slots if slot.instructor_id == resource
+                              and slot.weekday == weekday and slot.start < end and slot.end > start)
+            found = sorted(slot.id for slot in index.overlapping(INSTRUCTOR, resource, weekday, start, end))
+            assert found == expected, (found, expected)
+
+        # Sweep line against the pairwise scan
+        started = time.perf_counter()
+        conflicts = conflict_report(slots)
+        sweep_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        expected_pairs = brute_force_pairs(slots)
+        pairwise_seconds = time.perf_counter() - started
+        found_pairs = {(conflict.kind, frozenset((conflict.first.id, conflict.second.id))) for conflict in conflicts}
+        assert len(found_pairs) == len(conflicts) and found_pairs == expected_pairs
+
+        # Another worker swaps the days of two classes and moves two others by
+        # +30 and -30 minutes: counts and column sums stay the same
+        first, second, third, fourth = rows[:4]
+        db.session.execute(db.update(InstructorSchedule), [
+            {'id': first.id, 'weekday': second.weekday}, {'id': second.id, 'weekday': first.weekday},
+            {'id': third.id, 'start_minute': third.start_minute + 30, 'end_minute': third.end_minute + 30},
+            {'id': fourth.id, 'start_minute': fourth.start_minute - 30, 'end_minute': fourth.end_minute - 30}])
+        schedules_changed(school.id)
+        db.session.commit()
+        db.session.expire_all()
+        moved = {slot.id: slot for slot in get_schedule_index(school.id).slots()}
+        for row in (first, second, third, fourth):
+            assert (moved[row.id].weekday, moved[row.id].start) == (row.weekday, row.start_minute)
+
+        # A current index costs one primary key lookup
+        lookups = []
+        listener = lambda conn, cursor, statement, *rest: lookups.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        get_schedule_index(school.id)
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len(lookups) == 1 and 'FROM schools' in lookups[0], lookups
+
+        # The endpoint: a conflict the old string comparison missed
+        client = app.test_client()
+        login(client, school_id=school.id)
+        teacher = instructors[0]
+        section = sections[0]
+        InstructorSchedule.query.filter_by(instructor_id=teacher.id).delete()
+        InstructorSchedule.query.filter_by(section_id=section.id).delete()
+        db.session.add(InstructorSchedule(instructor_id=teacher.id, section_id=section.id,
+                                          subject_id=subjects[0].id, day='Saturday',
+                                          start_time='9:00', end_time='10:00'))
+        schedules_changed(school.id)
+        db.session.commit()
+        # '09:30' < '10:00' but '10:30' > '9:00' is False as strings
+        response = client.post('/school_admin/assignments', json={
+            'instructor_id': teacher.id, 'subject_id': subjects[1].id, 'section_id': sections[1].id,
+            'day': 'Saturday', 'start_time': '09:30', 'end_time': '10:30'})
+        assert response.status_code == 400 and 'Time conflict' in response.get_json()['message'], response.get_json()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+        response = client.post('/school_admin/assignments', json={
+            'instructor_id': teacher.id, 'subject_id': subjects[1].id, 'section_id': sections[1].id,
+            'day': 'Saturday', 'start_time': '10:00 AM', 'end_time': '11:00 AM'})
+        assert response.status_code == 201, response.get_json()
+        create_statements = len(statements)
+        created = InstructorSchedule.query.order_by(InstructorSchedule.id.desc()).first()
+        assert (created.start_time, created.start_minute, created.weekday) == ('10:00', 600, 5)
+
+        response = client.get('/school_admin/assignments/conflicts')
+        report = response.get_json()
+        assert report['success'] and report['count'] == len(brute_force_pairs(get_schedule_index(school.id).slots()))
+        assert created.id in {slot.id for slot in get_schedule_index(school.id).slots()}
+
+    print("🧪 Schedule index")
+    print("=" * 50)
+    print(f"  Classes:                  {args.classes}")
+    print(f"  Overlapping pairs:        {len(conflicts)}")
+    print(f"  Sweep-line report:        {sweep_seconds * 1000:8.1f} ms")
+    print(f"  Pairwise scan:            {pairwise_seconds * 1000:8.1f} ms")
+    print(f"  Statements per create:    {create_statements}")
+    print("  Current index check:      1 primary key lookup")
+    print("\n✅ Schedule index passed: integer overlaps, index and sweep match brute force")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the structured logging pipeline
+Checks that:
+    - records come out as one JSON object per line, with extra fields,
+      tracebacks and the method, path, user and school of the request
+    - per-module levels apply and LOG_SAMPLE thins debug records while
+      warnings are always kept
+    - disabled debug calls never format their arguments
+    - records are written by the listener thread, not the one logging
+    - a full queue drops records without blocking and counts them in
+      edutrack_log_records_dropped_total
+    - record_attendance no longer prints the submitted form
+
+Usage: python test_structured_logging.py [--records 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import jsonify, session
+
+import structured_logging
+from metrics import log_dropped
+from structured_logging import shutdown_logging, parse_levels, parse_sample
+from test_helpers import create_test_app
+
+
+class Expensive:
+    """Counts how often it is formatted"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'expensive'
+
+
+def create_app(path, **config):
+    app = create_test_app(LOG_FILE=path, LOG_FORMAT='json', LOG_LEVEL='INFO', **config)
+
+    @app.route('/schools/<int:school_id>/log')
+    def log_in_request(school_id):
+        session['user_id'] = 7
+        session['school_id'] = school_id
+        logging.getLogger('blueprints.test').info("Saved %d rows", 3, extra={'rows': 3})
+        return jsonify({'success': True})
+
+    return app
+
+
+def read_records(path):
+    shutdown_logging()  # writes out everything still queued
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Structured logging test')
+    parser.add_argument('--records', type=int, default=2000, help='debug records for the sampling check')
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp()
+
+    assert parse_levels('blueprints=debug, telegram_bot=WARNING') == {'blueprints': 10, 'telegram_bot': 30}
+    assert parse_sample('DEBUG=0.1') == {10: 0.1}
+    try:
+        parse_levels('blueprints=LOUD')
+        raise AssertionError('unknown level accepted')
+    except ValueError:
+        pass
+
+    # JSON records, request context, per-module levels, sampling
+    path = os.path.join(folder, 'app.log')
+    app = create_app(path, LOG_LEVELS='quiet=WARNING,chatty=DEBUG', LOG_SAMPLE='DEBUG=0.1')
+    writers = []
+    output = structured_logging._listener.handlers[0]
+    emit = output.emit
+    output.emit = lambda record: (writers.append(threading.current_thread().name), emit(record))
+
+    assert app.test_client().get('/schools/4/log').status_code == 200
+    logging.getLogger('quiet.module').info("hidden")
+    logging.getLogger('quiet.module').warning("shown")
+    chatty = logging.getLogger('chatty')
+    for n in range(args.records):
+        chatty.debug("debug %d", n)
+    chatty.warning("always kept")
+    try:
+        raise RuntimeError('boom')
+    except RuntimeError:
+        logging.getLogger('blueprints.test').exception("Failed")
+
+    expensive = Expensive()
+    started = time.perf_counter()
+    for _ in range(10000):
+        logging.getLogger('blueprints.test').debug("Form data: %s", expensive)
+    disabled_ns = (time.perf_counter() - started) / 10000 * 1e9
+    assert expensive.formatted == 0
+
+    records = read_records(path)
+    assert threading.current_thread().name not in writers and writers
+    saved = next(r for r in records if r['msg'] == 'Saved 3 rows')
+    assert saved['level'] == 'INFO' and saved['logger'] == 'blueprints.test' and saved['rows'] == 3
+    assert saved['method'] == 'GET' and saved['path'] == '/schools/4/log'
+    assert saved['user_id'] == 7 and saved['school_id'] == 4
+    messages = [r['msg'] for r in records]
+    assert 'hidden' not in messages and 'shown' in messages and 'always kept' in messages
+    sampled = sum(1 for m in messages if m.startswith('debug '))
+    assert 0.03 * args.records < sampled < 0.2 * args.records, sampled
+    failed = next(r for r in records if r['msg'] == 'Failed')
+    assert 'RuntimeError: boom' in failed['exc'] and 'method' not in failed
+
+    # A stalled output: the queue fills, further records are dropped at once
+    path = os.path.join(folder, 'stalled.log')
+    create_app(path, LOG_QUEUE_SIZE=10)
+    release = threading.Event()
+    output = structured_logging._listener.handlers[0]
+    emit = output.emit
+    output.emit = lambda record: (release.wait(10), emit(record))
+    before = log_dropped._values.get((), 0)
+    started = time.perf_counter()
+    for n in range(200):
+        logging.getLogger('flood').warning("record %d", n)
+    flood_ms = (time.perf_counter() - started) * 1000
+    dropped = structured_logging._handler.dropped
+    release.set()
+    assert flood_ms < 500 and dropped >= 180, (flood_ms, dropped)
+    assert log_dropped._values.get((), 0) - before == dropped
+    assert len(read_records(path)) == 200 - dropped
+
+    # record_attendance logs the form at DEBUG instead of printing it
+    from blueprints.instructor import crud_attendance
+    with open(crud_attendance.__file__, encoding='utf-8') as f:
+        source = f.read()
+    assert 'print(' not in source.replace('Blueprint(', '')
+    stdout = io.StringIO()
+    path = os.path.join(folder, 'quiet.log')
+    with contextlib.redirect_stdout(stdout):
+        create_app(path)
+        logging.getLogger('blueprints.instructor.crud_attendance').debug("Form data: %s", expensive)
+    assert not stdout.getvalue() and not read_records(path) and expensive.formatted == 0
+
+    print("🧪 Structured logging")
+    print("=" * 50)
+    print(f"  JSON records:     {len(records)} written by {writers[0]}, request context attached")
+    print(f"  Sampling:         {sampled}/{args.records} debug records kept at DEBUG=0.1")
+    print(f"  Disabled debug:   {disabled_ns:.0f} ns per call, arguments never formatted")
+    print(f"  Full queue:       {dropped}/200 dropped in {flood_ms:.1f} ms, counted in metrics")
+    print("\n✅ Structured logging passed: JSON output, levels, sampling, non-blocking queue")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the resilient Telegram transport
+Runs telegram_transport.TelegramTransport against a local stub Bot API that
+can be switched between healthy, slow, failing and rate-limited, and checks:
+    - a hanging API costs one read timeout per call, not a stuck thread
+    - the circuit opens after repeated failures and then fails fast
+    - sends made during the outage are deferred and delivered once it is over
+    - 4xx answers never open the circuit
+    - connection errors do not leak the bot token from the URL
+
+No database, Flask app or Telegram needed.
+Usage: python test_telegram_transport.py
+"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram_transport import TelegramTransport, TransportError, CircuitOpenError, CLOSED, OPEN
+
+
+class StubBotAPI(BaseHTTPRequestHandler):
+    """Behaviour is switched through StubBotAPI.mode"""
+
+    mode = 'ok'   # ok | slow | fail | throttle | bad_request
+    delay = 2.0
+    delivered = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        mode = StubBotAPI.mode
+        if mode == 'slow':
+            time.sleep(self.delay)
+            status, payload = 200, {'ok': True, 'result': {}}
+        elif mode == 'fail':
+            status, payload = 502, {'ok': False, 'description': 'Bad Gateway'}
+        elif mode == 'throttle':
+            status, payload = 429, {'ok': False, 'description': 'Too Many Requests',
+                                    'parameters': {'retry_after': 1}}
+        elif mode == 'bad_request':
+            status, payload = 400, {'ok': False, 'description': 'Bad Request: chat not found'}
+        else:
+            with self.lock:
+                self.delivered.append(body)
+            status, payload = 200, {'ok': True, 'result': {'message_id': len(self.delivered)}}
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up after its read timeout
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except TransportError as e:
+        result = e
+    return result, time.perf_counter() - start
+
+
+def wait_for(predicate, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}/bot123:STUB'
+
+    transport = TelegramTransport(connect_timeout=0.5, read_timeout=0.3, breaker_threshold=3,
+                                  breaker_reset=1.0, retry_base_delay=0.2)
+    breaker = transport.breaker(base_url)
+    print("🧪 Telegram transport against a local stub")
+    print("=" * 50)
+
+    # 1. Healthy
+    result, elapsed = timed(transport.call, base_url, 'sendMessage', {'chat_id': 1, 'text': 'hello'})
+    assert result['ok'] and breaker.state == CLOSED
+    print(f"  healthy call:            {elapsed * 1000:7.1f} ms")
+
+    # 2. API hangs: every call is cut off by the read timeout, then the circuit opens
+    StubBotAPI.mode = 'slow'
+    for i in range(3):
+        result, elapsed = timed(transport.call, base_url, 'getMe')
+        assert isinstance(result, TransportError) and result.transient
+        assert elapsed < 1.0, f'call {i} took {elapsed:.2f}s'
+    assert breaker.state == OPEN
+    print(f"  hanging API, per call:   {elapsed * 1000:7.1f} ms (read timeout 300 ms)")
+
+    result, elapsed = timed(transport.call, base_url, 'getMe')
+    assert isinstance(result, CircuitOpenError)
+    assert elapsed < 0.01
+    print(f"  circuit open, fail fast: {elapsed * 1000:7.3f} ms")
+
+    # 3. Sends during the outage are deferred, not lost
+    StubBotAPI.mode = 'fail'
+    for i in range(10):
+        assert transport.send(base_url, 'sendMessage', {'chat_id': 100 + i, 'text': f'notice {i}'}) is None
+    assert len(transport.deferred) == 10
+    print(f"  deferred during outage:  {len(transport.deferred)} messages")
+
+    # 4. API recovers: the half-open probe closes the circuit and the queue drains
+    StubBotAPI.mode = 'ok'
+    StubBotAPI.delivered.clear()
+    assert wait_for(lambda: not transport.deferred and len(StubBotAPI.delivered) == 10, timeout=15), \
+        f'{len(transport.deferred)} still deferred, {len(StubBotAPI.delivered)} delivered'
+    assert breaker.state == CLOSED
+    chats = sorted(message['chat_id'] for message in StubBotAPI.delivered)
+    assert chats == list(range(100, 110)), chats
+    print(f"  delivered after recovery: {len(StubBotAPI.delivered)} messages, each once")
+
+    # 5. Client errors and rate limits never open the circuit
+    StubBotAPI.mode = 'bad_request'
+    for _ in range(5):
+        result, _ = timed(transport.call, base_url, 'sendMessage', {'chat_id': 0, 'text': 'x'})
+        assert isinstance(result, TransportError) and not result.transient
+    StubBotAPI.mode = 'throttle'
+    for _ in range(5):
+        result, _ = timed(transport.call, base_url, 'sendMessage', {'chat_id': 0, 'text': 'x'})
+        assert result.transient and result.retry_after == 1
+    assert breaker.state == CLOSED
+    print("  400 and 429 answers:     circuit stays closed")
+
+    # 6. Connection errors never carry the URL, which holds the bot token
+    refused = TelegramTransport(connect_timeout=0.5, read_timeout=0.3)
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    refused_url = f'http://127.0.0.1:{closed.getsockname()[1]}/bot123:SECRET'
+    closed.close()
+    result, _ = timed(refused.call, refused_url, 'sendMessage', {'chat_id': 0, 'text': 'x'})
+    assert isinstance(result, TransportError) and result.transient
+    assert 'SECRET' not in str(result) and 'ConnectionError' in str(result), str(result)
+    print(f"  refused connection:      {result}")
+
+    server.shutdown()
+    print("\n📊 Metrics")
+    for method, counters in transport.metrics()['endpoints'].items():
+        print(f"  {method:<12} {counters}")
+
+    print("\n✅ Transport passed: bounded latency, fail-fast circuit, deferred sends delivered")
+
+
+if __name__ == '__main__':
+    main()
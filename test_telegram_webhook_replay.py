@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Replay test for the asynchronous Telegram webhook
+Posts a recorded-style stream of updates (with Telegram's retries, i.e.
+repeated update_ids) to /school_admin/webhook and checks the replies that
+reach a local fake Telegram API:
+    - every webhook call is acknowledged without waiting for processing
+    - duplicate update_ids are processed once
+    - replies to the same chat are merged into one sendMessage per batch
+    - with two bots, a student is only linked through the bot serving the school
+
+Runs against a temporary SQLite database, no MySQL or Telegram needed.
+Usage: python test_telegram_webhook_replay.py [--chats 50] [--retries 2]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database import db
+from models import School, Section, Student, TelegramConfig, SchoolTelegramBot
+from telegram_provider import invalidate_telegram_config
+from test_helpers import create_test_app
+
+BOT_TOKEN = '123456:REPLAY'
+OTHER_TOKEN = '654321:OTHER'
+
+
+class FakeTelegramAPI(BaseHTTPRequestHandler):
+    """Records sendMessage calls, answers like the Bot API"""
+
+    sent = []
+    other_bot = []  # sendMessage calls made through OTHER_TOKEN
+    lock = threading.Lock()
+    delay = 0.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path not in (f'/bot{BOT_TOKEN}/sendMessage', f'/bot{OTHER_TOKEN}/sendMessage'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        time.sleep(self.delay)
+        with self.lock:
+            (self.sent if BOT_TOKEN in self.path else self.other_bot).append(json.loads(body))
+        payload = json.dumps({'ok': True, 'result': {'message_id': len(self.sent)}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_telegram():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegramAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_app(api_base):
+    # A file, not :memory:, so every ingest worker gets its own connection
+    db_path = os.path.join(tempfile.mkdtemp(), 'replay.sqlite3')
+    app = create_test_app(['telegram'], db_path=db_path, TELEGRAM_API_BASE=api_base, TELEGRAM_INGEST_WORKERS=4)
+
+    with app.app_context():
+        school = School(name='Replay High School', school_code='REPLAYHIGH')
+        db.session.add(school)
+        db.session.flush()
+        section = Section(name='Rizal', school_id=school.id, grade_level='Grade 10')
+        db.session.add(section)
+        db.session.flush()
+        db.session.add(TelegramConfig(bot_token=BOT_TOKEN, bot_username='replay_bot', is_active=True))
+        db.session.commit()
+    return app
+
+
+def seed_students(app, count):
+    with app.app_context():
+        school = School.query.filter_by(school_code='REPLAYHIGH').first()
+        section = Section.query.first()
+        for i in range(count):
+            db.session.add(Student(
+                first_name=f'Student{i}', last_name='Replay', grade_level='Grade 10',
+                section_id=section.id, school_id=school.id, code=f'RP{i:04d}'
+            ))
+        db.session.commit()
+
+
+def build_updates(chats):
+    """Each chat sends /start then registers; every update is delivered once"""
+    updates = []
+    update_id = 500000
+    for chat in range(chats):
+        chat_id = 9000000 + chat
+        for text in ('/start', f'REPLAYHIGH RP{chat:04d}'):
+            update_id += 1
+            updates.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'text': text
+                }
+            })
+    return updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telegram webhook replay test')
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--retries', type=int, default=2, help='times Telegram redelivers each update')
+    parser.add_argument('--api-delay', type=float, default=0.02, help='seconds per sendMessage')
+    args = parser.parse_args()
+
+    FakeTelegramAPI.delay = args.api_delay
+    server = start_fake_telegram()
+    app = create_app(f'http://127.0.0.1:{server.server_port}')
+    seed_students(app, args.chats)
+
+    updates = build_updates(args.chats)
+    # Telegram redelivers updates it thinks were not acknowledged
+    replay = updates + [u for _ in range(args.retries) for u in updates]
+
+    client = app.test_client()
+    ack_times = []
+    statuses = {}
+    for update in replay:
+        start = time.perf_counter()
+        response = client.post('/school_admin/webhook', json=update)
+        ack_times.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    invalid = client.post('/school_admin/webhook', data='not json', content_type='application/json')
+
+    ingestor = app.telegram_ingestor
+    assert ingestor.join(timeout=60), 'ingestor did not drain in time'
+
+    ack_times.sort()
+    print("🧪 Telegram webhook replay")
+    print("=" * 50)
+    print(f"  Updates posted:      {len(replay)} ({len(updates)} unique)")
+    print(f"  Response codes:      {statuses}")
+    print(f"  Ack p50 / p99:       {ack_times[len(ack_times) // 2] * 1000:.3f} ms / "
+          f"{ack_times[int(len(ack_times) * 0.99)] * 1000:.3f} ms")
+    print(f"  Ingestor stats:      {ingestor.stats}")
+    print(f"  sendMessage calls:   {len(FakeTelegramAPI.sent)} for {len(updates)} replies")
+
+    assert statuses == {200: len(replay)}, statuses
+    assert invalid.status_code == 400
+    assert ingestor.stats['accepted'] == len(updates)
+    assert ingestor.stats['duplicates'] == len(updates) * args.retries
+    assert ingestor.stats['processed'] == len(updates)
+
+    per_chat = {}
+    for message in FakeTelegramAPI.sent:
+        per_chat.setdefault(message['chat_id'], []).append(message['text'])
+    assert len(per_chat) == args.chats, f'expected replies for {args.chats} chats, got {len(per_chat)}'
+    for chat_id, texts in per_chat.items():
+        combined = '\n\n'.join(texts)
+        assert combined.count('Registration successful') == 1, f'chat {chat_id} registered {combined.count("Registration successful")} times'
+    assert len(FakeTelegramAPI.sent) <= len(updates)
+
+    with app.app_context():
+        registered = Student.query.filter_by(telegram_status=True).count()
+    assert registered == args.chats, f'{registered} of {args.chats} students registered'
+
+    # A second bot now serves the school: the first bot must not link its students
+    with app.app_context():
+        other = TelegramConfig(bot_token=OTHER_TOKEN, bot_username='other_bot', is_active=True)
+        db.session.add(other)
+        db.session.flush()
+        school = School.query.filter_by(school_code='REPLAYHIGH').first()
+        db.session.add(SchoolTelegramBot(school_id=school.id, telegram_config_id=other.id))
+        late = Student(first_name='Late', last_name='Replay', grade_level='Grade 10',
+                       section_id=Section.query.first().id, school_id=school.id, code='RPLATE')
+        db.session.add(late)
+        db.session.commit()
+        other_id, late_id = other.id, late.id
+        invalidate_telegram_config()
+    register = {'update_id': 900001, 'message': {'message_id': 1, 'text': 'REPLAYHIGH RPLATE',
+                                                 'chat': {'id': 8000001, 'type': 'private'}}}
+    sent_before = len(FakeTelegramAPI.sent)
+    client.post('/school_admin/webhook', json=register)
+    assert ingestor.join(timeout=10)
+    with app.app_context():
+        assert db.session.get(Student, late_id).telegram_chat_id is None
+    refusals = FakeTelegramAPI.sent[sent_before:]
+    assert len(refusals) == 1 and '@other_bot' in refusals[0]['text'], refusals
+    client.post(f'/school_admin/webhook/{other_id}', json=dict(register, update_id=900002))
+    assert ingestor.join(timeout=10)
+    with app.app_context():
+        assert db.session.get(Student, late_id).telegram_chat_id == '8000001'
+    assert 'Registration successful' in FakeTelegramAPI.other_bot[-1]['text']
+    server.shutdown()
+    print("  Second bot:          refused by the wrong bot, linked by the serving one")
+
+    print("\n✅ Replay passed: duplicates dropped, every chat registered once")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for production serving
+Checks that:
+    - /healthz answers without touching the database
+    - /readyz reports 503 for an exhausted pool or an unreachable replica,
+      without waiting for a connection or returning the driver's error
+    - a hanging database gets one probe thread, later checks report it pending
+    - gunicorn.conf.py sizes workers: one realtime worker without a message
+      queue, 2 x CPUs + 1 (capped) otherwise, and picks the matching
+      Socket.IO async mode
+    - when gunicorn is installed: wsgi:app serves the API and Socket.IO, and
+      a HUP reload under load drops no request
+
+Uses temporary SQLite files, no MySQL needed.
+Usage: python test_wsgi_server.py [--skip-server]
+"""
+
+import argparse
+import http.client
+import importlib.util
+import os
+import runpy
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from database import db
+from health import check_engine
+from test_helpers import create_test_app
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def health_app(path, replica=None):
+    return create_test_app(['auth'], db_path=path, DATABASE_REPLICA_URL=replica, HEALTH_DB_TIMEOUT=1)
+
+
+def gunicorn_settings(**env):
+    saved = dict(os.environ)
+    try:
+        for key in ('WEB_WORKERS', 'WEB_REALTIME', 'WEB_WORKER_CLASS', 'SOCKETIO_MESSAGE_QUEUE', 'WEB_MAX_WORKERS',
+                    'METRICS_MULTIPROC_DIR', 'PRESENCE_BACKEND'):
+            os.environ.pop(key, None)
+        os.environ.update(env)
+        settings = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+        settings['async_mode'] = os.environ['SOCKETIO_ASYNC_MODE']
+        settings['metrics_dir'] = os.environ.get('METRICS_MULTIPROC_DIR')
+        settings['presence'] = os.environ.get('PRESENCE_BACKEND', 'memory')
+        return settings
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def serve_and_reload(folder, port):
+    """Start gunicorn, HUP it while clients are busy; returns (served, failed)"""
+    database_url = 'sqlite:///' + os.path.join(folder, 'server.sqlite3')
+    env = dict(os.environ, DATABASE_URL=database_url, WEB_BIND=f'127.0.0.1:{port}', WEB_ACCESS_LOG='')
+    subprocess.run([sys.executable, '-c', 'from app_factory import create_script_app; from database import db; '
+                    'app = create_script_app(); app.app_context().push(); db.create_all()'],
+                   cwd=ROOT, env=env, check=True)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(150):
+            try:
+                if get(port, '/healthz')[0] == 200:
+                    break
+            except OSError:
+                time.sleep(0.2)
+        status, body = get(port, '/readyz')
+        assert status == 200 and b'"ready"' in body, body
+        status, body = get(port, '/socket.io/?EIO=4&transport=polling')
+        assert status == 200 and b'"sid"' in body, body
+
+        served, failed, stop = [], [], threading.Event()
+
+        def client():
+            while not stop.is_set():
+                try:
+                    status, _ = get(port, '/readyz')
+                    (served if status == 200 else failed).append(status)
+                except OSError as e:
+                    failed.append(str(e))
+
+        clients = [threading.Thread(target=client) for _ in range(4)]
+        for thread in clients:
+            thread.start()
+        time.sleep(1)
+        server.send_signal(1)  # SIGHUP: graceful reload
+        time.sleep(4)
+        stop.set()
+        for thread in clients:
+            thread.join()
+        return len(served), failed
+    finally:
+        server.terminate()
+        server.wait(15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Production serving test')
+    parser.add_argument('--skip-server', action='store_true', help='do not start gunicorn')
+    parser.add_argument('--port', type=int, default=5177)
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp()
+
+    # Liveness and readiness
+    app = health_app(os.path.join(folder, 'health.sqlite3'))
+    client = app.test_client()
+    assert client.get('/healthz').status_code == 200
+    ready = client.get('/readyz')
+    assert ready.status_code == 200 and ready.get_json()['checks']['primary']['pool']['type'] == 'QueuePool'
+
+    with app.app_context():
+        pool = db.engine.pool
+        held = [pool.connect() for _ in range(pool.size() + pool._max_overflow)]
+        started = time.perf_counter()
+        exhausted = client.get('/readyz')
+        waited = time.perf_counter() - started
+        for connection in held:
+            connection.close()
+    assert exhausted.status_code == 503 and waited < 0.5, (exhausted.status_code, waited)
+    assert exhausted.get_json()['checks']['primary']['error'] == 'connection pool exhausted'
+    assert client.get('/readyz').status_code == 200
+
+    broken = health_app(os.path.join(folder, 'replica.sqlite3'), replica='mysql+pymysql://u:p@127.0.0.1:1/none')
+    response = broken.test_client().get('/readyz')
+    checks = response.get_json()['checks']
+    assert response.status_code == 503 and 'error' not in checks['primary']
+    assert checks['replica']['error'] == 'connection failed' and b'127.0.0.1' not in response.data
+
+    # A database that never answers: one probe thread however often it is checked
+    answer = threading.Event()
+    hanging = create_engine('sqlite://', creator=lambda: answer.wait() and sqlite3.connect(':memory:'))
+    ok, details = check_engine(hanging, 0.2)
+    assert not ok and details['error'] == 'no answer within 0.2 s'
+    started = time.perf_counter()
+    outcomes = [check_engine(hanging, 0.2) for _ in range(5)]
+    pending_ms = (time.perf_counter() - started) * 1000 / 5
+    assert all(not ok and details['error'] == 'probe pending' for ok, details in outcomes) and pending_ms < 50
+    probes = [thread for thread in threading.enumerate() if thread.name == 'readiness-probe']
+    assert len(probes) == 1
+    answer.set()
+    probes[0].join(5)
+    assert check_engine(hanging, 0.2)[0]
+
+    # Worker sizing
+    realtime = gunicorn_settings(WEB_WORKER_CLASS='gevent')
+    assert realtime['workers'] == 1 and realtime['async_mode'] == 'gevent'
+    queued = gunicorn_settings(WEB_WORKER_CLASS='eventlet', SOCKETIO_MESSAGE_QUEUE='redis://localhost')
+    assert queued['workers'] == min(os.cpu_count() * 2 + 1, 8) and queued['async_mode'] == 'eventlet'
+    rest = gunicorn_settings(WEB_REALTIME='0', WEB_WORKER_CLASS='gthread', WEB_MAX_WORKERS='2')
+    assert rest['workers'] == min(os.cpu_count() * 2 + 1, 2) and rest['async_mode'] == 'threading'
+    assert rest['max_requests'] > 0 and realtime['max_requests'] == 0
+    assert gunicorn_settings(WEB_WORKERS='3')['workers'] == 3
+    # Several workers publish their metrics to one directory, a single worker has no need
+    assert realtime['metrics_dir'] is None and realtime['presence'] == 'memory'
+    assert queued['metrics_dir'] and gunicorn_settings(WEB_WORKERS='3')['metrics_dir']
+    # ... and share one presence registry, unless another backend was chosen
+    assert queued['presence'] == 'sqlite'
+    assert gunicorn_settings(WEB_WORKERS='3', PRESENCE_BACKEND='memory')['presence'] == 'memory'
+
+    print("🧪 Production serving")
+    print("=" * 50)
+    print(f"  Readiness:        exhausted pool reported in {waited * 1000:.0f} ms, unreachable replica reported")
+    print(f"  Hanging database: one probe thread, pending reported in {pending_ms:.1f} ms")
+    print(f"  Worker sizing:    realtime 1, with queue {queued['workers']}, REST {rest['workers']} (capped)")
+
+    if args.skip_server or importlib.util.find_spec('gunicorn') is None:
+        print("  gunicorn:         not installed, server checks skipped")
+    else:
+        served, failed = serve_and_reload(folder, args.port)
+        assert served and not failed, (served, failed[:5])
+        print(f"  HUP under load:   {served} requests served, none failed")
+    print("\n✅ Production serving passed: health endpoints, worker sizing, graceful reload")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Bulk Timetable Import
+Assignments used to be created one POST at a time, each running duplicate
+and overlap queries plus lookups for its error message. A timetable import
+takes a whole term's schedule as one CSV or XLSX file:
+
+    1. resolve instructors, subjects and sections by name, one query each
+    2. parse days and times into weekday / minute-of-day integers
+    3. find duplicates and overlaps, inside the file and against the
+       school's existing classes, in one conflict_report() sweep
+    4. insert the rows with one executemany in a single transaction
+
+By default the file is all or nothing: any invalid or conflicting row
+blocks the import and the full report is returned. With partial=True the
+clean rows are inserted and the rest reported.
+"""
+
+from sqlalchemy import insert
+
+from database import db
+from models import Instructor, Subject, InstructorSchedule
+from schedule_index import (DAY_NAMES, INSTRUCTOR, Slot, conflict_report, get_schedule_index,
+                            parse_weekday, parse_minutes, format_minutes, schedules_changed)
+from student_import import SectionResolver
+
+MAX_ROWS = 5000
+
+REQUIRED_COLUMNS = ('instructor', 'subject', 'section', 'day', 'start_time', 'end_time')
+COLUMN_ALIASES = {
+    'teacher': 'instructor',
+    'instructor_name': 'instructor',
+    'teacher_name': 'instructor',
+    'subject_name': 'subject',
+    'section_name': 'section',
+    'weekday': 'day',
+    'start': 'start_time',
+    'from': 'start_time',
+    'end': 'end_time',
+    'to': 'end_time',
+    'grade': 'grade_level',
+}
+
+
+class InstructorResolver:
+    """Instructor ids by name or email for one school, from a single query"""
+
+    def __init__(self, school_id):
+        self.names = {}
+        self.by_key = {}
+        rows = db.session.query(Instructor.id, Instructor.name, Instructor.email)\
+            .filter(Instructor.school_id == school_id).all()
+        for instructor_id, name, email in rows:
+            self.names[instructor_id] = name
+            for key in (name, email):
+                if key:
+                    self.by_key.setdefault(key.strip().lower(), set()).add(instructor_id)
+
+    def resolve(self, value):
+        """(instructor id, error)"""
+        ids = self.by_key.get(value.lower(), set())
+        if len(ids) == 1:
+            return next(iter(ids)), None
+        if not ids:
+            return None, f"Unknown instructor '{value}'"
+        return None, f"Instructor '{value}' is ambiguous, use the email address"
+
+
+class SubjectResolver:
+    """Subject ids by name for one school, from a single query"""
+
+    def __init__(self, school_id):
+        self.names = {}
+        self.by_name = {}
+        rows = db.session.query(Subject.id, Subject.name, Subject.grade_level)\
+            .filter(Subject.school_id == school_id).all()
+        for subject in rows:
+            self.names[subject.id] = subject.name
+            self.by_name.setdefault(subject.name.strip().lower(), []).append(subject)
+
+    def resolve(self, value, grade_level):
+        """(subject id, error)"""
+        candidates = self.by_name.get(value.lower(), [])
+        if len(candidates) > 1:
+            # The same subject name in several grades: the grade decides
+            candidates = [subject for subject in candidates
+                          if (subject.grade_level or '').strip().lower() == grade_level.lower()]
+        if len(candidates) == 1:
+            return candidates[0].id, None
+        if not candidates:
+            return None, f"Unknown subject '{value}'"
+        return None, f"Subject '{value}' is ambiguous, add a grade_level column"
+
+
+class Names:
+    """Display names of the school's instructors, subjects and sections"""
+
+    def __init__(self, instructors, subjects, sections):
+        self.instructors = instructors.names
+        self.subjects = subjects.names
+        self.sections = {section.id: f"{section.grade_level}-{section.name}"
+                         for candidates in sections.by_name.values() for section in candidates}
+
+    def describe(self, slot, rows):
+        """A class of the conflict report; rows maps batch slot ids to row numbers"""
+        return {
+            'row': rows.get(slot.id),
+            'id': slot.id if slot.id > 0 else None,
+            'instructor': self.instructors.get(slot.instructor_id, 'Unknown'),
+            'subject': self.subjects.get(slot.subject_id, 'Unknown'),
+            'section': self.sections.get(slot.section_id, 'Unknown'),
+            'start_time': format_minutes(slot.start),
+            'end_time': format_minutes(slot.end)
+        }
+
+
+def validate_rows(rows, school_id):
+    """Resolve and parse every row: (entries, per-row errors, names)"""
+    instructors = InstructorResolver(school_id)
+    subjects = SubjectResolver(school_id)
+    sections = SectionResolver(school_id)
+
+    entries, errors = [], []
+    for number, row in rows:
+        problems = [f'{column} is required' for column in REQUIRED_COLUMNS if not row.get(column)]
+        grade_level = row.get('grade_level') or ''
+        entry = {}
+        if row.get('instructor'):
+            entry['instructor_id'], error = instructors.resolve(row['instructor'])
+            problems += [error] if error else []
+        if row.get('section'):
+            entry['section_id'], error = sections.resolve(row['section'], grade_level)
+            problems += [error] if error else []
+        if row.get('subject'):
+            entry['subject_id'], error = subjects.resolve(row['subject'], grade_level)
+            problems += [error] if error else []
+        if row.get('day'):
+            entry['weekday'] = parse_weekday(row['day'])
+            if entry['weekday'] is None:
+                problems.append(f"Unknown day '{row['day']}'")
+        for column in ('start_time', 'end_time'):
+            if row.get(column):
+                entry[column] = parse_minutes(row[column])
+                if entry[column] is None:
+                    problems.append(f"Invalid {column} '{row[column]}', use HH:MM or h:MM AM/PM")
+        if not problems and entry['start_time'] >= entry['end_time']:
+            problems.append('End time must be after start time')
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+            continue
+        entries.append((number, entry))
+    return entries, errors, Names(instructors, subjects, sections)
+
+
+def find_conflicts(entries, school_id, names):
+    """Duplicates and overlaps of the batch, inside it and against the school's
+    existing classes: (per-row errors, conflict report, rejected row numbers)"""
+    index = get_schedule_index(school_id)
+    existing = index.slots()
+    batch = [Slot(-number, entry['instructor_id'], entry['section_id'], entry['subject_id'],
+                  entry['weekday'], entry['start_time'], entry['end_time']) for number, entry in entries]
+    rows = {slot.id: -slot.id for slot in batch}
+
+    errors, rejected = [], set()
+    assigned = {(slot.instructor_id, slot.subject_id, slot.section_id, slot.weekday): slot.id for slot in existing}
+    for slot in batch:
+        key = (slot.instructor_id, slot.subject_id, slot.section_id, slot.weekday)
+        if key in assigned:
+            other = assigned[key]
+            where = f'row {rows[other]}' if other < 0 else 'an existing assignment'
+            errors.append({'row': rows[slot.id], 'errors': [f'Duplicate of {where} on {DAY_NAMES[slot.weekday]}']})
+            rejected.add(rows[slot.id])
+        else:
+            assigned[key] = slot.id
+
+    report = []
+    for conflict in conflict_report(existing + batch):
+        if conflict.first.id > 0 and conflict.second.id > 0:
+            continue  # between existing classes, see /assignments/conflicts
+        conflict_rows = [rows[slot.id] for slot in (conflict.first, conflict.second) if slot.id < 0]
+        rejected.update(conflict_rows)
+        report.append({
+            'type': conflict.kind,
+            'day': DAY_NAMES[conflict.weekday],
+            'resource': (names.instructors if conflict.kind == INSTRUCTOR else names.sections)
+                        .get(conflict.resource_id, 'Unknown'),
+            'rows': conflict_rows,
+            'with_existing': max(conflict.first.id, conflict.second.id) > 0,
+            'classes': [names.describe(conflict.first, rows), names.describe(conflict.second, rows)]
+        })
+    return errors, report, rejected
+
+
+def import_timetable(rows, school_id, dry_run=False, partial=False):
+    """Validate, conflict-check and insert parsed rows; returns a summary"""
+    entries, errors, names = validate_rows(rows, school_id)
+    duplicate_errors, conflicts, rejected = find_conflicts(entries, school_id, names)
+    errors = sorted(errors + duplicate_errors, key=lambda error: error['row'])
+    clean = [(number, entry) for number, entry in entries if number not in rejected]
+
+    summary = {'total_rows': len(rows), 'valid': len(clean), 'imported': 0,
+               'failed': len(rows) - len(clean), 'errors': errors, 'conflicts': conflicts,
+               'dry_run': dry_run, 'blocked': bool(errors or conflicts) and not partial}
+    if dry_run or summary['blocked'] or not clean:
+        return summary
+
+    db.session.execute(insert(InstructorSchedule), [{
+        'instructor_id': entry['instructor_id'],
+        'subject_id': entry['subject_id'],
+        'section_id': entry['section_id'],
+        'day': DAY_NAMES[entry['weekday']],
+        'start_time': format_minutes(entry['start_time']),
+        'end_time': format_minutes(entry['end_time']),
+        # executemany skips the ORM hooks, so the normalized columns are set here
+        'weekday': entry['weekday'],
+        'start_minute': entry['start_time'],
+        'end_minute': entry['end_time'],
+    } for _, entry in clean])
+    schedules_changed(school_id)
+    db.session.commit()
+    summary['imported'] = len(clean)
+    return summary
@@ -3,11 +3,13 @@
 Update school admin passwords to be properly hashed
 """
 
-from app import app
+from app_factory import create_script_app
 from database import db
 from models import SchoolAdmin
 from werkzeug.security import generate_password_hash
 
+app = create_script_app()
+
 def update_admin_passwords():
     with app.app_context():
         try:
@@ -4,11 +4,13 @@ Update script to add password column to school_instructor_account table
 and set default passwords for existing accounts
 """
 
-from app import app
+from app_factory import create_script_app
 from database import db
 from models import SchoolInstructorAccount
 from werkzeug.security import generate_password_hash
 
+app = create_script_app()
+
 def update_instructor_accounts():
     with app.app_context():
         try:
@@ -0,0 +1,51 @@
+"""
+Production WSGI entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+WEB_REALTIME=1 (default) serves app_realtime's app with Socket.IO.
+WEB_REALTIME=0 serves the same blueprints without Socket.IO, for extra
+REST workers next to one realtime process (see gunicorn.conf.py).
+
+`python wsgi.py` starts gunicorn with gunicorn.conf.py, or the development
+server with a warning when gunicorn is not installed.
+"""
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REALTIME = os.environ.get('WEB_REALTIME', '1') == '1'
+
+
+def load_app():
+    """The app gunicorn serves, built in each worker after the fork"""
+    if REALTIME:
+        from app_realtime import app
+        return app
+    from app_factory import create_app
+    return create_app()
+
+
+def main():
+    if importlib.util.find_spec('gunicorn') is not None:
+        from gunicorn.app.wsgiapp import run
+        os.chdir(ROOT)
+        sys.argv = ['gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'wsgi:app'] + sys.argv[1:]
+        sys.exit(run())
+
+    print("⚠️ gunicorn is not installed (pip install gunicorn gevent), using the development server")
+    host, _, port = os.environ.get('WEB_BIND', '0.0.0.0:5000').rpartition(':')
+    app = load_app()
+    if REALTIME:
+        from app_realtime import socketio
+        socketio.run(app, host=host, port=int(port), use_reloader=False, allow_unsafe_werkzeug=True)
+    else:
+        app.run(host=host, port=int(port), use_reloader=False, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
+else:
+    app = load_app()